@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Migration Script: Backfill metadata.source_key on existing OpenSearch indexes
+
+PROBLEM:
+- Chunks and images indexed before source_key existed only carry metadata.source
+- With USE_SOURCE_KEY_FILTER=true, document filters are a single term on
+  metadata.source_key.keyword, so those records would not match; run this
+  script before enabling the flag
+
+SOLUTION:
+- Run update_by_query on every aris-* index (document chunk indexes and the
+  images index), setting source_key = lowercased basename of metadata.source
+  for records that do not have it yet
+
+USAGE:
+    python3 scripts/backfill_source_key.py [--dry-run] [--prefix aris-] [--index NAME]
+"""
+
+import os
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from shared.config.settings import ARISConfig
+from shared.utils.source_key import SOURCE_KEY_FIELD, SOURCE_KEY_PAINLESS
+
+MISSING_SOURCE_KEY_QUERY = {
+    "bool": {
+        "filter": [{"exists": {"field": "metadata.source"}}],
+        "must_not": [{"exists": {"field": SOURCE_KEY_FIELD}}],
+    }
+}
+
+
+def backfill_index(client, index_name: str, dry_run: bool = False) -> int:
+    """Backfill one index. Returns the number of records updated (or that would be)."""
+    missing = client.count(index=index_name, body={"query": MISSING_SOURCE_KEY_QUERY}).get("count", 0)
+    if dry_run or not missing:
+        return missing
+    response = client.update_by_query(
+        index=index_name,
+        body={
+            "query": MISSING_SOURCE_KEY_QUERY,
+            "script": {"source": SOURCE_KEY_PAINLESS, "lang": "painless"},
+        },
+        conflicts="proceed",
+        refresh=True,
+        slices="auto",
+        request_timeout=3600,
+    )
+    return response.get("updated", 0)
+
+
+def backfill_source_key(prefix: str = "aris-", index: str = None, dry_run: bool = False) -> bool:
+    from vectorstores.opensearch_store import OpenSearchCRUDManager
+
+    print("=" * 80)
+    print("MIGRATION: Backfill metadata.source_key")
+    print("=" * 80)
+
+    crud = OpenSearchCRUDManager(
+        embeddings=None,
+        domain=os.getenv('AWS_OPENSEARCH_DOMAIN') or ARISConfig.AWS_OPENSEARCH_DOMAIN,
+        region=ARISConfig.AWS_OPENSEARCH_REGION
+    )
+    client = crud._client
+    index_names = [index] if index else [idx['index_name'] for idx in crud.list_all_indexes(prefix=prefix)]
+    print(f"\n📋 {len(index_names)} index(es) to check")
+
+    total = 0
+    failed = 0
+    for index_name in index_names:
+        try:
+            count = backfill_index(client, index_name, dry_run=dry_run)
+            total += count
+            verb = "would update" if dry_run else "updated"
+            print(f"  ✅ {index_name:<60} | {verb} {count}")
+        except Exception as e:
+            failed += 1
+            print(f"  ❌ {index_name:<60} | {e}")
+
+    print("-" * 80)
+    print(f"\n📊 Records {'to update' if dry_run else 'updated'}: {total} ({failed} index(es) failed)")
+    if dry_run:
+        print("\n🔍 DRY RUN MODE - No changes were made")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Backfill metadata.source_key on OpenSearch indexes")
+    parser.add_argument("--dry-run", action="store_true", help="Only count records missing source_key")
+    parser.add_argument("--prefix", default="aris-", help="Index name prefix (default: aris-)")
+    parser.add_argument("--index", default=None, help="Backfill a single index")
+    args = parser.parse_args()
+
+    try:
+        success = backfill_source_key(prefix=args.prefix, index=args.index, dry_run=args.dry_run)
+        sys.exit(0 if success else 1)
+    except Exception as e:
+        print(f"\n❌ Migration failed: {e}", file=sys.stderr)
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
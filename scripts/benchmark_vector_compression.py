@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Benchmark reduced-precision vector storage (VECTOR_COMPRESSION) with and without rescoring.
+
+Builds a synthetic clustered corpus of unit vectors, takes exact float32 search as
+ground truth and reports, per compression mode:
+  - memory:   in-memory vector/index bytes (FAISS serialized index, OpenSearch k-NN
+              native memory after warmup, Qdrant estimated from the storage type)
+  - latency:  p50 / p95 per query
+  - recall@k: overlap with the exact top-k
+
+Backends:
+  - FAISS (always, in process)
+  - OpenSearch (--opensearch; uses AWS_OPENSEARCH_DOMAIN credentials, creates and
+    deletes temporary aris-bench-* indexes)
+  - Qdrant (--qdrant-url URL, or ":memory:" for the local mode which ignores quantization)
+
+Usage:
+    python scripts/benchmark_vector_compression.py --vectors 20000 --dim 1536 --queries 200 --k 10
+    python scripts/benchmark_vector_compression.py --opensearch --qdrant-url http://localhost:6333
+"""
+import os
+import statistics
+import sys
+import time
+import uuid
+from pathlib import Path
+
+import numpy as np
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from shared.config.settings import ARISConfig
+from vectorstores.vector_compression import COMPRESSION_MODES, rescore_oversample
+
+
+def build_corpus(num_vectors: int, dim: int, num_queries: int, seed: int = 7):
+    """Unit vectors around random centroids (embedding-like), plus held-out queries."""
+    rng = np.random.default_rng(seed)
+    centroids = rng.standard_normal((max(1, num_vectors // 200), dim)).astype(np.float32)
+    assignment = rng.integers(0, len(centroids), num_vectors + num_queries)
+    data = centroids[assignment] + 0.35 * rng.standard_normal((num_vectors + num_queries, dim)).astype(np.float32)
+    data /= np.linalg.norm(data, axis=1, keepdims=True)
+    return data[:num_vectors], data[num_vectors:]
+
+
+def exact_top_k(vectors, queries, k):
+    import faiss
+
+    index = faiss.IndexFlatL2(vectors.shape[1])
+    index.add(vectors)
+    return index.search(queries, k)[1]
+
+
+def report(backend, mode, rescored, memory, latencies, results, truth, k):
+    latencies = sorted(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1] if len(latencies) > 1 else latencies[0]
+    recall = np.mean([len(set(r[:k]) & set(t)) / k for r, t in zip(results, truth)])
+    print(
+        f"{backend:<10} {mode:<8} {'yes' if rescored else 'no':<7} {memory:>12} "
+        f"{statistics.median(latencies):9.2f} {p95:9.2f} {recall:10.3f}"
+    )
+
+
+def human_bytes(num_bytes):
+    if num_bytes is None:
+        return "n/a"
+    for unit in ("B", "KB", "MB", "GB"):
+        if num_bytes < 1024 or unit == "GB":
+            return f"{num_bytes:.1f} {unit}"
+        num_bytes /= 1024
+
+
+def bench_faiss(vectors, queries, truth, k):
+    import faiss
+    from vectorstores.faiss_index import build_faiss_index, train_if_needed
+
+    oversample = rescore_oversample()
+    for mode in ("none", "fp16", "int8"):  # FAISS on_disk = int8 codes + the float32 side file
+        config = type("BenchConfig", (ARISConfig,), {"VECTOR_COMPRESSION": mode})
+        index = build_faiss_index(vectors.shape[1], ARISConfig.FAISS_INDEX_TYPE, config)
+        train_if_needed(index, vectors)
+        index.add(vectors)
+        memory = human_bytes(len(faiss.serialize_index(index)))
+        for rescored in ((False, True) if mode != "none" else (False,)):
+            latencies, results = [], []
+            for query in queries:
+                start = time.perf_counter()
+                fetch = int(k * oversample) if rescored else k
+                labels = index.search(query.reshape(1, -1), fetch)[1][0]
+                if rescored:
+                    labels = labels[labels >= 0]
+                    distances = np.sum((vectors[labels] - query) ** 2, axis=1)
+                    labels = labels[np.argsort(distances)[:k]]
+                latencies.append((time.perf_counter() - start) * 1000)
+                results.append(list(labels))
+            report("faiss", mode, rescored, memory, latencies, results, truth, k)
+
+
+def bench_opensearch(vectors, queries, truth, k):
+    from opensearchpy import helpers
+    from vectorstores.opensearch_store import OpenSearchCRUDManager
+    from vectorstores.vector_compression import apply_opensearch_rescore, opensearch_index_body
+
+    crud = OpenSearchCRUDManager(
+        embeddings=None,
+        domain=os.getenv('AWS_OPENSEARCH_DOMAIN') or ARISConfig.AWS_OPENSEARCH_DOMAIN,
+        region=ARISConfig.AWS_OPENSEARCH_REGION
+    )
+    client = crud._client
+    for mode in COMPRESSION_MODES:
+        index_name = f"aris-bench-{mode.replace('_', '-')}-{uuid.uuid4().hex[:6]}"
+        client.indices.create(index=index_name, body=opensearch_index_body(vectors.shape[1], mode))
+        try:
+            helpers.bulk(
+                client,
+                ({"_index": index_name, "_id": str(i), "vector_field": v.tolist(), "text": ""} for i, v in enumerate(vectors)),
+                chunk_size=500,
+                request_timeout=600,
+            )
+            client.indices.refresh(index=index_name)
+            client.transport.perform_request("GET", f"/_plugins/_knn/warmup/{index_name}")
+            stats = client.transport.perform_request("GET", "/_plugins/_knn/stats")
+            memory_kb = sum(
+                node.get("indices_in_cache", {}).get(index_name, {}).get("graph_memory_usage", 0)
+                for node in stats.get("nodes", {}).values()
+            )
+            memory = human_bytes(memory_kb * 1024)
+            for rescored in ((False, True) if mode != "none" else (False,)):
+                latencies, results = [], []
+                for query in queries:
+                    body = {"size": k, "_source": False, "query": {"knn": {"vector_field": {"vector": query.tolist(), "k": k}}}}
+                    if rescored:
+                        apply_opensearch_rescore(body, query.tolist(), k, mode)
+                    start = time.perf_counter()
+                    hits = client.search(index=index_name, body=body)["hits"]["hits"][:k]
+                    latencies.append((time.perf_counter() - start) * 1000)
+                    results.append([int(hit["_id"]) for hit in hits])
+                report("opensearch", mode, rescored, memory, latencies, results, truth, k)
+        finally:
+            client.indices.delete(index=index_name)
+
+
+def bench_qdrant(url, vectors, queries, truth, k):
+    from qdrant_client import QdrantClient
+    from qdrant_client.models import PointStruct
+    from vectorstores.vector_compression import qdrant_search_params, qdrant_vectors_config
+
+    client = QdrantClient(location=":memory:") if url == ":memory:" else QdrantClient(url=url, api_key=ARISConfig.QDRANT_API_KEY)
+    bytes_per_value = {"none": 4, "fp16": 2, "int8": 1, "on_disk": 1}
+    for mode in COMPRESSION_MODES:
+        collection = f"aris_bench_{mode}_{uuid.uuid4().hex[:6]}"
+        vectors_config, quantization = qdrant_vectors_config(vectors.shape[1], mode)
+        client.create_collection(collection_name=collection, vectors_config=vectors_config, quantization_config=quantization)
+        try:
+            for start in range(0, len(vectors), 500):
+                client.upsert(collection_name=collection, points=[
+                    PointStruct(id=i, vector=vectors[i].tolist()) for i in range(start, min(start + 500, len(vectors)))
+                ])
+            memory = f"~{human_bytes(len(vectors) * vectors.shape[1] * bytes_per_value[mode])}"
+            for rescored in ((False, True) if quantization is not None else (False,)):
+                params = qdrant_search_params(True) if rescored else None
+                if quantization is not None and not rescored:
+                    from qdrant_client.models import QuantizationSearchParams, SearchParams
+                    params = SearchParams(quantization=QuantizationSearchParams(rescore=False))
+                latencies, results = [], []
+                for query in queries:
+                    start = time.perf_counter()
+                    points = client.query_points(collection_name=collection, query=query.tolist(), search_params=params, limit=k).points
+                    latencies.append((time.perf_counter() - start) * 1000)
+                    results.append([int(p.id) for p in points])
+                report("qdrant", mode, rescored, memory, latencies, results, truth, k)
+        finally:
+            client.delete_collection(collection_name=collection)
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark vector compression modes (memory, latency, recall@k)")
+    parser.add_argument("--vectors", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--opensearch", action="store_true", help="Also benchmark OpenSearch (temporary indexes)")
+    parser.add_argument("--qdrant-url", default=None, help="Also benchmark Qdrant at this URL (':memory:' for local mode)")
+    args = parser.parse_args()
+
+    vectors, queries = build_corpus(args.vectors, args.dim, args.queries)
+    truth = exact_top_k(vectors, queries, args.k)
+    print(f"{args.vectors} vectors x {args.dim} dims, {args.queries} queries, oversample {rescore_oversample()}x, "
+          f"FAISS index type '{ARISConfig.FAISS_INDEX_TYPE}'\n")
+    print(f"{'backend':<10} {'mode':<8} {'rescore':<7} {'memory':>12} {'p50 ms':>9} {'p95 ms':>9} {'recall@' + str(args.k):>10}")
+
+    bench_faiss(vectors, queries, truth, args.k)
+    if args.opensearch:
+        bench_opensearch(vectors, queries, truth, args.k)
+    if args.qdrant_url:
+        bench_qdrant(args.qdrant_url, vectors, queries, truth, args.k)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Migration Script: Add the PGVector hybrid search schema
+
+PROBLEM:
+- Native hybrid search needs a generated tsvector column (with a GIN index) on
+  the LangChain embeddings table
+- Adding a generated STORED column rewrites the table under an ACCESS EXCLUSIVE
+  lock, blocking reads and writes for the duration on a large table
+
+SOLUTION:
+- Add the column and its indexes once, explicitly (maintenance window), instead of
+  whenever a store is created
+- The ingestion service does the same at startup unless PGVECTOR_MIGRATE_ON_STARTUP=false
+- HNSW indexes are per embedding dimension and still created by the store on first use
+
+USAGE:
+    python3 scripts/migrate_pgvector_hybrid.py [--connection-string URI] [--text-search-config simple]
+"""
+
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from shared.config.settings import ARISConfig
+from vectorstores.pgvector_store import PgVectorStore, migrate_hybrid_schema
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Add the tsvector column and GIN index used by PGVector hybrid search")
+    parser.add_argument("--connection-string", default=None, help="PostgreSQL URI (default: PGVECTOR_* settings)")
+    parser.add_argument("--text-search-config", default=ARISConfig.PGVECTOR_TEXT_SEARCH_CONFIG,
+                        help="Postgres text search configuration of the tsvector column")
+    args = parser.parse_args()
+
+    try:
+        connection_string = args.connection_string or PgVectorStore._build_connection_string_from_env()
+        success = migrate_hybrid_schema(connection_string, args.text_search_config)
+        print("✅ PGVector hybrid schema ready" if success else "❌ PGVector hybrid schema migration failed (see log)")
+        sys.exit(0 if success else 1)
+    except Exception as e:
+        print(f"\n❌ Migration failed: {e}", file=sys.stderr)
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
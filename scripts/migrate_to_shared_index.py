@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Migration Script: Move per-document aris-doc-* indexes into the shared chunk index
+
+PROBLEM:
+- Every ingested document got its own OpenSearch index (aris-doc-{id})
+- Thousands of tiny indexes waste heap/shard overhead and make cross-document
+  queries fan out across all of them
+
+SOLUTION:
+- Create the shared index (OPENSEARCH_SHARED_INDEX, routing required) with the
+  dimension of the existing chunk indexes
+- _reindex each document's index into it, routing every chunk by the document's
+  source_key and stamping metadata.source_key
+- Point the registry text_index and document_index_map.json at the shared index
+- Optionally delete the old per-document indexes (--delete-old)
+
+Set OPENSEARCH_INDEX_LAYOUT=shared for the services after migrating.
+
+USAGE:
+    python3 scripts/migrate_to_shared_index.py [--dry-run] [--delete-old] [--document-id ID]
+"""
+
+import json
+import os
+import sys
+from datetime import datetime
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from shared.config.settings import ARISConfig
+from shared.utils.source_key import source_key
+from vectorstores.shared_index import document_routing, is_shared_index, shared_index_body, shared_index_name
+
+REINDEX_PAINLESS = (
+    "if (ctx._source.metadata == null) { ctx._source.metadata = new HashMap(); }"
+    " ctx._source.metadata.source_key = params.source_key;"
+    " ctx._routing = params.routing;"
+)
+
+
+def index_dimension(client, index_name: str) -> int:
+    """Vector dimension of an existing chunk index."""
+    mapping = client.indices.get_mapping(index=index_name)
+    properties = next(iter(mapping.values()))["mappings"]["properties"]
+    return int(properties["vector_field"]["dimension"])
+
+
+def ensure_shared_index(client, target: str, dimension: int):
+    if client.indices.exists(index=target):
+        existing = index_dimension(client, target)
+        if existing != dimension:
+            raise ValueError(f"Shared index '{target}' has dimension {existing}, source indexes have {dimension}")
+        return
+    client.indices.create(index=target, body=shared_index_body(dimension))
+    print(f"✅ Created shared index '{target}' (dimension {dimension}, {ARISConfig.OPENSEARCH_SHARED_INDEX_SHARDS} shards)")
+
+
+def reindex_document(client, old_index: str, target: str, document_name: str) -> int:
+    """Copy one document's chunks into the shared index. Returns the number created."""
+    response = client.reindex(
+        body={
+            "source": {"index": old_index},
+            "dest": {"index": target},
+            "script": {
+                "source": REINDEX_PAINLESS,
+                "lang": "painless",
+                "params": {
+                    "source_key": source_key(document_name),
+                    "routing": document_routing([document_name]),
+                },
+            },
+        },
+        refresh=False,
+        request_timeout=3600,
+    )
+    failures = response.get("failures") or []
+    if failures:
+        raise RuntimeError(f"{len(failures)} chunk(s) failed: {failures[0]}")
+    return response.get("created", 0) + response.get("updated", 0)
+
+
+def migrate_to_shared_index(dry_run: bool = False, delete_old: bool = False, document_id: str = None) -> bool:
+    from storage.document_registry import DocumentRegistry
+    from vectorstores.opensearch_store import OpenSearchCRUDManager
+
+    print("=" * 80)
+    print("MIGRATION: Per-document indexes -> shared chunk index")
+    print("=" * 80)
+
+    crud = OpenSearchCRUDManager(
+        embeddings=None,
+        domain=os.getenv('AWS_OPENSEARCH_DOMAIN') or ARISConfig.AWS_OPENSEARCH_DOMAIN,
+        region=ARISConfig.AWS_OPENSEARCH_REGION
+    )
+    client = crud._client
+    registry = DocumentRegistry(ARISConfig.DOCUMENT_REGISTRY_PATH)
+    target = shared_index_name()
+
+    # Documents whose chunks still live in their own index
+    candidates = []
+    for doc in registry.list_documents():
+        old_index = (doc.get('text_index') or '').strip()
+        doc_name = (doc.get('document_name') or '').strip()
+        if document_id and doc.get('document_id') != document_id:
+            continue
+        if doc.get('status') != 'success' or not old_index or not doc_name or is_shared_index(old_index):
+            continue
+        if not client.indices.exists(index=old_index):
+            print(f"  ⚠️  {doc_name[:50]:<50} | index '{old_index}' missing, skipped")
+            continue
+        candidates.append((doc, old_index, doc_name))
+
+    print(f"\n📋 {len(candidates)} document(s) to migrate into '{target}'")
+    if not candidates:
+        return True
+
+    if dry_run:
+        for doc, old_index, doc_name in candidates:
+            count = client.count(index=old_index).get('count', 0)
+            print(f"  🔍 {doc_name[:50]:<50} | {old_index} | {count} chunks")
+        print("\n🔍 DRY RUN MODE - No changes were made")
+        return True
+
+    ensure_shared_index(client, target, index_dimension(client, candidates[0][1]))
+
+    document_index_map_path = os.path.join(ARISConfig.VECTORSTORE_PATH, "document_index_map.json")
+    document_index_map = {}
+    if os.path.exists(document_index_map_path):
+        with open(document_index_map_path, 'r') as f:
+            document_index_map = json.load(f)
+
+    migrated = []
+    failed = 0
+    print("-" * 80)
+    for doc, old_index, doc_name in candidates:
+        try:
+            count = reindex_document(client, old_index, target, doc_name)
+            registry.client.update(
+                index=registry.index_name,
+                id=doc['document_id'],
+                body={'doc': {'text_index': target, 'updated_at': datetime.now().isoformat()}},
+                refresh=True
+            )
+            document_index_map[doc_name] = target
+            migrated.append(old_index)
+            print(f"  ✅ {doc_name[:50]:<50} | {old_index} → {target} | {count} chunks")
+        except Exception as e:
+            failed += 1
+            print(f"  ❌ {doc_name[:50]:<50} | {old_index} | {e}")
+
+    client.indices.refresh(index=target)
+
+    os.makedirs(os.path.dirname(document_index_map_path), exist_ok=True)
+    with open(document_index_map_path, 'w') as f:
+        json.dump(document_index_map, f, indent=2)
+    print(f"\n💾 document_index_map saved ({len(document_index_map)} entries)")
+
+    if delete_old:
+        for old_index in migrated:
+            try:
+                client.indices.delete(index=old_index)
+            except Exception as e:
+                print(f"  ⚠️  Could not delete '{old_index}': {e}")
+        print(f"🗑️  Deleted {len(migrated)} per-document index(es)")
+
+    print("-" * 80)
+    print(f"\n📊 Migrated: {len(migrated)} | Failed: {failed}")
+    print("\n🔄 Next Steps:")
+    print("   1. Set OPENSEARCH_INDEX_LAYOUT=shared for ingestion and retrieval")
+    print("   2. Restart services to load updated mappings")
+    if not delete_old:
+        print("   3. Re-run with --delete-old once queries are verified")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Migrate per-document OpenSearch indexes into the shared chunk index")
+    parser.add_argument("--dry-run", action="store_true", help="Show what would be migrated without making changes")
+    parser.add_argument("--delete-old", action="store_true", help="Delete per-document indexes after migrating them")
+    parser.add_argument("--document-id", default=None, help="Migrate a single document")
+    args = parser.parse_args()
+
+    try:
+        success = migrate_to_shared_index(dry_run=args.dry_run, delete_old=args.delete_old, document_id=args.document_id)
+        sys.exit(0 if success else 1)
+    except Exception as e:
+        print(f"\n❌ Migration failed: {e}", file=sys.stderr)
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
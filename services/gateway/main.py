@@ -91,16 +91,9 @@ app.add_middleware(
 
 @app.middleware("http")
 async def auto_sync_middleware(request: Request, call_next):
-    """Middleware to automatically sync state before operations."""
+    """Tag requests with an ID (sync runs in the background task, never per request)."""
     request_id = request.headers.get("X-Request-ID", "internal")
     
-    # Auto-sync before critical operations (queries, document listing)
-    if sync_manager and request.url.path in ["/query", "/documents", "/health"]:
-        try:
-            sync_manager.check_and_sync()
-        except Exception as e:
-            logger.debug(f"Auto-sync check failed in middleware: {e}")
-    
     logger.info(f"Gateway: [ReqID: {request_id}] {request.method} {request.url.path}")
     response = await call_next(request)
     response.headers["X-Request-ID"] = request_id
@@ -145,7 +138,8 @@ async def health_check(service: GatewayService = Depends(get_service)):
             "service": "gateway",
             "registry_accessible": registry_accessible,
             "registry_document_count": doc_count,
-            "index_map_accessible": index_map_accessible
+            "index_map_accessible": index_map_accessible,
+            "sync": sync_manager.get_sync_staleness() if sync_manager else None
         }
     except Exception as e:
         return {
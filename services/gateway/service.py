@@ -109,7 +109,7 @@ class GatewayService:
     def remove_document(self, document_id: str) -> bool:
         """Removes document from registry and proxies deletion to Retrieval Service"""
         # 1. Remove from registry
-        success = self.document_registry.remove_document(document_id)
+        success = self.document_registry.remove_document(document_id, refresh="wait_for")
         
         # 2. Proxy deletion to Retrieval Service (async background or just wait)
         # We'll use a simple background-like fire and forget for the microservice deletion
@@ -0,0 +1,98 @@
+"""
+Bulk import sources.
+
+A bulk import names a server-side directory (which must lie under BULK_IMPORT_ROOT)
+or an s3://bucket/prefix. Either is expanded into a file list ({path, name}) that
+is queued as one job per file (or handed to DocumentProcessor.process_documents_batch
+when the job queue is disabled); S3 objects are downloaded concurrently into a
+per-batch directory first, which is removed once the batch is done.
+"""
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from shared.config.settings import ARISConfig
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_EXTENSIONS = {'.pdf', '.txt', '.md', '.docx', '.doc'}
+
+
+class BulkImportError(ValueError):
+    """The bulk import source is not allowed or cannot be read."""
+
+
+def _supported(name: str) -> bool:
+    return os.path.splitext(name)[1].lower() in SUPPORTED_EXTENSIONS
+
+
+def parse_s3_source(source: str) -> Tuple[str, str]:
+    """Split s3://bucket/prefix into (bucket, prefix)."""
+    bucket, _, prefix = source[len("s3://"):].partition("/")
+    if not bucket:
+        raise BulkImportError(f"Invalid S3 source: {source}")
+    return bucket, prefix
+
+
+def list_local_files(source: str, recursive: bool = False, root: Optional[str] = None) -> List[Dict]:
+    """Supported files of a directory under the bulk import root, sorted by path."""
+    root = os.path.realpath(root or ARISConfig.BULK_IMPORT_ROOT)
+    directory = os.path.realpath(source if os.path.isabs(source) else os.path.join(root, source))
+    if os.path.commonpath([root, directory]) != root:
+        raise BulkImportError(f"Bulk import directory must be inside {root}")
+    if not os.path.isdir(directory):
+        raise BulkImportError(f"Bulk import directory not found: {source}")
+
+    paths = []
+    for dirpath, dirnames, filenames in os.walk(directory):
+        paths.extend(os.path.join(dirpath, name) for name in filenames if _supported(name))
+        if not recursive:
+            break
+    return [{'path': path, 'name': os.path.basename(path)} for path in sorted(paths)]
+
+
+def download_s3_files(source: str, target_dir: str, s3_client, recursive: bool = True) -> List[Dict]:
+    """Download the supported objects under an S3 prefix into target_dir (concurrently)."""
+    bucket, prefix = parse_s3_source(source)
+    keys = []
+    paginator = s3_client.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+        for obj in page.get('Contents', []):
+            key = obj['Key']
+            relative = key[len(prefix):].lstrip('/')
+            if not recursive and '/' in relative:
+                continue
+            if _supported(key):
+                keys.append(key)
+    if not keys:
+        return []
+
+    os.makedirs(target_dir, exist_ok=True)
+
+    def download(indexed_key: Tuple[int, str]) -> Optional[Dict]:
+        idx, key = indexed_key
+        name = os.path.basename(key)
+        # Prefix with the position: equal names under different sub-prefixes must not collide
+        path = os.path.join(target_dir, f"{idx:05d}_{name}")
+        try:
+            s3_client.download_file(bucket, key, path)
+        except Exception as e:
+            logger.warning(f"⚠️ [BULK] Could not download s3://{bucket}/{key}: {e}")
+            return None
+        return {'path': path, 'name': name}
+
+    workers = max(1, min(ARISConfig.S3_MAX_CONCURRENCY, len(keys)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        files = [f for f in pool.map(download, enumerate(sorted(keys))) if f]
+    logger.info(f"✅ [BULK] Downloaded {len(files)}/{len(keys)} objects from s3://{bucket}/{prefix}")
+    return files
+
+
+def collect_files(source: str, target_dir: Optional[str], recursive: bool = False, s3_client=None) -> List[Dict]:
+    """Files of a bulk import source (local directory or s3://bucket/prefix)."""
+    if source.startswith("s3://"):
+        if s3_client is None:
+            raise BulkImportError("S3 storage is not enabled")
+        return download_s3_files(source, target_dir, s3_client, recursive=recursive)
+    return list_local_files(source, recursive=recursive)
@@ -0,0 +1,88 @@
+"""
+Content-keyed cache of chunk embeddings shared by the ingestion stores.
+
+The page store (cross-document reuse) and the job queue (resume after a crash)
+both serve chunk vectors by content hash. An engine gets a single
+PersistentEmbeddings wrapper: vectors are read from and written to one backing
+store (the page store when it is attached, otherwise the job queue), and the
+other attachments are only told which hashes were used, so every vector is
+stored once. (Not to be confused with shared.utils.cached_embeddings, the
+in-memory query/OCR cache of the retrieval engine and images store.)
+"""
+import hashlib
+import logging
+import sqlite3
+from typing import Callable, List, Sequence
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from shared.utils.embedding_dimensions import embedding_dimension, embedding_model_name
+
+logger = logging.getLogger(__name__)
+
+# SQLite limits the number of bound parameters per statement
+LOOKUP_BATCH = 500
+
+
+def select_by_keys(conn: sqlite3.Connection, query: str, keys: Sequence[str]) -> List[tuple]:
+    """Run ``query`` (with a ``{placeholders}`` slot for ``key IN (...)``) over keys in batches."""
+    unique = list(dict.fromkeys(keys))
+    rows: List[tuple] = []
+    for start in range(0, len(unique), LOOKUP_BATCH):
+        batch = unique[start:start + LOOKUP_BATCH]
+        rows.extend(conn.execute(query.format(placeholders=','.join('?' * len(batch))), batch).fetchall())
+    return rows
+
+
+def vector_blob(vector: Sequence[float]) -> bytes:
+    return np.asarray(vector, dtype=np.float32).tobytes()
+
+
+def blob_vector(blob: bytes) -> List[float]:
+    return np.frombuffer(blob, dtype=np.float32).tolist()
+
+
+class PersistentEmbeddings(Embeddings):
+    """
+    Embeddings whose document vectors are kept by content hash in a store with
+    ``get_vectors(keys)`` / ``put_vectors(vectors)``: texts embedded before (by an
+    earlier document or an interrupted job) are served from the store, only new
+    texts are embedded.
+    """
+
+    def __init__(self, base: Embeddings, store):
+        self.base = base
+        self.store = store
+        # Called with the content keys of every embed_documents batch (e.g. job bookkeeping)
+        self.listeners: List[Callable[[List[str]], None]] = []
+        self.model = embedding_model_name(base)
+        self.dimensions = embedding_dimension(base)
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model}|{self.dimensions}|{text}".encode("utf-8")).hexdigest()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [self._key(text) for text in texts]
+        for listener in self.listeners:
+            listener(keys)
+        vectors = self.store.get_vectors(keys)
+        missing = [i for i, key in enumerate(keys) if key not in vectors]
+        if missing:
+            embedded = self.base.embed_documents([texts[i] for i in missing])
+            new_vectors = {keys[i]: vector for i, vector in zip(missing, embedded)}
+            self.store.put_vectors(new_vectors)
+            vectors.update(new_vectors)
+        if len(missing) < len(keys):
+            logger.info(f"♻️ Reused {len(keys) - len(missing)}/{len(keys)} cached chunk embeddings")
+        return [list(vectors[key]) for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.base.embed_query(text)
+
+
+def persistent_embeddings(engine, store) -> PersistentEmbeddings:
+    """The engine's PersistentEmbeddings, wrapping its embeddings with ``store`` on first use."""
+    if not isinstance(engine.embeddings, PersistentEmbeddings):
+        engine.embeddings = PersistentEmbeddings(engine.embeddings, store)
+    return engine.embeddings
@@ -5,19 +5,21 @@ import os
 import time as time_module
 import math
 import logging
+import threading
 import traceback
 from typing import List, Dict, Optional, Callable, Any
 import numpy as np
 from dotenv import load_dotenv
-from langchain_openai import OpenAIEmbeddings
-from shared.utils.local_embeddings import LocalHashEmbeddings
+from shared.utils.embedding_dimensions import create_embeddings
 try:
     from langchain.docstore.document import Document
 except ImportError:
     from langchain_core.documents import Document
 import requests
-from shared.utils.tokenizer import TokenTextSplitter
+from shared.utils.tokenizer import TokenTextSplitter, count_tokens
 from shared.utils.s3_service import S3Service
+from shared.utils.chunk_identity import assign_chunk_identities, diff_chunk_identities, scope_chunk_ids
+from shared.utils.source_key import source_key_filter
 # Accuracy Improvements: Recursive Chunking and Reranking
 try:
     from langchain_text_splitters import RecursiveCharacterTextSplitter
@@ -33,6 +35,7 @@ except ImportError:
     Ranker = None
     RerankRequest = None
 from vectorstores.vector_store_factory import VectorStoreFactory
+from vectorstores.shared_index import document_routing, is_shared_index, shared_index_name, use_shared_layout
 from shared.config.settings import ARISConfig
 
 load_dotenv()
@@ -120,15 +123,12 @@ class IngestionEngine:
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
         
-        # Use selected embedding model (use instance variable after defaults applied)
-        if os.getenv('OPENAI_API_KEY'):
-            self.embeddings = OpenAIEmbeddings(
-                openai_api_key=os.getenv('OPENAI_API_KEY'),
-                model=self.embedding_model
-            )
-        else:
-            self.embeddings = LocalHashEmbeddings(model_name=self.embedding_model)
+        # Use selected embedding model (use instance variable after defaults applied),
+        # shortened to EMBEDDING_DIMENSIONS when configured
+        self.embeddings = create_embeddings(self.embedding_model)
         self.vectorstore = None
+        # Set by PageStore.attach(): pages ingested before reuse their chunks and vectors
+        self.page_store = None
         # Use token-aware text splitter with configurable chunking
         # Accuracy Upgrade: Use RecursiveCharacterTextSplitter for context preservation
         # This splits by paragraphs/headers first, then falls back to tokens
@@ -187,6 +187,9 @@ class IngestionEngine:
         # Document tracking for incremental updates
         self.document_index: Dict[str, List[int]] = {}  # {doc_id: [chunk_indices]}
         self.total_tokens = 0
+        # Chunk + embed + index re-targets the vector store and updates the counters and the
+        # index map above, so documents processed by concurrent workers are indexed one at a time
+        self.indexing_lock = threading.RLock()
         
         # Document-to-index mapping for per-document OpenSearch indexes
         self.document_index_map: Dict[str, str] = {}  # document_name -> index_name
@@ -903,9 +906,12 @@ class IngestionEngine:
         
         try:
             logger.info(f"[STEP 3.1.3] RAGSystem: Starting chunking operation (timeout warning at {chunking_timeout_warning}s)...")
-            chunks = splitter_to_use.split_documents(
-                safe_documents
-            )
+            if self.page_store is not None:
+                chunks = self._split_with_page_store(splitter_to_use, safe_documents)
+            else:
+                chunks = splitter_to_use.split_documents(
+                    safe_documents
+                )
             if chunks is None:
                 chunks = []
             
@@ -1022,6 +1028,9 @@ class IngestionEngine:
                 chunk.metadata['token_count'] = token_count
             self.total_tokens += token_count
         
+        # Content-hash identity per chunk (stored as metadata.chunk_hash)
+        chunk_ids = assign_chunk_identities(valid_chunks)
+        
         logger.info(f"Total tokens: {self.total_tokens:,}")
         
         if progress_callback:
@@ -1037,8 +1046,20 @@ class IngestionEngine:
                 doc_name = first_meta.get('source', 'Unknown')
                 doc_id = first_meta.get('document_id')
                 explicit_index_name = first_meta.get('text_index') or first_meta.get('opensearch_index')
+                # Shared layout: chunks go to the consolidated index, routed by document
+                routing = None
 
-                if explicit_index_name:
+                if use_shared_layout() and not (explicit_index_name and not is_shared_index(explicit_index_name)):
+                    index_name = explicit_index_name or shared_index_name()
+                    routing = document_routing([doc_name])
+                    logger.info(f"Using shared OpenSearch index '{index_name}' for document '{doc_name}' (routing={routing})")
+                    try:
+                        if doc_name:
+                            self.document_index_map[doc_name] = index_name
+                            self._save_document_index_map()
+                    except Exception as e:
+                        logger.warning(f"operation: {type(e).__name__}: {e}")
+                elif explicit_index_name:
                     index_name = explicit_index_name
                     logger.info(f"Using explicit OpenSearch index '{index_name}' for document '{doc_name}'")
                     # Ensure mapping exists for query-time filtering
@@ -1077,6 +1098,18 @@ class IngestionEngine:
                         logger.info(f"Created new index '{index_name}' for document '{doc_name}'")
                         self._save_document_index_map()
                 
+                # Content-hash ids make re-ingestion idempotent: unchanged chunks keep their _id.
+                # Any index can hold several documents (shared layout, explicit index names), so
+                # ids are scoped by document: identical chunks of two documents need distinct _ids
+                chunk_ids = scope_chunk_ids(chunk_ids, doc_name)
+                for chunk, chunk_id in zip(valid_chunks, chunk_ids):
+                    chunk.id = chunk_id
+                
+                if getattr(ARISConfig, 'ENABLE_INCREMENTAL_REINGEST', True):
+                    synced_chunks = self._reingest_incrementally(index_name, doc_name, valid_chunks, progress_callback, routing=routing)
+                    if synced_chunks is not None:
+                        return synced_chunks
+                
                 # Create vectorstore with document-specific index
                 if self.vectorstore is None:
                     # First document - create vectorstore with its index
@@ -1090,6 +1123,7 @@ class IngestionEngine:
                             embeddings=self.embeddings,
                             opensearch_domain=self.opensearch_domain,
                             opensearch_index=index_name,  # Use document-specific index
+                            opensearch_routing=routing,
                             pgvector_connection_string=self.pgvector_connection_string,
                             pgvector_collection=self.pgvector_collection,
                             qdrant_url=self.qdrant_url,
@@ -1104,7 +1138,7 @@ class IngestionEngine:
                 else:
                     # Check if we need to switch to a different index
                     current_index = getattr(self.vectorstore, 'index_name', None)
-                    if current_index != index_name:
+                    if current_index != index_name or getattr(self.vectorstore, 'routing', None) != routing:
                         # Create new vectorstore instance for this document's index
                         logger.info(f"[STEP 3.2.1] RAGSystem: Creating new {self.vector_store_type.upper()} vectorstore with index '{index_name}' for document '{doc_name}' ({len(valid_chunks)} chunks)...")
                         try:
@@ -1113,6 +1147,7 @@ class IngestionEngine:
                                 embeddings=self.embeddings,
                                 opensearch_domain=self.opensearch_domain,
                                 opensearch_index=index_name,
+                                opensearch_routing=routing,
                                 pgvector_connection_string=self.pgvector_connection_string,
                                 pgvector_collection=self.pgvector_collection,
                                 qdrant_url=self.qdrant_url,
@@ -1352,6 +1387,154 @@ class IngestionEngine:
         
         return len(valid_chunks)
     
+    def _split_with_page_store(self, splitter, documents: List[Document]):
+        """
+        Split page documents, reusing the stored chunks of pages ingested before.
+        
+        A page's chunks depend only on its text and the chunking fingerprint, so pages
+        split now are recorded right away; their vectors are stored as they are embedded.
+        """
+        from services.ingestion.page_store import chunking_fingerprint, page_key
+        
+        fingerprint = chunking_fingerprint(splitter, self.embeddings)
+        keys = [page_key(doc.page_content, fingerprint) for doc in documents]
+        try:
+            stored = self.page_store.get_pages(keys)
+        except Exception as e:
+            logger.warning(f"⚠️ Page store lookup failed, splitting every page: {type(e).__name__}: {e}")
+            stored = {}
+        
+        chunks: List[Document] = []
+        new_pages: Dict[str, List] = {}
+        reused = 0
+        for doc, key in zip(documents, keys):
+            known = stored[key] if key in stored else new_pages.get(key)
+            if known is not None:
+                reused += 1
+                for text, start in known:
+                    metadata = dict(doc.metadata)
+                    if start is not None:
+                        metadata['start_index'] = start
+                    chunks.append(Document(page_content=text, metadata=metadata))
+                continue
+            page_chunks = splitter.split_documents([doc]) or []
+            new_pages[key] = [(chunk.page_content, chunk.metadata.get('start_index')) for chunk in page_chunks]
+            chunks.extend(page_chunks)
+        
+        if new_pages:
+            try:
+                self.page_store.put_pages(new_pages)
+            except Exception as e:
+                logger.warning(f"⚠️ Could not record {len(new_pages)} pages in the page store: {type(e).__name__}: {e}")
+        if reused:
+            logger.info(f"♻️ [STEP 3.1] RAGSystem: Page store - reused {reused}/{len(documents)} pages, split {len(new_pages)}")
+        return chunks
+    
+    def _reingest_incrementally(
+        self,
+        index_name: str,
+        doc_name: str,
+        chunks: List[Document],
+        progress_callback: Optional[Callable] = None,
+        routing: Optional[str] = None
+    ) -> Optional[int]:
+        """
+        Sync a re-ingested document into its existing OpenSearch index by content-hash id.
+        
+        Only chunks whose id is not yet indexed are embedded; chunks that disappeared
+        are deleted and unchanged chunks only get their metadata (page, offsets,
+        document_id, ...) refreshed.
+        
+        Returns:
+            Number of chunks in the document after the sync, or None when the index
+            holds no fingerprinted chunks for this document (caller does a full ingest).
+        """
+        from vectorstores.opensearch_store import OpenSearchVectorStore
+        
+        store = self.vectorstore
+        if (
+            not isinstance(store, OpenSearchVectorStore)
+            or store.index_name != index_name
+            or getattr(store, 'routing', None) != routing
+        ):
+            try:
+                store = OpenSearchVectorStore(
+                    embeddings=self.embeddings,
+                    domain=self.opensearch_domain,
+                    index_name=index_name,
+                    region=getattr(self, 'region', None),
+                    routing=routing
+                )
+            except Exception as e:
+                logger.warning(f"Incremental re-ingest unavailable for '{index_name}': {type(e).__name__}: {e}")
+                return None
+        
+        if not store.index_exists(index_name):
+            return None
+        
+        existing = store.get_chunk_identities(source=doc_name)
+        if not existing:
+            # Legacy chunks without a chunk_hash cannot be diffed - drop them and re-embed everything.
+            # Other documents may share this index - only an exact document match is safe to delete
+            legacy_query = {"bool": {"should": [
+                clause for clause in (
+                    source_key_filter([doc_name]),
+                    {"term": {"metadata.source.keyword": doc_name}}
+                ) if clause
+            ], "minimum_should_match": 1}}
+            if store.count_documents(legacy_query) > 0:
+                try:
+                    store.vectorstore.client.delete_by_query(
+                        index=index_name, body={"query": legacy_query}, conflicts='proceed'
+                    )
+                    logger.info(f"Removed legacy chunks of '{doc_name}' from '{index_name}' before full re-ingest")
+                except Exception as e:
+                    logger.warning(f"Could not remove legacy chunks of '{doc_name}': {type(e).__name__}: {e}")
+            return None
+        
+        by_id = {chunk.id: chunk for chunk in chunks}
+        added, removed, kept = diff_chunk_identities(by_id.keys(), existing.keys())
+        logger.info(
+            f"🔄 Incremental re-ingest of '{doc_name}' into '{index_name}': "
+            f"{len(added)} new, {len(removed)} removed, {len(kept)} unchanged chunks"
+        )
+        
+        if added:
+            new_chunks = [by_id[chunk_id] for chunk_id in added]
+            batch_size = getattr(ARISConfig, 'EMBEDDING_BATCH_SIZE', 1000)
+            for start in range(0, len(new_chunks), batch_size):
+                batch = new_chunks[start:start + batch_size]
+                try:
+                    store.add_documents(batch, auto_recreate_on_mismatch=False)
+                except ValueError as e:
+                    if start == 0:
+                        # Nothing written yet (e.g. embedding dimension changed) - let the full path rebuild the index
+                        logger.warning(f"Incremental re-ingest aborted, falling back to full ingest: {e}")
+                        store.delete_chunks_by_ids(list(existing.keys()))
+                        return None
+                    raise
+                if progress_callback:
+                    progress = 0.65 + (min(start + batch_size, len(new_chunks)) / len(new_chunks)) * 0.25
+                    progress_callback('embedding', progress, detailed_message=f"Embedded {min(start + batch_size, len(new_chunks))}/{len(new_chunks)} changed chunks")
+        
+        if removed:
+            deleted = store.delete_chunks_by_ids(removed)
+            logger.info(f"🗑️ Deleted {deleted} stale chunks from '{index_name}'")
+        
+        updates = {}
+        for chunk_id in kept:
+            cleaned = store._clean_metadata_for_opensearch([by_id[chunk_id]])[0].metadata
+            stored = existing.get(chunk_id, {})
+            changed = {key: value for key, value in cleaned.items() if stored.get(key) != value}
+            if changed:
+                updates[chunk_id] = changed
+        if updates:
+            updated = store.update_chunks_metadata(updates)
+            logger.info(f"✅ Refreshed metadata for {updated} shifted chunks in '{index_name}'")
+        
+        self.vectorstore = store
+        return len(chunks)
+    
     def add_documents_incremental(self, 
         texts: List[str],
         metadatas: List[Dict] = None,
@@ -1370,13 +1553,13 @@ class IngestionEngine:
         Returns:
             Dict with processing stats: chunks_created, tokens_added, documents_added
         """
-        chunks_before = sum(len(chunks) for chunks in self.document_index.values())
-        tokens_before = self.total_tokens
-        
-        chunks_created = self.process_documents(texts, metadatas, progress_callback=progress_callback, index_name=index_name)
-        
-        chunks_after = sum(len(chunks) for chunks in self.document_index.values())
-        tokens_after = self.total_tokens
+        with self.indexing_lock:
+            tokens_before = self.total_tokens
+            
+            chunks_created = self.process_documents(texts, metadatas, progress_callback=progress_callback, index_name=index_name)
+            
+            chunks_after = sum(len(chunks) for chunks in self.document_index.values())
+            tokens_after = self.total_tokens
         
         return {
             'chunks_created': chunks_created,
@@ -1896,18 +2079,8 @@ class IngestionEngine:
         }
     
     def count_tokens(self, text: str) -> int:
-        """Count tokens in text using tiktoken."""
-        if not text:
-            return 0
-        try:
-            import tiktoken
-            # Use cl100k_base for OpenAI models (GPT-3.5/4)
-            encoding = tiktoken.get_encoding("cl100k_base")
-            return len(encoding.encode(text))
-        except Exception as e:
-            logger.debug(f"count_tokens: {type(e).__name__}: {e}")
-            # Fallback to rough estimate if tiktoken fails
-            return len(text) // 4
+        """Count tokens in text using the process-wide cached cl100k_base encoder."""
+        return count_tokens(text)
     
     def _truncate_text_by_tokens(self, text: str, max_tokens: int) -> str:
         """
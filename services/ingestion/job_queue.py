@@ -0,0 +1,484 @@
+"""
+Durable ingestion job queue.
+
+Jobs are rows in a SQLite database (WAL) next to their stage checkpoints, so a
+container restart re-queues in-flight jobs instead of losing them. A bounded
+pool of worker threads claims jobs by priority, admitting a job only while the
+total upload size of running jobs stays under INGESTION_MAX_INFLIGHT_MB (a
+job larger than the budget runs alone). Failed jobs are retried with backoff
+up to INGESTION_JOB_MAX_ATTEMPTS.
+
+A bulk import is a batch: one job per file, enqueued together, with the batch
+row kept in the same database so its progress survives restarts. A batch may
+own a download directory (S3 imports), removed once its last job finishes.
+
+Checkpoints:
+  - parsed:    the ParsedDocument is pickled per job; a resumed job skips parsing
+               (and the S3 backup and image indexing that came with it)
+  - chunking / embedding / indexed: progress recorded on the job row
+  - embedded batches: every embedded chunk vector is cached by content hash
+    (embedding_cache.PersistentEmbeddings), so a resumed job re-embeds nothing it
+    already embedded; content-hash chunk ids make re-indexing those chunks
+    idempotent. The hashes a job used are recorded against it. Vectors live in
+    the page store when one is attached, otherwise in this database, where a
+    finished job's vectors are deleted (vectors shared with a running job are kept)
+"""
+import hashlib
+import json
+import logging
+import os
+import pickle
+import shutil
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from shared.config.settings import ARISConfig
+
+from .embedding_cache import blob_vector, persistent_embeddings, select_by_keys, vector_blob
+
+logger = logging.getLogger(__name__)
+
+PARSED_FILE = "parsed.pkl"
+# Finished jobs and cached embedding vectors not tied to a job are purged after this long
+RETENTION_SECONDS = 7 * 24 * 3600
+_RETRY_BACKOFF_SECONDS = 30
+_POLL_SECONDS = 2.0
+
+
+class JobCheckpoint:
+    """Stage checkpoints of one job: the parsed document on disk, the stage on the job row."""
+
+    def __init__(self, queue: 'IngestionJobQueue', job_id: str, data: Optional[Dict[str, Any]] = None):
+        self.queue = queue
+        self.job_id = job_id
+        self.data: Dict[str, Any] = dict(data or {})
+
+    @property
+    def stage(self) -> Optional[str]:
+        return self.data.get('stage')
+
+    def mark(self, stage: str, **details):
+        """Record the stage reached (parsed, chunking, embedding, indexed) with optional details."""
+        self.data.update(details)
+        self.data['stage'] = stage
+        self.data['updated_at'] = time.time()
+        self.queue._save_checkpoint(self.job_id, self.data)
+
+    def save_parsed(self, parsed_doc, **details):
+        """Persist the parsed document and mark the job as parsed (best effort)."""
+        path = os.path.join(self.queue.job_dir(self.job_id, create=True), PARSED_FILE)
+        try:
+            with open(f"{path}.tmp", "wb") as f:
+                pickle.dump(parsed_doc, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(f"{path}.tmp", path)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not checkpoint parsed document of job {self.job_id}: {type(e).__name__}: {e}")
+            return
+        self.mark('parsed', **details)
+
+    def load_parsed(self):
+        """The parsed document of an earlier attempt, or None."""
+        path = os.path.join(self.queue.job_dir(self.job_id), PARSED_FILE)
+        if not self.stage or not os.path.exists(path):
+            return None
+        try:
+            with open(path, "rb") as f:
+                return pickle.load(f)
+        except Exception as e:
+            logger.warning(f"⚠️ Ignoring unreadable parse checkpoint of job {self.job_id}: {type(e).__name__}: {e}")
+            return None
+
+
+class IngestionJobQueue:
+    """SQLite-backed job queue with a bounded, size-aware worker pool."""
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        workers: Optional[int] = None,
+        max_inflight_bytes: Optional[int] = None,
+        max_attempts: Optional[int] = None,
+    ):
+        self.path = path or ARISConfig.INGESTION_QUEUE_PATH
+        self.checkpoint_root = os.path.join(os.path.dirname(os.path.abspath(self.path)), "jobs")
+        self.workers = max(1, workers or ARISConfig.INGESTION_WORKERS)
+        self.max_inflight_bytes = (
+            max_inflight_bytes if max_inflight_bytes is not None else ARISConfig.INGESTION_MAX_INFLIGHT_MB * 1024 * 1024
+        )
+        self.max_attempts = max(1, max_attempts or ARISConfig.INGESTION_JOB_MAX_ATTEMPTS)
+        os.makedirs(self.checkpoint_root, exist_ok=True)
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        # Upload size of the jobs running in this process (admission budget)
+        self._inflight: Dict[str, int] = {}
+        # Job run by the current worker thread (embedding hashes are recorded against it)
+        self._current = threading.local()
+        self._conn = self._connect(self.path)
+
+    @staticmethod
+    def _connect(path: str) -> sqlite3.Connection:
+        conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, status TEXT NOT NULL, priority INTEGER NOT NULL DEFAULT 0, "
+            "size_bytes INTEGER NOT NULL DEFAULT 0, attempts INTEGER NOT NULL DEFAULT 0, "
+            "payload TEXT NOT NULL, checkpoint TEXT, error TEXT, "
+            "created_at REAL NOT NULL, updated_at REAL NOT NULL, available_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS jobs_claim ON jobs (status, priority DESC, created_at)")
+        # Queue databases created before bulk imports were queued lack the batch column
+        if 'batch_id' not in {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}:
+            conn.execute("ALTER TABLE jobs ADD COLUMN batch_id TEXT")
+        conn.execute("CREATE INDEX IF NOT EXISTS jobs_batch ON jobs (batch_id)")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS batches ("
+            "id TEXT PRIMARY KEY, source TEXT, cleanup_dir TEXT, created_at REAL NOT NULL)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL, created_at REAL NOT NULL)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS job_embeddings (job_id TEXT NOT NULL, key TEXT NOT NULL, PRIMARY KEY (job_id, key))"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS job_embeddings_key ON job_embeddings (key)")
+        conn.commit()
+        return conn
+
+    def job_dir(self, job_id: str, create: bool = False) -> str:
+        path = os.path.join(self.checkpoint_root, hashlib.sha1(job_id.encode("utf-8")).hexdigest()[:16])
+        if create:
+            os.makedirs(path, exist_ok=True)
+        return path
+
+    # ------------------------------------------------------------------
+    # Jobs
+    # ------------------------------------------------------------------
+
+    def enqueue(self, job_id: str, payload: Dict[str, Any], priority: int = 0, size_bytes: int = 0):
+        """Add a job (higher priority runs first); the payload must be JSON-serializable."""
+        with self._lock:
+            self._insert_job(job_id, payload, priority, size_bytes, None, time.time())
+            self._conn.commit()
+        logger.info(f"📥 Queued ingestion job {job_id} (priority={priority}, {size_bytes / 1024 / 1024:.1f} MB)")
+        with self._wakeup:
+            self._wakeup.notify_all()
+
+    def enqueue_batch(
+        self,
+        batch_id: str,
+        jobs: List[Dict[str, Any]],
+        source: Optional[str] = None,
+        priority: int = 0,
+        cleanup_dir: Optional[str] = None,
+    ):
+        """
+        Add a batch of jobs ({job_id, payload, size_bytes}) in one transaction, so no job
+        can finish before its siblings are queued. cleanup_dir is removed after the last one.
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("INSERT INTO batches VALUES (?, ?, ?, ?)", (batch_id, source, cleanup_dir, now))
+            for job in jobs:
+                self._insert_job(job['job_id'], job['payload'], priority, job.get('size_bytes', 0), batch_id, now)
+            self._conn.commit()
+        logger.info(f"📥 Queued batch {batch_id}: {len(jobs)} ingestion job(s) from {source}")
+        with self._wakeup:
+            self._wakeup.notify_all()
+
+    def _insert_job(self, job_id: str, payload: Dict[str, Any], priority: int, size_bytes: int,
+                    batch_id: Optional[str], now: float):
+        """Insert a queued job row (caller holds the lock and commits)."""
+        self._conn.execute(
+            "INSERT INTO jobs (id, status, priority, size_bytes, payload, batch_id, created_at, updated_at, available_at) "
+            "VALUES (?, 'queued', ?, ?, ?, ?, ?, ?, ?)",
+            (job_id, int(priority or 0), int(size_bytes or 0), json.dumps(payload, default=str), batch_id, now, now, now)
+        )
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, status, priority, size_bytes, attempts, checkpoint, error, created_at, updated_at "
+                "FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        return self._row_dict(row) if row else None
+
+    def list_jobs(self, status: Optional[str] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        query = (
+            "SELECT id, status, priority, size_bytes, attempts, checkpoint, error, created_at, updated_at FROM jobs"
+        )
+        params: tuple = ()
+        if status:
+            query += " WHERE status = ?"
+            params = (status,)
+        query += " ORDER BY created_at DESC LIMIT ?"
+        with self._lock:
+            rows = self._conn.execute(query, params + (int(limit),)).fetchall()
+        return [self._row_dict(row) for row in rows]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = dict(self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+        return {
+            'workers': self.workers,
+            'running_bytes': sum(self._inflight.values()),
+            'max_inflight_bytes': self.max_inflight_bytes,
+            **{status: counts.get(status, 0) for status in ('queued', 'running', 'done', 'failed')},
+        }
+
+    def get_batch(self, batch_id: str) -> Optional[Dict[str, Any]]:
+        """Aggregate progress of a batch (same shape as the processor's batch state), or None."""
+        with self._lock:
+            batch = self._conn.execute("SELECT source, created_at FROM batches WHERE id = ?", (batch_id,)).fetchone()
+            if not batch:
+                return None
+            rows = self._conn.execute(
+                "SELECT id, status, payload FROM jobs WHERE batch_id = ? ORDER BY created_at", (batch_id,)
+            ).fetchall()
+        counts = {status: 0 for status in ('queued', 'running', 'done', 'failed')}
+        documents = {}
+        for job_id, status, payload in rows:
+            counts[status] = counts.get(status, 0) + 1
+            documents[json.loads(payload).get('file_name') or job_id] = 'success' if status == 'done' else status
+        total = len(rows)
+        finished = counts['done'] + counts['failed']
+        if finished < total:
+            status = 'processing'
+        else:
+            status = 'failed' if counts['failed'] == total else 'success'
+        return {
+            'batch_id': batch_id,
+            'status': status,
+            'progress': finished / total if total else 1.0,
+            'document_name': f"Batch of {total} documents",
+            'source': batch[0],
+            'created_at': batch[1],
+            'total': total,
+            'queued': counts['queued'],
+            'running': counts['running'],
+            'completed': counts['done'],
+            'failed': counts['failed'],
+            'documents': documents,
+        }
+
+    @staticmethod
+    def _row_dict(row) -> Dict[str, Any]:
+        keys = ('job_id', 'status', 'priority', 'size_bytes', 'attempts', 'checkpoint', 'error', 'created_at', 'updated_at')
+        job = dict(zip(keys, row))
+        job['checkpoint'] = json.loads(job['checkpoint']) if job['checkpoint'] else None
+        return job
+
+    def recover(self) -> int:
+        """Re-queue jobs left running by a previous process and purge expired rows. Returns jobs re-queued."""
+        now = time.time()
+        with self._lock:
+            requeued = self._conn.execute(
+                "UPDATE jobs SET status = 'queued', updated_at = ?, available_at = ? WHERE status = 'running'", (now, now)
+            ).rowcount
+            expired = [row[0] for row in self._conn.execute(
+                "SELECT id FROM jobs WHERE status IN ('done', 'failed') AND updated_at < ?", (now - RETENTION_SECONDS,)
+            ).fetchall()]
+            self._conn.executemany("DELETE FROM jobs WHERE id = ?", [(job_id,) for job_id in expired])
+            self._conn.executemany("DELETE FROM job_embeddings WHERE job_id = ?", [(job_id,) for job_id in expired])
+            self._conn.execute(
+                "DELETE FROM embeddings WHERE created_at < ? AND key NOT IN (SELECT key FROM job_embeddings)",
+                (now - RETENTION_SECONDS,)
+            )
+            # Batches whose jobs have all been purged; also clean directories of finished batches
+            # in case the process stopped before it could
+            finished = self._conn.execute(
+                "SELECT id, cleanup_dir FROM batches WHERE id NOT IN "
+                "(SELECT batch_id FROM jobs WHERE batch_id IS NOT NULL AND status IN ('queued', 'running'))"
+            ).fetchall()
+            self._conn.execute(
+                "DELETE FROM batches WHERE id NOT IN (SELECT batch_id FROM jobs WHERE batch_id IS NOT NULL)"
+            )
+            self._conn.commit()
+        for job_id in expired:
+            shutil.rmtree(self.job_dir(job_id), ignore_errors=True)
+        for _, cleanup_dir in finished:
+            if cleanup_dir:
+                shutil.rmtree(cleanup_dir, ignore_errors=True)
+        if requeued:
+            logger.info(f"♻️ Re-queued {requeued} interrupted ingestion job(s); they resume from their checkpoints")
+        return requeued
+
+    def _claim(self) -> Optional[Dict[str, Any]]:
+        """Mark the next admissible job running: highest priority first, within the size budget."""
+        now = time.time()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, size_bytes, payload, checkpoint, attempts FROM jobs "
+                "WHERE status = 'queued' AND available_at <= ? ORDER BY priority DESC, created_at",
+                (now,)
+            ).fetchall()
+            running_bytes = sum(self._inflight.values())
+            for job_id, size_bytes, payload, checkpoint, attempts in rows:
+                if self._inflight and running_bytes + size_bytes > self.max_inflight_bytes:
+                    continue
+                self._conn.execute(
+                    "UPDATE jobs SET status = 'running', attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                    (now, job_id)
+                )
+                self._conn.commit()
+                self._inflight[job_id] = size_bytes
+                return {
+                    'job_id': job_id,
+                    'payload': json.loads(payload),
+                    'checkpoint': json.loads(checkpoint) if checkpoint else None,
+                    'attempts': attempts + 1,
+                }
+        return None
+
+    def _save_checkpoint(self, job_id: str, data: Dict[str, Any]):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET checkpoint = ?, updated_at = ? WHERE id = ?",
+                (json.dumps(data, default=str), time.time(), job_id)
+            )
+            self._conn.commit()
+
+    def _complete(self, job_id: str):
+        with self._lock:
+            self._conn.execute("UPDATE jobs SET status = 'done', error = NULL, updated_at = ? WHERE id = ?", (time.time(), job_id))
+            self._drop_job_embeddings(job_id)
+            cleanup_dir = self._finished_batch_dir(job_id)
+            self._conn.commit()
+        shutil.rmtree(self.job_dir(job_id), ignore_errors=True)
+        if cleanup_dir:
+            shutil.rmtree(cleanup_dir, ignore_errors=True)
+
+    def _fail(self, job: Dict[str, Any], error: Exception):
+        job_id, attempts = job['job_id'], job['attempts']
+        now = time.time()
+        retry = attempts < self.max_attempts
+        cleanup_dir = None
+        with self._lock:
+            if retry:
+                self._conn.execute(
+                    "UPDATE jobs SET status = 'queued', error = ?, updated_at = ?, available_at = ? WHERE id = ?",
+                    (str(error)[:2000], now, now + _RETRY_BACKOFF_SECONDS * attempts, job_id)
+                )
+            else:
+                self._conn.execute(
+                    "UPDATE jobs SET status = 'failed', error = ?, updated_at = ? WHERE id = ?",
+                    (str(error)[:2000], now, job_id)
+                )
+                self._drop_job_embeddings(job_id)
+                cleanup_dir = self._finished_batch_dir(job_id)
+            self._conn.commit()
+        if cleanup_dir:
+            shutil.rmtree(cleanup_dir, ignore_errors=True)
+        if retry:
+            logger.warning(f"⚠️ Ingestion job {job_id} failed (attempt {attempts}/{self.max_attempts}), retrying: {error}")
+        else:
+            logger.error(f"❌ Ingestion job {job_id} failed after {attempts} attempt(s): {error}")
+            shutil.rmtree(self.job_dir(job_id), ignore_errors=True)
+
+    def _finished_batch_dir(self, job_id: str) -> Optional[str]:
+        """The cleanup directory of the job's batch once no job of it is pending (caller holds the lock)."""
+        row = self._conn.execute(
+            "SELECT b.id, b.cleanup_dir FROM jobs j JOIN batches b ON b.id = j.batch_id WHERE j.id = ?", (job_id,)
+        ).fetchone()
+        if not row or not row[1]:
+            return None
+        pending = self._conn.execute(
+            "SELECT COUNT(*) FROM jobs WHERE batch_id = ? AND status IN ('queued', 'running')", (row[0],)
+        ).fetchone()[0]
+        return None if pending else row[1]
+
+    # ------------------------------------------------------------------
+    # Embedding checkpoints
+    # ------------------------------------------------------------------
+
+    def record_job_keys(self, keys: List[str]):
+        """Tie embedding hashes to the job run by this worker thread (no-op outside a job)."""
+        job_id = getattr(self._current, 'job_id', None)
+        if not job_id:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO job_embeddings VALUES (?, ?)", [(job_id, key) for key in dict.fromkeys(keys)]
+            )
+            self._conn.commit()
+
+    def _drop_job_embeddings(self, job_id: str):
+        """Delete a finished job's vectors unless another job still uses them (caller holds the lock)."""
+        self._conn.execute(
+            "DELETE FROM embeddings WHERE key IN (SELECT key FROM job_embeddings WHERE job_id = ?) "
+            "AND key NOT IN (SELECT key FROM job_embeddings WHERE job_id != ?)",
+            (job_id, job_id)
+        )
+        self._conn.execute("DELETE FROM job_embeddings WHERE job_id = ?", (job_id,))
+
+    def get_vectors(self, keys: List[str]) -> Dict[str, List[float]]:
+        with self._lock:
+            rows = select_by_keys(self._conn, "SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", keys)
+        return {key: blob_vector(blob) for key, blob in rows}
+
+    def put_vectors(self, vectors: Dict[str, List[float]]):
+        now = time.time()
+        rows = [(key, vector_blob(vector), now) for key, vector in vectors.items()]
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?)", rows)
+            self._conn.commit()
+
+    def attach(self, engine):
+        """Checkpoint the document embeddings of an ingestion engine's jobs in this queue."""
+        embeddings = persistent_embeddings(engine, self)
+        if self.record_job_keys not in embeddings.listeners:
+            embeddings.listeners.append(self.record_job_keys)
+
+    # ------------------------------------------------------------------
+    # Workers
+    # ------------------------------------------------------------------
+
+    def start(self, handler: Callable[[Dict[str, Any], JobCheckpoint], None]):
+        """Start the worker pool; handler(payload, checkpoint) raises to fail a job."""
+        self._stop.clear()
+        for number in range(self.workers):
+            thread = threading.Thread(target=self._work, args=(handler,), name=f"ingestion-worker-{number + 1}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info(
+            f"✅ Ingestion job queue started: {self.workers} worker(s), "
+            f"{self.max_inflight_bytes / 1024 / 1024:.0f} MB in-flight budget ({self.path})"
+        )
+
+    def stop(self, timeout: float = 5.0):
+        """Stop claiming jobs; jobs still running are re-queued by recover() on the next start."""
+        self._stop.set()
+        with self._wakeup:
+            self._wakeup.notify_all()
+        for thread in self._threads:
+            thread.join(timeout=timeout)
+        self._threads = []
+
+    def _work(self, handler: Callable[[Dict[str, Any], JobCheckpoint], None]):
+        while not self._stop.is_set():
+            job = self._claim()
+            if job is None:
+                with self._wakeup:
+                    self._wakeup.wait(timeout=_POLL_SECONDS)
+                continue
+            job_id = job['job_id']
+            started = time.time()
+            logger.info(f"▶️ Ingestion job {job_id} started (attempt {job['attempts']}, checkpoint: {(job['checkpoint'] or {}).get('stage', 'none')})")
+            self._current.job_id = job_id
+            try:
+                handler(job['payload'], JobCheckpoint(self, job_id, job['checkpoint']))
+                self._complete(job_id)
+                logger.info(f"✅ Ingestion job {job_id} completed in {time.time() - started:.1f}s")
+            except Exception as e:
+                self._fail(job, e)
+            finally:
+                self._current.job_id = None
+                with self._lock:
+                    self._inflight.pop(job_id, None)
+                with self._wakeup:
+                    self._wakeup.notify_all()
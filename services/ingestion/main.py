@@ -3,13 +3,15 @@ FastAPI Entrypoint for ARIS Ingestion Service
 Handles document upload, parsing, and indexing.
 """
 import os
+import shutil
 import uuid
 import logging
-import hashlib
+import threading
 import time as time_module
 import asyncio
 from datetime import datetime
 from contextlib import asynccontextmanager
+from concurrent.futures import Executor
 from typing import Optional, Dict, Any, List
 from fastapi import BackgroundTasks, FastAPI, UploadFile, File, HTTPException, Form, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
@@ -19,7 +21,10 @@ from scripts.setup_logging import setup_logging
 from shared.config.settings import ARISConfig
 from shared.schemas import DocumentMetadata, ProcessingResult, FullIngestionRequest, FullIngestionResponse
 from .engine import IngestionEngine
-from .processor import DocumentProcessor
+from .processor import DocumentProcessor, _parse_file, _parse_pool
+from .job_queue import IngestionJobQueue, JobCheckpoint
+from .page_store import PageStore
+from .uploads import UPLOAD_DIR, UploadTooLarge, spool_upload
 from shared.utils.sync_manager import SyncManager, get_sync_manager
 
 logger = setup_logging(
@@ -34,11 +39,17 @@ load_dotenv()
 engine: Optional[IngestionEngine] = None
 processor: Optional[DocumentProcessor] = None
 sync_manager: Optional[SyncManager] = None
+job_queue: Optional[IngestionJobQueue] = None
+page_store: Optional[PageStore] = None
+# Process pool the queue workers parse in, so parsing one job overlaps indexing another
+parse_pool: Optional[Executor] = None
+# Guards swapping engine/processor (requests and queue workers reconfigure concurrently)
+_engine_lock = threading.Lock()
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Lifespan context manager for startup/shutdown"""
-    global engine, processor, sync_manager
+    global engine, processor, sync_manager, job_queue, page_store, parse_pool
     
     logger.info("=" * 60)
     logger.info("[STARTUP] Initializing ARIS Ingestion Service")
@@ -62,9 +73,43 @@ async def lifespan(app: FastAPI):
         chunk_overlap=ARISConfig.DEFAULT_CHUNK_OVERLAP
     )
     
+    # PGVector hybrid search schema: migrated once per start, never while building stores
+    if ARISConfig.VECTOR_STORE_TYPE.lower() == 'pgvector' and ARISConfig.PGVECTOR_MIGRATE_ON_STARTUP:
+        try:
+            from vectorstores.pgvector_store import PgVectorStore, migrate_hybrid_schema
+            migrate_hybrid_schema(
+                ARISConfig.PGVECTOR_CONNECTION_STRING or PgVectorStore._build_connection_string_from_env()
+            )
+        except Exception as e:
+            logger.warning(f"[STARTUP] PGVector hybrid schema migration skipped: {e}")
+    
     # Initialize processor
     processor = DocumentProcessor(engine)
     
+    # Durable ingestion queue: re-queue jobs interrupted by the last shutdown
+    if ARISConfig.ENABLE_INGESTION_QUEUE:
+        try:
+            job_queue = IngestionJobQueue()
+            job_queue.recover()
+        except Exception as e:
+            logger.warning(f"[STARTUP] Ingestion job queue unavailable, using in-process background tasks: {e}")
+            job_queue = None
+    
+    # Cross-document page dedup: repeated pages reuse stored chunks and embeddings
+    if ARISConfig.ENABLE_PAGE_DEDUP:
+        try:
+            page_store = PageStore()
+            purged = page_store.purge()
+            logger.info(f"✅ [STARTUP] Page store opened ({page_store.stats()['pages']} pages, {purged} expired rows purged)")
+        except Exception as e:
+            logger.warning(f"[STARTUP] Page store unavailable, pages will not be deduplicated: {e}")
+            page_store = None
+    
+    _attach_engine_stores(engine)
+    if job_queue:
+        parse_pool = _parse_pool(max(1, ARISConfig.BATCH_PARSE_WORKERS))
+        job_queue.start(_run_ingest_job)
+    
     # Force initial sync on startup
     sync_manager.force_full_sync()
     
@@ -92,6 +137,10 @@ async def lifespan(app: FastAPI):
     yield
     
     # Cleanup
+    if job_queue:
+        job_queue.stop()
+    if parse_pool:
+        parse_pool.shutdown(wait=False, cancel_futures=True)
     sync_manager.stop_background_sync()
     logger.info("[SHUTDOWN] Ingestion Service Shutting Down")
 
@@ -110,18 +159,34 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+def _broadcast_sync_after_ingestion():
+    """Sync locally, then ask the Gateway to broadcast to the other services (runs off the request path)."""
+    try:
+        # First, sync locally (Ingestion's own state)
+        sync_manager.instant_sync()
+        
+        # Ask Gateway to broadcast to retrieval + mcp (exclude ingestion)
+        import httpx
+        gateway_url = os.getenv("GATEWAY_URL", "http://127.0.0.1:8500")
+        
+        try:
+            with httpx.Client(timeout=5.0) as client:
+                broadcast_response = client.post(f"{gateway_url}/sync/broadcast?exclude=ingestion")
+                if broadcast_response.status_code == 200:
+                    logger.info(f"📡 [Ingestion] Auto-broadcast sync completed (self excluded)")
+                else:
+                    logger.debug(f"📡 [Ingestion] Broadcast returned: {broadcast_response.status_code}")
+        except Exception as broadcast_err:
+            logger.debug(f"📡 [Ingestion] Broadcast failed (services may sync on next interval): {broadcast_err}")
+            
+    except Exception as e:
+        logger.debug(f"Post-operation sync failed: {e}")
+
 @app.middleware("http")
 async def auto_sync_middleware(request: Request, call_next):
-    """Middleware to automatically sync state before and after operations."""
+    """Tag requests and broadcast after ingestion (sync checks run in the background task)."""
     request_id = request.headers.get("X-Request-ID", "internal")
     
-    # Auto-sync before critical operations
-    if sync_manager and request.url.path in ["/ingest", "/process", "/health", "/status", "/ingest/full"]:
-        try:
-            sync_manager.check_and_sync()
-        except Exception as e:
-            logger.debug(f"Auto-sync check failed in middleware: {e}")
-    
     logger.info(f"Ingestion: [ReqID: {request_id}] {request.method} {request.url.path}")
     response = await call_next(request)
     response.headers["X-Request-ID"] = request_id
@@ -129,27 +194,10 @@ async def auto_sync_middleware(request: Request, call_next):
     # AUTOMATIC BROADCAST SYNC after document ingestion operations
     # Gateway is the sole sync coordinator. Ingestion excludes itself to avoid
     # circular callback (Gateway would otherwise call Ingestion /sync/force).
-    if sync_manager and request.url.path in ["/ingest", "/process", "/ingest/full"] and response.status_code in [200, 201]:
-        try:
-            # First, sync locally (Ingestion's own state)
-            sync_manager.instant_sync()
-            
-            # Ask Gateway to broadcast to retrieval + mcp (exclude ingestion)
-            import httpx
-            gateway_url = os.getenv("GATEWAY_URL", "http://127.0.0.1:8500")
-            
-            try:
-                with httpx.Client(timeout=5.0) as client:
-                    broadcast_response = client.post(f"{gateway_url}/sync/broadcast?exclude=ingestion")
-                    if broadcast_response.status_code == 200:
-                        logger.info(f"📡 [Ingestion] Auto-broadcast sync completed (self excluded)")
-                    else:
-                        logger.debug(f"📡 [Ingestion] Broadcast returned: {broadcast_response.status_code}")
-            except Exception as broadcast_err:
-                logger.debug(f"📡 [Ingestion] Broadcast failed (services may sync on next interval): {broadcast_err}")
-                
-        except Exception as e:
-            logger.debug(f"Post-operation sync failed: {e}")
+    # Not needed with the registry change feed: every service is rung when the
+    # registry write lands. Otherwise it runs in a worker thread, not before the response.
+    if sync_manager and not sync_manager.change_feed_active and request.url.path in ["/ingest", "/process", "/ingest/full"] and response.status_code in [200, 201]:
+        asyncio.get_running_loop().run_in_executor(None, _broadcast_sync_after_ingestion)
     
     return response
 
@@ -159,6 +207,14 @@ def get_processor() -> DocumentProcessor:
     return processor
 
 
+def _attach_engine_stores(target: IngestionEngine):
+    """Attach the job queue and page store to an engine (every engine the processor is built on)."""
+    if job_queue:
+        job_queue.attach(target)
+    if page_store:
+        page_store.attach(target)
+
+
 def _reconfigure_engine_if_needed(
     vector_store_type: Optional[str] = None,
     opensearch_domain: Optional[str] = None,
@@ -168,9 +224,13 @@ def _reconfigure_engine_if_needed(
     qdrant_url: Optional[str] = None,
     qdrant_collection: Optional[str] = None,
     qdrant_api_key: Optional[str] = None,
-):
+) -> DocumentProcessor:
     """
     Reconfigure global ingestion engine/processor for per-request vector DB selection.
+
+    Returns the processor for the requested store. Requests and queue workers run
+    concurrently, so callers use the returned processor rather than re-reading the
+    global, which another caller may already have swapped for a different store.
     """
     global engine, processor
 
@@ -183,35 +243,80 @@ def _reconfigure_engine_if_needed(
     target_qdrant_collection = qdrant_collection or ARISConfig.QDRANT_COLLECTION
     target_qdrant_api_key = qdrant_api_key or ARISConfig.QDRANT_API_KEY
 
-    if engine is not None:
-        same_store = getattr(engine, "vector_store_type", None) == target_store
-        same_os_domain = getattr(engine, "opensearch_domain", None) == target_os_domain
-        same_os_index = getattr(engine, "opensearch_index", None) == target_os_index
-        same_pg_conn = getattr(engine, "pgvector_connection_string", None) == target_pg_conn
-        same_pg_collection = getattr(engine, "pgvector_collection", None) == target_pg_collection
-        same_qdrant_url = getattr(engine, "qdrant_url", None) == target_qdrant_url
-        same_qdrant_collection = getattr(engine, "qdrant_collection", None) == target_qdrant_collection
-        same_qdrant_api_key = getattr(engine, "qdrant_api_key", None) == target_qdrant_api_key
-        if same_store and same_os_domain and same_os_index and same_pg_conn and same_pg_collection and same_qdrant_url and same_qdrant_collection and same_qdrant_api_key:
-            return
-
-    logger.info(
-        f"[Ingestion] Reconfiguring engine: vector_store_type={target_store}, "
-        f"opensearch_index={target_os_index}, pgvector_collection={target_pg_collection}"
-    )
-    engine = IngestionEngine(
-        vector_store_type=target_store,
-        opensearch_domain=target_os_domain,
-        opensearch_index=target_os_index,
-        pgvector_connection_string=target_pg_conn,
-        pgvector_collection=target_pg_collection,
-        qdrant_url=target_qdrant_url,
-        qdrant_collection=target_qdrant_collection,
-        qdrant_api_key=target_qdrant_api_key,
-        chunk_size=ARISConfig.DEFAULT_CHUNK_SIZE,
-        chunk_overlap=ARISConfig.DEFAULT_CHUNK_OVERLAP
+    with _engine_lock:
+        if engine is not None:
+            same_store = getattr(engine, "vector_store_type", None) == target_store
+            same_os_domain = getattr(engine, "opensearch_domain", None) == target_os_domain
+            same_os_index = getattr(engine, "opensearch_index", None) == target_os_index
+            same_pg_conn = getattr(engine, "pgvector_connection_string", None) == target_pg_conn
+            same_pg_collection = getattr(engine, "pgvector_collection", None) == target_pg_collection
+            same_qdrant_url = getattr(engine, "qdrant_url", None) == target_qdrant_url
+            same_qdrant_collection = getattr(engine, "qdrant_collection", None) == target_qdrant_collection
+            same_qdrant_api_key = getattr(engine, "qdrant_api_key", None) == target_qdrant_api_key
+            if same_store and same_os_domain and same_os_index and same_pg_conn and same_pg_collection and same_qdrant_url and same_qdrant_collection and same_qdrant_api_key:
+                return get_processor()
+
+        logger.info(
+            f"[Ingestion] Reconfiguring engine: vector_store_type={target_store}, "
+            f"opensearch_index={target_os_index}, pgvector_collection={target_pg_collection}"
+        )
+        engine = IngestionEngine(
+            vector_store_type=target_store,
+            opensearch_domain=target_os_domain,
+            opensearch_index=target_os_index,
+            pgvector_connection_string=target_pg_conn,
+            pgvector_collection=target_pg_collection,
+            qdrant_url=target_qdrant_url,
+            qdrant_collection=target_qdrant_collection,
+            qdrant_api_key=target_qdrant_api_key,
+            chunk_size=ARISConfig.DEFAULT_CHUNK_SIZE,
+            chunk_overlap=ARISConfig.DEFAULT_CHUNK_OVERLAP
+        )
+        _attach_engine_stores(engine)
+        processor = DocumentProcessor(engine)
+        return processor
+
+
+def _run_ingest_job(payload: Dict[str, Any], checkpoint: JobCheckpoint):
+    """Run one queued /ingest job on the engine for its store; raises so failed jobs are retried."""
+    job_processor = _reconfigure_engine_if_needed(**(payload.get('store') or {}))
+    parsed_doc = None
+    # A resumed job loads its parse checkpoint; a new one is parsed in the process pool
+    # (off the GIL) while the other queue workers embed and index
+    if parse_pool is not None and (checkpoint is None or not checkpoint.stage):
+        try:
+            parsed_doc = parse_pool.submit(
+                _parse_file,
+                payload['file_path'],
+                None,
+                payload.get('parser_preference'),
+                payload.get('language') or "eng"
+            ).result()
+        except Exception as e:
+            logger.warning(f"⚠️ [QUEUE] Parse worker failed for {payload['file_name']} ({e}); parsing it in-process")
+    result = job_processor.process_document(
+        file_path=payload['file_path'],
+        file_content=None,
+        file_name=payload['file_name'],
+        parser_preference=payload.get('parser_preference'),
+        document_id=payload['document_id'],
+        index_name=payload.get('index_name'),
+        language=payload.get('language') or "eng",
+        is_update=payload.get('is_update', False),
+        old_index_name=payload.get('old_index_name'),
+        checkpoint=checkpoint,
+        parsed_document=parsed_doc
     )
-    processor = DocumentProcessor(engine)
+    if result.status == 'failed':
+        raise RuntimeError(result.error or "Processing failed")
+
+def _run_bulk_batch(batch_processor: DocumentProcessor, files: List[Dict[str, Any]], cleanup_dir: Optional[str], **kwargs):
+    """Process a bulk import in-process (job queue disabled), then remove its download directory."""
+    try:
+        batch_processor.process_documents_batch(files, **kwargs)
+    finally:
+        if cleanup_dir:
+            shutil.rmtree(cleanup_dir, ignore_errors=True)
 
 @app.get("/health")
 async def health_check():
@@ -239,16 +344,8 @@ async def health_check():
         index_map_path = os.path.join(ARISConfig.VECTORSTORE_PATH, "document_index_map.json")
         index_map_accessible = os.path.exists(index_map_path) or os.path.exists(ARISConfig.VECTORSTORE_PATH)
         
-        # Get index map count
-        index_map_count = 0
-        try:
-            if os.path.exists(index_map_path):
-                with open(index_map_path, 'r') as f:
-                    index_map = json.load(f)
-                    index_map_count = len(index_map) if isinstance(index_map, dict) else 0
-        except Exception as e:
-            logger.debug(f"operation: {type(e).__name__}: {e}")
-            pass
+        # Sync state as last swapped in by the background sync (no sync work here)
+        sync_state = sync_manager.get_sync_staleness() if sync_manager else None
         
         return {
             "status": "healthy",
@@ -256,7 +353,8 @@ async def health_check():
             "registry_accessible": registry_accessible,
             "registry_document_count": doc_count,
             "index_map_accessible": index_map_accessible,
-            "index_map_entries": index_map_count
+            "index_map_entries": sync_state["index_map_entries"] if sync_state else 0,
+            "sync": sync_state
         }
     except Exception as e:
         return {
@@ -284,6 +382,7 @@ async def ingest_document(
     qdrant_api_key: Optional[str] = Form(default=None),
     is_update: Optional[str] = Form(default=None),  # String "true" from form data
     old_index_name: Optional[str] = Form(default=None),
+    priority: Optional[int] = Form(default=0),
     background_tasks: BackgroundTasks = None,
     processor: DocumentProcessor = Depends(get_processor)
 ):
@@ -294,6 +393,7 @@ async def ingest_document(
     Args:
         is_update: If "true", force update even for identical content
         old_index_name: Old index name to clean up when updating
+        priority: Queue priority (higher runs first) when the ingestion job queue is enabled
     """
     # Convert string "true" to boolean
     force_update_from_request = is_update and is_update.lower() == "true"
@@ -301,7 +401,7 @@ async def ingest_document(
     logger.info(f"POST /ingest - [ReqID: {request_id}] File: {file.filename}")
 
     # Apply per-request vector store selection.
-    _reconfigure_engine_if_needed(
+    processor = _reconfigure_engine_if_needed(
         vector_store_type=vector_store_type,
         opensearch_domain=ARISConfig.AWS_OPENSEARCH_DOMAIN,
         opensearch_index=index_name or ARISConfig.AWS_OPENSEARCH_INDEX,
@@ -311,8 +411,6 @@ async def ingest_document(
         qdrant_collection=qdrant_collection,
         qdrant_api_key=qdrant_api_key
     )
-    processor = get_processor()
-    processor = get_processor()
     
     # Validate file type
     allowed_extensions = {'.pdf', '.txt', '.md', '.docx', '.doc'}
@@ -324,13 +422,14 @@ async def ingest_document(
             detail=f"Unsupported file type: {file_ext}. Allowed: {', '.join(allowed_extensions)}"
         )
     
+    # Stream the upload to disk, hashing it on the way (never holds the whole file in memory)
     try:
-        # Read content first for hash calculation
-        content = await file.read()
-        
-        # Calculate file hash for duplicate detection
-        import hashlib
-        file_hash = hashlib.md5(content).hexdigest()
+        upload = await spool_upload(file)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    
+    try:
+        file_hash = upload.md5
         
         # Check for existing document with same name and parser
         from storage.document_registry import DocumentRegistry
@@ -399,16 +498,13 @@ async def ingest_document(
             logger.info(f"POST /ingest - [ReqID: {request_id}] Creating new document: {document_id}")
         
         # Save locally for reference/fallback
-        upload_dir = "data/uploads"
-        os.makedirs(upload_dir, exist_ok=True)
-        file_path = os.path.join(upload_dir, f"{document_id}_{file.filename}")
-        
-        with open(file_path, "wb") as f:
-            f.write(content)
+        file_path = upload.move_to(os.path.join(UPLOAD_DIR, f"{document_id}_{file.filename}"))
         
         # DELETE OLD DOCUMENTS before processing new one (ensures single copy)
         if documents_to_delete:
             logger.info(f"POST /ingest - [ReqID: {request_id}] 🗑️ Starting cleanup of {len(documents_to_delete)} old version(s)...")
+            # Text chunks in a reusable index are diffed by content hash instead of deleted
+            reusable_index = processor.get_reusable_index(effective_old_index_name, index_name) if processor else None
             
             for old_doc in documents_to_delete:
                 old_doc_id = old_doc['document_id']
@@ -419,7 +515,10 @@ async def ingest_document(
                     # 1. Delete from vector store (OpenSearch or FAISS)
                     if old_index_name and processor and hasattr(processor, '_cleanup_old_index_data'):
                         logger.info(f"POST /ingest - [ReqID: {request_id}] 🗑️ Cleaning vector store for {old_doc_id} (index: {old_index_name})")
-                        processor._cleanup_old_index_data(old_doc_id, old_index_name, old_doc_name)
+                        processor._cleanup_old_index_data(
+                            old_doc_id, old_index_name, old_doc_name,
+                            include_text=old_index_name != reusable_index
+                        )
                     
                     # 2. Delete from S3 if enabled
                     if hasattr(processor, 'rag_system') and hasattr(processor.rag_system, 's3_service'):
@@ -477,12 +576,38 @@ async def ingest_document(
         except Exception as e:
             logger.warning(f"Ingestion: [ReqID: {request_id}] Could not pre-register document: {e}")
             
-        # Start background processing
-        if background_tasks:
+        # Start background processing: durable job queue, else in-process background task
+        if job_queue:
+            job_queue.enqueue(
+                document_id,
+                {
+                    'file_path': file_path,
+                    'file_name': file.filename,
+                    'parser_preference': parser_preference,
+                    'document_id': document_id,
+                    'index_name': index_name,
+                    'language': language or "eng",
+                    'is_update': is_update_flag,
+                    'old_index_name': effective_old_index_name,
+                    'store': {
+                        'vector_store_type': vector_store_type,
+                        'opensearch_domain': ARISConfig.AWS_OPENSEARCH_DOMAIN,
+                        'opensearch_index': index_name or ARISConfig.AWS_OPENSEARCH_INDEX,
+                        'pgvector_connection_string': pgvector_connection_string,
+                        'pgvector_collection': pgvector_collection,
+                        'qdrant_url': qdrant_url,
+                        'qdrant_collection': qdrant_collection,
+                        'qdrant_api_key': qdrant_api_key,
+                    },
+                },
+                priority=priority or 0,
+                size_bytes=upload.size
+            )
+        elif background_tasks:
             background_tasks.add_task(
                 processor.process_document,
                 file_path=file_path,
-                file_content=content,
+                file_content=None,
                 file_name=file.filename,
                 parser_preference=parser_preference,
                 document_id=document_id,
@@ -495,7 +620,7 @@ async def ingest_document(
             # Synchronous processing if background_tasks is not available (unlikely in FastAPI)
             processor.process_document(
                 file_path=file_path,
-                file_content=content,
+                file_content=None,
                 file_name=file.filename,
                 parser_preference=parser_preference,
                 document_id=document_id,
@@ -516,6 +641,117 @@ async def ingest_document(
     except Exception as e:
         logger.error(f"Error ingesting document: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Error ingesting document: {str(e)}")
+    finally:
+        upload.discard()
+
+@app.post("/ingest/bulk", status_code=202,
+           summary="Bulk Document Ingestion",
+           description="Ingest every supported file of a server-side directory (under BULK_IMPORT_ROOT) or an s3://bucket/prefix as one batch of queued jobs.")
+async def ingest_bulk(
+    source: str = Form(...),
+    parser_preference: Optional[str] = Form(default=None),
+    language: Optional[str] = Form(default="eng"),
+    recursive: bool = Form(default=False),
+    skip_existing: bool = Form(default=True),
+    priority: Optional[int] = Form(default=0),
+    background_tasks: BackgroundTasks = None,
+    processor: DocumentProcessor = Depends(get_processor)
+):
+    """
+    Start a bulk import (asynchronous).
+    Every file becomes a job of the durable ingestion queue (in-process background
+    batch when the queue is disabled); progress of the whole batch is reported by
+    /status/{batch_id}.
+
+    Args:
+        source: Directory relative to (or inside) BULK_IMPORT_ROOT, or s3://bucket/prefix
+        recursive: Include sub-directories / nested prefixes
+        skip_existing: Skip files whose name is already ingested successfully
+        priority: Queue priority of the batch's jobs
+    """
+    from .bulk_import import BulkImportError, collect_files
+
+    batch_id = f"batch-{uuid.uuid4().hex[:12]}"
+    # S3 objects are downloaded here; removed once the batch is done with them
+    download_dir = os.path.join(UPLOAD_DIR, batch_id) if source.startswith("s3://") else None
+    handed_off = False
+    try:
+        s3_client = None
+        if download_dir:
+            s3_service = getattr(processor.rag_system, 's3_service', None)
+            if s3_service and s3_service.enabled:
+                s3_client = s3_service.client
+        try:
+            files = await asyncio.to_thread(
+                collect_files, source, download_dir, recursive, s3_client
+            )
+        except BulkImportError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        skipped = []
+        if skip_existing and files:
+            try:
+                from storage.document_registry import DocumentRegistry
+                registry = DocumentRegistry(ARISConfig.DOCUMENT_REGISTRY_PATH)
+                existing = {
+                    doc.get('document_name') for doc in registry.list_documents()
+                    if doc.get('status') == 'success'
+                }
+                skipped = [f['name'] for f in files if f['name'] in existing]
+                files = [f for f in files if f['name'] not in existing]
+            except Exception as e:
+                logger.warning(f"⚠️ [BULK] Could not check the registry for existing documents: {e}")
+
+        if not files:
+            return {"batch_id": None, "total": 0, "skipped": skipped, "message": "No new documents to ingest"}
+
+        for f in files:
+            f['document_id'] = str(uuid.uuid4())
+        if job_queue:
+            job_queue.enqueue_batch(
+                batch_id,
+                [
+                    {
+                        'job_id': f['document_id'],
+                        'payload': {
+                            'file_path': f['path'],
+                            'file_name': f['name'],
+                            'parser_preference': parser_preference,
+                            'document_id': f['document_id'],
+                            'language': language or "eng",
+                        },
+                        'size_bytes': os.path.getsize(f['path']),
+                    }
+                    for f in files
+                ],
+                source=source,
+                priority=priority or 0,
+                cleanup_dir=download_dir
+            )
+        else:
+            background_tasks.add_task(
+                _run_bulk_batch,
+                processor,
+                files,
+                download_dir,
+                parser_preference=parser_preference,
+                language=language or "eng",
+                concurrent=True,
+                batch_id=batch_id
+            )
+        handed_off = True
+    finally:
+        if download_dir and not handed_off:
+            shutil.rmtree(download_dir, ignore_errors=True)
+
+    logger.info(f"📦 [BULK] {batch_id}: {len(files)} files from {source} ({len(skipped)} skipped)")
+    return {
+        "batch_id": batch_id,
+        "total": len(files),
+        "skipped": skipped,
+        "documents": {f['name']: f['document_id'] for f in files},
+        "status_url": f"/status/{batch_id}"
+    }
 
 @app.post("/process", response_model=ProcessingResult,
            summary="Synchronous Document Processing",
@@ -545,7 +781,7 @@ async def process_document_sync(
     request_id = request.headers.get("X-Request-ID", "unknown")
     logger.info(f"POST /process - [ReqID: {request_id}] File: {file.filename}")
 
-    _reconfigure_engine_if_needed(
+    processor = _reconfigure_engine_if_needed(
         vector_store_type=vector_store_type,
         opensearch_domain=ARISConfig.AWS_OPENSEARCH_DOMAIN,
         opensearch_index=index_name or ARISConfig.AWS_OPENSEARCH_INDEX,
@@ -555,15 +791,12 @@ async def process_document_sync(
         qdrant_collection=qdrant_collection,
         qdrant_api_key=qdrant_api_key
     )
-    processor = get_processor()
     
+    upload = None
     try:
-        # Read content first for hash calculation
-        content = await file.read()
-        
-        # Calculate file hash for duplicate detection
-        import hashlib
-        file_hash = hashlib.md5(content).hexdigest()
+        # Stream the upload to disk, hashing it on the way
+        upload = await spool_upload(file)
+        file_hash = upload.md5
         
         # ENHANCED DUPLICATE DETECTION: Check for ALL documents with the same filename
         from storage.document_registry import DocumentRegistry
@@ -594,7 +827,7 @@ async def process_document_sync(
                 return ProcessingResult(
                     document_id=exact_match['document_id'],
                     document_name=file.filename,
-                    file_size=len(content),
+                    file_size=upload.size,
                     file_type=os.path.splitext(file.filename)[1].lower(),
                     parser_used=exact_match.get('parser_used', effective_parser),
                     pages=exact_match.get('pages', 0),
@@ -610,6 +843,8 @@ async def process_document_sync(
             
             # DELETE ALL EXISTING VERSIONS before processing new one
             logger.info(f"POST /process - [ReqID: {request_id}] 🗑️ Deleting {len(all_existing_docs)} existing version(s) before re-upload")
+            last_old_index = all_existing_docs[-1].get('text_index') or all_existing_docs[-1].get('index_name')
+            reusable_index = processor.get_reusable_index(last_old_index, index_name) if processor else None
             
             for existing_doc in all_existing_docs:
                 old_doc_id = existing_doc.get('document_id')
@@ -624,7 +859,10 @@ async def process_document_sync(
                 # Cleanup each old document
                 try:
                     if old_idx and processor and hasattr(processor, '_cleanup_old_index_data'):
-                        processor._cleanup_old_index_data(old_doc_id, old_idx, file.filename)
+                        processor._cleanup_old_index_data(
+                            old_doc_id, old_idx, file.filename,
+                            include_text=old_idx != reusable_index
+                        )
                     
                     # Delete from S3
                     if hasattr(processor, 'rag_system') and hasattr(processor.rag_system, 's3_service'):
@@ -646,17 +884,12 @@ async def process_document_sync(
         logger.info(f"POST /process - [ReqID: {request_id}] {'Replacing' if is_update else 'Creating new'} document: {document_id}")
         
         # Save temp
-        upload_dir = "data/uploads"
-        os.makedirs(upload_dir, exist_ok=True)
-        file_path = os.path.join(upload_dir, f"{document_id}_{file.filename}")
-        
-        with open(file_path, "wb") as f:
-            f.write(content)
+        file_path = upload.move_to(os.path.join(UPLOAD_DIR, f"{document_id}_{file.filename}"))
             
         # Process synchronously
         result = processor.process_document(
             file_path=file_path,
-            file_content=content,
+            file_content=None,
             file_name=file.filename,
             parser_preference=parser_preference,
             document_id=document_id,
@@ -675,6 +908,9 @@ async def process_document_sync(
             document_name=file.filename,
             error=str(e)
         )
+    finally:
+        if upload:
+            upload.discard()
 
 def get_engine() -> IngestionEngine:
     if engine is None:
@@ -710,10 +946,31 @@ async def get_processing_status(
     Get processing status for a document.
     """
     state = processor.get_processing_state(document_id)
+    job = job_queue.get(document_id) if job_queue else None
+    if not state and not job and job_queue:
+        # Bulk import batches are tracked by the queue
+        state = job_queue.get_batch(document_id)
+        if state:
+            return state
     if not state:
-        raise HTTPException(status_code=404, detail="Document processing state not found")
+        if not job:
+            raise HTTPException(status_code=404, detail="Document processing state not found")
+        # Queued (or resumed) jobs have no in-process state until a worker picks them up
+        state = {'status': job['status'], 'progress': 1.0 if job['status'] == 'done' else 0.0, 'document_name': document_id}
+    if job:
+        state = {**state, 'job': job}
     return state
 
+
+@app.get("/jobs")
+async def list_ingestion_jobs(status: Optional[str] = None, limit: int = 100):
+    """
+    List ingestion queue jobs (newest first) with queue statistics.
+    """
+    if not job_queue:
+        raise HTTPException(status_code=404, detail="Ingestion job queue is disabled")
+    return {"stats": job_queue.stats(), "jobs": job_queue.list_jobs(status=status, limit=limit)}
+
 @app.delete("/documents/{document_id}")
 async def delete_document(
     document_id: str,
@@ -746,8 +1003,8 @@ async def delete_document(
             except Exception as e:
                 logger.warning(f"S3 deletion failed for {document_id}: {e}")
         
-        # 3. Remove from registry
-        success = registry.remove_document(document_id)
+        # 3. Remove from registry (visible to other services' listings on return)
+        success = registry.remove_document(document_id, refresh="wait_for")
         
         if success:
             return {"status": "success", "message": f"Document {document_id} ingestion data deleted"}
@@ -999,7 +1256,7 @@ async def ingest_document_full(
     request_id = request.headers.get("X-Request-ID", str(uuid.uuid4()))
     logger.info(f"POST /ingest/full - [ReqID: {request_id}] File: {file.filename}, Parser: {parser}")
 
-    _reconfigure_engine_if_needed(
+    processor = _reconfigure_engine_if_needed(
         vector_store_type=vector_store_type,
         opensearch_domain=ARISConfig.AWS_OPENSEARCH_DOMAIN,
         opensearch_index=index_name or ARISConfig.AWS_OPENSEARCH_INDEX,
@@ -1023,10 +1280,11 @@ async def ingest_document_full(
             message=f"Unsupported file type: {file_ext}. Allowed: {', '.join(allowed_extensions)}"
         )
     
+    upload = None
     try:
-        # Read content
-        content = await file.read()
-        file_hash = hashlib.md5(content).hexdigest()
+        # Stream the upload to disk, hashing it on the way
+        upload = await spool_upload(file)
+        file_hash = upload.md5
         
         # Check for duplicates
         from storage.document_registry import DocumentRegistry
@@ -1063,7 +1321,9 @@ async def ingest_document_full(
                     is_update=False
                 )
             
-            # Delete existing versions
+            # Delete existing versions (text chunks of a reusable index are diffed instead)
+            last_old_index = all_existing_docs[-1].get('text_index') or all_existing_docs[-1].get('index_name')
+            reusable_index = processor.get_reusable_index(last_old_index, index_name) if processor else None
             for existing_doc in all_existing_docs:
                 old_doc_id = existing_doc.get('document_id')
                 old_index = existing_doc.get('text_index') or existing_doc.get('index_name')
@@ -1075,7 +1335,10 @@ async def ingest_document_full(
                 # Cleanup
                 try:
                     if old_index and processor and hasattr(processor, '_cleanup_old_index_data'):
-                        processor._cleanup_old_index_data(old_doc_id, old_index, file.filename)
+                        processor._cleanup_old_index_data(
+                            old_doc_id, old_index, file.filename,
+                            include_text=old_index != reusable_index
+                        )
                     registry.remove_document(old_doc_id)
                 except Exception as cleanup_err:
                     logger.warning(f"Cleanup error: {cleanup_err}")
@@ -1086,12 +1349,7 @@ async def ingest_document_full(
         document_id = str(uuid.uuid4())
         
         # Save temp file
-        upload_dir = "data/uploads"
-        os.makedirs(upload_dir, exist_ok=True)
-        file_path = os.path.join(upload_dir, f"{document_id}_{file.filename}")
-        
-        with open(file_path, "wb") as f:
-            f.write(content)
+        file_path = upload.move_to(os.path.join(UPLOAD_DIR, f"{document_id}_{file.filename}"))
         
         # Register document
         registration_data = {
@@ -1113,7 +1371,7 @@ async def ingest_document_full(
         # Process synchronously for immediate result
         result = processor.process_document(
             file_path=file_path,
-            file_content=content,
+            file_content=None,
             file_name=file.filename,
             parser_preference=effective_parser,
             document_id=document_id,
@@ -1155,6 +1413,9 @@ async def ingest_document_full(
             status="failed",
             message=str(e)
         )
+    finally:
+        if upload:
+            upload.discard()
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,155 @@
+"""
+Content-addressed page store for cross-document page dedup.
+
+Revisions of the same manual repeat most of their pages (legal boilerplate,
+unchanged procedures). Every ingested page is recorded under the hash of its
+normalized text and the chunking fingerprint (splitter, chunk size/overlap,
+embedding model and dimension) together with the chunks it produced (text and
+offset within the page). Chunk vectors are stored by content hash. A later
+document containing the same page reuses its chunks instead of splitting the
+page again, and the engine's PersistentEmbeddings (embedding_cache) returns the
+stored vectors instead of calling the embedding model, so only new or changed
+pages are embedded. When attached, the page store is the engine's only vector
+cache; the job queue then just records which hashes each job used.
+Per-document metadata (source, page, offsets, ids) is still assigned to every
+chunk of every document.
+
+Pages are keyed by their extracted text: scanned pages are keyed by their OCR
+output, since parsers do not expose page images.
+"""
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from shared.config.settings import ARISConfig
+from shared.utils.embedding_dimensions import embedding_dimension, embedding_model_name
+
+from .embedding_cache import blob_vector, persistent_embeddings, select_by_keys, vector_blob
+
+logger = logging.getLogger(__name__)
+
+# (chunk text, start offset within the page or None when the splitter does not track it)
+PageChunks = List[Tuple[str, Optional[int]]]
+
+
+def normalize_page_text(text: str) -> str:
+    """Page text with whitespace runs collapsed (extraction differences in spacing don't count as changes)."""
+    return " ".join(text.split())
+
+
+def chunking_fingerprint(splitter, embeddings) -> str:
+    """Everything besides the page text that determines its chunks and their vectors."""
+    parts = [type(splitter).__name__]
+    for attr in ("_chunk_size", "chunk_size", "_chunk_overlap", "chunk_overlap", "_separators", "model_name"):
+        value = getattr(splitter, attr, None)
+        if value is not None:
+            parts.append(f"{attr}={value!r}")
+    parts.append(f"model={embedding_model_name(embeddings)}")
+    parts.append(f"dim={embedding_dimension(embeddings)}")
+    return "|".join(parts)
+
+
+def page_key(text: str, fingerprint: str) -> str:
+    return hashlib.sha256(f"{fingerprint}\n{normalize_page_text(text)}".encode("utf-8")).hexdigest()
+
+
+class PageStore:
+    """SQLite-backed store of page chunks (by page key) and chunk vectors (by text hash)."""
+
+    def __init__(self, path: Optional[str] = None, retention_days: Optional[int] = None):
+        self.path = path or ARISConfig.PAGE_STORE_PATH
+        self.retention_seconds = (
+            retention_days if retention_days is not None else ARISConfig.PAGE_STORE_RETENTION_DAYS
+        ) * 24 * 3600
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = self._connect(self.path)
+
+    @staticmethod
+    def _connect(path: str) -> sqlite3.Connection:
+        conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS pages (key TEXT PRIMARY KEY, chunks TEXT NOT NULL, "
+            "created_at REAL NOT NULL, used_at REAL NOT NULL)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS vectors (key TEXT PRIMARY KEY, vector BLOB NOT NULL, used_at REAL NOT NULL)"
+        )
+        conn.commit()
+        return conn
+
+    def _select(self, table: str, column: str, keys: Sequence[str]) -> Dict[str, object]:
+        with self._lock:
+            found = dict(select_by_keys(
+                self._conn, f"SELECT key, {column} FROM {table} WHERE key IN ({{placeholders}})", keys
+            ))
+            if found:
+                self._conn.executemany(
+                    f"UPDATE {table} SET used_at = ? WHERE key = ?", [(time.time(), key) for key in found]
+                )
+            self._conn.commit()
+        return found
+
+    # ------------------------------------------------------------------
+    # Pages
+    # ------------------------------------------------------------------
+
+    def get_pages(self, keys: Sequence[str]) -> Dict[str, PageChunks]:
+        """Stored chunks of the pages among keys."""
+        return {
+            key: [(text, start) for text, start in json.loads(chunks)]
+            for key, chunks in self._select("pages", "chunks", keys).items()
+        }
+
+    def put_pages(self, pages: Dict[str, PageChunks]):
+        now = time.time()
+        rows = [(key, json.dumps(chunks), now, now) for key, chunks in pages.items()]
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?)", rows)
+            self._conn.commit()
+
+    # ------------------------------------------------------------------
+    # Vectors
+    # ------------------------------------------------------------------
+
+    def get_vectors(self, keys: Sequence[str]) -> Dict[str, List[float]]:
+        return {key: blob_vector(blob) for key, blob in self._select("vectors", "vector", keys).items()}
+
+    def put_vectors(self, vectors: Dict[str, List[float]]):
+        now = time.time()
+        rows = [(key, vector_blob(vector), now) for key, vector in vectors.items()]
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO vectors VALUES (?, ?, ?)", rows)
+            self._conn.commit()
+
+    # ------------------------------------------------------------------
+    # Maintenance
+    # ------------------------------------------------------------------
+
+    def purge(self) -> int:
+        """Drop pages and vectors unused for the retention period. Returns rows deleted."""
+        cutoff = time.time() - self.retention_seconds
+        with self._lock:
+            deleted = self._conn.execute("DELETE FROM pages WHERE used_at < ?", (cutoff,)).rowcount
+            deleted += self._conn.execute("DELETE FROM vectors WHERE used_at < ?", (cutoff,)).rowcount
+            self._conn.commit()
+        return deleted
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            pages = self._conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+            vectors = self._conn.execute("SELECT COUNT(*) FROM vectors").fetchone()[0]
+        return {"pages": pages, "vectors": vectors}
+
+    def attach(self, engine):
+        """Dedup the pages and serve stored chunk vectors for an ingestion engine."""
+        engine.page_store = self
+        # The page store outlives jobs, so it takes over as the engine's vector cache
+        persistent_embeddings(engine, self).store = self
@@ -1,11 +1,27 @@
+"""
+Llama-Scan parser: transcribes PDF pages with a local Ollama vision model.
+
+Pages are pipelined: a render pool turns pages into PNGs (a bounded number
+ahead) while LLAMA_SCAN_CONCURRENCY requests run against Ollama over one
+keep-alive session, so the model is not idle while pages render. Results are
+reassembled in page order. Transcriptions are cached on disk by page-image
+hash (with the model and prompt), so re-ingesting a scan only sends new pages.
+Ollama only runs requests in parallel up to its OLLAMA_NUM_PARALLEL setting.
+"""
 import base64
+import hashlib
 import os
+import queue
 import tempfile
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from typing import Optional, Dict, Any
 
 import requests
 from requests import exceptions as requests_exceptions
+from requests.adapters import HTTPAdapter
 
 from .base_parser import BaseParser, ParsedDocument
 from scripts.setup_logging import get_logger
@@ -46,6 +62,18 @@ class LlamaScanParser(BaseParser):
 
         self.custom_instructions = custom_instructions or os.getenv("LLAMA_SCAN_CUSTOM_INSTRUCTIONS", "").strip() or None
 
+        # Pipelining: concurrent Ollama requests and page render threads
+        self.concurrency = max(1, int(os.getenv("LLAMA_SCAN_CONCURRENCY", "4")))
+        self.render_workers = max(1, int(os.getenv("LLAMA_SCAN_RENDER_WORKERS", "2")))
+        # Per-page transcription cache ("" disables it)
+        self.cache_dir = os.getenv("LLAMA_SCAN_CACHE_DIR", "data/cache/llama_scan").strip() or None
+
+        # One keep-alive connection pool for all page requests
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.concurrency)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+
         self._check_dependencies()
 
     @staticmethod
@@ -147,7 +175,7 @@ class LlamaScanParser(BaseParser):
         attempts = max(1, self.ollama_retries + 1)
         for attempt in range(1, attempts + 1):
             try:
-                resp = requests.post(
+                resp = self._session.post(
                     f"{self.server_url}/api/generate",
                     json=payload,
                     timeout=self.ollama_timeout_seconds,
@@ -174,6 +202,124 @@ class LlamaScanParser(BaseParser):
 
         raise last_err or RuntimeError("Ollama generate failed")
 
+    def _cache_path(self, image_png_bytes: bytes, prompt: str) -> Optional[str]:
+        if not self.cache_dir:
+            return None
+        digest = hashlib.sha256()
+        digest.update(f"{self.model}\n{prompt}\n".encode("utf-8"))
+        digest.update(image_png_bytes)
+        key = digest.hexdigest()
+        return os.path.join(self.cache_dir, key[:2], f"{key}.txt")
+
+    def _transcribe_page(self, image_png_bytes: bytes, prompt: str) -> str:
+        """Transcription of one page image, from the cache when the same image was transcribed before."""
+        cache_path = self._cache_path(image_png_bytes, prompt)
+        if cache_path and os.path.exists(cache_path):
+            try:
+                with open(cache_path, "r", encoding="utf-8") as f:
+                    return f.read()
+            except OSError as e:
+                logger.debug(f"Llama-Scan: cache read failed for {cache_path}: {e}")
+
+        page_text = self._ollama_generate(image_png_bytes, prompt).strip()
+        if cache_path and page_text:
+            try:
+                os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+                tmp_path = f"{cache_path}.{threading.get_ident()}.tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    f.write(page_text)
+                os.replace(tmp_path, cache_path)
+            except OSError as e:
+                logger.debug(f"Llama-Scan: cache write failed for {cache_path}: {e}")
+        return page_text
+
+    def _render_page(self, doc, page_num: int) -> bytes:
+        """PNG of one page of an open document."""
+        import fitz
+
+        page = doc[page_num - 1]
+
+        # OPTIMIZED FOR MAXIMUM ACCURACY - Higher resolution for better OCR
+        # Default to 2x zoom for better text recognition (if width not specified)
+        default_zoom = 2.0  # 2x resolution for better accuracy
+        matrix = fitz.Matrix(default_zoom, default_zoom)
+        pix = page.get_pixmap(matrix=matrix, alpha=False)  # No alpha channel for cleaner image
+
+        # If specific width requested, recalculate zoom
+        if self.width and pix.width and self.width > 0 and pix.width != self.width:
+            zoom = self.width / float(pix.width) * default_zoom
+            matrix = fitz.Matrix(zoom, zoom)
+            pix = page.get_pixmap(matrix=matrix, alpha=False)
+
+        return pix.tobytes("png")
+
+    def _transcribe_pages(self, input_path: str, pages_to_process, prompt: str, total_pages: int, progress_callback=None) -> Dict[int, str]:
+        """
+        Render and transcribe pages concurrently; returns page number -> text.
+        At most 2 x LLAMA_SCAN_CONCURRENCY pages are rendered and not yet transcribed.
+        """
+        import fitz
+
+        results: Dict[int, str] = {}
+        done: "queue.Queue" = queue.Queue()
+        # PyMuPDF documents are not thread-safe: each render thread opens its own
+        local = threading.local()
+        opened = []
+        opened_lock = threading.Lock()
+        window = 2 * self.concurrency
+        pending = list(reversed(pages_to_process))
+        in_flight = 0
+
+        render_pool = ThreadPoolExecutor(max_workers=self.render_workers, thread_name_prefix="llamascan-render")
+        request_pool = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="llamascan-request")
+
+        def render(page_num):
+            doc = getattr(local, "doc", None)
+            if doc is None:
+                doc = local.doc = fitz.open(input_path)
+                with opened_lock:
+                    opened.append(doc)
+            return self._render_page(doc, page_num)
+
+        def on_transcribed(page_num, future):
+            done.put((page_num, future))
+
+        def on_rendered(page_num, future):
+            if future.exception() is not None:
+                done.put((page_num, future))
+                return
+            try:
+                request_pool.submit(self._transcribe_page, future.result(), prompt).add_done_callback(
+                    partial(on_transcribed, page_num)
+                )
+            except RuntimeError as e:  # pool shut down after another page failed
+                logger.debug(f"Llama-Scan: page {page_num} not sent: {e}")
+
+        try:
+            while pending or in_flight:
+                while pending and in_flight < window:
+                    page_num = pending.pop()
+                    render_pool.submit(render, page_num).add_done_callback(
+                        partial(on_rendered, page_num)
+                    )
+                    in_flight += 1
+                page_num, future = done.get()
+                in_flight -= 1
+                results[page_num] = future.result()  # raises the page's render/request error
+
+                if progress_callback:
+                    progress_callback(
+                        "parsing",
+                        0.05 + 0.90 * (len(results) / max(1, len(pages_to_process))),
+                        detailed_message=f"Llama-Scan: Transcribed {len(results)}/{len(pages_to_process)} pages (page {page_num}/{total_pages})...",
+                    )
+        finally:
+            render_pool.shutdown(wait=True, cancel_futures=True)
+            request_pool.shutdown(wait=False, cancel_futures=True)
+            for doc in opened:
+                doc.close()
+        return results
+
     def parse(
         self,
         file_path: str,
@@ -216,34 +362,21 @@ class LlamaScanParser(BaseParser):
             pages_to_process = list(range(start, end + 1))
             prompt = self._build_prompt()
 
+            doc.close()
+
+            logger.info(
+                f"Llama-Scan: transcribing {len(pages_to_process)} pages "
+                f"({self.concurrency} concurrent requests, {self.render_workers} render threads)"
+            )
+            page_texts = self._transcribe_pages(input_path, pages_to_process, prompt, total_pages, progress_callback)
+
             text_parts = []
             page_blocks = []
             cumulative_pos = 0
             pages_with_text = 0
 
-            for idx, page_num in enumerate(pages_to_process, 1):
-                page = doc[page_num - 1]
-
-                if progress_callback:
-                    progress_callback(
-                        "parsing",
-                        0.05 + 0.90 * (idx / max(1, len(pages_to_process))),
-                        detailed_message=f"Llama-Scan: Transcribing page {page_num}/{total_pages}...",
-                    )
-
-                # OPTIMIZED FOR MAXIMUM ACCURACY - Higher resolution for better OCR
-                # Default to 2x zoom for better text recognition (if width not specified)
-                default_zoom = 2.0  # 2x resolution for better accuracy
-                matrix = fitz.Matrix(default_zoom, default_zoom)
-                pix = page.get_pixmap(matrix=matrix, alpha=False)  # No alpha channel for cleaner image
-                
-                # If specific width requested, recalculate zoom
-                if self.width and pix.width and self.width > 0 and pix.width != self.width:
-                    zoom = self.width / float(pix.width) * default_zoom
-                    matrix = fitz.Matrix(zoom, zoom)
-                    pix = page.get_pixmap(matrix=matrix, alpha=False)
-
-                page_text = self._ollama_generate(pix.tobytes("png"), prompt).strip()
+            for page_num in pages_to_process:
+                page_text = page_texts[page_num]
                 if page_text:
                     pages_with_text += 1
 
@@ -263,8 +396,6 @@ class LlamaScanParser(BaseParser):
                 )
                 cumulative_pos = page_end + 2
 
-            doc.close()
-
             full_text = "\n\n".join(text_parts)
             extraction_percentage = (pages_with_text / max(1, len(pages_to_process))) if pages_to_process else 0.0
 
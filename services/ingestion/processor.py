@@ -3,13 +3,20 @@ Document processor for real-time ingestion with progress tracking.
 """
 import os
 import time
+import uuid
 import logging
+import functools
+import threading
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime
 from typing import Optional, Dict, List, Any, Any
 from shared.schemas import ProcessingResult
 from .parsers.parser_factory import ParserFactory
 from .engine import IngestionEngine
 from shared.config.settings import ARISConfig
+from shared.utils.source_key import source_key_filter
+from vectorstores.shared_index import document_routing, is_shared_index, shared_index_name, use_shared_layout
 
 # Set up enhanced logging
 from scripts.setup_logging import setup_logging
@@ -20,6 +27,27 @@ logger = setup_logging(
 )
 
 
+def _parse_file(file_path: str, file_content: Optional[bytes], parser_preference: Optional[str], language: str):
+    """Parse one file (runs in a batch parse worker process)."""
+    parsed_doc = ParserFactory.parse_with_fallback(
+        file_path,
+        file_content,
+        preferred_parser=parser_preference,
+        language=language
+    )
+    if parsed_doc is None:
+        raise ValueError("Parser returned None - document could not be parsed")
+    return parsed_doc
+
+
+def _parse_pool(workers: int) -> Executor:
+    """Process pool for CPU-bound parsing (a thread pool where processes cannot be started)."""
+    try:
+        # spawn: forking a process that runs sync and queue threads can deadlock the child
+        return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    except (OSError, ValueError, NotImplementedError) as e:
+        logger.warning(f"⚠️ [BATCH] Process pool unavailable ({e}); parsing in threads")
+        return ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch-parse")
 
 
 class DocumentProcessor:
@@ -46,7 +74,9 @@ class DocumentProcessor:
         index_name: Optional[str] = None,
         language: str = "eng",
         is_update: bool = False,
-        old_index_name: Optional[str] = None
+        old_index_name: Optional[str] = None,
+        checkpoint=None,
+        parsed_document=None
     ) -> ProcessingResult:
         """
         Process a single document.
@@ -62,6 +92,10 @@ class DocumentProcessor:
             language: Language code for OCR (default: 'eng'). Use '+' for multiple (e.g. 'eng+spa')
             is_update: Whether this is an update to an existing document
             old_index_name: Old index name to clean up if updating
+            checkpoint: Optional JobCheckpoint of a queued ingestion job; parsing is skipped
+                when it holds the parsed document and later stages are recorded on it
+            parsed_document: Optional ParsedDocument parsed ahead of time (concurrent batch
+                mode parses in a process pool); only the parser call is skipped
         
         Returns:
             ProcessingResult with processing statistics
@@ -81,26 +115,37 @@ class DocumentProcessor:
             logger.info(f"   Updating index: {old_index_name}")
         logger.info("=" * 60)
         
-        # If updating, clean up old index data first
+        # If updating, clean up old index data first. When the old index can be reused,
+        # only images are dropped - text chunks are diffed by content hash during embedding.
+        reused_index = self.get_reusable_index(old_index_name, index_name) if is_update else None
         if is_update and old_index_name:
-            self._cleanup_old_index_data(doc_id, old_index_name, doc_name)
+            self._cleanup_old_index_data(doc_id, old_index_name, doc_name, include_text=not reused_index)
+        if reused_index:
+            index_name = reused_index
+            logger.info(f"   Reusing index '{reused_index}' for incremental re-ingestion")
         
         # Handle OpenSearch index name generation from document name (for non-UI cases like API)
-        # Only generate if index is not explicitly set or is the default
+        # Only generate if index is not explicitly set or is the default. The index is resolved
+        # here and only set on the shared engine under its indexing lock (other workers may be
+        # indexing into another index meanwhile)
+        target_index = None
         if (hasattr(self.rag_system, 'vector_store_type') and 
             self.rag_system.vector_store_type.lower() == 'opensearch'):
-            current_index = getattr(self.rag_system, 'opensearch_index', None)
+            engine_index = getattr(self.rag_system, 'opensearch_index', None)
+            current_index = engine_index
             default_index = 'aris-rag-index'
             
             # Priority 1: Explicitly provided index name
             if index_name:
-                self.rag_system.opensearch_index = index_name
                 current_index = index_name
                 logger.info(f"📇 Using explicitly provided OpenSearch index: '{index_name}'")
-            # Priority 2: document_id based index for document isolation
+            # Priority 2: shared index layout (documents isolated by routing + source_key)
+            elif use_shared_layout():
+                current_index = shared_index_name()
+                logger.info(f"📇 Using shared OpenSearch index: '{current_index}'")
+            # Priority 3: document_id based index for document isolation
             elif document_id:
-                self.rag_system.opensearch_index = f"aris-doc-{document_id}"
-                current_index = self.rag_system.opensearch_index
+                current_index = f"aris-doc-{document_id}"
                 logger.info(f"📇 Using document-specific OpenSearch index: '{current_index}'")
             
             # Generate from document name if index is None or is the default
@@ -127,15 +172,17 @@ class DocumentProcessor:
                         
                         # Auto-increment if index exists
                         final_index_name = temp_store.get_index_name_for_document(doc_name, auto_increment=True)
-                        self.rag_system.opensearch_index = final_index_name
+                        current_index = final_index_name
                         logger.info(f"📇 Generated OpenSearch index name from document: '{final_index_name}'")
                     except Exception as e:
                         logger.warning(f"Could not generate index name from document name: {str(e)}. Using base name.")
                         # Use base name as fallback
-                        self.rag_system.opensearch_index = base_index_name
+                        current_index = base_index_name
                 except Exception as e:
                     logger.warning(f"Could not set up document-based index name: {str(e)}")
                     # Continue with default index
+            if current_index != engine_index:
+                target_index = current_index
         
         # Initialize state
         self.processing_state[doc_id] = {
@@ -199,8 +246,13 @@ class DocumentProcessor:
             file_size_mb = file_size / 1024 / 1024
             logger.info(f"✅ [STEP 1.1] Document validated: type={file_type}, size={file_size:,} bytes ({file_size_mb:.2f} MB)")
             
+            # A job resumed from its parse checkpoint was already backed up and parsed
+            resumed_doc = checkpoint.load_parsed() if checkpoint is not None else None
+            if resumed_doc is not None:
+                s3_url = checkpoint.data.get('s3_url')
+            
             # [NEW] Upload to S3 if enabled
-            if hasattr(self.rag_system, 's3_service') and self.rag_system.s3_service.enabled:
+            if resumed_doc is None and hasattr(self.rag_system, 's3_service') and self.rag_system.s3_service.enabled:
                 try:
                     s3_start = time.time()
                     update_status('processing', 0.1, f"Backing up {doc_name} to S3...")
@@ -227,121 +279,135 @@ class DocumentProcessor:
             update_status('parsing', 0.25, "Starting document parsing...")
             
             parse_start = time.time()
-            try:
-                # Get parser from factory with language preference
-                # Note: get_parser requires file_path as first argument, then preferred_parser
-                parser = ParserFactory.get_parser(
-                    file_path,
-                    parser_preference or 'auto',
-                    language=language
+            if resumed_doc is not None:
+                parsed_doc = resumed_doc
+                images_stored_count = checkpoint.data.get('images_stored', 0)
+                logger.info(
+                    f"♻️ [STEP 2] Resuming from parse checkpoint: parser '{parsed_doc.parser_used}', "
+                    f"{parsed_doc.pages} pages, {len(parsed_doc.text or ''):,} chars"
                 )
-                
-                # Guard against None parser - provide clear error message
-                if parser is None:
-                    if parser_preference and parser_preference.lower() in ['llamascan', 'llama-scan']:
-                        raise ValueError(
-                            "Llama-Scan parser selected but Ollama server is not reachable or vision model is missing. "
-                            "Please ensure Ollama is running (default: http://localhost:11434 or host.docker.internal) "
-                            "and the vision model (default: qwen2.5vl:latest) is pulled."
-                        )
-                    elif parser_preference and parser_preference.lower() == 'ocrmypdf':
-                        raise ValueError(
-                            "OCRmyPDF selected but not available. "
-                            "Ensure ocrmypdf and tesseract-ocr are installed: "
-                            "sudo apt-get install tesseract-ocr && pip install ocrmypdf"
-                        )
+            else:
+                try:
+                    if parsed_document is not None:
+                        parsed_doc = parsed_document
+                        logger.info(f"[STEP 2.1] Using document parsed ahead of time by '{getattr(parsed_doc, 'parser_used', 'unknown')}'")
                     else:
-                        file_ext = os.path.splitext(file_path)[1].lower().lstrip('.')
-                        raise ValueError(f"No parser available for file extension: {file_ext}")
+                        # Get parser from factory with language preference
+                        # Note: get_parser requires file_path as first argument, then preferred_parser
+                        parser = ParserFactory.get_parser(
+                            file_path,
+                            parser_preference or 'auto',
+                            language=language
+                        )
                 
-                logger.info(f"[STEP 2.1] Parser selected: {parser.get_name()} (Language: {language})")
-                if parser_preference:
-                    logger.info(f"[STEP 2.1] Explicit parser selected: {parser_preference} (will NOT fall back)")
+                        # Guard against None parser - provide clear error message
+                        if parser is None:
+                            if parser_preference and parser_preference.lower() in ['llamascan', 'llama-scan']:
+                                raise ValueError(
+                                    "Llama-Scan parser selected but Ollama server is not reachable or vision model is missing. "
+                                    "Please ensure Ollama is running (default: http://localhost:11434 or host.docker.internal) "
+                                    "and the vision model (default: qwen2.5vl:latest) is pulled."
+                                )
+                            elif parser_preference and parser_preference.lower() == 'ocrmypdf':
+                                raise ValueError(
+                                    "OCRmyPDF selected but not available. "
+                                    "Ensure ocrmypdf and tesseract-ocr are installed: "
+                                    "sudo apt-get install tesseract-ocr && pip install ocrmypdf"
+                                )
+                            else:
+                                file_ext = os.path.splitext(file_path)[1].lower().lstrip('.')
+                                raise ValueError(f"No parser available for file extension: {file_ext}")
                 
-                # Special handling for Docling - show progress updates
-                if parser_preference and parser_preference.lower() == 'docling':
-                    update_status('parsing', 0.3, f"Docling parsing {doc_name}...")
-                    # Estimate processing time based on file size
-                    if file_size_mb > 10:
-                        estimated_time = "15-30 minutes"
-                    elif file_size_mb > 5:
-                        estimated_time = "10-20 minutes"
-                    else:
-                        estimated_time = "5-15 minutes"
-                        # Update status to show Docling is processing
-                    logger.info(f"[STEP 2.2] Docling: Processing {doc_name} ({file_size_mb:.2f} MB) - Estimated time: {estimated_time}")
+                        logger.info(f"[STEP 2.1] Parser selected: {parser.get_name()} (Language: {language})")
+                        if parser_preference:
+                            logger.info(f"[STEP 2.1] Explicit parser selected: {parser_preference} (will NOT fall back)")
                 
-                # Parse document (this will block for Docling, but that's expected)
-                logger.info(f"[STEP 2.2] DocumentProcessor: Calling parser with preference: {parser_preference}")
-                if file_size_mb > 0:
-                    logger.info(f"[STEP 2.2] File size: {file_size_mb:.2f} MB | Estimated processing time: {estimated_time if parser_preference and parser_preference.lower() == 'docling' else 'varies'}")
+                        # Special handling for Docling - show progress updates
+                        if parser_preference and parser_preference.lower() == 'docling':
+                            update_status('parsing', 0.3, f"Docling parsing {doc_name}...")
+                            # Estimate processing time based on file size
+                            if file_size_mb > 10:
+                                estimated_time = "15-30 minutes"
+                            elif file_size_mb > 5:
+                                estimated_time = "10-20 minutes"
+                            else:
+                                estimated_time = "5-15 minutes"
+                                # Update status to show Docling is processing
+                            logger.info(f"[STEP 2.2] Docling: Processing {doc_name} ({file_size_mb:.2f} MB) - Estimated time: {estimated_time}")
                 
-                # Create a wrapper callback that provides parser-specific progress updates
-                def parser_progress_callback(status_msg, progress, detailed_message=None):
-                    # Map parser progress (0.0-1.0) to parsing phase (0.25-0.45)
-                    # Parsing phase is 25% to 45% of total progress
-                    mapped_progress = 0.25 + (progress * 0.20)  # 0.25 to 0.45
-                    # Use detailed_message if provided, otherwise use status_msg
-                    msg = detailed_message if detailed_message else status_msg
-                    update_status('parsing', mapped_progress, msg)
+                        # Parse document (this will block for Docling, but that's expected)
+                        logger.info(f"[STEP 2.2] DocumentProcessor: Calling parser with preference: {parser_preference}")
+                        if file_size_mb > 0:
+                            logger.info(f"[STEP 2.2] File size: {file_size_mb:.2f} MB | Estimated processing time: {estimated_time if parser_preference and parser_preference.lower() == 'docling' else 'varies'}")
                 
-                parsed_doc = ParserFactory.parse_with_fallback(
-                    file_path,
-                    file_content,
-                    preferred_parser=parser_preference,
-                    progress_callback=parser_progress_callback if progress_callback else None,
-                    language=language
-                )
+                        # Create a wrapper callback that provides parser-specific progress updates
+                        def parser_progress_callback(status_msg, progress, detailed_message=None):
+                            # Map parser progress (0.0-1.0) to parsing phase (0.25-0.45)
+                            # Parsing phase is 25% to 45% of total progress
+                            mapped_progress = 0.25 + (progress * 0.20)  # 0.25 to 0.45
+                            # Use detailed_message if provided, otherwise use status_msg
+                            msg = detailed_message if detailed_message else status_msg
+                            update_status('parsing', mapped_progress, msg)
                 
-                # Log successful parsing
-                if parsed_doc:
-                    logger.info(
-                        f"✅ [STEP 2.3] DocumentProcessor: Parser '{parsed_doc.parser_used}' completed successfully: "
-                        f"{parsed_doc.pages} pages, {len(parsed_doc.text):,} chars, "
-                        f"{parsed_doc.extraction_percentage*100:.1f}% extraction"
-                    )
-                    text_preview = parsed_doc.text[:200] if parsed_doc.text else 'EMPTY'
-                    logger.info(f"[STEP 2.3] Text preview (first 200 chars): {text_preview}...")
+                        parsed_doc = ParserFactory.parse_with_fallback(
+                            file_path,
+                            file_content,
+                            preferred_parser=parser_preference,
+                            progress_callback=parser_progress_callback if progress_callback else None,
+                            language=language
+                        )
+                
+                    # Log successful parsing
+                    if parsed_doc:
+                        logger.info(
+                            f"✅ [STEP 2.3] DocumentProcessor: Parser '{parsed_doc.parser_used}' completed successfully: "
+                            f"{parsed_doc.pages} pages, {len(parsed_doc.text):,} chars, "
+                            f"{parsed_doc.extraction_percentage*100:.1f}% extraction"
+                        )
+                        text_preview = parsed_doc.text[:200] if parsed_doc.text else 'EMPTY'
+                        logger.info(f"[STEP 2.3] Text preview (first 200 chars): {text_preview}...")
                     
-                    # Store images in OpenSearch if available
-                    extracted_images_list = None
-                    if (hasattr(parsed_doc, 'metadata') and 
-                        isinstance(parsed_doc.metadata, dict)):
-                        extracted_images_list = parsed_doc.metadata.get('extracted_images', [])
-                        logger.info(f"[STEP 2.4] Checking for extracted_images: found {len(extracted_images_list) if extracted_images_list else 0} images")
+                        # Store images in OpenSearch if available
+                        extracted_images_list = None
+                        if (hasattr(parsed_doc, 'metadata') and 
+                            isinstance(parsed_doc.metadata, dict)):
+                            extracted_images_list = parsed_doc.metadata.get('extracted_images', [])
+                            logger.info(f"[STEP 2.4] Checking for extracted_images: found {len(extracted_images_list) if extracted_images_list else 0} images")
                     
-                    if extracted_images_list and len(extracted_images_list) > 0:
-                        logger.info(f"[STEP 2.4] Storing {len(extracted_images_list)} images in OpenSearch...")
-                        img_store_start = time.time()
-                        try:
-                            images_stored_count = self._store_images_in_opensearch(
-                                extracted_images_list,
-                                doc_name,
-                                parsed_doc.parser_used
-                            )
-                            img_store_time = time.time() - img_store_start
-                            logger.info(f"✅ [STEP 2.4] Successfully stored {images_stored_count} images in OpenSearch in {img_store_time:.2f}s")
-                        except Exception as e:
-                            img_store_time = time.time() - img_store_start
-                            logger.warning(f"⚠️ [STEP 2.4] Failed to store images in OpenSearch after {img_store_time:.2f}s: {str(e)}")
-                            import traceback
-                            logger.debug(f"[STEP 2.4] Storage error details: {traceback.format_exc()}")
-                            # Don't fail processing if image storage fails
-                    elif extracted_images_list is not None and len(extracted_images_list) == 0:
-                        logger.warning(f"⚠️ [STEP 2.4] extracted_images list is empty - no images to store")
+                        if extracted_images_list and len(extracted_images_list) > 0:
+                            logger.info(f"[STEP 2.4] Storing {len(extracted_images_list)} images in OpenSearch...")
+                            img_store_start = time.time()
+                            try:
+                                images_stored_count = self._store_images_in_opensearch(
+                                    extracted_images_list,
+                                    doc_name,
+                                    parsed_doc.parser_used
+                                )
+                                img_store_time = time.time() - img_store_start
+                                logger.info(f"✅ [STEP 2.4] Successfully stored {images_stored_count} images in OpenSearch in {img_store_time:.2f}s")
+                            except Exception as e:
+                                img_store_time = time.time() - img_store_start
+                                logger.warning(f"⚠️ [STEP 2.4] Failed to store images in OpenSearch after {img_store_time:.2f}s: {str(e)}")
+                                import traceback
+                                logger.debug(f"[STEP 2.4] Storage error details: {traceback.format_exc()}")
+                                # Don't fail processing if image storage fails
+                        elif extracted_images_list is not None and len(extracted_images_list) == 0:
+                            logger.warning(f"⚠️ [STEP 2.4] extracted_images list is empty - no images to store")
+                        else:
+                            logger.info(f"[STEP 2.4] No extracted_images in metadata - images may not have been extracted")
                     else:
-                        logger.info(f"[STEP 2.4] No extracted_images in metadata - images may not have been extracted")
-                else:
-                    logger.error("❌ [STEP 2.3] DocumentProcessor: Parser returned None!")
-                    raise ValueError("Parser returned None - document could not be parsed")
-            except IndexError as e:
-                logger.error(f"❌ [STEP 2] Parser error (list index out of range): {str(e)}")
-                raise ValueError(f"Parser error (list index out of range): {str(e)}. The PDF may be corrupted or in an unsupported format.")
-            except Exception as e:
-                logger.error(f"❌ [STEP 2] Parser error: {str(e)}")
-                raise ValueError(f"Parser error: {str(e)}")
+                        logger.error("❌ [STEP 2.3] DocumentProcessor: Parser returned None!")
+                        raise ValueError("Parser returned None - document could not be parsed")
+                except IndexError as e:
+                    logger.error(f"❌ [STEP 2] Parser error (list index out of range): {str(e)}")
+                    raise ValueError(f"Parser error (list index out of range): {str(e)}. The PDF may be corrupted or in an unsupported format.")
+                except Exception as e:
+                    logger.error(f"❌ [STEP 2] Parser error: {str(e)}")
+                    raise ValueError(f"Parser error: {str(e)}")
             parsing_time = time.time() - parse_start
             logger.info(f"✅ [STEP 2] Parsing completed in {parsing_time:.2f} seconds")
+            if checkpoint is not None and resumed_doc is None:
+                checkpoint.save_parsed(parsed_doc, images_stored=images_stored_count, s3_url=s3_url)
             
             # Step 3: Validate parsed document
             logger.info("[STEP 3] DocumentProcessor: Validating parsed document...")
@@ -529,6 +595,10 @@ class DocumentProcessor:
                     # Forward detailed_message if provided
                     detailed_message = kwargs.get('detailed_message', None)
                     update_status(status, mapped_progress, detailed_message)
+                    
+                    # Record stage transitions on the job checkpoint (not every progress tick)
+                    if checkpoint is not None and status in ('chunking', 'embedding') and status != checkpoint.stage:
+                        checkpoint.mark(status, detail=detailed_message)
                 
                 # Estimate chunks and tokens
                 estimated_chunks = max(1, len(doc_text) // (self.rag_system.chunk_size * 4))  # Rough estimate: 4 chars per token
@@ -558,6 +628,8 @@ class DocumentProcessor:
                     'text_original': original_text[:5000] if len(original_text) > 5000 else original_text,  # Truncate to prevent metadata bloat
                     'text_english': english_translation[:5000] if english_translation and len(english_translation) > 5000 else english_translation
                 }
+                if reused_index:
+                    base_metadata['text_index'] = reused_index
                 
                 # NEW LOGIC: Use page_blocks if available for accurate citations
                 texts_to_process = []
@@ -665,13 +737,18 @@ class DocumentProcessor:
                     metadatas_to_process = [base_metadata]
                 
                 logger.info(f"[STEP 4.2] DocumentProcessor: Calling RAGSystem.add_documents_incremental with {len(texts_to_process)} text items...")
-                stats = self.rag_system.add_documents_incremental(
-                    texts=texts_to_process,
-                    metadatas=metadatas_to_process,
-                    progress_callback=chunking_progress_callback,
-                    index_name=index_name
-                )
+                with self.rag_system.indexing_lock:
+                    if target_index:
+                        self.rag_system.opensearch_index = target_index
+                    stats = self.rag_system.add_documents_incremental(
+                        texts=texts_to_process,
+                        metadatas=metadatas_to_process,
+                        progress_callback=chunking_progress_callback,
+                        index_name=index_name
+                    )
                 logger.info(f"✅ [STEP 4.2] Chunking and embedding completed: {stats['chunks_created']} chunks, {stats['tokens_added']:,} tokens")
+                if checkpoint is not None:
+                    checkpoint.mark('indexed', chunks=stats['chunks_created'])
             except IndexError as e:
                 import traceback
                 error_details = traceback.format_exc()
@@ -778,9 +855,10 @@ class DocumentProcessor:
                         # Add OpenSearch connection info for long-term reference
                         if hasattr(self.rag_system, 'opensearch_domain') and self.rag_system.opensearch_domain:
                             doc_metadata['opensearch_domain'] = self.rag_system.opensearch_domain
-                        if hasattr(self.rag_system, 'opensearch_index') and self.rag_system.opensearch_index:
-                            doc_metadata['opensearch_index'] = self.rag_system.opensearch_index
-                            doc_metadata['text_index'] = self.rag_system.opensearch_index
+                        indexed_into = target_index or getattr(self.rag_system, 'opensearch_index', None)
+                        if indexed_into:
+                            doc_metadata['opensearch_index'] = indexed_into
+                            doc_metadata['text_index'] = indexed_into
                         doc_metadata['storage_location'] = 'opensearch_cloud'
                     elif self.rag_system.vector_store_type.lower() == 'pgvector':
                         if hasattr(self.rag_system, 'pgvector_collection') and self.rag_system.pgvector_collection:
@@ -797,7 +875,8 @@ class DocumentProcessor:
                     else:
                         doc_metadata['storage_location'] = 'local_faiss'
                 
-                registry.add_document(doc_id, doc_metadata)
+                # Final status: wait until searches (listings, duplicate checks) can see it
+                registry.add_document(doc_id, doc_metadata, refresh="wait_for")
                 logger.info(f"✅ [STEP 6] Document saved to registry for long-term storage: {doc_id}")
             except Exception as e:
                 logger.warning(f"⚠️ [STEP 6] Could not save to registry (non-critical): {e}")
@@ -897,7 +976,26 @@ class DocumentProcessor:
             
             return result
     
-    def _cleanup_old_index_data(self, doc_id: str, old_index_name: str, doc_name: str) -> bool:
+    def get_reusable_index(self, old_index_name: Optional[str], requested_index: Optional[str] = None) -> Optional[str]:
+        """
+        Return the old text index if a re-ingest can sync into it incrementally.
+        
+        Args:
+            old_index_name: Text index of the version being replaced
+            requested_index: Explicit index requested for the new version, if any
+        
+        Returns:
+            Index name to reuse, or None when the old chunks must be fully replaced
+        """
+        if not ARISConfig.ENABLE_INCREMENTAL_REINGEST or not old_index_name:
+            return None
+        if getattr(self.rag_system, 'vector_store_type', '').lower() != 'opensearch':
+            return None
+        if requested_index and requested_index != old_index_name:
+            return None
+        return old_index_name
+    
+    def _cleanup_old_index_data(self, doc_id: str, old_index_name: str, doc_name: str, include_text: bool = True) -> bool:
         """
         Clean up old index data when updating a document.
         
@@ -905,6 +1003,7 @@ class DocumentProcessor:
             doc_id: Document ID
             old_index_name: Name of the old index to clean up
             doc_name: Document name for source filtering
+            include_text: If False, keep text chunks (incremental re-ingest) and only drop images
         
         Returns:
             True if cleanup was successful, False otherwise
@@ -943,14 +1042,25 @@ class DocumentProcessor:
                             }
                         }
                         
-                        response = client.delete_by_query(
-                            index=old_index_name,
-                            body=delete_query,
-                            conflicts='proceed'
-                        )
+                        delete_kwargs = {}
+                        if is_shared_index(old_index_name):
+                            # Other documents live in the same index: match exactly on
+                            # source_key and only touch this document's shard
+                            delete_query = {"query": {"bool": {"filter": [source_key_filter([doc_name])]}}}
+                            delete_kwargs['routing'] = document_routing([doc_name])
                         
-                        deleted_count = response.get('deleted', 0)
-                        logger.info(f"[CLEANUP] Deleted {deleted_count} chunks from index '{old_index_name}' for document '{doc_name}'")
+                        if include_text:
+                            response = client.delete_by_query(
+                                index=old_index_name,
+                                body=delete_query,
+                                conflicts='proceed',
+                                **delete_kwargs
+                            )
+                            
+                            deleted_count = response.get('deleted', 0)
+                            logger.info(f"[CLEANUP] Deleted {deleted_count} chunks from index '{old_index_name}' for document '{doc_name}'")
+                        else:
+                            logger.info(f"[CLEANUP] Keeping text chunks in '{old_index_name}' for incremental re-ingestion of '{doc_name}'")
                         
                         # Also clean up from images index
                         try:
@@ -992,21 +1102,34 @@ class DocumentProcessor:
     
     def process_documents_batch(
         self,
-        files: List[Dict],  # List of {path, content, name}
+        files: List[Dict],  # List of {path, content, name, document_id}
         parser_preference: Optional[str] = None,
-        progress_callback: Optional[callable] = None
+        progress_callback: Optional[callable] = None,
+        language: str = "eng",
+        concurrent: Optional[bool] = None,
+        batch_id: Optional[str] = None
     ) -> List[ProcessingResult]:
         """
-        Process multiple documents sequentially.
+        Process multiple documents.
         
         Args:
-            files: List of file dictionaries with 'path', 'content' (optional), 'name'
+            files: List of file dictionaries with 'path', 'content' (optional), 'name',
+                'document_id' (optional)
             parser_preference: Preferred parser
-            progress_callback: Optional callback(doc_index, total_docs, status, progress)
+            progress_callback: Optional callback(doc_index, total_docs, doc_name, status, overall_progress)
+            language: OCR / document language code
+            concurrent: Stage the batch across a parse process pool and an I/O thread pool
+                (default BATCH_CONCURRENT_PROCESSING); False processes files one after another
+            batch_id: processing_state key of the aggregate batch progress
         
         Returns:
-            List of ProcessingResult objects
+            List of ProcessingResult objects, in the order of files
         """
+        if concurrent is None:
+            concurrent = ARISConfig.BATCH_CONCURRENT_PROCESSING
+        if concurrent and len(files) > 1:
+            return self._process_batch_concurrently(files, parser_preference, progress_callback, language, batch_id)
+        
         results = []
         total_files = len(files)
         
@@ -1027,13 +1150,141 @@ class DocumentProcessor:
                 file_content=file_content,
                 file_name=file_name,
                 parser_preference=parser_preference,
-                progress_callback=doc_progress_callback
+                document_id=file_info.get('document_id'),
+                progress_callback=doc_progress_callback,
+                language=language
             )
             
             results.append(result)
         
         return results
     
+    def _process_batch_concurrently(
+        self,
+        files: List[Dict],
+        parser_preference: Optional[str],
+        progress_callback: Optional[callable],
+        language: str,
+        batch_id: Optional[str]
+    ) -> List[ProcessingResult]:
+        """
+        Staged batch: parsing runs in a process pool while already-parsed files are
+        embedded, indexed and stored by an I/O thread pool. A file that fails (or whose
+        parse worker fails, in which case it is parsed again in-process) only fails itself.
+        
+        The engine re-targets its vector store per index, so documents are indexed one at
+        a time unless they all go to the shared index. Even then chunking, embedding and
+        indexing hold the engine's indexing lock; the I/O pool overlaps the backups, image
+        storage and registry writes around them.
+        """
+        total = len(files)
+        batch_id = batch_id or f"batch-{uuid.uuid4().hex[:12]}"
+        parse_workers = max(1, ARISConfig.BATCH_PARSE_WORKERS)
+        io_workers = max(1, ARISConfig.BATCH_IO_WORKERS) if use_shared_layout() else 1
+        
+        results: List[Optional[ProcessingResult]] = [None] * total
+        progress = [0.0] * total
+        lock = threading.Lock()
+        all_done = threading.Event()
+        # Parsed documents wait in memory for the I/O pool: bound how far parsing runs ahead
+        window = threading.BoundedSemaphore(parse_workers + io_workers)
+        state = self.processing_state[batch_id] = {
+            'status': 'processing',
+            'progress': 0.0,
+            'document_name': f"Batch of {total} documents",
+            'total': total,
+            'parsed': 0,
+            'completed': 0,
+            'failed': 0,
+            'documents': {}
+        }
+        logger.info(f"[BATCH] {batch_id}: {total} files, {parse_workers} parse workers, {io_workers} I/O workers")
+        
+        def report(idx: int, name: str, status: str, value: float):
+            with lock:
+                progress[idx] = value
+                state['progress'] = sum(progress) / total
+                state['documents'][name] = status
+                overall = state['progress']
+            if progress_callback:
+                try:
+                    progress_callback(idx, total, name, status, overall)
+                except Exception as e:
+                    logger.warning(f"Error in batch progress callback: {e}")
+        
+        def index_file(idx: int, file_info: Dict, parsed_doc):
+            file_path = file_info.get('path', '')
+            file_name = file_info.get('name', os.path.basename(file_path))
+            try:
+                result = self.process_document(
+                    file_path=file_path,
+                    file_content=file_info.get('content'),
+                    file_name=file_name,
+                    parser_preference=parser_preference,
+                    document_id=file_info.get('document_id'),
+                    progress_callback=lambda status, value: report(idx, file_name, status, value),
+                    language=language,
+                    parsed_document=parsed_doc
+                )
+            except Exception as e:
+                logger.error(f"❌ [BATCH] {file_name} failed: {e}")
+                result = ProcessingResult(
+                    document_id=file_info.get('document_id'),
+                    status='failed',
+                    document_name=file_name,
+                    error=str(e),
+                    success=False
+                )
+            finally:
+                window.release()
+            with lock:
+                results[idx] = result
+                state['failed' if result.status == 'failed' else 'completed'] += 1
+                finished = state['completed'] + state['failed']
+            report(idx, file_name, result.status, 1.0)
+            if finished == total:
+                all_done.set()
+        
+        def on_parsed(idx: int, file_info: Dict, io_pool: Executor, future):
+            parsed_doc = None
+            try:
+                parsed_doc = future.result()
+                with lock:
+                    state['parsed'] += 1
+            except Exception as e:
+                logger.warning(f"⚠️ [BATCH] Parse worker failed for {file_info.get('name') or file_info.get('path')} ({e}); parsing it in-process")
+            io_pool.submit(index_file, idx, file_info, parsed_doc)
+        
+        start_time = time.time()
+        with ThreadPoolExecutor(max_workers=io_workers, thread_name_prefix="batch-io") as io_pool:
+            with _parse_pool(parse_workers) as parse_pool:
+                for idx, file_info in enumerate(files):
+                    window.acquire()
+                    try:
+                        future = parse_pool.submit(
+                            _parse_file,
+                            file_info.get('path', ''),
+                            file_info.get('content'),
+                            parser_preference,
+                            language
+                        )
+                    except Exception as e:
+                        logger.warning(f"⚠️ [BATCH] Could not schedule parsing ({e}); parsing in-process")
+                        io_pool.submit(index_file, idx, file_info, None)
+                        continue
+                    future.add_done_callback(functools.partial(on_parsed, idx, file_info, io_pool))
+                all_done.wait()
+        
+        with lock:
+            state['status'] = 'failed' if state['failed'] == total else 'success'
+            state['progress'] = 1.0
+            state['processing_time'] = time.time() - start_time
+        logger.info(
+            f"✅ [BATCH] {batch_id}: {state['completed']}/{total} succeeded, {state['failed']} failed "
+            f"in {state['processing_time']:.2f}s"
+        )
+        return results
+    
     def get_processing_state(self, doc_id: str) -> Optional[Dict]:
         """Get processing state for a document."""
         return self.processing_state.get(doc_id)
@@ -1120,8 +1371,7 @@ class DocumentProcessor:
         
         stored_count = 0
         try:
-            from vectorstores.opensearch_images_store import OpenSearchImagesStore
-            from langchain_openai import OpenAIEmbeddings
+            from vectorstores.opensearch_images_store import get_images_store
             from shared.utils.image_extraction_logger import image_logger
             
             # Log storage start
@@ -1132,12 +1382,6 @@ class DocumentProcessor:
                     storage_method="opensearch"
                 )
             
-            # Initialize images store
-            embeddings = OpenAIEmbeddings(
-                openai_api_key=os.getenv('OPENAI_API_KEY'),
-                model=self.rag_system.embedding_model
-            )
-            
             # Use OpenSearch domain from rag_system or environment
             opensearch_domain = getattr(self.rag_system, 'opensearch_domain', None) or os.getenv('AWS_OPENSEARCH_DOMAIN') or os.getenv('OPENSEARCH_DOMAIN')
             opensearch_region = getattr(self.rag_system, 'region', None) or os.getenv('AWS_OPENSEARCH_REGION', 'us-east-2')
@@ -1146,8 +1390,9 @@ class DocumentProcessor:
                 logger.warning("OpenSearch domain not found - cannot store images")
                 return 0
             
-            images_store = OpenSearchImagesStore(
-                embeddings=embeddings,
+            # Reuse one images store (and its embedding cache) per process
+            images_store = get_images_store(
+                embedding_model=self.rag_system.embedding_model,
                 domain=opensearch_domain,
                 region=opensearch_region
             )
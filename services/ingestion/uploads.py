@@ -0,0 +1,105 @@
+"""
+Streaming upload spooling.
+
+An UploadFile is copied to a spool file in UPLOAD_CHUNK_SIZE_KB chunks while its
+MD5 is computed incrementally, so peak memory per upload is one chunk instead of
+the whole file. Disk writes (and the hashing next to them) run in a worker
+thread so the event loop keeps serving other requests. Parsers and the S3 backup
+then read the file from disk.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import uuid
+from dataclasses import dataclass
+from typing import Optional
+
+from shared.config.settings import ARISConfig
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_DIR = "data/uploads"
+SPOOL_DIR = os.path.join(UPLOAD_DIR, ".spool")
+
+
+class UploadTooLarge(ValueError):
+    """The upload exceeds MAX_UPLOAD_SIZE_MB."""
+
+
+@dataclass
+class SpooledUpload:
+    """An upload streamed to disk: where it is, how large it is and its MD5."""
+    path: str
+    size: int
+    md5: str
+    spooled: bool = True
+
+    def move_to(self, path: str) -> str:
+        """Move the spool file to its final path (same filesystem, so no copy)."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        os.replace(self.path, path)
+        self.path = path
+        self.spooled = False
+        return path
+
+    def discard(self):
+        """Remove the spool file unless it was moved to its final path."""
+        if self.spooled and os.path.exists(self.path):
+            try:
+                os.remove(self.path)
+            except OSError as e:
+                logger.debug(f"discard: {type(e).__name__}: {e}")
+        self.spooled = False
+
+
+def max_upload_bytes() -> int:
+    """Upload size limit in bytes (0 = unlimited)."""
+    return max(0, ARISConfig.MAX_UPLOAD_SIZE_MB) * 1024 * 1024
+
+
+def _too_large(filename: str, limit: int) -> UploadTooLarge:
+    return UploadTooLarge(f"File '{filename}' exceeds the maximum upload size of {limit / 1024 / 1024:.0f} MB")
+
+
+async def spool_upload(
+    file,
+    chunk_size: Optional[int] = None,
+    max_bytes: Optional[int] = None,
+) -> SpooledUpload:
+    """
+    Stream an UploadFile to a spool file, hashing as it goes.
+
+    Raises UploadTooLarge as soon as the declared or streamed size passes the limit.
+    """
+    chunk_size = chunk_size or ARISConfig.UPLOAD_CHUNK_SIZE_KB * 1024
+    limit = max_upload_bytes() if max_bytes is None else max_bytes
+    declared = getattr(file, "size", None)
+    if limit and declared and declared > limit:
+        raise _too_large(file.filename, limit)
+
+    os.makedirs(SPOOL_DIR, exist_ok=True)
+    path = os.path.join(SPOOL_DIR, f"{uuid.uuid4().hex}.part")
+    digest = hashlib.md5()
+    size = 0
+
+    def consume(out, chunk: bytes):
+        digest.update(chunk)
+        out.write(chunk)
+
+    try:
+        with open(path, "wb") as out:
+            while True:
+                chunk = await file.read(chunk_size)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if limit and size > limit:
+                    raise _too_large(file.filename, limit)
+                await asyncio.to_thread(consume, out, chunk)
+    except BaseException:
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+    logger.info(f"📦 Spooled upload '{file.filename}' to disk: {size:,} bytes")
+    return SpooledUpload(path=path, size=size, md5=digest.hexdigest())
@@ -192,7 +192,12 @@ class MCPEngine:
         Gateway is the sole sync coordinator. MCP syncs itself locally, then
         asks Gateway to broadcast to the other services with ?exclude=mcp
         to avoid a circular callback (Gateway would otherwise call MCP /sync/force).
+        With the registry change feed enabled the services are already rung by
+        the registry write, so nothing is sent.
         """
+        from shared.config.settings import ARISConfig
+        if ARISConfig.ENABLE_REGISTRY_CHANGE_FEED:
+            return True
         try:
             # First, instant sync locally (MCP's own state)
             self.sync_manager.instant_sync()
@@ -9,6 +9,8 @@ import logging
 from typing import List, Dict, Optional, Any
 
 from shared.config.settings import ARISConfig
+from shared.utils.source_key import source_key_filter
+from vectorstores.shared_index import document_routing, is_shared_index, shared_search_target, use_shared_layout
 
 logger = logging.getLogger(__name__)
 
@@ -530,8 +532,18 @@ class StorageMixin:
                 if client:
                     index_name = self.opensearch_index
                     query = {"query": {"term": {"metadata.source.keyword": source}}}
+                    if is_shared_index(index_name):
+                        query = {"query": {"bool": {"filter": [source_key_filter([source])]}}}
                     client.delete_by_query(index=index_name, body=query)
                     logger.info(f"Deleted document {source} from {index_name}")
+                    if use_shared_layout() and not is_shared_index(index_name):
+                        # The document's chunks live in the shared index, on its routed shard
+                        client.delete_by_query(
+                            index=shared_search_target(),
+                            body={"query": {"bool": {"filter": [source_key_filter([source])]}}},
+                            routing=document_routing([source])
+                        )
+                        logger.info(f"Deleted document {source} from shared index {shared_search_target()}")
                 else:
                     logger.warning(f"Could not delete {source}: No client available")
         except Exception as e:
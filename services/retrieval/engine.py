@@ -11,13 +11,16 @@ import numpy as np
 from dotenv import load_dotenv
 from langchain_openai import OpenAIEmbeddings
 from shared.utils.local_embeddings import LocalHashEmbeddings
+from shared.utils.embedding_dimensions import create_embeddings
 try:
     from langchain.docstore.document import Document
 except ImportError:
     from langchain_core.documents import Document
 import requests
-from shared.utils.tokenizer import TokenTextSplitter
+from shared.utils.tokenizer import TokenTextSplitter, get_context_token_budget, pack_documents_by_tokens
 from shared.utils.s3_service import S3Service
+from shared.utils.source_key import source_key_filter
+from vectorstores.shared_index import is_shared_index
 # Accuracy Improvements: Recursive Chunking and Reranking
 try:
     from langchain_text_splitters import RecursiveCharacterTextSplitter
@@ -41,7 +44,7 @@ load_dotenv()
 # Mixin imports - methods extracted from this file for maintainability
 # ============================================================================
 from services.retrieval.utils import UtilsMixin
-from services.retrieval.search import SearchMixin
+from services.retrieval.search import NATIVE_HYBRID_STORE_TYPES, SearchMixin
 from services.retrieval.citation import PageExtractionMixin, SnippetMixin, CitationRankingMixin
 from services.retrieval.answer import AnswerGeneratorMixin, AgenticRAGMixin
 from services.retrieval.crud import StorageMixin
@@ -140,14 +143,9 @@ class RetrievalEngine(
         self.chunk_overlap = chunk_overlap
         
         # Use selected embedding model (use instance variable after defaults applied)
-        actual_embeddings = None
-        if os.getenv('OPENAI_API_KEY'):
-            actual_embeddings = OpenAIEmbeddings(
-                openai_api_key=os.getenv('OPENAI_API_KEY'),
-                model=self.embedding_model
-            )
-        else:
-            actual_embeddings = LocalHashEmbeddings(model_name=self.embedding_model)
+        # (shortened to EMBEDDING_DIMENSIONS when configured; indexes built at a smaller
+        # dimension truncate query vectors to their own size)
+        actual_embeddings = create_embeddings(self.embedding_model)
             
         # Wrap embeddings with caching to avoid redundant API calls
         from shared.utils.cached_embeddings import CachedEmbeddings
@@ -301,6 +299,8 @@ class RetrievalEngine(
         
         # Document-to-index mapping for per-document OpenSearch indexes
         self.document_index_map: Dict[str, str] = {}  # document_name -> index_name
+        # Bumped on every load/save so in-place edits invalidate the document-name matcher
+        self._document_index_map_version = 0
         self.document_index_map_path = os.path.join(
             ARISConfig.VECTORSTORE_PATH,
             "document_index_map.json"
@@ -328,6 +328,7 @@ class RetrievalEngine(
                 with open(self.document_index_map_path, 'r') as f:
                     self.document_index_map = json.load(f)
                     logger.info(f"Loaded {len(self.document_index_map)} document-index mappings")
+                self._document_index_map_version = getattr(self, '_document_index_map_version', 0) + 1
                 # Store modification time to detect changes
                 self._document_index_map_mtime = os.path.getmtime(self.document_index_map_path)
             except Exception as e:
@@ -357,11 +358,12 @@ class RetrievalEngine(
         return False
     
     def _save_document_index_map(self):
-        """Save document-to-index mapping to file."""
+        """Save document-to-index mapping to file (writers call this after editing the map in place)."""
         import json
         from scripts.setup_logging import get_logger
         logger = get_logger("aris_rag.rag_system")
         
+        self._document_index_map_version = getattr(self, '_document_index_map_version', 0) + 1
         os.makedirs(os.path.dirname(self.document_index_map_path), exist_ok=True)
         try:
             with open(self.document_index_map_path, 'w') as f:
@@ -422,6 +424,7 @@ class RetrievalEngine(
             return False
         
         self.document_index_map = merged_map
+        self._document_index_map_version = getattr(self, '_document_index_map_version', 0) + 1
         logger.info(
             f"Updated document index map from registry ({len(self.document_index_map)} total mappings)"
         )
@@ -1152,6 +1155,7 @@ class RetrievalEngine(
             logger.info(f"📚 [ACTIVE_SOURCES] ALL DOCUMENTS mode - searching across all indexes")
         else:
             # Specific documents passed - set filter for this request
+            active_sources = self._resolve_active_sources(active_sources)
             self.active_sources = active_sources
             logger.info(f"📄 [ACTIVE_SOURCES] Document filter: {active_sources}")
             
@@ -1508,7 +1512,7 @@ class RetrievalEngine(
             # AUTO-DETECT document mentions in question and filter accordingly
             # This helps when user asks "What is in VUORMAR MK?" without explicitly selecting the document
             if hasattr(self, 'document_index_map') and self.document_index_map:
-                detected_docs = self._detect_document_in_question(question, list(self.document_index_map.keys()))
+                detected_docs = self._detect_document_in_question(question)
                 if detected_docs:
                     active_sources = detected_docs
                     logger.info(f"🔍 Auto-detected document mention in question: {detected_docs} - filtering search to this document")
@@ -1786,8 +1790,8 @@ class RetrievalEngine(
                     region=getattr(self, 'region', None)
                 )
             
-            # Search across selected indexes
-            if len(indexes_to_search) == 1:
+            # Search across selected indexes (a shared index needs the document-scoped multi-index path)
+            if len(indexes_to_search) == 1 and not (active_sources and is_shared_index(indexes_to_search[0])):
                 # Single index - use it directly (more efficient)
                 index_name = indexes_to_search[0]
                 store = self.multi_index_manager.get_or_create_index_store(index_name)
@@ -1896,7 +1900,8 @@ class RetrievalEngine(
                     alternate_query=alternate_for_keywords or (original_question if original_question != retrieval_question else None),
                     fetch_k=ARISConfig.DEFAULT_MMR_FETCH_K if use_mmr else 50,
                     lambda_mult=ARISConfig.DEFAULT_MMR_LAMBDA if use_mmr else 0.3,
-                    filter=opensearch_filter # Apply global filters (e.g. language)
+                    filter=opensearch_filter, # Apply global filters (e.g. language)
+                    sources=active_sources
                 )
             
             logger.info(f"Searched {len(indexes_to_search)} index(es): {indexes_to_search}, found {len(relevant_docs)} results")
@@ -1919,7 +1924,9 @@ class RetrievalEngine(
                 # Source filtering
                 if active_sources:
                     valid_sources = [s for s in active_sources if s and s.strip()]
-                    if valid_sources:
+                    if valid_sources and ARISConfig.USE_SOURCE_KEY_FILTER:
+                        filters.append(source_key_filter(valid_sources))
+                    elif valid_sources:
                         if len(valid_sources) == 1:
                             filters.append({"term": {"metadata.source.keyword": valid_sources[0]}})
                         else:
@@ -1970,6 +1977,21 @@ class RetrievalEngine(
                 except Exception as e:
                     logger.warning(f"Hybrid search failed, falling back to semantic search: {str(e)}")
                     relevant_docs = None
+            elif use_hybrid_search and self.vector_store_type.lower() in NATIVE_HYBRID_STORE_TYPES and hasattr(self.vectorstore, 'hybrid_search'):
+                # Stores with in-database hybrid search take a LangChain-style metadata filter
+                try:
+                    relevant_docs = self.vectorstore.hybrid_search(
+                        query=retrieval_question,
+                        query_vector=self.embeddings.embed_query(retrieval_question),
+                        k=k,
+                        semantic_weight=semantic_weight,
+                        keyword_weight=keyword_weight,
+                        filter=self._native_hybrid_filter(active_sources, filter_language)
+                    )
+                    logger.info(f"Native hybrid search ({self.vector_store_type}) completed: {len(relevant_docs)} results (mode={search_mode}, semantic_weight={semantic_weight:.2f})")
+                except Exception as e:
+                    logger.warning(f"Native hybrid search failed, falling back to semantic search: {str(e)}")
+                    relevant_docs = None
             else:
                 relevant_docs = None
         
@@ -2184,6 +2206,7 @@ class RetrievalEngine(
         # The ranker was only called in the Agentic RAG sub-query path.
         # We must also rerank the main path so rerank_score flows into citations.
         if self.ranker and relevant_docs and len(relevant_docs) > 1:
+            relevant_docs = self._collapse_near_duplicate_candidates(relevant_docs)
             try:
                 passages = [
                     {"id": str(i), "text": doc.page_content, "meta": doc.metadata}
@@ -2206,6 +2229,20 @@ class RetrievalEngine(
             except Exception as e:
                 logger.warning(f"Main-path reranking failed (using original order): {e}")
         
+        # Pack chunks into the model's context budget (greedy, in rank order)
+        context_token_budget = get_context_token_budget(
+            target_llm_model,
+            self.ui_config.get('max_tokens') or ARISConfig.DEFAULT_MAX_TOKENS,
+            ARISConfig.MAX_CONTEXT_TOKENS,
+        )
+        packed_docs, text_context_tokens = pack_documents_by_tokens(relevant_docs, context_token_budget)
+        if len(packed_docs) < len(relevant_docs):
+            logger.info(
+                f"📦 Context budget: kept {len(packed_docs)}/{len(relevant_docs)} chunks "
+                f"({text_context_tokens:,}/{context_token_budget:,} tokens)"
+            )
+        relevant_docs = packed_docs
+        
         # Build context with metadata for better accuracy and collect citations
         context_parts = []
         citations = []  # Store citation information for each source
@@ -2859,7 +2896,8 @@ class RetrievalEngine(
                             query=q,
                             index_names=indexes_to_search,
                             k=100,
-                            use_hybrid_search=True
+                            use_hybrid_search=True,
+                            sources=active_sources
                         )
                     elif self.vectorstore is not None:
                         return self.vectorstore.similarity_search(q, k=100)
@@ -3421,6 +3459,10 @@ class RetrievalEngine(
             image_content_section += "=" * 80 + "\n"
             image_content_section += "=" * 80 + "\n\n"
             
+            # Images share the context budget with the packed text chunks
+            image_token_budget = max(context_token_budget - text_context_tokens, 0)
+            images_skipped_for_budget = 0
+            
             # Group by document for better organization
             documents_images = {}
             for (source, img_idx), contents in image_content_map.items():
@@ -3437,24 +3479,24 @@ class RetrievalEngine(
                 sorted_images = sorted(images_dict.items(), key=lambda x: x[0] if isinstance(x[0], int) else 0)
                 
                 for img_idx, contents in sorted_images:
-                    image_content_section += f"\n  Image {img_idx}:\n"
+                    image_entry = f"\n  Image {img_idx}:\n"
                     for content_info in contents:
                         # Add page information if available
                         if content_info.get('page'):
-                            image_content_section += f"    Location: Page {content_info['page']}\n"
+                            image_entry += f"    Location: Page {content_info['page']}\n"
                         
                         # Add OCR content with clear formatting
                         # CRITICAL FIX: Include FULL OCR text, not truncated
                         ocr_text = content_info.get('ocr_text', '')
                         if ocr_text:
                             # Include full OCR text (no truncation) - LLM can handle long text
-                            image_content_section += f"    OCR Text: {ocr_text}\n"
+                            image_entry += f"    OCR Text: {ocr_text}\n"
                         else:
                             # Use content if OCR text not available
                             content = content_info.get('content', '')
                             if content:
                                 # Include full content (no truncation)
-                                image_content_section += f"    Content: {content}\n"
+                                image_entry += f"    Content: {content}\n"
                         
                         # Add additional context if available (full_chunk might have more than ocr_text)
                         full_chunk = content_info.get('full_chunk', '')
@@ -3465,9 +3507,20 @@ class RetrievalEngine(
                                 # Include the additional content (no truncation)
                                 additional = full_chunk[len(ocr_or_content):] if ocr_or_content else full_chunk
                                 if additional.strip():
-                                    image_content_section += f"    Additional Context: {additional}\n"
+                                    image_entry += f"    Additional Context: {additional}\n"
                     
-                    image_content_section += "\n"
+                    image_entry += "\n"
+                    
+                    # Token budget: only include images that still fit after the text chunks
+                    entry_tokens = self.count_tokens(image_entry)
+                    if entry_tokens > image_token_budget:
+                        images_skipped_for_budget += 1
+                        continue
+                    image_token_budget -= entry_tokens
+                    image_content_section += image_entry
+            
+            if images_skipped_for_budget:
+                logger.info(f"📦 Context budget: skipped {images_skipped_for_budget} image(s) that did not fit in the remaining {image_token_budget:,} tokens")
             
             image_content_section += "\n" + "=" * 80 + "\n"
             image_content_section += "=" * 80 + "\n"
@@ -74,6 +74,8 @@ async def lifespan(app: FastAPI):
         if engine and (result.get("index_map") or result.get("registry")):
             try:
                 engine._check_and_reload_document_index_map()
+                # Apply name changes to the document-name matcher now rather than on the next query
+                engine._get_document_name_matcher()
                 logger.debug("[retrieval] Engine index map reloaded via sync callback")
             except Exception as e:
                 logger.warning(f"[retrieval] Failed to reload index map in callback: {e}")
@@ -113,19 +115,10 @@ app.add_middleware(
 
 @app.middleware("http")
 async def auto_sync_middleware(request: Request, call_next):
-    """Middleware to automatically sync state before operations."""
+    """Tag requests with an ID (sync runs in the background task, never per request)."""
     request_id = request.headers.get("X-Request-ID", "internal")
     
-    # Auto-sync before critical operations (queries need latest index map)
-    if sync_manager and request.url.path in ["/query", "/query/images", "/health", "/admin/index-map"]:
-        try:
-            sync_manager.check_and_sync()
-            # Also reload engine's index map for queries
-            if engine and request.url.path.startswith("/query"):
-                engine._check_and_reload_document_index_map()
-        except Exception as e:
-            logger.debug(f"Auto-sync check failed in middleware: {e}")
-    
+    # The engine's index map is reloaded by the sync callback when the background sync sees a change
     logger.info(f"Retrieval: [ReqID: {request_id}] {request.method} {request.url.path}")
     response = await call_next(request)
     response.headers["X-Request-ID"] = request_id
@@ -182,19 +175,16 @@ async def health_check():
         index_map_path = os.path.join(ARISConfig.VECTORSTORE_PATH, "document_index_map.json")
         index_map_accessible = os.path.exists(index_map_path) or os.path.exists(ARISConfig.VECTORSTORE_PATH)
         
-        # Reload index map to ensure it's up to date
-        if engine:
-            engine._check_and_reload_document_index_map()
-            index_map_count = len(engine.document_index_map) if hasattr(engine, 'document_index_map') else 0
-        else:
-            index_map_count = 0
+        # Report the engine's map as kept current by the background sync (no reload here)
+        index_map_count = len(getattr(engine, 'document_index_map', None) or {}) if engine else 0
         
         return {
             "status": "healthy",
             "service": "retrieval",
             "registry_accessible": registry_accessible,
             "index_map_accessible": index_map_accessible,
-            "index_map_entries": index_map_count
+            "index_map_entries": index_map_count,
+            "sync": sync_manager.get_sync_staleness() if sync_manager else None
         }
     except Exception as e:
         return {
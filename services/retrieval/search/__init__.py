@@ -1,3 +1,3 @@
-from .retriever import SearchMixin
+from .retriever import NATIVE_HYBRID_STORE_TYPES, SearchMixin
 
-__all__ = ["SearchMixin"]
+__all__ = ["SearchMixin", "NATIVE_HYBRID_STORE_TYPES"]
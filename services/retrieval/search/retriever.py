@@ -16,14 +16,79 @@ except ImportError:
     from langchain_core.documents import Document
 
 from shared.config.settings import ARISConfig
+from shared.utils.chunk_identity import collapse_near_duplicates, similarity_to_hamming
+from shared.utils.source_key import source_key_filter
+from vectorstores.shared_index import is_shared_index
 
 logger = logging.getLogger(__name__)
 
+# Vector stores whose hybrid_search runs natively and takes a LangChain-style metadata filter
+NATIVE_HYBRID_STORE_TYPES = ("pgvector", "qdrant")
+
+# Highlight markers for occurrence offsets (private-use code points never present in extracted text)
+_HL_PRE = "\ue000"
+_HL_POST = "\ue001"
+
+
+def _spans_from_highlight(highlighted: str):
+    """
+    Strip highlight markers and return (plain_text, [(start, end), ...]).
+
+    Adjacent highlighted terms separated only by whitespace (a phrase) are merged
+    into a single span.
+    """
+    plain = []
+    spans = []
+    pos = 0
+    span_start = None
+    for ch in highlighted:
+        if ch == _HL_PRE:
+            span_start = pos
+        elif ch == _HL_POST:
+            if span_start is not None:
+                if spans and not "".join(plain[spans[-1][1]:span_start]).strip():
+                    spans[-1] = (spans[-1][0], pos)
+                else:
+                    spans.append((span_start, pos))
+            span_start = None
+        else:
+            plain.append(ch)
+            pos += 1
+    return "".join(plain), spans
+
+
+def _occurrence_hit_to_document(hit: Dict) -> Optional[Document]:
+    """Convert an occurrence search hit (highlight + metadata) to a Document with match spans (plain text if unhighlighted)."""
+    src = hit.get('_source', {}) or {}
+    meta = dict(src.get('metadata', {}) or {})
+    fragments = (hit.get('highlight') or {}).get('text') or []
+    if fragments:
+        text, spans = _spans_from_highlight(fragments[0])
+        meta['_highlight_spans'] = spans
+    else:
+        text = src.get('text', '')
+    if not text:
+        return None
+    try:
+        return Document(page_content=text, metadata=meta)
+    except Exception as e:
+        logger.debug(f"operation: {type(e).__name__}: {e}")
+        return None
+
 class SearchMixin:
     """Mixin providing hybrid search, chunk retrieval, occurrence search, and deduplication capabilities."""
     
-    def _find_occurrences_opensearch(self, term: str, max_hits: int = 5000) -> List:
-        """Fetch chunks containing term from OpenSearch for the active document."""
+    def _iter_occurrence_hits(self, term: str, time_budget: Optional[float] = None):
+        """
+        Stream chunks containing term from OpenSearch for the active document.
+
+        Pages with search_after (inside a point-in-time when the cluster supports it)
+        instead of deep from/size offsets, and stops once the time budget is spent.
+        Each yielded Document carries ``_highlight_spans``: (start, end) offsets of the
+        analyzer-level matches inside page_content, taken from the highlight response.
+        Sets ``self._occurrence_scan_truncated`` when the budget cut the scan short.
+        """
+        self._occurrence_scan_truncated = False
         if not hasattr(self, 'multi_index_manager'):
             from vectorstores.opensearch_store import OpenSearchMultiIndexManager
             self.multi_index_manager = OpenSearchMultiIndexManager(
@@ -37,135 +102,177 @@ class SearchMixin:
             for doc_name in self.active_sources:
                 if doc_name in self.document_index_map:
                     indexes_to_search.append(self.document_index_map[doc_name])
+        # Documents in the shared layout map to the same index - scan it once
+        indexes_to_search = list(dict.fromkeys(indexes_to_search))
         if not indexes_to_search:
-            return []
+            return
+
+        scan_config = ARISConfig.get_occurrence_search_config()
+        if time_budget is None:
+            time_budget = scan_config['time_budget_seconds']
+        page_size = scan_config['page_size']
+        keep_alive = scan_config['pit_keep_alive']
+        deadline = time_module.time() + time_budget
 
         # Lucene query_string escaping (minimal)
         q = term.replace('\\', '\\\\').replace('"', '\\"')
         query = f'"{q}"'
 
-        results = []
-        page_size = 500
         for index_name in indexes_to_search:
+            pit_id = None
             try:
                 store = self.multi_index_manager.get_or_create_index_store(index_name)
                 client = store.vectorstore.client
-                offset = 0
-                while offset < max_hits:
+                try:
+                    pit_id = client.create_pit(index=index_name, params={"keep_alive": keep_alive}).get("pit_id")
+                except Exception as e:
+                    logger.debug(f"Point-in-time unavailable for '{index_name}', using plain search_after: {type(e).__name__}: {e}")
+
+                search_after = None
+                # _doc order is only stable inside a point-in-time; without one, page by _id
+                sort = [{"_doc": "asc"}] if pit_id else [{"_id": "asc"}]
+                while True:
+                    if time_module.time() >= deadline:
+                        self._occurrence_scan_truncated = True
+                        logger.info(f"⏱️ Occurrence scan for '{term}' stopped after {time_budget:.1f}s budget")
+                        return
                     body = {
-                        "from": offset,
-                        "size": min(page_size, max_hits - offset),
+                        "size": page_size,
+                        # text too: a hit the highlighter returns no fragment for is kept as plain text
+                        "_source": ["metadata", "text"],
+                        "sort": sort,
                         "query": {
                             "query_string": {
                                 "query": query,
                                 "fields": ["text"],
                                 "default_operator": "AND"
                             }
+                        },
+                        "highlight": {
+                            "pre_tags": [_HL_PRE],
+                            "post_tags": [_HL_POST],
+                            "fields": {"text": {"number_of_fragments": 0}}
                         }
                     }
-                    resp = client.search(index=index_name, body=body)
+                    if is_shared_index(index_name):
+                        body["query"] = {"bool": {"must": [body["query"]], "filter": [source_key_filter(self.active_sources)]}}
+                    if search_after is not None:
+                        body["search_after"] = search_after
+                    if pit_id:
+                        body["pit"] = {"id": pit_id, "keep_alive": keep_alive}
+                        resp = client.search(body=body)
+                        pit_id = resp.get("pit_id", pit_id)
+                    else:
+                        resp = client.search(index=index_name, body=body)
                     hits = resp.get("hits", {}).get("hits", [])
                     if not hits:
                         break
-                    results.extend(hits)
+                    for hit in hits:
+                        doc = _occurrence_hit_to_document(hit)
+                        if doc is not None:
+                            yield doc
                     if len(hits) < page_size:
                         break
-                    offset += page_size
+                    search_after = hits[-1].get("sort")
+                    if not search_after:
+                        break
             except Exception as e:
                 logger.warning(f"Occurrence search failed for index '{index_name}': {e}")
                 continue
+            finally:
+                if pit_id:
+                    try:
+                        client.delete_pit(body={"pit_id": [pit_id]})
+                    except Exception as e:
+                        logger.debug(f"delete_pit: {type(e).__name__}: {e}")
 
-        # Convert to LangChain documents (best-effort)
-        from langchain_core.documents import Document
-        docs = []
-        for h in results:
-            src = h.get('_source', {}) or {}
-            text = src.get('text', '')
-            meta = src.get('metadata', {}) or {}
-            try:
-                docs.append(Document(page_content=text, metadata=meta))
-            except Exception as e:
-                logger.debug(f"operation: {type(e).__name__}: {e}")
-                continue
-        return docs
-
-    def find_all_occurrences(self, term: str, max_results: int = 200) -> Dict:
-        """Find all occurrences of a term in the active document and return an answer + citations."""
-        import re
-
-        if not term or not term.strip():
-            return {
-                "answer": "Please provide a word or phrase to find.",
-                "sources": [],
-                "citations": [],
-                "context_chunks": [],
-                "num_chunks_used": 0
-            }
-
-        if not self.active_sources:
-            return {
-                "answer": "Select one document (Active Document) first, then ask again.",
-                "sources": [],
-                "citations": [],
-                "context_chunks": [],
-                "num_chunks_used": 0
-            }
+    def _find_occurrences_opensearch(self, term: str, time_budget: Optional[float] = None) -> List:
+        """Fetch chunks containing term from OpenSearch for the active document."""
+        return list(self._iter_occurrence_hits(term, time_budget=time_budget))
 
-        term_clean = term.strip()
-        # Pull candidate chunks
+    def iter_occurrences(self, term: str, time_budget: Optional[float] = None):
+        """Yield occurrence dicts (source, page, snippet, offsets) as matching chunks stream in."""
         if self.vector_store_type == 'opensearch':
-            candidate_docs = self._find_occurrences_opensearch(term_clean)
+            candidate_docs = self._iter_occurrence_hits(term, time_budget=time_budget)
         else:
+            self._occurrence_scan_truncated = False
             # FAISS fallback: retrieve a large set of chunks then scan
             try:
-                candidate_docs = self.vectorstore.similarity_search(term_clean, k=1000)
+                candidate_docs = self.vectorstore.similarity_search(term, k=1000)
             except Exception as e:
                 logger.warning(f"operation: {type(e).__name__}: {e}")
                 candidate_docs = []
 
-        occurrences = []
+        # Strict-ish matching: match whole word when term is a single token; else substring
+        if ' ' in term:
+            pattern = re.compile(re.escape(term), re.IGNORECASE)
+        else:
+            pattern = re.compile(rf"\b{re.escape(term)}\b", re.IGNORECASE)
+
         for doc in candidate_docs:
             text = getattr(doc, 'page_content', '') or ''
             if not text:
                 continue
+            metadata = getattr(doc, 'metadata', None) or {}
 
-            # Strict-ish matching: match whole word when term is a single token; else substring
-            if ' ' in term_clean:
-                pattern = re.compile(re.escape(term_clean), re.IGNORECASE)
-            else:
-                pattern = re.compile(rf"\b{re.escape(term_clean)}\b", re.IGNORECASE)
+            spans = metadata.pop('_highlight_spans', None)
+            if spans is None:
+                spans = [(m.start(), m.end()) for m in pattern.finditer(text)]
 
-            for m in pattern.finditer(text):
-                start = max(0, m.start() - 80)
-                end = min(len(text), m.end() + 80)
+            for match_start, match_end in spans:
+                start = max(0, match_start - 80)
+                end = min(len(text), match_end + 80)
                 snippet = text[start:end].replace('\n', ' ').strip()
-                page = None
-                if hasattr(doc, 'metadata') and doc.metadata:
-                    page = doc.metadata.get('source_page') or doc.metadata.get('page')
-                image_ref = doc.metadata.get('image_ref') if hasattr(doc, 'metadata') and doc.metadata else None
-                image_index = None
+                page = metadata.get('source_page') or metadata.get('page')
+                image_ref = metadata.get('image_ref')
                 if isinstance(image_ref, dict):
                     image_index = image_ref.get('image_index')
-                elif hasattr(doc, 'metadata') and doc.metadata:
-                    image_index = doc.metadata.get('image_index')
+                else:
+                    image_index = metadata.get('image_index')
 
                 # Ensure page is always set (fallback to 1 if None)
                 if page is None:
                     page = 1
-                
-                occurrences.append({
-                    "source": doc.metadata.get('source') if hasattr(doc, 'metadata') and doc.metadata else None,
+
+                yield {
+                    "source": metadata.get('source'),
                     "page": int(page),  # Always guaranteed to be an integer >= 1
                     "snippet": snippet,
                     "image_index": image_index,
-                    "start_char": doc.metadata.get('start_char') if hasattr(doc, 'metadata') and doc.metadata else None,
-                    "end_char": doc.metadata.get('end_char') if hasattr(doc, 'metadata') and doc.metadata else None,
-                })
+                    "start_char": metadata.get('start_char'),
+                    "end_char": metadata.get('end_char'),
+                    "match_start": match_start,
+                    "match_end": match_end,
+                }
+
+    def find_all_occurrences(self, term: str, max_results: int = 200) -> Dict:
+        """Find all occurrences of a term in the active document and return an answer + citations."""
+        if not term or not term.strip():
+            return {
+                "answer": "Please provide a word or phrase to find.",
+                "sources": [],
+                "citations": [],
+                "context_chunks": [],
+                "num_chunks_used": 0
+            }
+
+        if not self.active_sources:
+            return {
+                "answer": "Select one document (Active Document) first, then ask again.",
+                "sources": [],
+                "citations": [],
+                "context_chunks": [],
+                "num_chunks_used": 0
+            }
+
+        term_clean = term.strip()
+        occurrences = list(self.iter_occurrences(term_clean))
+        scan_truncated = getattr(self, '_occurrence_scan_truncated', False)
 
         # Sort by page then snippet
-        occurrences.sort(key=lambda x: (x.get('page') or 10**9, x.get('image_index') or 10**9, x.get('start_char') or 10**9))
+        occurrences.sort(key=lambda x: (x.get('page') or 10**9, x.get('image_index') or 10**9, x.get('start_char') or 10**9, x.get('match_start') or 0))
 
-        truncated = False
+        truncated = scan_truncated
         if len(occurrences) > max_results:
             occurrences = occurrences[:max_results]
             truncated = True
@@ -272,6 +379,7 @@ class SearchMixin:
         
         # 3. Rerank Results (only if not disabled)
         if self.ranker and relevant_docs and not disable_reranking:
+            relevant_docs = self._collapse_near_duplicate_candidates(relevant_docs)
             try:
                 # Prepare Rerank Request
                 passages = [
@@ -370,8 +478,8 @@ class SearchMixin:
                     region=getattr(self, 'region', None)
                 )
             
-            # Search across selected indexes
-            if len(indexes_to_search) == 1:
+            # Search across selected indexes (a shared index needs the document-scoped multi-index path)
+            if len(indexes_to_search) == 1 and not (active_sources and is_shared_index(indexes_to_search[0])):
                 # Single index - use it directly
                 index_name = indexes_to_search[0]
                 store = self.multi_index_manager.get_or_create_index_store(index_name)
@@ -437,7 +545,8 @@ class SearchMixin:
                     semantic_weight=semantic_weight,
                     keyword_weight=keyword_weight,
                     filter=lang_filter,
-                    alternate_query=alternate_query  # Pass for dual-language search
+                    alternate_query=alternate_query,  # Pass for dual-language search
+                    sources=active_sources
                 )
                 return relevant_docs
         
@@ -481,6 +590,19 @@ class SearchMixin:
                     return relevant_docs
             except Exception as e:
                 logger.warning(f"Hybrid search failed for sub-query, falling back: {e}")
+        elif use_hybrid_search and self.vector_store_type.lower() in NATIVE_HYBRID_STORE_TYPES and hasattr(self.vectorstore, 'hybrid_search'):
+            try:
+                return self.vectorstore.hybrid_search(
+                    query=query,
+                    query_vector=self.embeddings.embed_query(query),
+                    k=k,
+                    semantic_weight=semantic_weight,
+                    keyword_weight=keyword_weight,
+                    filter=self._native_hybrid_filter(active_sources or self.active_sources, filter_language),
+                    alternate_query=alternate_query
+                )
+            except Exception as e:
+                logger.warning(f"Native hybrid search failed for sub-query, falling back: {e}")
         
         # Standard retrieval
         # For FAISS: Increase k when filtering is needed (FAISS doesn't support native filtering)
@@ -613,9 +735,20 @@ class SearchMixin:
         
         return relevant_docs
     
+    @staticmethod
+    def _native_hybrid_filter(active_sources: Optional[List[str]], filter_language: Optional[str] = None) -> Optional[Dict]:
+        """Build the metadata filter for native hybrid stores (source / language)."""
+        metadata_filter = {}
+        valid_sources = [s for s in (active_sources or []) if s and s.strip()]
+        if valid_sources:
+            metadata_filter["source"] = {"$in": valid_sources}
+        if filter_language:
+            metadata_filter["language"] = filter_language
+        return metadata_filter or None
+    
     def _deduplicate_chunks(self, chunks: List, threshold: float = 0.95) -> List:
         """
-        Deduplicate chunks using content hash and similarity.
+        Deduplicate chunks using SimHash near-duplicate collapsing.
         
         Args:
             chunks: List of Document objects
@@ -624,49 +757,46 @@ class SearchMixin:
         Returns:
             List of unique Document objects
         """
-        import hashlib
-        
         if not chunks:
             return []
         
-        # Use content hash for exact duplicates
-        seen_hashes = set()
-        unique_chunks = []
-        chunk_scores = {}  # Track how many times each chunk appears (priority)
-        
         for chunk in chunks:
             # Ensure source metadata is preserved
             if hasattr(chunk, 'metadata') and chunk.metadata:
                 # Validate source exists in metadata
                 if 'source' not in chunk.metadata or not chunk.metadata.get('source'):
-                    from scripts.setup_logging import get_logger
-                    logger = get_logger("aris_rag.rag_system")
                     logger.warning(f"Chunk missing source metadata during deduplication. Available keys: {list(chunk.metadata.keys())}")
-            
-            # Create hash of content
-            content_hash = hashlib.md5(chunk.page_content.encode('utf-8')).hexdigest()
-            
-            if content_hash not in seen_hashes:
-                seen_hashes.add(content_hash)
-                unique_chunks.append(chunk)
-                chunk_scores[content_hash] = 1
-            else:
-                # Increment score for chunks that appear multiple times (they're more relevant)
-                chunk_scores[content_hash] = chunk_scores.get(content_hash, 1) + 1
         
-        # Sort by score (chunks appearing in multiple sub-queries are more relevant)
-        # Then by position (keep first occurrence)
-        unique_chunks_with_scores = []
-        for chunk in unique_chunks:
-            content_hash = hashlib.md5(chunk.page_content.encode('utf-8')).hexdigest()
-            score = chunk_scores.get(content_hash, 1)
-            unique_chunks_with_scores.append((score, chunk))
+        # Exact and near-duplicates (overlap windows, boilerplate repeated across
+        # revisions) collapse onto their first occurrence; the group size is the score
+        groups = collapse_near_duplicates(chunks, max_distance=similarity_to_hamming(threshold))
         
-        # Sort by score (descending), then maintain order
-        unique_chunks_with_scores.sort(key=lambda x: x[0], reverse=True)
-        unique_chunks = [chunk for _, chunk in unique_chunks_with_scores]
+        # Sort by score (chunks appearing in multiple sub-queries are more relevant)
+        # Stable sort keeps first-occurrence order within the same score
+        groups.sort(key=lambda item: item[1], reverse=True)
+        unique_chunks = [chunk for chunk, _ in groups]
         
-        # TODO: Add similarity-based deduplication for near-duplicates if needed
-        # This would require embedding comparison which is expensive
+        if len(unique_chunks) < len(chunks):
+            logger.info(f"Deduplication: {len(chunks)} → {len(unique_chunks)} chunks (threshold={threshold})")
         
         return unique_chunks
+    
+    def _collapse_near_duplicate_candidates(self, docs: List) -> List:
+        """
+        Drop near-duplicate candidates (keeping the best-ranked one) before reranking,
+        so FlashRank spends its budget on distinct passages.
+
+        Only called on the rerank path: without a loaded ranker (or with reranking
+        disabled) candidates are returned uncollapsed.
+        """
+        if not ARISConfig.ENABLE_NEAR_DUPLICATE_COLLAPSE or not docs or len(docs) < 2:
+            return docs
+        try:
+            max_distance = similarity_to_hamming(ARISConfig.DEFAULT_DEDUPLICATION_THRESHOLD)
+            collapsed = [doc for doc, _ in collapse_near_duplicates(docs, max_distance=max_distance)]
+            if len(collapsed) < len(docs):
+                logger.info(f"🧹 Collapsed {len(docs) - len(collapsed)} near-duplicate chunk(s) before reranking ({len(docs)} → {len(collapsed)})")
+            return collapsed
+        except Exception as e:
+            logger.warning(f"Near-duplicate collapse failed (using all candidates): {type(e).__name__}: {e}")
+            return docs
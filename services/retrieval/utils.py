@@ -10,6 +10,8 @@ import logging
 from typing import List, Dict, Optional
 
 from shared.config.settings import ARISConfig
+from shared.utils.document_name_matcher import DocumentNameMatcher
+from shared.utils.tokenizer import count_tokens
 
 logger = logging.getLogger(__name__)
 
@@ -17,18 +19,8 @@ class UtilsMixin:
     """Mixin providing utility methods for text processing, token counting, and query analysis capabilities."""
     
     def count_tokens(self, text: str) -> int:
-        """Count tokens in text using tiktoken."""
-        if not text:
-            return 0
-        try:
-            import tiktoken
-            # Use cl100k_base for OpenAI models (GPT-3.5/4)
-            encoding = tiktoken.get_encoding("cl100k_base")
-            return len(encoding.encode(text))
-        except Exception as e:
-            logger.debug(f"count_tokens: {type(e).__name__}: {e}")
-            # Fallback to rough estimate if tiktoken fails
-            return len(text) // 4
+        """Count tokens in text using the process-wide cached cl100k_base encoder."""
+        return count_tokens(text)
     
     def _truncate_text_by_tokens(self, text: str, max_tokens: int) -> str:
         """
@@ -224,7 +216,43 @@ class UtilsMixin:
         # Look for pattern like "(1)", "(2)", etc.
         match = re.search(r'\((\d+)\)', basename)
         return int(match.group(1)) if match else None
-    def _detect_document_in_question(self, question: str, available_docs: List[str]) -> Optional[List[str]]:
+    def _get_document_name_matcher(self) -> DocumentNameMatcher:
+        """
+        Return the compiled document-name matcher, kept in sync with document_index_map.
+
+        The map is replaced wholesale on reload/sync and edited in place by the API
+        writers, which save it afterwards; (identity, size, map version bumped on every
+        load/save) is the change signal. Only the difference in names is applied.
+        """
+        matcher = getattr(self, '_document_name_matcher', None)
+        if matcher is None:
+            matcher = DocumentNameMatcher()
+            self._document_name_matcher = matcher
+            self._document_name_matcher_signature = None
+        index_map = getattr(self, 'document_index_map', None) or {}
+        signature = (id(index_map), len(index_map), getattr(self, '_document_index_map_version', 0))
+        if signature != self._document_name_matcher_signature:
+            matcher.sync(index_map.keys())
+            self._document_name_matcher_signature = signature
+        return matcher
+
+    def _resolve_active_sources(self, active_sources: Optional[List[str]]) -> Optional[List[str]]:
+        """Map loosely written active source names (case, separators, extension) onto indexed document names."""
+        if not active_sources:
+            return active_sources
+        index_map = getattr(self, 'document_index_map', None) or {}
+        if all(name in index_map for name in active_sources):
+            return active_sources
+        matcher = self._get_document_name_matcher()
+        resolved = []
+        for name in active_sources:
+            canonical = name if name in index_map else matcher.resolve(name)
+            if canonical and canonical != name:
+                logger.info(f"Resolved active source '{name}' -> '{canonical}'")
+            resolved.append(canonical or name)
+        return resolved
+
+    def _detect_document_in_question(self, question: str, available_docs: Optional[List[str]] = None) -> Optional[List[str]]:
         """
         Detect if the question mentions a specific document name.
         
@@ -233,84 +261,28 @@ class UtilsMixin:
         
         Args:
             question: The user's question
-            available_docs: List of available document names
+            available_docs: Optional explicit list of document names. When omitted the
+                compiled matcher over document_index_map is used.
             
         Returns:
             List of detected document names, or None if no specific document mentioned
         """
-        import re
         from scripts.setup_logging import get_logger
         logger = get_logger("aris_rag.rag_system")
         
-        if not question or not available_docs:
+        if not question:
             return None
         
-        question_lower = question.lower()
-        detected = []
-        
-        # Sort documents by name length (descending) to match longer names first
-        # This ensures "VUORMAR MK" matches before "VUORMAR"
-        sorted_docs = sorted(available_docs, key=lambda x: len(x), reverse=True)
-        
-        for doc_name in sorted_docs:
-            # Get base name without extension
-            base_name = os.path.splitext(doc_name)[0].lower()
-            doc_name_lower = doc_name.lower()
-            
-            # Check various patterns:
-            # 1. Exact match (case-insensitive): "vuormar mk"
-            # 2. Without extension: "vuormar mk.pdf" -> "vuormar mk"
-            # 3. With "document" suffix: "vuormar mk document"
-            # 4. Separated words: "vuormar" and "mk" both in question
-            
-            # Pattern 1: Direct name match (most specific)
-            if base_name in question_lower or doc_name_lower.replace('.pdf', '') in question_lower:
-                # Make sure it's not a partial match of a longer document
-                # E.g., don't match "VUORMAR" when "VUORMAR MK" is also available
-                already_matched = any(
-                    base_name in os.path.splitext(d)[0].lower() and len(d) > len(doc_name)
-                    for d in detected
-                )
-                if not already_matched:
-                    detected.append(doc_name)
-                    logger.info(f"Detected document mention: '{doc_name}' (direct match)")
-                    continue
-            
-            # Pattern 2: Check if all significant words from doc name are in question
-            # Split doc name into words (remove common suffixes like MK, v1, etc.)
-            doc_words = re.split(r'[\s_\-\.]+', base_name)
-            doc_words = [w for w in doc_words if len(w) > 1]  # Filter out single chars
-            
-            if len(doc_words) >= 2:
-                # Multi-word document name - all words must be present
-                words_found = sum(1 for w in doc_words if w in question_lower)
-                if words_found == len(doc_words):
-                    # All words found - likely this document
-                    already_in_detected = doc_name in detected
-                    if not already_in_detected:
-                        detected.append(doc_name)
-                        logger.info(f"Detected document mention: '{doc_name}' (all words match: {doc_words})")
-        
-        # If we found multiple documents, prefer the most specific one (longest name with most matches)
-        if len(detected) > 1:
-            # Keep only the most specific (longest) document names
-            # E.g., if both "VUORMAR.pdf" and "VUORMAR MK.pdf" detected, keep only "VUORMAR MK.pdf"
-            # unless the question specifically mentions both
-            filtered_detected = []
-            for doc in detected:
-                base = os.path.splitext(doc)[0].lower()
-                # Check if this doc is a subset of another detected doc
-                is_subset = any(
-                    base in os.path.splitext(other)[0].lower() and len(other) > len(doc)
-                    for other in detected
-                )
-                if not is_subset:
-                    filtered_detected.append(doc)
-            
-            if filtered_detected:
-                detected = filtered_detected
-                logger.info(f"Filtered to most specific documents: {detected}")
+        if available_docs is None:
+            matcher = self._get_document_name_matcher()
+        else:
+            if not available_docs:
+                return None
+            matcher = DocumentNameMatcher(available_docs)
         
+        detected = matcher.match(question)
+        if detected:
+            logger.info(f"Detected document mention(s): {detected}")
         return detected if detected else None
     def _detect_occurrence_query(self, question: str) -> tuple:
         """Detect if a question is asking to find all occurrences of a term.
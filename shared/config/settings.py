@@ -35,7 +35,19 @@ class ARISConfig:
     # =========================================================================
     # Embedding: text-embedding-3-large has 3072 dimensions (highest quality)
     EMBEDDING_MODEL: str = os.getenv('EMBEDDING_MODEL', 'text-embedding-3-large')
-    
+    # Shortened (Matryoshka) embeddings for text-embedding-3-*: 0 = the model's native size.
+    # Recorded in each new OpenSearch index's _meta; existing indexes keep their own dimension.
+    EMBEDDING_DIMENSIONS: int = int(os.getenv('EMBEDDING_DIMENSIONS', '0'))
+    # Two-stage kNN for new OpenSearch indexes: HNSW over the first EMBEDDING_COARSE_DIMENSIONS,
+    # then the oversampled candidates are rescored with the stored full-dimension vectors
+    ENABLE_TWO_STAGE_KNN: bool = os.getenv('ENABLE_TWO_STAGE_KNN', 'false').lower() == 'true'
+    EMBEDDING_COARSE_DIMENSIONS: int = int(os.getenv('EMBEDDING_COARSE_DIMENSIONS', '256'))
+    # Offline LocalHashEmbeddings (no OPENAI_API_KEY): 'legacy' (hash-seeded Gaussian vectors,
+    # the vectors existing local indexes were built with) or 'features' (signed feature hashing
+    # of token n-grams, lexical similarity for recall benchmarks)
+    LOCAL_EMBEDDINGS_MODE: str = os.getenv('LOCAL_EMBEDDINGS_MODE', 'legacy')
+    LOCAL_EMBEDDINGS_NGRAMS: int = int(os.getenv('LOCAL_EMBEDDINGS_NGRAMS', '2'))
+
     # LLM: GPT-4o is the latest and most capable model
     OPENAI_MODEL: str = os.getenv('OPENAI_MODEL', 'gpt-4o')
     CEREBRAS_MODEL: str = os.getenv('CEREBRAS_MODEL', 'llama-3.3-70b')
@@ -49,6 +61,31 @@ class ARISConfig:
     # =========================================================================
     VECTOR_STORE_TYPE: str = os.getenv('VECTOR_STORE_TYPE', 'opensearch').lower()
     VECTORSTORE_PATH: str = os.getenv('VECTORSTORE_PATH', 'vectorstore')
+
+    # Reduced-precision vector storage for new indexes/collections (see vectorstores/vector_compression.py):
+    # 'none' | 'fp16' | 'int8' | 'on_disk' (quantized in memory, full-precision vectors on disk)
+    VECTOR_COMPRESSION: str = os.getenv('VECTOR_COMPRESSION', 'none').lower()
+    # Re-rank an oversampled candidate set with the full-precision vectors
+    VECTOR_RESCORE: bool = os.getenv('VECTOR_RESCORE', 'true').lower() == 'true'
+    VECTOR_RESCORE_OVERSAMPLE: float = float(os.getenv('VECTOR_RESCORE_OVERSAMPLE', '3.0'))
+    # OpenSearch on_disk mode compression level ('2x', '4x', '8x', '16x', '32x')
+    OPENSEARCH_ON_DISK_COMPRESSION: str = os.getenv('OPENSEARCH_ON_DISK_COMPRESSION', '32x')
+
+    # FAISS Configuration
+    # Index type: 'flat' (exact), 'hnsw' (graph, no training) or 'ivfpq' (compressed, trained once
+    # FAISS_IVF_TRAIN_SIZE vectors exist; stays flat until then)
+    FAISS_INDEX_TYPE: str = os.getenv('FAISS_INDEX_TYPE', 'flat').lower()
+    FAISS_HNSW_M: int = int(os.getenv('FAISS_HNSW_M', '32'))
+    FAISS_HNSW_EF_CONSTRUCTION: int = int(os.getenv('FAISS_HNSW_EF_CONSTRUCTION', '80'))
+    FAISS_HNSW_EF_SEARCH: int = int(os.getenv('FAISS_HNSW_EF_SEARCH', '64'))
+    FAISS_IVF_NLIST: int = int(os.getenv('FAISS_IVF_NLIST', '1024'))
+    FAISS_IVF_NPROBE: int = int(os.getenv('FAISS_IVF_NPROBE', '16'))
+    FAISS_PQ_M: int = int(os.getenv('FAISS_PQ_M', '64'))
+    FAISS_IVF_TRAIN_SIZE: int = int(os.getenv('FAISS_IVF_TRAIN_SIZE', '50000'))
+    # Memory-map the index file on load instead of reading it into RAM
+    FAISS_MMAP: bool = os.getenv('FAISS_MMAP', 'true').lower() == 'true'
+    # Rewrite the full index once unsaved deltas exceed this fraction of it (otherwise append delta files)
+    FAISS_COMPACT_RATIO: float = float(os.getenv('FAISS_COMPACT_RATIO', '0.25'))
     
     # OpenSearch Configuration
     AWS_OPENSEARCH_DOMAIN: Optional[str] = os.getenv('AWS_OPENSEARCH_DOMAIN', 'intelycx-waseem-os')
@@ -65,16 +102,41 @@ class ARISConfig:
     PGVECTOR_DATABASE: Optional[str] = os.getenv('PGVECTOR_DATABASE')
     PGVECTOR_USER: Optional[str] = os.getenv('PGVECTOR_USER')
     PGVECTOR_PASSWORD: Optional[str] = os.getenv('PGVECTOR_PASSWORD')
+    # Pooled engine shared by every PgVectorStore in the process
+    PGVECTOR_POOL_SIZE: int = int(os.getenv('PGVECTOR_POOL_SIZE', '5'))
+    PGVECTOR_MAX_OVERFLOW: int = int(os.getenv('PGVECTOR_MAX_OVERFLOW', '10'))
+    # Native hybrid search: tsvector text search config, HNSW params, candidates per list for RRF
+    PGVECTOR_TEXT_SEARCH_CONFIG: str = os.getenv('PGVECTOR_TEXT_SEARCH_CONFIG', 'simple')
+    PGVECTOR_HNSW_M: int = int(os.getenv('PGVECTOR_HNSW_M', '16'))
+    PGVECTOR_HNSW_EF_CONSTRUCTION: int = int(os.getenv('PGVECTOR_HNSW_EF_CONSTRUCTION', '64'))
+    PGVECTOR_HNSW_EF_SEARCH: int = int(os.getenv('PGVECTOR_HNSW_EF_SEARCH', '80'))
+    PGVECTOR_HYBRID_CANDIDATES: int = int(os.getenv('PGVECTOR_HYBRID_CANDIDATES', '50'))
+    # Add the hybrid tsvector column/GIN index when the ingestion service starts (rewrites the
+    # embeddings table once); disable to run scripts/migrate_pgvector_hybrid.py in a maintenance window
+    PGVECTOR_MIGRATE_ON_STARTUP: bool = os.getenv('PGVECTOR_MIGRATE_ON_STARTUP', 'true').lower() == 'true'
 
     # Qdrant Configuration
     QDRANT_URL: Optional[str] = os.getenv('QDRANT_URL')
     QDRANT_API_KEY: Optional[str] = os.getenv('QDRANT_API_KEY')
     QDRANT_COLLECTION: str = os.getenv('QDRANT_COLLECTION', 'aris_rag_index')
     QDRANT_PREFER_GRPC: bool = os.getenv('QDRANT_PREFER_GRPC', 'false').lower() == 'true'
+    # Dense vector size for new collections (0 = take it from the first vectors written/queried)
+    QDRANT_VECTOR_SIZE: int = int(os.getenv('QDRANT_VECTOR_SIZE', '0'))
+    # Hashed-term sparse vector used for the keyword side of hybrid search
+    QDRANT_SPARSE_VECTOR_NAME: str = os.getenv('QDRANT_SPARSE_VECTOR_NAME', 'text-sparse')
+    QDRANT_HYBRID_CANDIDATES: int = int(os.getenv('QDRANT_HYBRID_CANDIDATES', '50'))
+    QDRANT_UPSERT_BATCH_SIZE: int = int(os.getenv('QDRANT_UPSERT_BATCH_SIZE', '256'))
     
     # S3 Storage Configuration
     ENABLE_S3_STORAGE: bool = os.getenv('ENABLE_S3_STORAGE', 'true').lower() == 'true'
     AWS_S3_BUCKET: str = os.getenv('AWS_S3_BUCKET', 'intelycx-waseem-s3-bucket')
+    # Optional S3-compatible endpoint (MinIO / moto server) for local testing
+    AWS_S3_ENDPOINT_URL: str = os.getenv('AWS_S3_ENDPOINT_URL', '')
+    # Transfer manager: objects above the threshold upload in parallel multipart chunks
+    S3_MULTIPART_THRESHOLD_MB: int = int(os.getenv('S3_MULTIPART_THRESHOLD_MB', '8'))
+    S3_MULTIPART_CHUNK_MB: int = int(os.getenv('S3_MULTIPART_CHUNK_MB', '8'))
+    # Threads per multipart transfer, prefix delete and bulk-import download
+    S3_MAX_CONCURRENCY: int = int(os.getenv('S3_MAX_CONCURRENCY', '10'))
     
     # =========================================================================
     # 🎯 CHUNKING CONFIGURATION - Optimized for Accuracy
@@ -120,6 +182,10 @@ class ARISConfig:
     # Max Tokens: 2500 for detailed, comprehensive answers
     DEFAULT_MAX_TOKENS: int = int(os.getenv('DEFAULT_MAX_TOKENS', '2500'))
     
+    # Context Budget: hard cap on prompt tokens spent on retrieved chunks + images
+    # (further limited by the model's context window minus max_tokens and a reserve)
+    MAX_CONTEXT_TOKENS: int = int(os.getenv('MAX_CONTEXT_TOKENS', '24000'))
+    
     # =========================================================================
     # 🎯 HYBRID SEARCH CONFIGURATION - Balanced for Accuracy
     # =========================================================================
@@ -153,6 +219,10 @@ class ARISConfig:
     # Deduplication threshold: 0.92 to remove near-duplicates
     DEFAULT_DEDUPLICATION_THRESHOLD: float = float(os.getenv('DEFAULT_DEDUPLICATION_THRESHOLD', '0.92'))
     
+    # Collapse near-duplicate chunks (SimHash, same threshold) right before FlashRank reranking;
+    # only runs when a ranker is loaded and reranking is not disabled for the query
+    ENABLE_NEAR_DUPLICATE_COLLAPSE: bool = os.getenv('ENABLE_NEAR_DUPLICATE_COLLAPSE', 'true').lower() == 'true'
+    
     # =========================================================================
     # SUMMARY QUERY CONFIGURATION
     # =========================================================================
@@ -166,6 +236,27 @@ class ARISConfig:
     DOCUMENT_REGISTRY_PATH: str = os.getenv('DOCUMENT_REGISTRY_PATH', 'storage/document_registry.json')
     DOCUMENT_REGISTRY_INDEX: str = os.getenv('DOCUMENT_REGISTRY_INDEX', 'aris-document-registry')
     DOCUMENT_REGISTRY_SYNC_INTERVAL_SECONDS: int = int(os.getenv('DOCUMENT_REGISTRY_SYNC_INTERVAL_SECONDS', '30'))
+    # list_documents() serves a process-wide snapshot, refreshed at most this often with only the
+    # registry entries changed since the last refresh (by _seq_no); 0 = refresh on every call
+    DOCUMENT_REGISTRY_CACHE_TTL_SECONDS: float = float(os.getenv('DOCUMENT_REGISTRY_CACHE_TTL_SECONDS', '2'))
+    DOCUMENT_REGISTRY_PAGE_SIZE: int = int(os.getenv('DOCUMENT_REGISTRY_PAGE_SIZE', '1000'))
+    # _seq_no deltas (registry snapshot, change feed) re-read this many versions below the last one
+    # seen: a write can become searchable after one with a higher _seq_no (refresh=False, concurrent bulks)
+    REGISTRY_SEQ_NO_OVERLAP: int = int(os.getenv('REGISTRY_SEQ_NO_OVERLAP', '200'))
+    # Registry change feed: registry writes append events to a change-log index and ring the other
+    # services with a UDP doorbell, which pull and apply the delta (replaces mtime polling + HTTP broadcast)
+    ENABLE_REGISTRY_CHANGE_FEED: bool = os.getenv('ENABLE_REGISTRY_CHANGE_FEED', 'true').lower() == 'true'
+    REGISTRY_CHANGE_LOG_INDEX: str = os.getenv('REGISTRY_CHANGE_LOG_INDEX', 'aris-document-registry-changes')
+    # Doorbell port of the gateway; ingestion, retrieval and mcp listen on the next ports
+    CHANGE_FEED_UDP_PORT: int = int(os.getenv('CHANGE_FEED_UDP_PORT', '8600'))
+    # Safety poll for lost doorbells (the only I/O of an idle subscriber)
+    CHANGE_FEED_SAFETY_POLL_SECONDS: float = float(os.getenv('CHANGE_FEED_SAFETY_POLL_SECONDS', '60'))
+    CHANGE_FEED_RETENTION_DAYS: int = int(os.getenv('CHANGE_FEED_RETENTION_DAYS', '7'))
+    # Background sync (file/registry polling when the change feed is off). Each pass is scheduled
+    # interval * (1 ± jitter) apart so services started together do not poll in lockstep;
+    # requests never sync, they read the last swapped-in state
+    SYNC_INTERVAL_SECONDS: float = float(os.getenv('SYNC_INTERVAL_SECONDS', '5'))
+    SYNC_JITTER_FRACTION: float = float(os.getenv('SYNC_JITTER_FRACTION', '0.2'))
     
     # =========================================================================
     # 🎯 PARSER CONFIGURATION - Best Quality Extraction
@@ -184,8 +275,50 @@ class ARISConfig:
     # =========================================================================
     EMBEDDING_BATCH_SIZE: int = int(os.getenv('EMBEDDING_BATCH_SIZE', '500'))
     OPENSEARCH_BULK_SIZE: int = int(os.getenv('OPENSEARCH_BULK_SIZE', '5000'))
+    # Bulk-ingest mode: large ingests disable refresh/replicas and stream through parallel_bulk
+    ENABLE_OPENSEARCH_BULK_INGEST: bool = os.getenv('ENABLE_OPENSEARCH_BULK_INGEST', 'true').lower() == 'true'
+    OPENSEARCH_BULK_INGEST_MIN_DOCS: int = int(os.getenv('OPENSEARCH_BULK_INGEST_MIN_DOCS', '1000'))
+    OPENSEARCH_BULK_THREADS: int = int(os.getenv('OPENSEARCH_BULK_THREADS', '4'))
+    OPENSEARCH_BULK_CHUNK_BYTES: int = int(os.getenv('OPENSEARCH_BULK_CHUNK_BYTES', str(10 * 1024 * 1024)))
+    OPENSEARCH_BULK_FORCE_MERGE: bool = os.getenv('OPENSEARCH_BULK_FORCE_MERGE', 'false').lower() == 'true'
+    OPENSEARCH_FORCE_MERGE_SEGMENTS: int = int(os.getenv('OPENSEARCH_FORCE_MERGE_SEGMENTS', '1'))
+    # Chunk index layout: 'per_document' (one aris-doc-* index per document) or 'shared'
+    # (all chunks in OPENSEARCH_SHARED_INDEX, routed by document; see scripts/migrate_to_shared_index.py)
+    OPENSEARCH_INDEX_LAYOUT: str = os.getenv('OPENSEARCH_INDEX_LAYOUT', 'per_document').lower()
+    OPENSEARCH_SHARED_INDEX: str = os.getenv('OPENSEARCH_SHARED_INDEX', 'aris-chunks')
+    OPENSEARCH_SHARED_INDEX_PARTITION: str = os.getenv('OPENSEARCH_SHARED_INDEX_PARTITION', 'none').lower()  # none | month
+    OPENSEARCH_SHARED_INDEX_SHARDS: int = int(os.getenv('OPENSEARCH_SHARED_INDEX_SHARDS', '6'))
+    # Filter documents with one term on metadata.source_key. Opt-in: records indexed before source_key
+    # existed only match after scripts/backfill_source_key.py has run on their index
+    USE_SOURCE_KEY_FILTER: bool = os.getenv('USE_SOURCE_KEY_FILTER', 'false').lower() == 'true'
+    # Image OCR indexing: identical OCR texts are embedded once, unique texts in batches of this size
+    IMAGE_EMBEDDING_BATCH_SIZE: int = int(os.getenv('IMAGE_EMBEDDING_BATCH_SIZE', '100'))
     MAX_PAGE_BLOCKS_PER_DOC: int = int(os.getenv('MAX_PAGE_BLOCKS_PER_DOC', '2000'))
-    
+    # Re-ingesting a changed document reuses its index and only embeds chunks whose content hash is new
+    ENABLE_INCREMENTAL_REINGEST: bool = os.getenv('ENABLE_INCREMENTAL_REINGEST', 'true').lower() == 'true'
+    # Uploads stream to a spool file in chunks of this size (memory per upload is one chunk, not the file)
+    UPLOAD_CHUNK_SIZE_KB: int = int(os.getenv('UPLOAD_CHUNK_SIZE_KB', '1024'))
+    MAX_UPLOAD_SIZE_MB: int = int(os.getenv('MAX_UPLOAD_SIZE_MB', '1024'))  # 0 = unlimited
+    # Durable ingestion queue:/ingest jobs persist in SQLite and resume from stage checkpoints after a restart
+    ENABLE_INGESTION_QUEUE: bool = os.getenv('ENABLE_INGESTION_QUEUE', 'true').lower() == 'true'
+    INGESTION_QUEUE_PATH: str = os.getenv('INGESTION_QUEUE_PATH', 'data/ingestion_queue/jobs.sqlite')
+    INGESTION_WORKERS: int = int(os.getenv('INGESTION_WORKERS', '2'))
+    # Total upload size of concurrently running jobs (a larger job still runs, alone)
+    INGESTION_MAX_INFLIGHT_MB: int = int(os.getenv('INGESTION_MAX_INFLIGHT_MB', '512'))
+    INGESTION_JOB_MAX_ATTEMPTS: int = int(os.getenv('INGESTION_JOB_MAX_ATTEMPTS', '3'))
+    # Batch processing: files are parsed in a process pool while parsed files are embedded and
+    # indexed in an I/O thread pool (one at a time unless documents share one index)
+    BATCH_CONCURRENT_PROCESSING: bool = os.getenv('BATCH_CONCURRENT_PROCESSING', 'true').lower() == 'true'
+    BATCH_PARSE_WORKERS: int = int(os.getenv('BATCH_PARSE_WORKERS', str(min(4, os.cpu_count() or 1))))
+    BATCH_IO_WORKERS: int = int(os.getenv('BATCH_IO_WORKERS', '4'))
+    # /ingest/bulk only imports local directories below this root (S3 prefixes are downloaded here too)
+    BULK_IMPORT_ROOT: str = os.getenv('BULK_IMPORT_ROOT', 'data/imports')
+    # Cross-document page dedup: pages already ingested (same normalized text and chunking)
+    # reuse their stored chunks and embedding vectors instead of being split and embedded again
+    ENABLE_PAGE_DEDUP: bool = os.getenv('ENABLE_PAGE_DEDUP', 'true').lower() == 'true'
+    PAGE_STORE_PATH: str = os.getenv('PAGE_STORE_PATH', 'data/page_store/pages.sqlite')
+    PAGE_STORE_RETENTION_DAYS: int = int(os.getenv('PAGE_STORE_RETENTION_DAYS', '90'))  # unused pages are purged
+
     # =========================================================================
     # MULTILINGUAL CONFIGURATION
     # =========================================================================
@@ -264,6 +397,14 @@ class ARISConfig:
             'database': cls.PGVECTOR_DATABASE,
             'user': cls.PGVECTOR_USER,
             'password': cls.PGVECTOR_PASSWORD,
+            'pool_size': cls.PGVECTOR_POOL_SIZE,
+            'max_overflow': cls.PGVECTOR_MAX_OVERFLOW,
+            'text_search_config': cls.PGVECTOR_TEXT_SEARCH_CONFIG,
+            'hnsw_m': cls.PGVECTOR_HNSW_M,
+            'hnsw_ef_construction': cls.PGVECTOR_HNSW_EF_CONSTRUCTION,
+            'hnsw_ef_search': cls.PGVECTOR_HNSW_EF_SEARCH,
+            'hybrid_candidates': cls.PGVECTOR_HYBRID_CANDIDATES,
+            'migrate_on_startup': cls.PGVECTOR_MIGRATE_ON_STARTUP,
         }
 
     @classmethod
@@ -274,6 +415,10 @@ class ARISConfig:
             'api_key': cls.QDRANT_API_KEY,
             'collection': cls.QDRANT_COLLECTION,
             'prefer_grpc': cls.QDRANT_PREFER_GRPC,
+            'vector_size': cls.QDRANT_VECTOR_SIZE,
+            'sparse_vector_name': cls.QDRANT_SPARSE_VECTOR_NAME,
+            'hybrid_candidates': cls.QDRANT_HYBRID_CANDIDATES,
+            'upsert_batch_size': cls.QDRANT_UPSERT_BATCH_SIZE,
         }
     
     @classmethod
@@ -368,7 +513,19 @@ class ARISConfig:
             'cache_ttl_seconds': int(os.getenv('KNN_CACHE_TTL_SECONDS', '300')),
             'max_fetch_multiplier': int(os.getenv('KNN_MAX_FETCH_MULTIPLIER', '4')),
         }
-    
+
+    @classmethod
+    def get_occurrence_search_config(cls) -> dict:
+        """
+        Get "find all occurrences" scan configuration.
+        Used by SearchMixin to page through a document with search_after under a time budget.
+        """
+        return {
+            'time_budget_seconds': float(os.getenv('OCCURRENCE_SEARCH_TIME_BUDGET_SECONDS', '10')),
+            'page_size': int(os.getenv('OCCURRENCE_SEARCH_PAGE_SIZE', '500')),
+            'pit_keep_alive': os.getenv('OCCURRENCE_SEARCH_PIT_KEEP_ALIVE', '1m'),
+        }
+
     @classmethod
     def get_accuracy_config(cls) -> dict:
         """Get all accuracy-related configuration"""
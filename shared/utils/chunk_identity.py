@@ -0,0 +1,180 @@
+"""
+Content-hash identity for document chunks.
+
+Each chunk gets a ``chunk_hash`` derived from its normalized text. The hash
+(plus an occurrence suffix for repeated text within the same document) is used
+as the OpenSearch ``_id`` so that re-ingesting a revised document can diff the
+new chunk set against what is already indexed and only embed what changed. The
+id is additionally scoped by the document's source key, so identical chunks of
+different documents sharing an index do not overwrite each other.
+
+Chunks also carry a 64-bit ``simhash`` of their word shingles, which retrieval
+uses to collapse near-duplicate passages (overlapping windows, boilerplate
+repeated across revisions) before reranking.
+"""
+import hashlib
+import re
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    from langchain_core.documents import Document
+except ImportError:
+    from langchain.docstore.document import Document
+
+from shared.utils.source_key import source_key
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_WORD_RE = re.compile(r"\w+")
+
+SIMHASH_BITS = 64
+_SHINGLE_SIZE = 3
+_BIT_SHIFTS = np.arange(SIMHASH_BITS, dtype=np.uint64)
+
+
+def normalize_chunk_text(text: str) -> str:
+    """Collapse whitespace so layout-only changes keep the same identity."""
+    return _WHITESPACE_RE.sub(" ", text or "").strip()
+
+
+def compute_chunk_hash(text: str) -> str:
+    """Return the content hash for a chunk's text."""
+    return hashlib.sha256(normalize_chunk_text(text).encode("utf-8")).hexdigest()[:32]
+
+
+def compute_simhash(text: str) -> str:
+    """
+    Return a 64-bit SimHash (16 hex chars) over lowercase word 3-shingles.
+
+    Texts that differ only in a few words land within a small Hamming distance.
+    The per-bit votes over all shingle hashes are counted with numpy.
+    """
+    words = _WORD_RE.findall((text or "").lower())
+    if len(words) >= _SHINGLE_SIZE:
+        shingles = [" ".join(words[i:i + _SHINGLE_SIZE]) for i in range(len(words) - _SHINGLE_SIZE + 1)]
+    else:
+        shingles = words
+    if not shingles:
+        return f"{0:016x}"
+    digests = b"".join(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest() for shingle in shingles)
+    hashes = np.frombuffer(digests, dtype=">u8").astype(np.uint64)
+    ones = ((hashes[:, None] >> _BIT_SHIFTS) & np.uint64(1)).sum(axis=0, dtype=np.int64)
+    # A bit is set when more shingles have it set than unset
+    value = int((((2 * ones) > len(shingles)).astype(np.uint64) << _BIT_SHIFTS).sum())
+    return f"{value:016x}"
+
+
+def simhash_distance(a: str, b: str) -> int:
+    """Hamming distance between two hex SimHash signatures."""
+    return bin(int(a, 16) ^ int(b, 16)).count("1")
+
+
+def similarity_to_hamming(threshold: float) -> int:
+    """Map a 0-1 similarity threshold to a maximum SimHash Hamming distance."""
+    return max(0, min(SIMHASH_BITS // 4, int(round((1.0 - threshold) * SIMHASH_BITS))))
+
+
+def _simhash_of(chunk: Document) -> str:
+    metadata = chunk.metadata if isinstance(getattr(chunk, "metadata", None), dict) else {}
+    signature = metadata.get("simhash")
+    if not isinstance(signature, str) or len(signature) != SIMHASH_BITS // 4:
+        signature = compute_simhash(chunk.page_content)
+    return signature
+
+
+def collapse_near_duplicates(
+    chunks: Sequence[Document],
+    max_distance: int = 3,
+    signatures: Optional[Sequence[str]] = None
+) -> List[Tuple[Document, int]]:
+    """
+    Collapse chunks whose SimHash signatures are within ``max_distance`` bits.
+
+    The first (highest-ranked) chunk of each group is kept. Signatures are split
+    into ``max_distance + 1`` bands, so by pigeonhole any near-duplicate pair
+    shares at least one exact band and only bucket-mates are compared - roughly
+    linear in the number of candidates. Stored ``simhash`` metadata is used when
+    present; older chunks without it are hashed on the fly.
+
+    Returns:
+        [(kept_chunk, group_size), ...] in original order
+    """
+    if not chunks:
+        return []
+    sigs = [int(sig, 16) for sig in (signatures or [_simhash_of(chunk) for chunk in chunks])]
+    bands = max_distance + 1
+    widths = [SIMHASH_BITS // bands + (1 if i < SIMHASH_BITS % bands else 0) for i in range(bands)]
+
+    buckets: Dict[Tuple[int, int], List[int]] = {}
+    kept: List[int] = []
+    group_size: Dict[int, int] = {}
+    for idx, sig in enumerate(sigs):
+        keys = []
+        offset = 0
+        for band, width in enumerate(widths):
+            keys.append((band, (sig >> offset) & ((1 << width) - 1)))
+            offset += width
+
+        representative = None
+        for key in keys:
+            for other in buckets.get(key, ()):
+                if bin(sig ^ sigs[other]).count("1") <= max_distance:
+                    representative = other
+                    break
+            if representative is not None:
+                break
+
+        if representative is None:
+            kept.append(idx)
+            group_size[idx] = 1
+            for key in keys:
+                buckets.setdefault(key, []).append(idx)
+        else:
+            group_size[representative] += 1
+    return [(chunks[idx], group_size[idx]) for idx in kept]
+
+
+def assign_chunk_identities(chunks: List[Document]) -> List[str]:
+    """
+    Set ``chunk_hash`` on every chunk and return a stable id per chunk.
+
+    Repeated text inside one document gets ``<hash>-<n>`` for its n-th repeat so
+    ids stay unique while remaining deterministic across re-ingestion.
+    """
+    seen: Dict[str, int] = {}
+    ids = []
+    for chunk in chunks:
+        chunk_hash = chunk.metadata.get("chunk_hash") or compute_chunk_hash(chunk.page_content)
+        chunk.metadata["chunk_hash"] = chunk_hash
+        if not chunk.metadata.get("simhash"):
+            chunk.metadata["simhash"] = compute_simhash(chunk.page_content)
+        occurrence = seen.get(chunk_hash, 0)
+        seen[chunk_hash] = occurrence + 1
+        ids.append(chunk_hash if occurrence == 0 else f"{chunk_hash}-{occurrence}")
+    return ids
+
+
+def scope_chunk_ids(chunk_ids: Sequence[str], source: Optional[str]) -> List[str]:
+    """Prefix chunk ids with a hash of the document's source key (ids must be unique per index)."""
+    scope = hashlib.sha256(source_key(source).encode("utf-8")).hexdigest()[:16]
+    return [f"{scope}-{chunk_id}" for chunk_id in chunk_ids]
+
+
+def diff_chunk_identities(
+    new_ids: Iterable[str],
+    existing_ids: Iterable[str]
+) -> Tuple[List[str], List[str], List[str]]:
+    """
+    Compare the ids of a new chunk set with the ids already indexed.
+
+    Returns:
+        (added, removed, kept) - added/kept preserve the order of ``new_ids``
+    """
+    existing = set(existing_ids)
+    new_list = list(new_ids)
+    new_set = set(new_list)
+    added = [chunk_id for chunk_id in new_list if chunk_id not in existing]
+    kept = [chunk_id for chunk_id in new_list if chunk_id in existing]
+    removed = sorted(existing - new_set)
+    return added, removed, kept
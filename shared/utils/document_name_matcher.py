@@ -0,0 +1,200 @@
+"""
+Compiled document-name matcher for detecting document mentions in questions.
+
+Document names (and aliases) are normalized to token sequences and compiled into
+a token-level Aho-Corasick automaton, so a question is scanned once regardless of
+how many documents are indexed. A token -> document inverted index covers the
+"all words of the name appear somewhere in the question" case.
+"""
+import os
+import re
+import threading
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+_TOKEN_SPLIT_RE = re.compile(r"[\W_]+")
+
+
+def tokenize_name(text: str) -> List[str]:
+    """Lowercase and split on anything that is not a letter or digit."""
+    return [t for t in _TOKEN_SPLIT_RE.split((text or "").lower()) if t]
+
+
+def document_aliases(doc_name: str) -> List[Tuple[str, ...]]:
+    """Token sequences that count as a direct mention of doc_name."""
+    base = os.path.splitext(doc_name)[0]
+    aliases = []
+    for variant in (base, doc_name):
+        tokens = tuple(tokenize_name(variant))
+        if tokens and tokens not in aliases:
+            aliases.append(tokens)
+    return aliases
+
+
+class _Node:
+    __slots__ = ("children", "fail", "outputs")
+
+    def __init__(self):
+        self.children: Dict[str, "_Node"] = {}
+        self.fail: Optional["_Node"] = None
+        self.outputs: Set[str] = set()
+
+
+class DocumentNameMatcher:
+    """
+    Token-level Aho-Corasick matcher over document names.
+
+    Documents are added/removed incrementally; failure links are recomputed lazily
+    on the first match after a change, so a batch of index-map updates costs one
+    rebuild instead of one per document.
+    """
+
+    def __init__(self, names: Optional[Iterable[str]] = None):
+        self._lock = threading.RLock()
+        self._root = _Node()
+        self._names: Set[str] = set()
+        self._normalized: Dict[str, str] = {}  # normalized alias -> document name
+        self._word_index: Dict[str, Set[str]] = {}  # significant word -> document names
+        self._required_words: Dict[str, Set[str]] = {}  # document name -> significant words
+        self._dirty = False
+        if names:
+            self.sync(names)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._names
+
+    def add(self, name: str, aliases: Optional[Iterable[str]] = None):
+        """Add a document name (and optional extra aliases) to the matcher."""
+        with self._lock:
+            sequences = document_aliases(name)
+            for alias in aliases or []:
+                tokens = tuple(tokenize_name(alias))
+                if tokens and tokens not in sequences:
+                    sequences.append(tokens)
+            for tokens in sequences:
+                node = self._root
+                for token in tokens:
+                    node = node.children.setdefault(token, _Node())
+                node.outputs.add(name)
+                self._normalized.setdefault(" ".join(tokens), name)
+
+            words = {t for t in tokenize_name(os.path.splitext(name)[0]) if len(t) > 1}
+            if len(words) >= 2:
+                self._required_words[name] = words
+                for word in words:
+                    self._word_index.setdefault(word, set()).add(name)
+
+            self._names.add(name)
+            self._dirty = True
+
+    def remove(self, name: str):
+        """Remove a document name from the matcher."""
+        with self._lock:
+            if name not in self._names:
+                return
+            for tokens in document_aliases(name):
+                if self._normalized.get(" ".join(tokens)) == name:
+                    del self._normalized[" ".join(tokens)]
+                node = self._root
+                for token in tokens:
+                    node = node.children.get(token)
+                    if node is None:
+                        break
+                else:
+                    node.outputs.discard(name)
+            for word in self._required_words.pop(name, set()):
+                docs = self._word_index.get(word)
+                if docs:
+                    docs.discard(name)
+                    if not docs:
+                        del self._word_index[word]
+            self._names.discard(name)
+            self._dirty = True
+
+    def sync(self, names: Iterable[str]):
+        """Bring the matcher in line with the given set of names (adds/removes only the difference)."""
+        wanted = set(names)
+        with self._lock:
+            for name in self._names - wanted:
+                self.remove(name)
+            for name in wanted - self._names:
+                self.add(name)
+
+    def _build_failure_links(self):
+        queue = deque()
+        self._root.fail = self._root
+        for child in self._root.children.values():
+            child.fail = self._root
+            queue.append(child)
+        while queue:
+            node = queue.popleft()
+            for token, child in node.children.items():
+                fail = node.fail
+                while fail is not self._root and token not in fail.children:
+                    fail = fail.fail
+                child.fail = fail.children.get(token, self._root)
+                if child.fail is child:
+                    child.fail = self._root
+                queue.append(child)
+        self._dirty = False
+
+    def resolve(self, name: str) -> Optional[str]:
+        """Map a loosely written document name (case, separators, extension) to the indexed name."""
+        if name in self._names:
+            return name
+        tokens = tokenize_name(name)
+        return self._normalized.get(" ".join(tokens)) or self._normalized.get(
+            " ".join(tokenize_name(os.path.splitext(name)[0]))
+        )
+
+    def match(self, text: str) -> List[str]:
+        """
+        Return documents mentioned in text, most specific first.
+
+        A document matches when one of its aliases appears as a contiguous token
+        sequence, or when all of its (2+) significant name words appear anywhere.
+        Names that are contained in a longer matched name are dropped.
+        """
+        tokens = tokenize_name(text)
+        if not tokens:
+            return []
+        with self._lock:
+            if self._dirty:
+                self._build_failure_links()
+
+            direct: Dict[str, int] = {}
+            node = self._root
+            for token in tokens:
+                while node is not self._root and token not in node.children:
+                    node = node.fail
+                node = node.children.get(token, self._root)
+                out = node
+                while out is not self._root:
+                    for name in out.outputs:
+                        direct.setdefault(name, len(direct))
+                    out = out.fail
+
+            word_hits: Dict[str, int] = {}
+            for word in set(tokens):
+                for name in self._word_index.get(word, ()):
+                    word_hits[name] = word_hits.get(name, 0) + 1
+            by_words = [
+                name for name, count in word_hits.items()
+                if count == len(self._required_words.get(name, ())) and name not in direct
+            ]
+
+        detected = sorted(direct, key=lambda n: (-len(n), direct[n])) + sorted(by_words, key=len, reverse=True)
+        if len(detected) > 1:
+            bases = {name: " ".join(tokenize_name(os.path.splitext(name)[0])) for name in detected}
+            filtered = [
+                name for name in detected
+                if not any(
+                    other != name and len(other) > len(name) and bases[name] in bases[other]
+                    for other in detected
+                )
+            ]
+            detected = filtered or detected
+        return detected
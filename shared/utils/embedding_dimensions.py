@@ -0,0 +1,116 @@
+"""
+Shortened (Matryoshka) embedding dimensions.
+
+``text-embedding-3-*`` embeddings requested with ``dimensions=d`` equal the first
+``d`` components of the full embedding, L2-renormalized (LocalHashEmbeddings
+vectors have the same prefix property). So one full-size query embedding can be
+truncated to whatever dimension an index was built with, and a coarse prefix
+can drive kNN while the full vector rescores the candidates.
+"""
+from typing import List, Optional, Sequence
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from shared.config.settings import ARISConfig
+
+_NATIVE_DIMENSIONS = {
+    "text-embedding-3-large": 3072,
+    "text-embedding-3-small": 1536,
+    "text-embedding-ada-002": 1536,
+}
+
+
+def native_dimension(model_name: Optional[str]) -> int:
+    name = (model_name or "").lower()
+    for model, dimension in _NATIVE_DIMENSIONS.items():
+        if model in name:
+            return dimension
+    return 3072 if "3-large" in name else 1536
+
+
+def supports_truncation(model_name: Optional[str]) -> bool:
+    """ada-002 embeddings are not trained for truncation; text-embedding-3-* (and local hash embeddings) are."""
+    return "ada-002" not in (model_name or "").lower()
+
+
+def configured_dimension(model_name: Optional[str]) -> int:
+    """EMBEDDING_DIMENSIONS for the model, or its native size when unset or not applicable."""
+    native = native_dimension(model_name)
+    requested = ARISConfig.EMBEDDING_DIMENSIONS
+    if requested <= 0 or requested >= native or not supports_truncation(model_name):
+        return native
+    return requested
+
+
+def truncate_embeddings(vectors: Sequence[Sequence[float]], dimension: int) -> np.ndarray:
+    """First ``dimension`` components of each vector, L2-renormalized."""
+    array = np.asarray(vectors, dtype=np.float32)[:, :dimension]
+    norms = np.linalg.norm(array, axis=1, keepdims=True)
+    return array / np.maximum(norms, 1e-12)
+
+
+def truncate_embedding(vector: Sequence[float], dimension: int) -> List[float]:
+    if len(vector) <= dimension:
+        return list(vector)
+    return truncate_embeddings([vector], dimension)[0].tolist()
+
+
+def embedding_dimension(embeddings) -> Optional[int]:
+    """Output dimension of an embeddings object without calling it (None if unknown)."""
+    while embeddings is not None:
+        for attr in ("dimensions", "dim"):
+            value = getattr(embeddings, attr, None)
+            if isinstance(value, int) and value > 0:
+                return value
+        inner = getattr(embeddings, "underlying", None) or getattr(embeddings, "base", None)
+        if inner is None:
+            model = getattr(embeddings, "model", None)
+            return native_dimension(model) if model else None
+        embeddings = inner
+    return None
+
+
+def embedding_model_name(embeddings) -> Optional[str]:
+    """Model name of an embeddings object, looking through caching/truncating wrappers."""
+    while embeddings is not None:
+        model = getattr(embeddings, "model", None) or getattr(embeddings, "model_name", None)
+        if isinstance(model, str) and model:
+            return model
+        embeddings = getattr(embeddings, "underlying", None) or getattr(embeddings, "base", None)
+    return None
+
+
+def create_embeddings(model_name: str, dimensions: Optional[int] = None) -> Embeddings:
+    """OpenAI embeddings at the configured dimension, or local hash embeddings without an API key."""
+    import os
+
+    dimensions = dimensions or configured_dimension(model_name)
+    if os.getenv('OPENAI_API_KEY'):
+        from langchain_openai import OpenAIEmbeddings
+
+        kwargs = {}
+        if dimensions != native_dimension(model_name):
+            kwargs['dimensions'] = dimensions
+        return OpenAIEmbeddings(openai_api_key=os.getenv('OPENAI_API_KEY'), model=model_name, **kwargs)
+    from shared.utils.local_embeddings import LocalHashEmbeddings
+
+    return LocalHashEmbeddings(model_name=model_name, dim=dimensions)
+
+
+class TruncatedEmbeddings(Embeddings):
+    """Embeddings truncated to a smaller Matryoshka dimension (e.g. for an index built at that size)."""
+
+    def __init__(self, base: Embeddings, dimensions: int):
+        self.base = base
+        self.dimensions = int(dimensions)
+        self.model = getattr(base, "model", None) or getattr(base, "model_name", None)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors = self.base.embed_documents(texts)
+        if not vectors:
+            return vectors
+        return truncate_embeddings(vectors, self.dimensions).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return truncate_embedding(self.base.embed_query(text), self.dimensions)
@@ -1,21 +1,56 @@
 import hashlib
-from typing import List
+import logging
+import re
+from typing import List, Optional
 
 import numpy as np
 from langchain_core.embeddings import Embeddings
 
 
-def _default_dim_for_model(model_name: str) -> int:
-    name = (model_name or "").lower()
-    if "3-large" in name:
-        return 3072
-    return 1536
+from shared.utils.embedding_dimensions import native_dimension
+
+logger = logging.getLogger(__name__)
+
+LOCAL_EMBEDDING_MODES = ("legacy", "features")
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+# Texts per feature-hashing block (bounds the float64 working set for 3072-d vectors)
+_BLOCK = 256
 
 
 class LocalHashEmbeddings(Embeddings):
-    def __init__(self, model_name: str = "", dim: int | None = None):
+    """
+    Deterministic pseudo-embeddings (no API calls). Any dimension is supported; a
+    vector at dimension d is the renormalized d-prefix of the model-size vector,
+    like shortened text-embedding-3 embeddings. ``dimensions`` mirrors the
+    OpenAIEmbeddings argument.
+
+    Modes (LOCAL_EMBEDDINGS_MODE):
+      - ``legacy`` (default): a Gaussian vector per text from a numpy RNG seeded by
+                      the text hash
+      - ``features``: feature hashing of token 1..LOCAL_EMBEDDINGS_NGRAMS-grams into
+                      signed buckets, so texts sharing words are similar (recall
+                      benchmarks); buckets depend on the dimension, so there is no
+                      prefix property in this mode
+    """
+
+    def __init__(
+        self,
+        model_name: str = "",
+        dim: int | None = None,
+        dimensions: int | None = None,
+        mode: Optional[str] = None,
+        ngrams: Optional[int] = None,
+    ):
+        from shared.config.settings import ARISConfig
+
         self.model_name = model_name
-        self.dim = int(dim or _default_dim_for_model(model_name))
+        self.dim = int(dim or dimensions or native_dimension(model_name))
+        self.mode = (mode or ARISConfig.LOCAL_EMBEDDINGS_MODE or "legacy").lower()
+        if self.mode not in LOCAL_EMBEDDING_MODES:
+            logger.warning(f"Unknown LOCAL_EMBEDDINGS_MODE '{self.mode}', using legacy hash embeddings")
+            self.mode = "legacy"
+        self.ngrams = max(1, int(ngrams or ARISConfig.LOCAL_EMBEDDINGS_NGRAMS))
 
     def _embed_one(self, text: str) -> List[float]:
         data = (text or "").encode("utf-8")
@@ -28,8 +63,40 @@ class LocalHashEmbeddings(Embeddings):
             vec = vec / norm
         return vec.astype(np.float32).tolist()
 
+    def _feature_block(self, texts: List[str]) -> np.ndarray:
+        """Signed feature hashing of token n-grams (counts, one scatter-add per block)."""
+        rows, keys = [], []
+        for row, text in enumerate(texts):
+            tokens = _TOKEN.findall((text or "").lower())
+            for n in range(1, self.ngrams + 1):
+                for start in range(len(tokens) - n + 1):
+                    gram = " ".join(tokens[start:start + n])
+                    keys.append(int.from_bytes(hashlib.blake2b(gram.encode("utf-8"), digest_size=8).digest(), "big"))
+                    rows.append(row)
+        block = np.zeros((len(texts), self.dim), dtype=np.float64)
+        if keys:
+            hashed = np.array(keys, dtype=np.uint64)
+            buckets = (hashed % np.uint64(self.dim)).astype(np.int64)
+            signs = np.where((hashed >> np.uint64(63)) == 1, -1.0, 1.0)
+            np.add.at(block, (np.array(rows), buckets), signs)
+        return block
+
+    def _embed_batch(self, texts: List[str]) -> np.ndarray:
+        """Feature-hashed unit vectors for all texts in one preallocated float32 matrix, normalized in bulk."""
+        out = np.empty((len(texts), self.dim), dtype=np.float32)
+        for start in range(0, len(texts), _BLOCK):
+            block = texts[start:start + _BLOCK]
+            out[start:start + len(block)] = self._feature_block(block)
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        out /= np.where(norms > 0, norms, 1.0)
+        return out
+
     def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if self.mode == "features":
+            return self._embed_batch(list(texts)).tolist()
         return [self._embed_one(t) for t in texts]
 
     def embed_query(self, text: str) -> List[float]:
+        if self.mode == "features":
+            return self._embed_batch([text])[0].tolist()
         return self._embed_one(text)
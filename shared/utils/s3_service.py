@@ -1,16 +1,74 @@
 """
 AWS S3 service for document storage and registry synchronization.
+
+Transfers go through the boto3 transfer manager (parallel multipart above
+S3_MULTIPART_THRESHOLD_MB), and prefix deletes overlap listing with batched
+DeleteObjects calls.
 """
+import io
 import os
 import logging
+from concurrent.futures import ThreadPoolExecutor
 import boto3
-from botocore.exceptions import ClientError
+from boto3.exceptions import S3UploadFailedError
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+from botocore.exceptions import BotoCoreError, ClientError
 from typing import Optional, List, Dict, Any, Union
 from pathlib import Path
 from shared.config.settings import ARISConfig
 
 logger = logging.getLogger(__name__)
 
+# The transfer manager (upload_file/upload_fileobj) wraps client errors in S3UploadFailedError
+_UPLOAD_ERRORS = (ClientError, BotoCoreError, S3UploadFailedError)
+
+# DeleteObjects accepts at most 1000 keys per request
+DELETE_BATCH_SIZE = 1000
+
+
+def transfer_config() -> TransferConfig:
+    """Transfer manager settings: multipart threshold/chunk size and parallel parts."""
+    mb = 1024 * 1024
+    return TransferConfig(
+        multipart_threshold=max(5, ARISConfig.S3_MULTIPART_THRESHOLD_MB) * mb,
+        multipart_chunksize=max(5, ARISConfig.S3_MULTIPART_CHUNK_MB) * mb,
+        max_concurrency=max(1, ARISConfig.S3_MAX_CONCURRENCY),
+        use_threads=True
+    )
+
+
+def client_config() -> Config:
+    """Connection pool large enough for the concurrent transfers (botocore defaults to 10)."""
+    return Config(max_pool_connections=max(10, ARISConfig.S3_MAX_CONCURRENCY * 2))
+
+
+def _delete_batch(client, bucket: str, keys: List[str]) -> int:
+    response = client.delete_objects(
+        Bucket=bucket,
+        Delete={'Objects': [{'Key': key} for key in keys], 'Quiet': True}
+    )
+    errors = response.get('Errors') or []
+    for error in errors[:5]:
+        logger.warning(f"⚠️ S3 could not delete {error.get('Key')}: {error.get('Code')} {error.get('Message')}")
+    return len(keys) - len(errors)
+
+
+def delete_prefix_objects(client, bucket: str, prefix: str, max_workers: Optional[int] = None) -> int:
+    """
+    Delete every object under a prefix: list pages keep streaming while earlier
+    pages are deleted in DELETE_BATCH_SIZE batches on a thread pool. Returns objects deleted.
+    """
+    workers = max(1, max_workers or ARISConfig.S3_MAX_CONCURRENCY)
+    paginator = client.get_paginator('list_objects_v2')
+    futures = []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for page in paginator.paginate(Bucket=bucket, Prefix=prefix, PaginationConfig={'PageSize': DELETE_BATCH_SIZE}):
+            keys = [obj['Key'] for obj in page.get('Contents', [])]
+            for start in range(0, len(keys), DELETE_BATCH_SIZE):
+                futures.append(pool.submit(_delete_batch, client, bucket, keys[start:start + DELETE_BATCH_SIZE]))
+        return sum(future.result() for future in futures)
+
 class S3Service:
     """Service for interacting with AWS S3."""
     
@@ -30,6 +88,7 @@ class S3Service:
         self.region = ARISConfig.AWS_OPENSEARCH_REGION or os.getenv('AWS_REGION', 'us-east-2')
         
         self.client = None
+        self.transfer_config = None
         if self.enabled:
             self._initialize_client()
     
@@ -40,8 +99,11 @@ class S3Service:
                 's3',
                 aws_access_key_id=self.access_key,
                 aws_secret_access_key=self.secret_key,
-                region_name=self.region
+                region_name=self.region,
+                endpoint_url=ARISConfig.AWS_S3_ENDPOINT_URL or None,
+                config=client_config()
             )
+            self.transfer_config = transfer_config()
             logger.info(f"✅ S3 service initialized for bucket: {self.bucket_name}")
         except Exception as e:
             logger.error(f"❌ Failed to initialize S3 client: {str(e)}")
@@ -67,16 +129,19 @@ class S3Service:
             if content_type:
                 extra_args['ContentType'] = content_type
                 
-            self.client.upload_file(str(local_path), self.bucket_name, s3_key, ExtraArgs=extra_args)
+            self.client.upload_file(
+                str(local_path), self.bucket_name, s3_key,
+                ExtraArgs=extra_args, Config=self.transfer_config
+            )
             logger.info(f"✅ Uploaded {local_path} to s3://{self.bucket_name}/{s3_key}")
             return True
-        except ClientError as e:
+        except _UPLOAD_ERRORS as e:
             logger.error(f"❌ S3 upload failed: {str(e)}")
             return False
 
     def upload_bytes(self, content: bytes, s3_key: str, content_type: Optional[str] = None) -> bool:
         """
-        Upload bytes directly to S3.
+        Upload bytes directly to S3 (multipart above the transfer threshold).
         """
         if not self.enabled or not self.client:
             return False
@@ -86,15 +151,13 @@ class S3Service:
             if content_type:
                 extra_args['ContentType'] = content_type
                 
-            self.client.put_object(
-                Bucket=self.bucket_name,
-                Key=s3_key,
-                Body=content,
-                **extra_args
+            self.client.upload_fileobj(
+                io.BytesIO(content), self.bucket_name, s3_key,
+                ExtraArgs=extra_args, Config=self.transfer_config
             )
             logger.info(f"✅ Uploaded bytes to s3://{self.bucket_name}/{s3_key}")
             return True
-        except ClientError as e:
+        except _UPLOAD_ERRORS as e:
             logger.error(f"❌ S3 byte upload failed: {str(e)}")
             return False
 
@@ -144,25 +207,8 @@ class S3Service:
             return 0
             
         try:
-            # List all objects with the prefix
-            paginator = self.client.get_paginator('list_objects_v2')
-            deleted_count = 0
-            
-            for page in paginator.paginate(Bucket=self.bucket_name, Prefix=prefix):
-                objects = page.get('Contents', [])
-                if not objects:
-                    continue
-                
-                # Delete objects in batches of 1000 (S3 limit)
-                delete_keys = [{'Key': obj['Key']} for obj in objects]
-                
-                if delete_keys:
-                    self.client.delete_objects(
-                        Bucket=self.bucket_name,
-                        Delete={'Objects': delete_keys}
-                    )
-                    deleted_count += len(delete_keys)
-                    logger.info(f"🗑️ Deleted {len(delete_keys)} objects with prefix: {prefix}")
+            # List and delete concurrently, in batches of 1000 (S3 limit)
+            deleted_count = delete_prefix_objects(self.client, self.bucket_name, prefix)
             
             logger.info(f"✅ Total deleted: {deleted_count} objects with prefix s3://{self.bucket_name}/{prefix}")
             return deleted_count
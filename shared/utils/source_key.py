@@ -0,0 +1,42 @@
+"""
+Canonical source key for document filtering.
+
+Chunks and image OCR records store ``metadata.source`` exactly as the parser
+reported it (full path, basename, mixed case). Filtering on that field needed a
+``bool.should`` over several spellings and fields. Instead every record also
+carries ``metadata.source_key``: the lowercased basename, so a document filter
+is a single ``term``/``terms`` clause on its keyword sub-field.
+"""
+import re
+from typing import Dict, Iterable, Optional
+
+SOURCE_KEY_FIELD = "metadata.source_key"
+SOURCE_KEY_KEYWORD_FIELD = "metadata.source_key.keyword"
+
+_SEPARATORS_RE = re.compile(r"[\\/]")
+
+# Painless equivalent of source_key(), used by the backfill script (update_by_query)
+SOURCE_KEY_PAINLESS = (
+    "if (ctx._source.metadata != null && ctx._source.metadata.source != null) {"
+    " String s = ctx._source.metadata.source.toString();"
+    " int cut = Math.max(s.lastIndexOf('/'), s.lastIndexOf('\\\\'));"
+    " ctx._source.metadata.source_key = s.substring(cut + 1).trim().toLowerCase();"
+    " } else { ctx.op = 'noop'; }"
+)
+
+
+def source_key(source: Optional[str]) -> str:
+    """Normalize a document source to its canonical key (lowercased basename)."""
+    if not source:
+        return ""
+    return _SEPARATORS_RE.split(str(source))[-1].strip().lower()
+
+
+def source_key_filter(sources: Iterable[Optional[str]]) -> Optional[Dict]:
+    """Single term/terms clause matching any of the given sources, or None when empty."""
+    keys = sorted({source_key(s) for s in sources if s and source_key(s)})
+    if not keys:
+        return None
+    if len(keys) == 1:
+        return {"term": {SOURCE_KEY_KEYWORD_FIELD: keys[0]}}
+    return {"terms": {SOURCE_KEY_KEYWORD_FIELD: keys}}
@@ -2,18 +2,27 @@
 Synchronization Manager for Microservices
 Ensures all services stay in sync with shared state (document registry, index map, etc.)
 Provides AUTOMATIC synchronization without manual intervention.
+
+With ENABLE_REGISTRY_CHANGE_FEED, each service subscribes to the registry change
+feed (storage.registry_changes): a UDP doorbell wakes it to pull the events past
+its version, with a slow safety poll in case a datagram is lost. File polling and
+HTTP sync broadcasts remain as the fallback.
 """
 import os
+import random
+import socket
 import time
 import json
 import asyncio
 import threading
 import logging
 import httpx
-from typing import Dict, Optional, List, Callable, Any
+from types import MappingProxyType
+from typing import Dict, Optional, List, Callable, Any, Mapping, Set
 from pathlib import Path
 from shared.config.settings import ARISConfig
 from storage.document_registry import DocumentRegistry
+from storage.registry_changes import doorbell_port, get_change_log
 from scripts.setup_logging import get_logger
 logger = logging.getLogger(__name__)
 
@@ -68,14 +77,27 @@ class SyncManager:
         self._index_map_mtime = 0
         self._registry_mtime = 0
         self._last_sync_time = 0
-        self._sync_interval = 5.0  # Check for changes every 5 seconds for real-time sync
+        self._last_check_time = 0.0  # last completed background pass, changes or not
+        self._sync_interval = ARISConfig.SYNC_INTERVAL_SECONDS
+        self._sync_jitter = ARISConfig.SYNC_JITTER_FRACTION
         
         # Background sync task control
         self._background_task: Optional[asyncio.Task] = None
+        self._polling_thread: Optional[threading.Thread] = None
         self._stop_event = threading.Event()
         self._sync_callbacks: List[Callable] = []
         
-        # Cached data
+        # Registry change feed subscription
+        self._change_log = None
+        self._feed_version = -1
+        # Change-feed versions applied within the re-read overlap window (dedupes late events)
+        self._feed_delivered: Set[int] = set()
+        self._feed_thread: Optional[threading.Thread] = None
+        self._feed_socket: Optional[socket.socket] = None
+        
+        # Cached data: the index map is never mutated in place, writers build a
+        # new dict and swap the reference (serialized by _map_lock)
+        self._map_lock = threading.RLock()
         self._cached_index_map: Optional[Dict[str, str]] = None
         self._cached_registry_data: Optional[Dict] = None
         
@@ -113,13 +135,13 @@ class SyncManager:
         # For backward compatibility with existing calls
         return False
     
-    def _build_index_map_from_registry(self) -> Dict[str, str]:
+    def _build_index_map_from_registry(self, fresh: bool = False) -> Dict[str, str]:
         """Build an index map from the registry's persisted text_index metadata."""
         if not self.document_registry:
             return {}
         
         try:
-            registry_docs = self.document_registry.list_documents()
+            registry_docs = self.document_registry.list_documents(fresh=fresh)
         except Exception as e:
             logger.warning(f"[{self.service_name}] Could not load registry documents for index map bootstrap: {e}")
             return {}
@@ -138,42 +160,40 @@ class SyncManager:
         
         return derived_map
     
-    def sync_index_map(self, force: bool = False) -> Optional[Dict[str, str]]:
+    def sync_index_map(self, force: bool = False, fresh: bool = False) -> Optional[Dict[str, str]]:
         """
         Sync document index map from disk.
         
         Args:
             force: If True, reload even if file hasn't changed
+            fresh: If True, merge against a just-refreshed registry snapshot
             
         Returns:
             Updated index map dict, or None if no changes
         """
         try:
-            if os.path.exists(self.index_map_path):
-                current_mtime = os.path.getmtime(self.index_map_path)
-                if force or current_mtime > self._index_map_mtime:
-                    with open(self.index_map_path, 'r') as f:
-                        index_map = json.load(f)
-                    derived_map = self._build_index_map_from_registry()
-                    if any(index_map.get(name) != idx for name, idx in derived_map.items()):
-                        index_map.update(derived_map)
-                        with open(self.index_map_path, 'w') as f:
-                            json.dump(index_map, f, indent=2)
-                        current_mtime = os.path.getmtime(self.index_map_path)
-                    self._index_map_mtime = current_mtime
+            with self._map_lock:
+                if os.path.exists(self.index_map_path):
+                    current_mtime = os.path.getmtime(self.index_map_path)
+                    if force or current_mtime > self._index_map_mtime:
+                        with open(self.index_map_path, 'r') as f:
+                            index_map = json.load(f)
+                        derived_map = self._build_index_map_from_registry(fresh=fresh)
+                        if any(index_map.get(name) != idx for name, idx in derived_map.items()):
+                            index_map.update(derived_map)
+                            self._write_index_map(index_map)
+                        else:
+                            self._index_map_mtime = current_mtime
+                        self._cached_index_map = index_map
+                        logger.info(f"✅ [{self.service_name}] Synced index map ({len(index_map)} mappings)")
+                        return index_map
+                else:
+                    # Bootstrap from registry if possible, otherwise create an empty map.
+                    index_map = self._build_index_map_from_registry(fresh=fresh)
+                    self._write_index_map(index_map)
                     self._cached_index_map = index_map
-                    logger.info(f"✅ [{self.service_name}] Synced index map ({len(index_map)} mappings)")
+                    logger.info(f"✅ [{self.service_name}] Created index map ({len(index_map)} mappings)")
                     return index_map
-            else:
-                # Bootstrap from registry if possible, otherwise create an empty map.
-                os.makedirs(os.path.dirname(self.index_map_path), exist_ok=True)
-                index_map = self._build_index_map_from_registry()
-                with open(self.index_map_path, 'w') as f:
-                    json.dump(index_map, f, indent=2)
-                self._index_map_mtime = os.path.getmtime(self.index_map_path)
-                self._cached_index_map = index_map
-                logger.info(f"✅ [{self.service_name}] Created index map ({len(index_map)} mappings)")
-                return index_map
             return None
         except Exception as e:
             logger.warning(f"[{self.service_name}] Could not sync index map: {e}")
@@ -181,17 +201,19 @@ class SyncManager:
     
     def check_and_sync(self) -> Dict[str, Any]:
         """
-        Check for changes and sync if needed.
+        Check for changes and sync if needed (at most once per sync interval).
         
         Returns:
             Dict with sync status for each component
         """
-        now = time.time()
-        
         # Only check periodically to avoid excessive I/O
-        if now - self._last_sync_time < self._sync_interval:
+        if time.time() - self._last_sync_time < self._sync_interval:
             return {"registry": False, "index_map": False, "skipped": True}
-        
+        return self._sync_pass()
+    
+    def _sync_pass(self) -> Dict[str, Any]:
+        """One polling pass: reload what changed on disk and notify callbacks."""
+        now = time.time()
         self._last_sync_time = now
         
         registry_synced = self.sync_document_registry()
@@ -210,6 +232,7 @@ class SyncManager:
             self._last_sync_result = result
             self._notify_callbacks(result)
         
+        self._last_check_time = time.time()
         return result
     
     def force_full_sync(self) -> Dict[str, Any]:
@@ -248,6 +271,7 @@ class SyncManager:
         
         self._sync_count += 1
         self._last_sync_result = result
+        self._last_check_time = time.time()
         self._notify_callbacks(result)
         
         logger.info(f"✅ [{self.service_name}] Full sync complete: {doc_count} docs, {len(index_map) if index_map else 0} mappings")
@@ -305,14 +329,56 @@ class SyncManager:
             "last_sync": self._last_sync_time,
             "sync_count": self._sync_count,
             "sync_interval": self._sync_interval,
-            "background_task_running": self._background_task is not None and not self._background_task.done()
+            "background_task_running": self.change_feed_active or (
+                self._background_task is not None and not self._background_task.done()
+            ),
+            "change_feed": {
+                "active": self.change_feed_active,
+                "version": self._feed_version,
+                "doorbell": self._feed_socket is not None
+            }
+        }
+    
+    def get_sync_staleness(self) -> Dict[str, Any]:
+        """
+        Age of the in-memory sync state, computed without any sync work (for /health).
+        
+        Returns:
+            Dict with the sync mode, seconds since the last background pass and whether
+            that is overdue (three expected periods)
+        """
+        if self.change_feed_active:
+            mode = "change_feed"
+            expected_period = max(1.0, ARISConfig.CHANGE_FEED_SAFETY_POLL_SECONDS)
+        else:
+            running = self._background_task is not None and not self._background_task.done()
+            mode = "polling" if running or self._polling_thread_alive() else "none"
+            expected_period = self._sync_interval * (1 + self._sync_jitter)
+        
+        now = time.time()
+        check_age = now - self._last_check_time if self._last_check_time else None
+        change_age = now - self._last_sync_time if self._last_sync_time else None
+        return {
+            "mode": mode,
+            "last_check_age_seconds": round(check_age, 3) if check_age is not None else None,
+            "last_sync_age_seconds": round(change_age, 3) if change_age is not None else None,
+            "stale": check_age is None or check_age > 3 * expected_period,
+            "index_map_entries": len(self._cached_index_map or {}),
+            "feed_version": self._feed_version
         }
     
-    def get_cached_index_map(self) -> Dict[str, str]:
-        """Get cached index map without disk I/O."""
-        if self._cached_index_map is None:
+    def get_cached_index_map(self) -> Mapping[str, str]:
+        """
+        Read-only view of the cached index map (no I/O once loaded).
+        
+        The background sync swaps in a new map instead of mutating this one, so the view
+        stays consistent for the caller; only the very first call before any sync loads it.
+        """
+        index_map = self._cached_index_map
+        if index_map is None:
             self.sync_index_map(force=True)
-        return self._cached_index_map or {}
+            index_map = self._cached_index_map
+        return MappingProxyType(index_map or {})
     
     def get_cached_registry(self) -> Dict:
         """Get cached registry data without disk I/O."""
@@ -320,14 +386,19 @@ class SyncManager:
             self.sync_document_registry(force=True)
         return self._cached_registry_data or {}
     
+    def _next_sync_delay(self) -> float:
+        """Sync interval with random jitter, so services do not poll in lockstep."""
+        jitter = min(max(self._sync_jitter, 0.0), 1.0)
+        return self._sync_interval * random.uniform(1.0 - jitter, 1.0 + jitter)
+    
     async def _background_sync_loop(self):
-        """Background task that periodically syncs state."""
-        logger.info(f"🔄 [{self.service_name}] Starting background sync loop (interval: {self._sync_interval}s)")
+        """Background task that periodically syncs state (off the event loop)."""
+        logger.info(f"🔄 [{self.service_name}] Starting background sync loop (interval: {self._sync_interval}s ±{self._sync_jitter:.0%})")
         
         while not self._stop_event.is_set():
             try:
-                # Check and sync
-                result = self.check_and_sync()
+                # File stat/JSON load/registry listing run in a worker thread so requests never wait on them
+                result = await asyncio.to_thread(self._sync_pass)
                 
                 if result.get("registry") or result.get("index_map"):
                     logger.debug(f"[{self.service_name}] Background sync detected changes: {result}")
@@ -336,17 +407,19 @@ class SyncManager:
                 logger.warning(f"[{self.service_name}] Background sync error: {e}")
             
             # Sleep with interrupt check
-            await asyncio.sleep(self._sync_interval)
+            await asyncio.sleep(self._next_sync_delay())
         
         logger.info(f"🛑 [{self.service_name}] Background sync loop stopped")
     
     def start_background_sync(self, loop: Optional[asyncio.AbstractEventLoop] = None):
-        """Start the background sync task."""
+        """Start the background sync task (the change feed subscriber when enabled)."""
         if self._background_task is not None and not self._background_task.done():
             logger.info(f"[{self.service_name}] Background sync already running")
             return
         
         self._stop_event.clear()
+        if self.start_change_feed():
+            return
         
         try:
             if loop is None:
@@ -364,23 +437,172 @@ class SyncManager:
         def sync_thread():
             while not self._stop_event.is_set():
                 try:
-                    self.check_and_sync()
+                    self._sync_pass()
                 except Exception as e:
                     logger.warning(f"[{self.service_name}] Threaded sync error: {e}")
-                self._stop_event.wait(self._sync_interval)
+                self._stop_event.wait(self._next_sync_delay())
         
-        thread = threading.Thread(target=sync_thread, daemon=True)
+        self._stop_event.clear()
+        thread = threading.Thread(target=sync_thread, name=f"{self.service_name}-sync", daemon=True)
         thread.start()
+        self._polling_thread = thread
         logger.info(f"✅ [{self.service_name}] Threaded sync started")
     
+    def _polling_thread_alive(self) -> bool:
+        return self._polling_thread is not None and self._polling_thread.is_alive()
+    
     def stop_background_sync(self):
         """Stop the background sync task."""
         self._stop_event.set()
         if self._background_task is not None:
             self._background_task.cancel()
             self._background_task = None
+        if self._feed_socket is not None:
+            self._feed_socket.close()
+            self._feed_socket = None
         logger.info(f"🛑 [{self.service_name}] Background sync stopped")
     
+    # ------------------------------------------------------------------
+    # Registry change feed
+    # ------------------------------------------------------------------
+    
+    @property
+    def change_feed_active(self) -> bool:
+        """True while this service is subscribed to the registry change feed."""
+        return self._feed_thread is not None and self._feed_thread.is_alive()
+    
+    def start_change_feed(self) -> bool:
+        """
+        Subscribe to the registry change feed instead of polling.
+        
+        Returns:
+            False when the feed is disabled or unavailable (callers keep polling)
+        """
+        if not ARISConfig.ENABLE_REGISTRY_CHANGE_FEED or not self.document_registry:
+            return False
+        if self.change_feed_active:
+            return True
+        
+        try:
+            self._change_log = get_change_log(self.document_registry.client)
+            # Versions already covered (the fresh re-sync below includes every visible event)
+            self._feed_delivered.clear()
+            self._feed_version = self._change_log.changes_since(
+                self._change_log.latest_version(), self._feed_delivered
+            )[1]
+        except Exception as e:
+            logger.warning(f"[{self.service_name}] Registry change feed unavailable, polling instead: {e}")
+            return False
+        
+        # Re-sync against a fresh snapshot: everything up to this version is included
+        self.sync_index_map(force=True, fresh=True)
+        
+        port = doorbell_port(self.service_name)
+        try:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            sock.bind(("0.0.0.0", port))
+            sock.settimeout(max(1.0, ARISConfig.CHANGE_FEED_SAFETY_POLL_SECONDS))
+            self._feed_socket = sock
+        except OSError as e:
+            logger.warning(f"[{self.service_name}] Doorbell port udp/{port} unavailable ({e}); change feed uses the safety poll only")
+            self._feed_socket = None
+        
+        self._stop_event.clear()
+        self._feed_thread = threading.Thread(
+            target=self._change_feed_loop, name=f"{self.service_name}-change-feed", daemon=True
+        )
+        self._feed_thread.start()
+        logger.info(f"✅ [{self.service_name}] Subscribed to registry change feed (version {self._feed_version}, doorbell udp/{port})")
+        return True
+    
+    def _change_feed_loop(self):
+        """Wait for a doorbell (or the safety poll timeout), then pull and apply changes."""
+        safety_poll = max(1.0, ARISConfig.CHANGE_FEED_SAFETY_POLL_SECONDS)
+        while not self._stop_event.is_set():
+            sock = self._feed_socket
+            if sock is None:
+                self._stop_event.wait(safety_poll)
+            else:
+                try:
+                    sock.recv(64)
+                except socket.timeout:
+                    pass
+                except OSError:
+                    # Socket closed by stop_background_sync (or broken): fall back to polling
+                    if not self._stop_event.is_set():
+                        self._feed_socket = None
+            if self._stop_event.is_set():
+                break
+            try:
+                self.apply_registry_changes()
+                self._last_check_time = time.time()
+            except Exception as e:
+                logger.warning(f"[{self.service_name}] Change feed error: {e}")
+        logger.info(f"🛑 [{self.service_name}] Change feed subscriber stopped")
+    
+    def apply_registry_changes(self) -> Optional[Dict[str, Any]]:
+        """
+        Pull change-feed events past the local version and apply them to the index map.
+        
+        The map is updated on a copy and swapped in, so readers never see it half-applied.
+        
+        Returns:
+            Sync result passed to the callbacks, or None when there was nothing new
+        """
+        if self._change_log is None:
+            return None
+        events, version = self._change_log.changes_since(self._feed_version, self._feed_delivered)
+        if not events:
+            return None
+        
+        with self._map_lock:
+            index_map = dict(self.get_cached_index_map())
+            changed = False
+            for event in events:
+                document_name = (event.get("document_name") or "").strip()
+                text_index = (event.get("text_index") or "").strip()
+                if not document_name:
+                    continue
+                if event.get("op") == "upsert" and event.get("status") == "success" and text_index:
+                    if index_map.get(document_name) != text_index:
+                        index_map[document_name] = text_index
+                        changed = True
+                elif event.get("op") == "remove" and document_name in index_map:
+                    # A re-upload may already map the name to its new index
+                    if not text_index or index_map[document_name] == text_index:
+                        del index_map[document_name]
+                        changed = True
+            
+            if changed:
+                self._write_index_map(index_map)
+            self._cached_index_map = index_map
+            self._feed_version = version
+        
+        result = {
+            "registry": True,
+            "index_map": changed,
+            "changes": len(events),
+            "version": version,
+            "timestamp": time.time(),
+            "service": self.service_name,
+            "type": "change_feed"
+        }
+        self._last_sync_time = result["timestamp"]
+        self._sync_count += 1
+        self._last_sync_result = result
+        self._notify_callbacks(result)
+        logger.info(f"📬 [{self.service_name}] Applied {len(events)} registry change(s) (version {version})")
+        return result
+    
+    def _write_index_map(self, index_map: Dict[str, str]):
+        """Persist the index map atomically (readers of the file never see a partial write)."""
+        os.makedirs(os.path.dirname(self.index_map_path), exist_ok=True)
+        tmp_path = f"{self.index_map_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(index_map, f, indent=2)
+        os.replace(tmp_path, self.index_map_path)
+        self._index_map_mtime = os.path.getmtime(self.index_map_path)
+    
     def update_index_map(self, document_name: str, index_name: str) -> bool:
         """
         Update index map with a new mapping and save to disk.
@@ -393,18 +615,12 @@ class SyncManager:
             True if successful
         """
         try:
-            # Load current map
-            current_map = self.get_cached_index_map()
-            current_map[document_name] = index_name
-            
-            # Save
-            os.makedirs(os.path.dirname(self.index_map_path), exist_ok=True)
-            with open(self.index_map_path, 'w') as f:
-                json.dump(current_map, f, indent=2)
-            
-            # Update cache and mtime
-            self._cached_index_map = current_map
-            self._index_map_mtime = os.path.getmtime(self.index_map_path)
+            with self._map_lock:
+                # Copy, save, then swap: readers keep a consistent map throughout
+                current_map = dict(self.get_cached_index_map())
+                current_map[document_name] = index_name
+                self._write_index_map(current_map)
+                self._cached_index_map = current_map
             
             logger.info(f"✅ [{self.service_name}] Updated index map: {document_name} -> {index_name}")
             return True
@@ -423,19 +639,16 @@ class SyncManager:
             True if successful
         """
         try:
-            current_map = self.get_cached_index_map()
-            if document_name in current_map:
+            with self._map_lock:
+                current_map = dict(self.get_cached_index_map())
+                if document_name not in current_map:
+                    return False
                 del current_map[document_name]
-                
-                with open(self.index_map_path, 'w') as f:
-                    json.dump(current_map, f, indent=2)
-                
+                self._write_index_map(current_map)
                 self._cached_index_map = current_map
-                self._index_map_mtime = os.path.getmtime(self.index_map_path)
-                
-                logger.info(f"✅ [{self.service_name}] Removed from index map: {document_name}")
-                return True
-            return False
+            
+            logger.info(f"✅ [{self.service_name}] Removed from index map: {document_name}")
+            return True
         except Exception as e:
             logger.error(f"[{self.service_name}] Failed to remove from index map: {e}")
             return False
@@ -4,13 +4,110 @@ Token-aware text splitter using TikToken.
 import tiktoken
 import time
 import logging
-from typing import List, Optional, Callable
+from functools import lru_cache
+from typing import Any, Callable, List, Optional, Sequence, Tuple
 try:
     from langchain.docstore.document import Document
 except ImportError:
     from langchain_core.documents import Document
 
 
+# Context windows (tokens) of the answer model families we route to, matched by longest prefix
+# so dated/snapshot ids (gpt-4o-2024-08-06) resolve to their family
+MODEL_CONTEXT_WINDOWS = {
+    'gpt-4o': 128000,
+    'gpt-4o-mini': 128000,
+    'gpt-4-turbo': 128000,
+    'gpt-4.1': 1000000,
+    'gpt-4.1-mini': 1000000,
+    'gpt-4': 8192,
+    'gpt-3.5-turbo': 16385,
+    'llama-3.3-70b': 8192,
+    'llama3.1-8b': 8192,
+}
+
+
+def get_context_window(model_name: Optional[str]) -> Optional[int]:
+    """Context window of the longest MODEL_CONTEXT_WINDOWS prefix of the model id, or None."""
+    model = (model_name or '').lower()
+    matches = [prefix for prefix in MODEL_CONTEXT_WINDOWS if model.startswith(prefix)]
+    return MODEL_CONTEXT_WINDOWS[max(matches, key=len)] if matches else None
+
+
+@lru_cache(maxsize=None)
+def get_encoding(model_name: Optional[str] = None):
+    """Process-wide cached tiktoken encoder (cl100k_base unless the model maps to another)."""
+    if model_name:
+        try:
+            return tiktoken.encoding_for_model(model_name)
+        except KeyError:
+            pass
+    return tiktoken.get_encoding("cl100k_base")
+
+
+def count_tokens(text: Optional[str], model_name: Optional[str] = None) -> int:
+    """Count tokens with the cached encoder; falls back to len/4 if encoding fails."""
+    if not text:
+        return 0
+    try:
+        return len(get_encoding(model_name).encode(text, disallowed_special=()))
+    except Exception as e:
+        logging.getLogger(__name__).debug(f"count_tokens: {type(e).__name__}: {e}")
+        return len(text) // 4
+
+
+@lru_cache(maxsize=64)
+def get_context_token_budget(
+    model_name: Optional[str],
+    max_output_tokens: int,
+    max_context_tokens: int,
+    reserved_tokens: int = 1500
+) -> int:
+    """
+    Tokens available for retrieved context for a given answer model.
+
+    The model window minus the completion allowance and a reserve for the system
+    prompt/question, capped by max_context_tokens (also the window assumed for models
+    that are not listed). Cached per model/settings.
+    """
+    window = get_context_window(model_name) or max_context_tokens
+    available = window - max(0, max_output_tokens or 0) - reserved_tokens
+    return max(512, min(available, max_context_tokens))
+
+
+def pack_documents_by_tokens(
+    documents: Sequence[Any],
+    budget: int,
+    overhead_per_document: int = 20
+) -> Tuple[List[Any], int]:
+    """
+    Greedily keep documents (in rank order) whose tokens fit in the budget.
+
+    Uses the ingest-time ``token_count`` metadata when present and only encodes
+    chunks that lack it (the count is written back for later use). A document that
+    does not fit is skipped so smaller lower-ranked chunks can still be packed; the
+    top-ranked document is always kept.
+
+    Returns:
+        (kept_documents, tokens_used)
+    """
+    kept = []
+    used = 0
+    for doc in documents:
+        metadata = getattr(doc, 'metadata', None)
+        tokens = metadata.get('token_count') if isinstance(metadata, dict) else None
+        if not isinstance(tokens, int) or tokens <= 0:
+            tokens = count_tokens(getattr(doc, 'page_content', '') or '')
+            if isinstance(metadata, dict):
+                metadata['token_count'] = tokens
+        cost = tokens + overhead_per_document
+        if kept and used + cost > budget:
+            continue
+        kept.append(doc)
+        used += cost
+    return kept, used
+
+
 class TokenTextSplitter:
     """
     Text splitter that chunks text based on token count rather than character count.
@@ -35,13 +132,8 @@ class TokenTextSplitter:
         self.chunk_overlap = chunk_overlap
         self.model_name = model_name
         
-        # Get encoding for the model
-        try:
-            self.encoding = tiktoken.encoding_for_model(model_name)
-        except KeyError as e:
-            logger.debug(f"__init__: {type(e).__name__}: {e}")
-            # Fallback to cl100k_base encoding (used by GPT-3.5/GPT-4)
-            self.encoding = tiktoken.get_encoding("cl100k_base")
+        # Get encoding for the model (shared process-wide; falls back to cl100k_base)
+        self.encoding = get_encoding(model_name)
     
     def _safe_encode(self, text: str):
         """
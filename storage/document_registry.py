@@ -1,20 +1,57 @@
 """
 Shared document registry using OpenSearch as the backend database.
 Replaces file-based JSON storage to eliminate race conditions and improve scalability.
+
+The OpenSearch client is shared process-wide, and list_documents() serves an
+in-memory snapshot of the registry index. The snapshot is loaded once with
+search_after pagination (inside a point-in-time when the cluster supports it) and
+then refreshed with only the entries whose _seq_no is above the last one seen.
+Writes are also published to the registry change feed (storage.registry_changes).
 """
 import os
 import json
 import logging
+import threading
 import time
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Union
 from datetime import datetime
 import boto3
 from boto3 import Session
 from opensearchpy import OpenSearch, RequestsHttpConnection, AWSV4SignerAuth, NotFoundError
 from shared.config.settings import ARISConfig
+from storage.registry_changes import get_change_log
 
 logger = logging.getLogger(__name__)
 
+# Process-wide OpenSearch clients (per domain/region), registry snapshots (per index)
+_CLIENTS: Dict[tuple, OpenSearch] = {}
+_SNAPSHOTS: Dict[str, '_RegistrySnapshot'] = {}
+_READY_INDEXES: set = set()
+_STATE_LOCK = threading.Lock()
+
+
+# Replace an entry's fields but keep its stored created_at unless the write sets one
+# (no read before writing); new entries take the upsert body as-is
+_UPSERT_SCRIPT = (
+    "def created = ctx._source.created_at; "
+    "ctx._source.clear(); ctx._source.putAll(params.doc); "
+    "if (created != null && !params.doc.containsKey('created_at')) { ctx._source.created_at = created; }"
+)
+
+
+class _RegistrySnapshot:
+    """In-memory copy of the registry index, kept current by _seq_no deltas."""
+
+    def __init__(self):
+        self.documents: Dict[str, Dict] = {}
+        self.seq_no = -1  # highest _seq_no loaded
+        self.loaded = False
+        self.refreshed_at = 0.0
+        # _seq_no is per shard: deltas are only exact on a single-shard registry index
+        self.single_shard: Optional[bool] = None
+        self.lock = threading.RLock()
+
+
 class DocumentRegistry:
     """
     OpenSearch-backed Document Registry.
@@ -29,8 +66,20 @@ class DocumentRegistry:
             registry_path: Ignored, kept for backward compatibility.
         """
         self.index_name = ARISConfig.DOCUMENT_REGISTRY_INDEX
-        self.client = self._initialize_client()
-        self._ensure_index_exists()
+        client_key = (ARISConfig.AWS_OPENSEARCH_DOMAIN, ARISConfig.AWS_OPENSEARCH_REGION)
+        with _STATE_LOCK:
+            client = _CLIENTS.get(client_key)
+        if client is None:
+            client = self._initialize_client()
+            with _STATE_LOCK:
+                client = _CLIENTS.setdefault(client_key, client)
+        self.client = client
+        with _STATE_LOCK:
+            self._snapshot = _SNAPSHOTS.setdefault(self.index_name, _RegistrySnapshot())
+            index_ready = self.index_name in _READY_INDEXES
+        if not index_ready and self._ensure_index_exists():
+            with _STATE_LOCK:
+                _READY_INDEXES.add(self.index_name)
         
     def _initialize_client(self) -> OpenSearch:
         """Initialize OpenSearch client."""
@@ -92,11 +141,13 @@ class DocumentRegistry:
             connection_class=RequestsHttpConnection
         )
 
-    def _ensure_index_exists(self):
+    def _ensure_index_exists(self) -> bool:
         """Create registry index if it doesn't exist."""
         try:
             if not self.client.indices.exists(index=self.index_name):
                 mapping = {
+                    # One shard keeps _seq_no monotonic across the index (snapshot deltas)
+                    "settings": {"index": {"number_of_shards": 1}},
                     "mappings": {
                         "properties": {
                             "document_id": {"type": "keyword"},
@@ -112,44 +163,112 @@ class DocumentRegistry:
                 }
                 self.client.indices.create(index=self.index_name, body=mapping)
                 logger.info(f"Created registry index: {self.index_name}")
+            return True
         except Exception as e:
             logger.error(f"Error checking/creating registry index: {e}")
+            return False
+
+    @staticmethod
+    def _prepare(document_id: str, metadata: Dict) -> Dict:
+        """Stamp id, updated_at and version on an entry (created_at is kept server-side)."""
+        # Ensure document_id is in the metadata
+        metadata['document_id'] = document_id
+        metadata['updated_at'] = datetime.now().isoformat()
+        
+        # Version tracking (simplified)
+        if 'version_info' not in metadata:
+            metadata['version_info'] = {'version': 1}
+        else:
+            current_ver = metadata['version_info'].get('version', 1)
+            metadata['version_info']['version'] = current_ver + 1
+        return metadata
 
-    def add_document(self, document_id: str, metadata: Dict):
-        """Add or update document metadata."""
+    @staticmethod
+    def _upsert_body(metadata: Dict) -> Dict:
+        upsert = dict(metadata)
+        upsert.setdefault('created_at', metadata['updated_at'])
+        return {
+            "script": {"source": _UPSERT_SCRIPT, "lang": "painless", "params": {"doc": metadata}},
+            "upsert": upsert
+        }
+
+    def _cache_put(self, document_id: str, metadata: Dict):
+        with self._snapshot.lock:
+            if self._snapshot.loaded:
+                previous = self._snapshot.documents.get(document_id) or {}
+                entry = dict(metadata)
+                entry.setdefault('created_at', previous.get('created_at', metadata['updated_at']))
+                self._snapshot.documents[document_id] = entry
+
+    def _publish(self, op: str, document_id: Optional[str] = None, metadata: Optional[Dict] = None):
+        """Append a change-feed event (best effort; subscribers' safety poll covers a lost one)."""
+        if not ARISConfig.ENABLE_REGISTRY_CHANGE_FEED:
+            return
         try:
-            # Ensure document_id is in the metadata
-            metadata['document_id'] = document_id
-            
-            # Add timestamps
-            if 'created_at' not in metadata:
-                # Check if exists to preserve created_at
-                existing = self.get_document(document_id)
-                if existing and 'created_at' in existing:
-                    metadata['created_at'] = existing['created_at']
-                else:
-                    metadata['created_at'] = datetime.now().isoformat()
-            
-            metadata['updated_at'] = datetime.now().isoformat()
-            
-            # Version tracking (simplified)
-            if 'version_info' not in metadata:
-                metadata['version_info'] = {'version': 1}
-            else:
-                current_ver = metadata['version_info'].get('version', 1)
-                metadata['version_info']['version'] = current_ver + 1
+            get_change_log(self.client).publish(op, document_id, metadata)
+        except Exception as e:
+            logger.debug(f"_publish: {type(e).__name__}: {e}")
 
-            self.client.index(
+    def add_document(self, document_id: str, metadata: Dict, refresh: Union[bool, str] = False):
+        """
+        Add or update document metadata (a single scripted upsert, no prior read).
+        
+        Args:
+            document_id: Registry entry id
+            metadata: Entry fields (replace the stored ones; created_at is preserved)
+            refresh: "wait_for" (or True) only where searches must see the write immediately;
+                get_document() reads are real-time either way
+        """
+        try:
+            self._prepare(document_id, metadata)
+            self.client.update(
                 index=self.index_name,
                 id=document_id,
-                body=metadata,
-                refresh=True  # Ensure immediate consistency
+                body=self._upsert_body(metadata),
+                refresh=refresh,
+                retry_on_conflict=3
             )
+            self._cache_put(document_id, metadata)
+            self._publish('upsert', document_id, metadata)
             logger.info(f"Added/Updated document {document_id} in registry")
         except Exception as e:
             logger.error(f"Failed to add document {document_id}: {e}")
             raise
 
+    def add_documents(self, documents: Dict[str, Dict], refresh: Union[bool, str] = False) -> int:
+        """
+        Add or update many entries with bulk scripted upserts.
+        
+        Args:
+            documents: document_id -> metadata
+            refresh: Refresh policy applied once per bulk request
+            
+        Returns:
+            Number of entries written
+        """
+        items = list(documents.items())
+        batch_size = max(1, ARISConfig.DOCUMENT_REGISTRY_PAGE_SIZE)
+        written = 0
+        for start in range(0, len(items), batch_size):
+            batch = items[start:start + batch_size]
+            body: List[Dict] = []
+            for document_id, metadata in batch:
+                self._prepare(document_id, metadata)
+                body.append({"update": {"_index": self.index_name, "_id": document_id, "retry_on_conflict": 3}})
+                body.append(self._upsert_body(metadata))
+            is_last = start + batch_size >= len(items)
+            response = self.client.bulk(body=body, refresh=refresh if is_last else False)
+            for (document_id, metadata), item in zip(batch, response.get('items', [])):
+                result = item.get('update', {})
+                if result.get('error'):
+                    logger.error(f"Failed to add document {document_id}: {result['error']}")
+                    continue
+                self._cache_put(document_id, metadata)
+                self._publish('upsert', document_id, metadata)
+                written += 1
+        logger.info(f"Added/Updated {written}/{len(items)} documents in registry (bulk)")
+        return written
+
     def get_document(self, document_id: str) -> Optional[Dict]:
         """Get document metadata by ID."""
         try:
@@ -162,24 +281,116 @@ class DocumentRegistry:
             logger.error(f"Error getting document {document_id}: {e}")
             return None
 
-    def list_documents(self) -> List[Dict]:
-        """List all documents."""
+    def list_documents(self, fresh: bool = False) -> List[Dict]:
+        """
+        List all documents (complete, however large the registry).
+        
+        Args:
+            fresh: Reload the whole registry instead of serving the cached snapshot
+        """
+        snapshot = self._snapshot
         try:
-            # Search all using scan/scroll or high limit
-            # For registry, 10000 is a safe reasonable limit for now
-            response = self.client.search(
-                index=self.index_name,
-                body={"query": {"match_all": {}}, "size": 1000}
-            )
-            return [hit['_source'] for hit in response['hits']['hits']]
+            self._refresh_snapshot(full=fresh)
         except Exception as e:
             logger.error(f"Error listing documents: {e}")
-            return []
+            if not snapshot.loaded:
+                return []
+        with snapshot.lock:
+            return [dict(doc) for doc in snapshot.documents.values()]
+
+    @property
+    def version(self) -> int:
+        """Registry change version: the highest _seq_no in the snapshot (-1 before loading)."""
+        return self._snapshot.seq_no
+
+    def _scan(self, query: Dict, sort: List[Dict], point_in_time: bool = False) -> List[Dict]:
+        """All hits of a query, page by page with search_after (optionally inside a point-in-time)."""
+        page_size = max(1, ARISConfig.DOCUMENT_REGISTRY_PAGE_SIZE)
+        pit_id = None
+        if point_in_time:
+            try:
+                pit_id = self.client.create_pit(index=self.index_name, params={'keep_alive': '1m'})['pit_id']
+            except Exception as e:
+                logger.debug(f"_scan: point-in-time unavailable, paging without it: {type(e).__name__}: {e}")
+        hits: List[Dict] = []
+        search_after = None
+        try:
+            while True:
+                body = {"query": query, "size": page_size, "sort": sort, "seq_no_primary_term": True}
+                if search_after is not None:
+                    body["search_after"] = search_after
+                if pit_id:
+                    body["pit"] = {"id": pit_id, "keep_alive": "1m"}
+                    response = self.client.search(body=body)
+                    pit_id = response.get('pit_id', pit_id)
+                else:
+                    response = self.client.search(index=self.index_name, body=body)
+                page = response['hits']['hits']
+                hits.extend(page)
+                if len(page) < page_size:
+                    return hits
+                search_after = page[-1]['sort']
+        finally:
+            if pit_id:
+                try:
+                    self.client.delete_pit(body={'pit_id': [pit_id]})
+                except Exception as e:
+                    logger.debug(f"_scan: {type(e).__name__}: {e}")
+
+    def _load_all(self):
+        snapshot = self._snapshot
+        if snapshot.single_shard is None:
+            try:
+                settings = self.client.indices.get_settings(index=self.index_name)
+                shards = next(iter(settings.values()))['settings']['index']['number_of_shards']
+                snapshot.single_shard = int(shards) == 1
+            except Exception as e:
+                logger.debug(f"_load_all: {type(e).__name__}: {e}")
+                snapshot.single_shard = False
+        documents: Dict[str, Dict] = {}
+        seq_no = -1
+        for hit in self._scan({"match_all": {}}, [{"document_id": {"order": "asc", "missing": "_last"}}], point_in_time=True):
+            documents[hit['_id']] = hit['_source']
+            seq_no = max(seq_no, hit.get('_seq_no', -1))
+        snapshot.documents, snapshot.seq_no, snapshot.loaded = documents, seq_no, True
+        logger.debug(f"Registry snapshot loaded: {len(documents)} documents (version {seq_no})")
+
+    def _refresh_snapshot(self, full: bool = False):
+        """Bring the snapshot up to date: a delta by _seq_no (with an overlap), or a full reload when needed."""
+        snapshot = self._snapshot
+        with snapshot.lock:
+            now = time.time()
+            if not full and snapshot.loaded and now - snapshot.refreshed_at < ARISConfig.DOCUMENT_REGISTRY_CACHE_TTL_SECONDS:
+                return
+            if full or not snapshot.loaded or not snapshot.single_shard:
+                self._load_all()
+            else:
+                # Re-read an overlap below the last version: a lower _seq_no written without a
+                # refresh can become searchable after a higher one (upserts are idempotent)
+                since = snapshot.seq_no - max(0, ARISConfig.REGISTRY_SEQ_NO_OVERLAP)
+                changed = self._scan({"range": {"_seq_no": {"gt": since}}}, [{"_seq_no": "asc"}])
+                for hit in changed:
+                    snapshot.documents[hit['_id']] = hit['_source']
+                    snapshot.seq_no = max(snapshot.seq_no, hit.get('_seq_no', -1))
+                # Deletions by other processes leave no changed entry: a count mismatch reloads
+                if self.client.count(index=self.index_name)['count'] != len(snapshot.documents):
+                    self._load_all()
+            snapshot.refreshed_at = now
 
-    def remove_document(self, document_id: str) -> bool:
-        """Remove document from registry."""
+    def remove_document(self, document_id: str, refresh: Union[bool, str] = False) -> bool:
+        """Remove document from registry (refresh="wait_for" when searches must not see it anymore)."""
+        previous = None
+        if ARISConfig.ENABLE_REGISTRY_CHANGE_FEED:
+            # Subscribers drop the mapping by name, so capture it before deleting
+            with self._snapshot.lock:
+                previous = self._snapshot.documents.get(document_id)
+            if previous is None:
+                previous = self.get_document(document_id)
         try:
-            self.client.delete(index=self.index_name, id=document_id, refresh=True)
+            self.client.delete(index=self.index_name, id=document_id, refresh=refresh)
+            with self._snapshot.lock:
+                self._snapshot.documents.pop(document_id, None)
+            self._publish('remove', document_id, previous)
             logger.info(f"Removed document {document_id} from registry")
             return True
         except NotFoundError as e:
@@ -264,14 +475,18 @@ class DocumentRegistry:
             logger.error(f"Error marking for reindex: {e}")
             return False
 
-    def clear_all(self):
+    def clear_all(self, refresh: bool = False):
         """Clear all documents from registry (Dangerous)."""
         try:
             self.client.delete_by_query(
                 index=self.index_name,
                 body={"query": {"match_all": {}}},
-                refresh=True
+                refresh=refresh
             )
+            with self._snapshot.lock:
+                self._snapshot.documents = {}
+                self._snapshot.loaded = False
+            self._publish('clear')
             logger.info("Cleared all documents from registry")
         except Exception as e:
             logger.error(f"Error clearing registry: {e}")
@@ -294,7 +509,8 @@ class DocumentRegistry:
             return {
                 'total_documents': count,
                 'backend': 'opensearch',
-                'index': self.index_name
+                'index': self.index_name,
+                'version': self.version
             }
         except Exception as e:
             logger.debug(f"get_sync_status: {type(e).__name__}: {e}")
@@ -0,0 +1,232 @@
+"""
+Registry change log: the change feed behind cross-service sync.
+
+Registry writes append events (upsert / remove / clear, with the document name,
+text index and status) to a single-shard change-log index whose _seq_no is the
+feed version. A background publisher thread writes the events, never the request
+path, and then rings every service with a one-datagram UDP doorbell so their
+subscribers pull the new events at once instead of polling files or being called
+over HTTP.
+"""
+import logging
+import queue
+import socket
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+from urllib.parse import urlparse
+
+from opensearchpy import NotFoundError
+
+from shared.config.settings import ARISConfig
+
+logger = logging.getLogger(__name__)
+
+# Doorbell port of each service: CHANGE_FEED_UDP_PORT + offset
+SERVICE_PORT_OFFSETS = {"gateway": 0, "ingestion": 1, "retrieval": 2, "mcp": 3}
+_PUBLISH_BATCH = 500
+_PURGE_INTERVAL_SECONDS = 3600
+
+
+def doorbell_port(service_name: str) -> int:
+    offset = SERVICE_PORT_OFFSETS.get(service_name, len(SERVICE_PORT_OFFSETS))
+    return ARISConfig.CHANGE_FEED_UDP_PORT + offset
+
+
+def peer_addresses() -> List[Tuple[str, int]]:
+    """Doorbell address of every service (hosts from the service URLs)."""
+    from shared.utils.sync_manager import SERVICE_URLS
+
+    return [
+        (urlparse(url).hostname or "127.0.0.1", doorbell_port(service))
+        for service, url in SERVICE_URLS.items()
+    ]
+
+
+def ring(addresses: Optional[List[Tuple[str, int]]] = None):
+    """Send the doorbell datagram (fire-and-forget; a lost one is covered by the safety poll)."""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        for host, port in addresses if addresses is not None else peer_addresses():
+            try:
+                sock.sendto(b"registry", (host, port))
+            except OSError as e:
+                logger.debug(f"ring: {host}:{port}: {type(e).__name__}: {e}")
+    finally:
+        sock.close()
+
+
+class RegistryChangeLog:
+    """Append-only registry change events, versioned by _seq_no."""
+
+    def __init__(self, client, index_name: Optional[str] = None):
+        self.client = client
+        self.index_name = index_name or ARISConfig.REGISTRY_CHANGE_LOG_INDEX
+        self._queue: "queue.Queue[Dict]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._ready = False
+        self._purged_at = 0.0
+
+    def ensure_index(self) -> bool:
+        if self._ready:
+            return True
+        try:
+            if not self.client.indices.exists(index=self.index_name):
+                keyword = {"type": "keyword"}
+                self.client.indices.create(index=self.index_name, body={
+                    # One shard keeps _seq_no a total order over all events
+                    "settings": {"index": {"number_of_shards": 1}},
+                    "mappings": {"properties": {
+                        "op": keyword,
+                        "document_id": keyword,
+                        "document_name": keyword,
+                        "text_index": keyword,
+                        "status": keyword,
+                        "timestamp": {"type": "date"}
+                    }}
+                })
+                logger.info(f"Created registry change log index: {self.index_name}")
+            self._ready = True
+        except Exception as e:
+            logger.warning(f"⚠️ Could not create registry change log index {self.index_name}: {e}")
+        return self._ready
+
+    # ------------------------------------------------------------------
+    # Publishing
+    # ------------------------------------------------------------------
+
+    def publish(self, op: str, document_id: Optional[str] = None, metadata: Optional[Dict] = None):
+        """Queue a change event; the publisher thread writes it and rings the services."""
+        metadata = metadata or {}
+        self._queue.put({
+            'op': op,
+            'document_id': document_id,
+            'document_name': metadata.get('document_name'),
+            'text_index': metadata.get('text_index') or metadata.get('index_name'),
+            'status': metadata.get('status'),
+            'timestamp': datetime.utcnow().isoformat()
+        })
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._publish_loop, name="registry-change-publisher", daemon=True)
+                self._thread.start()
+
+    def _publish_loop(self):
+        while True:
+            events = [self._queue.get()]
+            while len(events) < _PUBLISH_BATCH:
+                try:
+                    events.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._write(events)
+                ring()
+                if time.time() - self._purged_at > _PURGE_INTERVAL_SECONDS:
+                    self._purged_at = time.time()
+                    self.purge()
+            except Exception as e:
+                logger.warning(f"⚠️ Could not publish {len(events)} registry change(s): {e}")
+            finally:
+                for _ in events:
+                    self._queue.task_done()
+
+    def _write(self, events: List[Dict]):
+        if not self.ensure_index():
+            raise RuntimeError(f"change log index {self.index_name} unavailable")
+        body: List[Dict] = []
+        for event in events:
+            body.append({"index": {"_index": self.index_name}})
+            body.append(event)
+        # Visible to subscribers before they are rung
+        self.client.bulk(body=body, refresh="wait_for")
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Wait until queued events are written (True) or the timeout passes."""
+        deadline = time.time() + timeout
+        while self._queue.unfinished_tasks and time.time() < deadline:
+            time.sleep(0.01)
+        return not self._queue.unfinished_tasks
+
+    # ------------------------------------------------------------------
+    # Reading
+    # ------------------------------------------------------------------
+
+    def latest_version(self) -> int:
+        """_seq_no of the newest event (-1 when the log is empty or missing)."""
+        try:
+            response = self.client.search(index=self.index_name, body={
+                "query": {"match_all": {}}, "size": 1, "sort": [{"_seq_no": "desc"}],
+                "seq_no_primary_term": True, "_source": False
+            })
+        except NotFoundError:
+            return -1
+        hits = response['hits']['hits']
+        return hits[0]['_seq_no'] if hits else -1
+
+    def changes_since(self, version: int, delivered: Optional[Set[int]] = None) -> Tuple[List[Dict], int]:
+        """
+        Events after a version, oldest first, and the new version.
+
+        Events are written from several processes, so one can become searchable after an
+        event with a higher _seq_no. With ``delivered`` (the versions already returned to
+        the subscriber, kept by the caller) the last REGISTRY_SEQ_NO_OVERLAP versions are
+        read again and only events not delivered yet are returned; the set is updated and
+        pruned to that window.
+        """
+        page_size = max(1, ARISConfig.DOCUMENT_REGISTRY_PAGE_SIZE)
+        overlap = max(0, ARISConfig.REGISTRY_SEQ_NO_OVERLAP) if delivered is not None else 0
+        events: List[Dict] = []
+        search_after = None
+        while True:
+            body = {
+                "query": {"range": {"_seq_no": {"gt": version - overlap}}},
+                "size": page_size, "sort": [{"_seq_no": "asc"}], "seq_no_primary_term": True
+            }
+            if search_after is not None:
+                body["search_after"] = search_after
+            try:
+                response = self.client.search(index=self.index_name, body=body)
+            except NotFoundError:
+                break
+            hits = response['hits']['hits']
+            for hit in hits:
+                if delivered is None or hit['_seq_no'] not in delivered:
+                    events.append({**hit['_source'], 'version': hit['_seq_no']})
+            if len(hits) < page_size:
+                break
+            search_after = hits[-1]['sort']
+        new_version = max([version] + [event['version'] for event in events])
+        if delivered is not None:
+            delivered.update(event['version'] for event in events)
+            delivered.difference_update([v for v in delivered if v <= new_version - overlap])
+        return events, new_version
+
+    def purge(self, retention_days: Optional[int] = None):
+        """Drop events older than the retention (subscribers further behind do a full resync)."""
+        days = retention_days or ARISConfig.CHANGE_FEED_RETENTION_DAYS
+        try:
+            self.client.delete_by_query(
+                index=self.index_name,
+                body={"query": {"range": {"timestamp": {"lt": f"now-{days}d"}}}},
+                params={"conflicts": "proceed"}
+            )
+        except NotFoundError:
+            pass
+        except Exception as e:
+            logger.debug(f"purge: {type(e).__name__}: {e}")
+
+
+_CHANGE_LOGS: Dict[str, RegistryChangeLog] = {}
+_CHANGE_LOGS_LOCK = threading.Lock()
+
+
+def get_change_log(client) -> RegistryChangeLog:
+    """Process-wide change log (one publisher thread per process)."""
+    index_name = ARISConfig.REGISTRY_CHANGE_LOG_INDEX
+    with _CHANGE_LOGS_LOCK:
+        if index_name not in _CHANGE_LOGS:
+            _CHANGE_LOGS[index_name] = RegistryChangeLog(client, index_name)
+        return _CHANGE_LOGS[index_name]
@@ -2,6 +2,7 @@
 S3 Document Storage Service for ARIS RAG System.
 Handles document upload, download, and management in AWS S3.
 """
+import io
 import os
 import boto3
 import logging
@@ -10,6 +11,9 @@ from typing import Optional, Dict, List, Any
 from datetime import datetime
 from dotenv import load_dotenv
 
+from shared.config.settings import ARISConfig
+from shared.utils.s3_service import client_config, delete_prefix_objects, transfer_config
+
 load_dotenv()
 
 logger = logging.getLogger(__name__)
@@ -48,8 +52,11 @@ class S3DocumentStorage:
             's3',
             aws_access_key_id=os.getenv('AWS_OPENSEARCH_ACCESS_KEY_ID'),
             aws_secret_access_key=os.getenv('AWS_OPENSEARCH_SECRET_ACCESS_KEY'),
-            region_name=self.region
+            region_name=self.region,
+            endpoint_url=ARISConfig.AWS_S3_ENDPOINT_URL or None,
+            config=client_config()
         )
+        self.transfer_config = transfer_config()
         
         logger.info(f"S3DocumentStorage initialized: bucket={self.bucket_name}, region={self.region}")
     
@@ -96,12 +103,13 @@ class S3DocumentStorage:
                 s3_metadata[k.replace('_', '-')] = str(v)
         
         try:
-            self.s3_client.put_object(
-                Bucket=self.bucket_name,
-                Key=s3_key,
-                Body=file_content,
-                ContentType=content_type,
-                Metadata=s3_metadata
+            # Transfer manager: parallel multipart upload for large documents
+            self.s3_client.upload_fileobj(
+                io.BytesIO(file_content),
+                self.bucket_name,
+                s3_key,
+                ExtraArgs={'ContentType': content_type, 'Metadata': s3_metadata},
+                Config=self.transfer_config
             )
             
             s3_url = f"s3://{self.bucket_name}/{s3_key}"
@@ -213,20 +221,10 @@ class S3DocumentStorage:
                 self.s3_client.delete_object(Bucket=self.bucket_name, Key=s3_key)
                 logger.info(f"Deleted from S3: {s3_key}")
             else:
-                # Delete all files for this document
+                # Delete all files for this document (every page, in batched DeleteObjects calls)
                 prefix = f"{self.prefix}{document_id}/"
-                response = self.s3_client.list_objects_v2(
-                    Bucket=self.bucket_name,
-                    Prefix=prefix
-                )
-                
-                if 'Contents' in response:
-                    for obj in response['Contents']:
-                        self.s3_client.delete_object(
-                            Bucket=self.bucket_name,
-                            Key=obj['Key']
-                        )
-                        logger.info(f"Deleted from S3: {obj['Key']}")
+                deleted = delete_prefix_objects(self.s3_client, self.bucket_name, prefix)
+                logger.info(f"Deleted {deleted} objects from S3: {prefix}")
             
             return True
             
@@ -1,9 +1,12 @@
 """
 Mock services for testing external dependencies
 """
+from types import SimpleNamespace
 from unittest.mock import MagicMock, Mock
 from typing import List, Dict, Any, Optional
 
+from shared.utils.local_embeddings import LocalHashEmbeddings
+
 
 class MockOpenAIEmbeddings:
     """Mock OpenAI embeddings"""
@@ -21,6 +24,29 @@ class MockOpenAIEmbeddings:
         return [[0.1] * self.dimension for _ in texts]
 
 
+
+class CountingEmbeddings(LocalHashEmbeddings):
+    """Deterministic local embeddings that record every embed_documents batch and embed_query call"""
+    
+    def __init__(self, dim: int = 32, model_name: str = ""):
+        super().__init__(model_name=model_name, dim=dim)
+        self.batches: List[List[str]] = []
+        self.query_calls = 0
+    
+    @property
+    def embedded(self) -> List[str]:
+        """Every text passed to embed_documents, in order"""
+        return [text for batch in self.batches for text in batch]
+    
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.batches.append(list(texts))
+        return super().embed_documents(texts)
+    
+    def embed_query(self, text: str) -> List[float]:
+        self.query_calls += 1
+        return super().embed_query(text)
+
+
 class MockOpenAIClient:
     """Mock OpenAI client"""
     
@@ -65,6 +91,130 @@ class MockOpenSearchClient:
         self.delete = Mock(return_value={"result": "deleted"})
 
 
+
+class FakeOpenSearchIndices:
+    """In-memory indices API: records calls; exists() turns true once the index is created"""
+    
+    def __init__(self, exists: bool = True):
+        self.created = exists
+        self.calls: List[tuple] = []
+    
+    def exists(self, index):
+        return self.created
+    
+    def create(self, index, body):
+        self.created = True
+        self.calls.append(("create", body))
+    
+    def get_settings(self, index):
+        return {index: {"settings": {"index": {
+            "number_of_shards": "1", "refresh_interval": "1s", "number_of_replicas": "1"
+        }}}}
+    
+    def put_settings(self, index, body):
+        self.calls.append(("put_settings", body["index"]))
+    
+    def forcemerge(self, index, max_num_segments, request_timeout=None):
+        self.calls.append(("forcemerge", max_num_segments))
+    
+    def refresh(self, index):
+        self.calls.append(("refresh",))
+
+
+class FakeOpenSearchClient:
+    """
+    In-memory single-shard OpenSearch index: every write gets the next _seq_no, search
+    supports _seq_no ranges, sorting on _seq_no or a source field and search_after.
+    Search bodies and the refresh argument of writes are recorded.
+    """
+    
+    def __init__(self, index_exists: bool = True):
+        self.indices = FakeOpenSearchIndices(index_exists)
+        self.docs: Dict[str, tuple] = {}
+        self.seq_no = -1
+        self.searches: List[Dict] = []
+        self.refreshes: List[Any] = []
+    
+    def _write(self, id, source: Dict):
+        self.seq_no += 1
+        self.docs[id if id is not None else f"auto-{self.seq_no}"] = (self.seq_no, source)
+    
+    def _upsert(self, id, body: Dict):
+        """Scripted upsert: replace the fields, keep the stored created_at"""
+        if id in self.docs:
+            created = self.docs[id][1].get("created_at")
+            source = dict(body["script"]["params"]["doc"])
+            if created is not None and "created_at" not in source:
+                source["created_at"] = created
+        else:
+            source = dict(body["upsert"])
+        self._write(id, source)
+    
+    def index(self, index, id, body, refresh=None):
+        self._write(id, dict(body))
+        return {"result": "created"}
+    
+    def update(self, index, id, body, refresh=None, retry_on_conflict=None):
+        self.refreshes.append(refresh)
+        self._upsert(id, body)
+        return {"result": "updated"}
+    
+    def bulk(self, body, refresh=None):
+        """Index and update actions"""
+        self.refreshes.append(refresh)
+        items = []
+        for action, doc in zip(body[::2], body[1::2]):
+            op, meta = next(iter(action.items()))
+            if op == "update":
+                self._upsert(meta["_id"], doc)
+            else:
+                self._write(meta.get("_id"), dict(doc))
+            items.append({op: {"_id": meta.get("_id"), "status": 200}})
+        return {"errors": False, "items": items}
+    
+    def delete(self, index, id, refresh=None):
+        self.seq_no += 1
+        del self.docs[id]
+    
+    def count(self, index):
+        return {"count": len(self.docs)}
+    
+    def create_pit(self, index, params=None):
+        raise RuntimeError("point-in-time not supported")
+    
+    def search(self, index=None, body=None):
+        self.searches.append(body)
+        hits = [
+            {"_id": doc_id, "_seq_no": seq_no, "_source": source}
+            for doc_id, (seq_no, source) in self.docs.items()
+        ]
+        seq_range = body["query"].get("range", {}).get("_seq_no")
+        if seq_range:
+            hits = [hit for hit in hits if hit["_seq_no"] > seq_range["gt"]]
+        field, order = next(iter(body["sort"][0].items()))
+        descending = (order if isinstance(order, str) else order.get("order", "asc")) == "desc"
+        for hit in hits:
+            hit["sort"] = [hit["_seq_no"] if field == "_seq_no" else hit["_source"].get(field)]
+        hits.sort(key=lambda hit: hit["sort"], reverse=descending)
+        if "search_after" in body:
+            after = body["search_after"]
+            hits = [hit for hit in hits if (hit["sort"] < after if descending else hit["sort"] > after)]
+        return {"hits": {"hits": hits[:body["size"]]}}
+
+
+def make_fake_opensearch_store(store_class=None, client: Optional[FakeOpenSearchClient] = None, **attrs):
+    """
+    An OpenSearch store (OpenSearchVectorStore by default) built without connecting:
+    its vectorstore only carries the fake client; attrs are set on the instance.
+    """
+    if store_class is None:
+        from vectorstores.opensearch_store import OpenSearchVectorStore as store_class
+    store = store_class.__new__(store_class)
+    store.vectorstore = SimpleNamespace(client=client or FakeOpenSearchClient())
+    store.__dict__.update(attrs)
+    return store
+
+
 class MockDocumentConverter:
     """Mock Docling DocumentConverter"""
     
@@ -118,6 +268,105 @@ class MockPyMuPDF:
         self.mock_doc.__len__ = Mock(return_value=count)
 
 
+class MockOllamaServer:
+    """
+    Local Ollama stand-in on 127.0.0.1 (/api/tags and a non-streaming /api/generate).
+    
+    Each generate call answers "image <sha256 of the image>" after `delay` seconds
+    (callable per request for out-of-order completion) and records the peak number
+    of requests in flight. Use as a context manager; `url` is the server URL.
+    """
+    
+    def __init__(self, model: str = "llava:latest", delay=0.0, fail_images: Optional[set] = None):
+        import threading
+        
+        self.model = model
+        self.delay = delay
+        self.fail_images = fail_images or set()
+        self.generate_calls = 0
+        self.max_in_flight = 0
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+    
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+    
+    @staticmethod
+    def image_text(image_b64: str) -> str:
+        import base64
+        import hashlib
+        
+        return f"image {hashlib.sha256(base64.b64decode(image_b64)).hexdigest()}"
+    
+    def _generate(self, payload: Dict[str, Any]):
+        import time
+        
+        with self._lock:
+            self.generate_calls += 1
+            self._in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self._in_flight)
+            call = self.generate_calls
+        try:
+            time.sleep(self.delay(call) if callable(self.delay) else self.delay)
+            text = self.image_text(payload["images"][0])
+            if text in self.fail_images:
+                return 500, {"error": "model crashed"}
+            return 200, {"model": payload.get("model"), "response": text, "done": True}
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+    
+    def __enter__(self):
+        import json
+        import threading
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        
+        mock = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            
+            def _reply(self, status: int, body: Dict[str, Any]):
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+            
+            def do_GET(self):
+                if self.path == "/api/tags":
+                    self._reply(200, {"models": [{"name": mock.model}]})
+                else:
+                    self._reply(404, {"error": "not found"})
+            
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length) or b"{}")
+                if self.path == "/api/generate":
+                    self._reply(*mock._generate(payload))
+                else:
+                    self._reply(404, {"error": "not found"})
+            
+            def log_message(self, format, *args):
+                pass
+        
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+    
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+        return False
+
+
 def create_mock_service_container(
     vector_store_type: str = "faiss",
     embedding_model: str = "text-embedding-3-small"
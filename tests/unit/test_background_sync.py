@@ -0,0 +1,69 @@
+"""
+Unit tests for background-only sync: jittered scheduling, swapped index map and staleness
+"""
+import json
+
+import pytest
+
+from shared.config.settings import ARISConfig
+from shared.utils import sync_manager as sync_module
+from shared.utils.sync_manager import SyncManager
+
+
+class StubRegistry:
+    client = None
+
+    def list_documents(self, fresh=False):
+        return [{"document_name": "registry.pdf", "text_index": "idx-registry", "status": "success"}]
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    monkeypatch.setattr(SyncManager, "_instances", {})
+    monkeypatch.setattr(sync_module, "DocumentRegistry", StubRegistry)
+    monkeypatch.setattr(ARISConfig, "ENABLE_REGISTRY_CHANGE_FEED", False)
+    monkeypatch.setattr(ARISConfig, "SYNC_INTERVAL_SECONDS", 10.0)
+    monkeypatch.setattr(ARISConfig, "SYNC_JITTER_FRACTION", 0.2)
+    manager = SyncManager("background-test")
+    manager.index_map_path = str(tmp_path / "document_index_map.json")
+    yield manager
+    manager.stop_background_sync()
+
+
+@pytest.mark.unit
+class TestBackgroundSync:
+    """Test scheduling, the read-only cached map and staleness reporting"""
+
+    def test_jittered_delay(self, manager):
+        """Test that pass delays stay within interval ± jitter and are not all equal"""
+        delays = [manager._next_sync_delay() for _ in range(200)]
+        assert all(8.0 <= delay <= 12.0 for delay in delays)
+        assert len(set(delays)) > 1
+
+    def test_cached_map_is_read_only_and_swapped(self, manager):
+        """Test that readers get a read-only view that writers replace instead of mutating"""
+        view = manager.get_cached_index_map()
+        assert dict(view) == {"registry.pdf": "idx-registry"}
+        with pytest.raises(TypeError):
+            view["other.pdf"] = "idx-other"
+
+        assert manager.update_index_map("new.pdf", "idx-new")
+        assert "new.pdf" not in view
+        assert manager.get_cached_index_map()["new.pdf"] == "idx-new"
+        with open(manager.index_map_path) as f:
+            assert json.load(f)["new.pdf"] == "idx-new"
+
+        assert manager.remove_from_index_map("new.pdf")
+        assert not manager.remove_from_index_map("new.pdf")
+
+    def test_staleness_without_sync_work(self, manager, monkeypatch):
+        """Test that staleness is reported from timestamps alone and clears after a background pass"""
+        before = manager.get_sync_staleness()
+        assert before["stale"] and before["last_check_age_seconds"] is None
+
+        manager._sync_pass()
+        monkeypatch.setattr(manager, "_sync_pass", lambda: pytest.fail("staleness must not sync"))
+        monkeypatch.setattr(manager, "sync_index_map", lambda *a, **k: pytest.fail("staleness must not sync"))
+        after = manager.get_sync_staleness()
+        assert not after["stale"] and after["last_check_age_seconds"] < 1
+        assert after["index_map_entries"] == 1
@@ -0,0 +1,148 @@
+"""
+Unit tests for concurrent batch processing and bulk import sources (stubbed parsing and indexing)
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from services.ingestion import bulk_import, processor as processor_module
+from services.ingestion.bulk_import import BulkImportError
+from services.ingestion.engine import IngestionEngine
+from services.ingestion.processor import DocumentProcessor
+from shared.config.settings import ARISConfig
+from shared.schemas import ProcessingResult
+
+
+def fake_parse(file_path, file_content, parser_preference, language):
+    if "unparseable" in file_path:
+        raise ValueError("corrupt file")
+    time.sleep(0.01)
+    return f"parsed:{file_path}"
+
+
+@pytest.fixture
+def batch_processor(monkeypatch):
+    monkeypatch.setattr(processor_module, "_parse_file", fake_parse)
+    monkeypatch.setattr(processor_module, "_parse_pool", lambda workers: ThreadPoolExecutor(max_workers=workers))
+    monkeypatch.setattr(processor_module, "use_shared_layout", lambda: True)
+    monkeypatch.setattr(ARISConfig, "BATCH_PARSE_WORKERS", 2)
+    monkeypatch.setattr(ARISConfig, "BATCH_IO_WORKERS", 3)
+    processor = DocumentProcessor(rag_system=None)
+    calls = []
+    active = {"now": 0, "max": 0}
+    lock = threading.Lock()
+
+    def process_document(file_path, file_name=None, document_id=None, progress_callback=None,
+                         parsed_document=None, **kwargs):
+        with lock:
+            calls.append((file_name, parsed_document))
+            active["now"] += 1
+            active["max"] = max(active["max"], active["now"])
+        try:
+            time.sleep(0.02)
+            if "broken" in file_name:
+                raise RuntimeError("embedding service unavailable")
+            progress_callback("Indexing...", 0.5)
+            return ProcessingResult(document_id=document_id, status="success", document_name=file_name)
+        finally:
+            with lock:
+                active["now"] -= 1
+
+    monkeypatch.setattr(processor, "process_document", process_document)
+    processor.calls = calls
+    processor.active = active
+    return processor
+
+
+@pytest.mark.unit
+class TestConcurrentBatch:
+    """Test ordering, failure isolation and aggregate batch state"""
+
+    def test_results_in_input_order_with_isolated_failures(self, batch_processor):
+        """Test that one failing file does not stop the batch and results keep the input order"""
+        files = [{"path": f"/tmp/{name}", "name": name, "document_id": f"id-{i}"}
+                 for i, name in enumerate(["a.pdf", "broken.pdf", "c.pdf", "d.pdf", "e.pdf", "f.pdf"])]
+        results = batch_processor.process_documents_batch(files, concurrent=True, batch_id="batch-1")
+
+        assert [r.document_name for r in results] == [f["name"] for f in files]
+        assert [r.status for r in results] == ["success", "failed", "success", "success", "success", "success"]
+        assert results[1].document_id == "id-1" and "unavailable" in results[1].error
+        assert batch_processor.active["max"] > 1
+
+        state = batch_processor.get_processing_state("batch-1")
+        assert state["status"] == "success" and state["progress"] == 1.0
+        assert (state["total"], state["parsed"], state["completed"], state["failed"]) == (6, 6, 5, 1)
+
+    def test_parse_failure_falls_back_to_in_process(self, batch_processor):
+        """Test that a file whose parse worker fails is handed over without a parsed document"""
+        files = [{"path": "/tmp/ok.pdf", "name": "ok.pdf"}, {"path": "/tmp/unparseable.pdf", "name": "unparseable.pdf"}]
+        batch_processor.process_documents_batch(files, concurrent=True, batch_id="batch-2")
+        parsed = dict(batch_processor.calls)
+        assert parsed["ok.pdf"] == "parsed:/tmp/ok.pdf"
+        assert parsed["unparseable.pdf"] is None
+
+    def test_indexing_serialized_without_shared_layout(self, batch_processor, monkeypatch):
+        """Test that per-document indexes are indexed one at a time"""
+        monkeypatch.setattr(processor_module, "use_shared_layout", lambda: False)
+        files = [{"path": f"/tmp/{i}.pdf", "name": f"{i}.pdf"} for i in range(5)]
+        results = batch_processor.process_documents_batch(files, concurrent=True)
+        assert all(r.status == "success" for r in results)
+        assert batch_processor.active["max"] == 1
+
+    def test_concurrent_documents_index_one_at_a_time_on_one_engine(self):
+        """Test that workers sharing an engine each get their own token count and index"""
+        engine = IngestionEngine.__new__(IngestionEngine)
+        engine.indexing_lock = threading.RLock()
+        engine.document_index = {}
+        engine.total_tokens = 0
+        engine.opensearch_index = None
+        indexed = []
+
+        def process_documents(texts, metadatas, progress_callback=None, index_name=None):
+            target = engine.opensearch_index
+            for text in texts:
+                time.sleep(0.01)
+                engine.total_tokens += len(text)
+            indexed.append((target, engine.opensearch_index))
+            return len(texts)
+
+        engine.process_documents = process_documents
+
+        def ingest(name, text):
+            with engine.indexing_lock:
+                engine.opensearch_index = f"aris-doc-{name}"
+                return engine.add_documents_incremental([text] * 3, [{"source": name}] * 3)
+
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            stats = list(pool.map(ingest, ["a", "b"], ["xx", "yyyyy"]))
+
+        assert [s["tokens_added"] for s in stats] == [6, 15]
+        assert engine.total_tokens == 21
+        assert all(before == after for before, after in indexed)
+
+
+@pytest.mark.unit
+class TestBulkImportSources:
+    """Test local directory listing and its root restriction"""
+
+    def test_lists_supported_files_under_root(self, tmp_path):
+        """Test that only supported extensions are listed and recursion is opt-in"""
+        (tmp_path / "docs" / "nested").mkdir(parents=True)
+        for name in ["b.pdf", "a.txt", "skip.exe"]:
+            (tmp_path / "docs" / name).write_text("x")
+        (tmp_path / "docs" / "nested" / "c.docx").write_text("x")
+
+        flat = bulk_import.list_local_files("docs", root=str(tmp_path))
+        assert [f["name"] for f in flat] == ["a.txt", "b.pdf"]
+        nested = bulk_import.list_local_files("docs", recursive=True, root=str(tmp_path))
+        assert [f["name"] for f in nested] == ["a.txt", "b.pdf", "c.docx"]
+
+    def test_rejects_paths_outside_root(self, tmp_path):
+        """Test that directories outside the bulk import root are refused"""
+        (tmp_path / "root").mkdir()
+        with pytest.raises(BulkImportError):
+            bulk_import.list_local_files("../", root=str(tmp_path / "root"))
+        with pytest.raises(BulkImportError):
+            bulk_import.list_local_files("/etc", root=str(tmp_path / "root"))
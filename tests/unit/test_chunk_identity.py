@@ -0,0 +1,227 @@
+"""
+Unit tests for content-hash chunk identity and incremental re-ingestion
+"""
+import hashlib
+import re
+from types import SimpleNamespace
+
+import pytest
+from langchain_core.documents import Document
+
+from shared.utils.chunk_identity import (
+    assign_chunk_identities,
+    collapse_near_duplicates,
+    compute_chunk_hash,
+    compute_simhash,
+    diff_chunk_identities,
+    scope_chunk_ids,
+    simhash_distance,
+)
+
+
+@pytest.mark.unit
+class TestChunkIdentity:
+    """Test chunk hashing and diffing"""
+
+    def test_hash_ignores_whitespace_layout(self):
+        """Test that re-flowed text keeps the same hash"""
+        assert compute_chunk_hash("Leave  policy\napplies") == compute_chunk_hash("Leave policy applies ")
+        assert compute_chunk_hash("Leave policy") != compute_chunk_hash("Leave policies")
+
+    def test_assign_sets_metadata_and_unique_ids(self):
+        """Test that repeated text gets distinct but deterministic ids"""
+        chunks = [
+            Document(page_content="Header", metadata={}),
+            Document(page_content="Body", metadata={}),
+            Document(page_content="Header", metadata={}),
+        ]
+        ids = assign_chunk_identities(chunks)
+        assert len(set(ids)) == 3
+        assert ids[2] == f"{ids[0]}-1"
+        assert chunks[0].metadata["chunk_hash"] == chunks[2].metadata["chunk_hash"]
+        assert assign_chunk_identities([Document(page_content=c.page_content) for c in chunks]) == ids
+
+    def test_scoped_ids_differ_per_document(self):
+        """Test that identical chunks of two documents get distinct ids that are stable per document"""
+        ids = assign_chunk_identities([Document(page_content="Shared disclaimer")])
+        first = scope_chunk_ids(ids, "/uploads/Manual-A.pdf")
+        assert first != scope_chunk_ids(ids, "manual-b.pdf")
+        assert first == scope_chunk_ids(ids, "manual-a.pdf")
+        assert first[0].endswith(ids[0])
+
+    def test_diff(self):
+        """Test added/removed/kept classification"""
+        added, removed, kept = diff_chunk_identities(["a", "b", "d"], ["a", "b", "c"])
+        assert added == ["d"]
+        assert removed == ["c"]
+        assert kept == ["a", "b"]
+
+
+_ITEMS = ["press line", "hydraulic pump", "guard rails", "emergency stop", "conveyor belt", "oil filter",
+          "safety valve", "tool drawer", "forklift", "paint booth", "air compressor", "welding station"]
+_BOILERPLATE = " ".join(
+    f"Clause {i}: operators inspect the {item} at the start of every shift and record the result in the maintenance log."
+    for i, item in enumerate(_ITEMS, 1)
+)
+_REVISED = _BOILERPLATE.replace("Clause 7", "Clause 8", 1) + " Revision 2"
+
+
+@pytest.mark.unit
+class TestNearDuplicateCollapse:
+    """Test SimHash signatures and near-duplicate collapsing"""
+
+    def test_simhash_matches_per_bit_reference(self):
+        """Test that the numpy SimHash equals the per-bit vote over shingle hashes (stored hashes stay valid)"""
+        def reference(text):
+            words = re.findall(r"\w+", text.lower())
+            shingles = [" ".join(words[i:i + 3]) for i in range(len(words) - 2)] if len(words) >= 3 else words
+            weights = [0] * 64
+            for shingle in shingles:
+                h = int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+                for bit in range(64):
+                    weights[bit] += 1 if (h >> bit) & 1 else -1
+            return f"{sum(1 << bit for bit in range(64) if weights[bit] > 0):016x}"
+
+        for text in ["", "pump", "two words", _BOILERPLATE, _REVISED]:
+            assert compute_simhash(text) == reference(text)
+
+    def test_simhash_is_close_for_small_edits(self):
+        """Test that a one-word revision stays near and unrelated text stays far"""
+        other = "The hydraulic pump must be bled after replacing the filter cartridge on unit 3."
+        assert simhash_distance(compute_simhash(_BOILERPLATE), compute_simhash(_REVISED)) <= 5
+        assert simhash_distance(compute_simhash(_BOILERPLATE), compute_simhash(other)) > 10
+
+    def test_collapse_keeps_first_and_counts_group(self):
+        """Test that near-duplicates collapse onto the best-ranked chunk"""
+        chunks = [
+            Document(page_content=_BOILERPLATE, metadata={"source": "v2.pdf"}),
+            Document(page_content="Pump maintenance: bleed the line after a filter change.", metadata={}),
+            Document(page_content=_REVISED, metadata={"source": "v1.pdf"}),
+            Document(page_content=_BOILERPLATE, metadata={"source": "v2.pdf"}),
+        ]
+        groups = collapse_near_duplicates(chunks, max_distance=5)
+        assert [(chunk.page_content[:4], size) for chunk, size in groups] == [("Clau", 3), ("Pump", 1)]
+        assert groups[0][0].metadata["source"] == "v2.pdf"
+
+    def test_assign_stores_simhash(self):
+        """Test that ingest-time identity assignment also stores the signature"""
+        chunks = [Document(page_content=_BOILERPLATE, metadata={})]
+        assign_chunk_identities(chunks)
+        assert chunks[0].metadata["simhash"] == compute_simhash(_BOILERPLATE)
+
+
+@pytest.mark.unit
+class TestIncrementalReingest:
+    """Test IngestionEngine._reingest_incrementally against an in-memory store"""
+
+    def _make_store(self, existing):
+        from vectorstores.opensearch_store import OpenSearchVectorStore
+
+        class FakeStore(OpenSearchVectorStore):
+            def __init__(self):
+                self.index_name = "aris-doc-old"
+                self.existing = existing
+                self.added, self.deleted, self.updated = [], [], {}
+
+            def index_exists(self, index_name=None):
+                return True
+
+            def get_chunk_identities(self, source=None, index_name=None):
+                return dict(self.existing)
+
+            def add_documents(self, documents, auto_recreate_on_mismatch=True):
+                self.added.extend(documents)
+
+            def delete_chunks_by_ids(self, chunk_ids, index_name=None):
+                self.deleted.extend(chunk_ids)
+                return len(chunk_ids)
+
+            def update_chunks_metadata(self, updates, index_name=None):
+                self.updated.update(updates)
+                return len(updates)
+
+        return FakeStore()
+
+    def test_only_changed_chunks_are_embedded(self):
+        """Test that unchanged chunks are not re-embedded and shifted pages are updated"""
+        pytest.importorskip("tiktoken")
+        from services.ingestion.engine import IngestionEngine
+
+        old_chunks = [
+            Document(page_content="Intro text", metadata={"source": "doc.pdf", "page": 1}),
+            Document(page_content="Removed section", metadata={"source": "doc.pdf", "page": 2}),
+        ]
+        old_ids = assign_chunk_identities(old_chunks)
+        existing = {
+            chunk_id: {
+                "source": "doc.pdf", "source_key": "doc.pdf", "page": chunk.metadata["page"],
+                "chunk_hash": chunk.metadata["chunk_hash"], "simhash": chunk.metadata["simhash"],
+                "content_type": "text"
+            }
+            for chunk_id, chunk in zip(old_ids, old_chunks)
+        }
+
+        new_chunks = [
+            Document(page_content="New preface", metadata={"source": "doc.pdf", "page": 1}),
+            Document(page_content="Intro text", metadata={"source": "doc.pdf", "page": 2}),
+        ]
+        for chunk, chunk_id in zip(new_chunks, assign_chunk_identities(new_chunks)):
+            chunk.id = chunk_id
+
+        engine = IngestionEngine.__new__(IngestionEngine)
+        engine.vectorstore = self._make_store(existing)
+        synced = engine._reingest_incrementally("aris-doc-old", "doc.pdf", new_chunks)
+
+        store = engine.vectorstore
+        assert synced == 2
+        assert [doc.page_content for doc in store.added] == ["New preface"]
+        assert store.deleted == [old_ids[1]]
+        assert store.updated == {old_ids[0]: {"page": 2}}
+
+    def test_empty_index_falls_back_to_full_ingest(self):
+        """Test that an index without fingerprinted chunks returns None"""
+        pytest.importorskip("tiktoken")
+        from services.ingestion.engine import IngestionEngine
+
+        engine = IngestionEngine.__new__(IngestionEngine)
+        store = self._make_store({})
+        store.count_documents = lambda query=None, index_name=None: 0
+        engine.vectorstore = store
+        assert engine._reingest_incrementally("aris-doc-old", "doc.pdf", []) is None
+
+    def test_bare_ids_are_replaced_by_scoped_ids_once(self):
+        """Test that chunks indexed under bare hash ids are re-added under document-scoped ids and the bare ids deleted"""
+        pytest.importorskip("tiktoken")
+        from services.ingestion.engine import IngestionEngine
+
+        chunks = [Document(page_content="Shared disclaimer", metadata={"source": "doc.pdf", "page": 1})]
+        bare_ids = assign_chunk_identities(chunks)
+        existing = {bare_ids[0]: {"source": "doc.pdf", "page": 1, "chunk_hash": chunks[0].metadata["chunk_hash"]}}
+        chunks[0].id = scope_chunk_ids(bare_ids, "doc.pdf")[0]
+
+        engine = IngestionEngine.__new__(IngestionEngine)
+        engine.vectorstore = self._make_store(existing)
+        engine._reingest_incrementally("aris-doc-old", "doc.pdf", chunks)
+
+        assert [doc.id for doc in engine.vectorstore.added] == [chunks[0].id]
+        assert engine.vectorstore.deleted == bare_ids
+
+    def test_legacy_chunks_deleted_by_exact_source(self):
+        """Test that legacy chunks are deleted with exact term filters, never an analyzed match on the name"""
+        pytest.importorskip("tiktoken")
+        from services.ingestion.engine import IngestionEngine
+
+        queries = []
+        store = self._make_store({})
+        store.count_documents = lambda query=None, index_name=None: 1
+        store.vectorstore = SimpleNamespace(client=SimpleNamespace(
+            delete_by_query=lambda index, body, conflicts: queries.append(body["query"])
+        ))
+        engine = IngestionEngine.__new__(IngestionEngine)
+        engine.vectorstore = store
+        assert engine._reingest_incrementally("aris-doc-old", "Manual A.pdf", []) is None
+
+        clauses = queries[0]["bool"]["should"]
+        assert queries[0]["bool"]["minimum_should_match"] == 1
+        assert {"term": {"metadata.source.keyword": "Manual A.pdf"}} in clauses
+        assert all(set(clause) <= {"term", "terms"} for clause in clauses)
@@ -0,0 +1,70 @@
+"""
+Unit tests for the compiled document-name matcher
+"""
+import pytest
+
+from shared.utils.document_name_matcher import DocumentNameMatcher
+
+
+@pytest.mark.unit
+class TestDocumentNameMatcher:
+    """Test document detection and incremental updates"""
+
+    def test_prefers_most_specific_name(self):
+        """Test that 'VUORMAR MK' wins over 'VUORMAR' when both are mentioned"""
+        matcher = DocumentNameMatcher(["VUORMAR.pdf", "VUORMAR MK.pdf", "EM11_manual.pdf"])
+        assert matcher.match("What is in VUORMAR MK?") == ["VUORMAR MK.pdf"]
+        assert matcher.match("Tell me about vuormar") == ["VUORMAR.pdf"]
+
+    def test_separators_and_extension(self):
+        """Test that underscores, dashes and the extension do not matter"""
+        matcher = DocumentNameMatcher(["EM11_manual.pdf"])
+        assert matcher.match("open the em11 manual please") == ["EM11_manual.pdf"]
+        assert matcher.match("see EM11-manual.pdf page 3") == ["EM11_manual.pdf"]
+
+    def test_all_words_in_any_order(self):
+        """Test the all-significant-words rule for multi-word names"""
+        matcher = DocumentNameMatcher(["Safety Policy 2024.pdf"])
+        assert matcher.match("what does the 2024 policy say about safety") == ["Safety Policy 2024.pdf"]
+        assert matcher.match("what does the policy say") == []
+
+    def test_whole_tokens_only(self):
+        """Test that names are not matched inside longer words"""
+        matcher = DocumentNameMatcher(["MK.pdf"])
+        assert matcher.match("add a bookmark") == []
+
+    def test_incremental_sync(self):
+        """Test that sync applies only the difference and removed names stop matching"""
+        matcher = DocumentNameMatcher(["alpha.pdf", "beta.pdf"])
+        matcher.sync(["beta.pdf", "gamma.pdf"])
+        assert len(matcher) == 2
+        assert matcher.match("alpha and gamma") == ["gamma.pdf"]
+
+    def test_resolve(self):
+        """Test resolving loosely written names to indexed names"""
+        matcher = DocumentNameMatcher(["EM11_manual.pdf"])
+        assert matcher.resolve("em11 manual") == "EM11_manual.pdf"
+        assert matcher.resolve("EM11_manual.pdf") == "EM11_manual.pdf"
+        assert matcher.resolve("unknown.pdf") is None
+
+
+@pytest.mark.unit
+class TestEngineDocumentNameMatcher:
+    """Test that the engine's cached matcher follows edits of document_index_map"""
+
+    def test_in_place_edit_of_same_size_is_picked_up(self, tmp_path):
+        """Test that replacing a name in place (same map, same size) rebuilds the matcher once saved"""
+        from services.retrieval.engine import RetrievalEngine
+
+        engine = RetrievalEngine.__new__(RetrievalEngine)
+        engine.document_index_map = {"alpha.pdf": "idx-a", "beta.pdf": "idx-b"}
+        engine.document_index_map_path = str(tmp_path / "document_index_map.json")
+        assert engine._get_document_name_matcher().match("summarize alpha") == ["alpha.pdf"]
+
+        engine.document_index_map.pop("alpha.pdf")
+        engine.document_index_map["gamma.pdf"] = "idx-g"
+        engine._save_document_index_map()
+
+        matcher = engine._get_document_name_matcher()
+        assert matcher.match("summarize alpha") == []
+        assert matcher.match("summarize gamma") == ["gamma.pdf"]
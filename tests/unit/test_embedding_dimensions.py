@@ -0,0 +1,88 @@
+"""
+Unit tests for shortened (Matryoshka) embedding dimensions and two-stage k-NN
+"""
+import numpy as np
+import pytest
+
+from shared.config.settings import ARISConfig
+from shared.utils import embedding_dimensions
+from shared.utils.embedding_dimensions import TruncatedEmbeddings, truncate_embedding
+from shared.utils.local_embeddings import LocalHashEmbeddings
+from vectorstores import vector_compression
+
+
+@pytest.mark.unit
+class TestEmbeddingDimensions:
+    """Test dimension configuration and truncation"""
+
+    def test_configured_dimension(self, monkeypatch):
+        """Test that EMBEDDING_DIMENSIONS applies to text-embedding-3-* only and 0 means native size"""
+        monkeypatch.setattr(ARISConfig, "EMBEDDING_DIMENSIONS", 0)
+        assert embedding_dimensions.configured_dimension("text-embedding-3-large") == 3072
+        monkeypatch.setattr(ARISConfig, "EMBEDDING_DIMENSIONS", 1024)
+        assert embedding_dimensions.configured_dimension("text-embedding-3-large") == 1024
+        assert embedding_dimensions.configured_dimension("text-embedding-ada-002") == 1536
+
+    def test_local_embeddings_are_prefix_consistent(self):
+        """Test that a shortened local embedding equals the truncated full-size one"""
+        full = LocalHashEmbeddings(model_name="text-embedding-3-small").embed_query("hydraulic pump pressure")
+        short = LocalHashEmbeddings(model_name="text-embedding-3-small", dim=256).embed_query("hydraulic pump pressure")
+        assert len(full) == 1536 and len(short) == 256
+        assert np.allclose(truncate_embedding(full, 256), short, atol=1e-5)
+
+    def test_truncated_embeddings(self):
+        """Test that TruncatedEmbeddings returns unit vectors of the target size and reports it"""
+        truncated = TruncatedEmbeddings(LocalHashEmbeddings(dim=64), 16)
+        vectors = truncated.embed_documents(["a", "b"])
+        assert [len(v) for v in vectors] == [16, 16]
+        assert np.allclose(np.linalg.norm(vectors, axis=1), 1.0)
+        assert embedding_dimensions.embedding_dimension(truncated) == 16
+
+    def test_create_embeddings_without_api_key(self, monkeypatch):
+        """Test that local embeddings are created at the configured dimension"""
+        monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+        monkeypatch.setattr(ARISConfig, "EMBEDDING_DIMENSIONS", 512)
+        embeddings = embedding_dimensions.create_embeddings("text-embedding-3-large")
+        assert len(embeddings.embed_query("valve")) == 512
+
+
+@pytest.mark.unit
+class TestTwoStageIndex:
+    """Test two-stage OpenSearch index bodies, chunk vectors and rescoring"""
+
+    def test_index_body_records_dimensions(self):
+        """Test that _meta records the embedding dimension and model and the k-NN field uses the coarse prefix"""
+        body = vector_compression.opensearch_index_body(
+            1024, "none", coarse_dimensions=256, embedding_model="text-embedding-3-large"
+        )
+        layout = vector_compression.opensearch_index_layout(body["mappings"])
+        assert layout == {
+            "dimension": 256,
+            "full_dimensions": 1024,
+            "embedding_model": "text-embedding-3-large",
+            "two_stage": True,
+            "compression": "none",
+        }
+
+    def test_single_stage_layout_for_old_indexes(self):
+        """Test that indexes without _meta report the k-NN dimension as the embedding dimension"""
+        body = vector_compression.opensearch_index_body(1536, "none")
+        del body["mappings"]["_meta"]
+        layout = vector_compression.opensearch_index_layout(body["mappings"])
+        assert layout["full_dimensions"] == 1536 and layout["two_stage"] is False
+
+    def test_rescore_orders_by_full_vectors(self):
+        """Test that coarse hits are re-ranked by exact distance on the full vectors"""
+        layout = {"dimension": 2, "full_dimensions": 4, "two_stage": True}
+        near = [0.5, 0.5, 0.5, 0.5]
+        far = [0.5, 0.5, -0.5, -0.5]
+        hits = [
+            {"_id": "far", "_score": 1.0, "_source": {"text": "far", **vector_compression.opensearch_vector_values(far, layout)}},
+            {"_id": "near", "_score": 0.9, "_source": {"text": "near", **vector_compression.opensearch_vector_values(near, layout)}},
+        ]
+        assert len(hits[0]["_source"]["vector_field"]) == 2
+
+        ranked = vector_compression.rescore_full_vectors(hits, near, 1)
+        assert [hit["_id"] for hit in ranked] == ["near"]
+        assert ranked[0]["_score"] == pytest.approx(1.0)
+        assert vector_compression.FULL_VECTOR_FIELD not in ranked[0]["_source"]
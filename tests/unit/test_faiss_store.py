@@ -0,0 +1,153 @@
+"""
+Unit tests for the FAISS backend: index types, SQLite docstore, mmap loading and incremental saves
+"""
+import os
+
+import pytest
+
+try:
+    from langchain_core.documents import Document
+except ImportError:
+    from langchain.docstore.document import Document
+
+from shared.config.settings import ARISConfig
+from shared.utils.local_embeddings import LocalHashEmbeddings
+from tests.fixtures.mock_services import CountingEmbeddings
+from vectorstores.faiss_index import DOCSTORE_FILE, FaissIndexFiles, SqliteDocstore
+from vectorstores.vector_store_factory import FAISSVectorStore
+
+
+def _docs(start, count):
+    return [
+        Document(page_content=f"Maintenance step {i}: inspect valve {i} and record pressure.", metadata={"source": "m.pdf", "page": i})
+        for i in range(start, start + count)
+    ]
+
+
+@pytest.mark.unit
+class TestSqliteDocstore:
+    """Test the append-only SQLite docstore"""
+
+    def test_add_search_and_positions(self, tmp_path):
+        """Test that documents keep metadata and positions follow insertion order"""
+        store = SqliteDocstore()
+        store.add({"a": Document(page_content="one", metadata={"page": 1}), "b": Document(page_content="two")})
+        store.attach(str(tmp_path / DOCSTORE_FILE))
+        store.add({"c": Document(page_content="three")})
+
+        reopened = SqliteDocstore(str(tmp_path / DOCSTORE_FILE))
+        assert reopened.positions() == {0: "a", 1: "b", 2: "c"}
+        assert reopened.search("a").metadata == {"page": 1}
+        assert isinstance(reopened.search("missing"), str)
+        with pytest.raises(ValueError):
+            reopened.add({"a": Document(page_content="dup")})
+
+
+@pytest.mark.unit
+class TestFAISSVectorStore:
+    """Test FAISSVectorStore persistence and index types"""
+
+    def test_round_trip_with_incremental_delta(self, tmp_path, monkeypatch):
+        """Test that the second save appends a delta segment and load replays it"""
+        monkeypatch.setattr(ARISConfig, "FAISS_INDEX_TYPE", "hnsw")
+        monkeypatch.setattr(ARISConfig, "FAISS_COMPACT_RATIO", 10.0)
+        path = str(tmp_path / "vs")
+        store = FAISSVectorStore(LocalHashEmbeddings(dim=32)).from_documents(_docs(0, 20))
+        store.save_local(path)
+        store.add_documents(_docs(20, 5))
+        store.save_local(path)
+
+        meta = FaissIndexFiles(path).read_meta()
+        assert meta["index_type"] == "hnsw"
+        assert meta["base_ntotal"] == 20
+        assert meta["deltas"] == ["delta-00001.npy"]
+
+        loaded = FAISSVectorStore(LocalHashEmbeddings(dim=32))
+        loaded.load_local(path)
+        assert loaded.vectorstore.index.ntotal == 25
+        hit = loaded.vectorstore.similarity_search("Maintenance step 22: inspect valve 22 and record pressure.", k=1)[0]
+        assert hit.metadata["page"] == 22
+
+    def test_compaction_rewrites_base(self, tmp_path, monkeypatch):
+        """Test that deltas beyond FAISS_COMPACT_RATIO trigger a full rewrite"""
+        monkeypatch.setattr(ARISConfig, "FAISS_COMPACT_RATIO", 0.25)
+        path = str(tmp_path / "vs")
+        store = FAISSVectorStore(LocalHashEmbeddings(dim=32)).from_documents(_docs(0, 8))
+        store.save_local(path)
+        store.add_documents(_docs(8, 4))
+        store.save_local(path)
+
+        meta = FaissIndexFiles(path).read_meta()
+        assert meta["base_ntotal"] == 12
+        assert meta["deltas"] == []
+
+    def test_mmap_load_then_add(self, tmp_path, monkeypatch):
+        """Test that a memory-mapped index is promoted to RAM before adding, without probe embeddings"""
+        monkeypatch.setattr(ARISConfig, "FAISS_MMAP", True)
+        path = str(tmp_path / "vs")
+        FAISSVectorStore(LocalHashEmbeddings(dim=32)).from_documents(_docs(0, 10)).save_local(path)
+
+        embeddings = CountingEmbeddings(dim=32)
+        loaded = FAISSVectorStore(embeddings)
+        loaded.load_local(path)
+        assert loaded._mmap_loaded
+        loaded.add_documents(_docs(10, 3))
+        loaded.save_local(path)
+
+        assert loaded.vectorstore.index.ntotal == 13
+        assert embeddings.query_calls == 0
+        assert len(SqliteDocstore(os.path.join(path, DOCSTORE_FILE))) == 13
+
+    def test_ivfpq_upgrade(self, tmp_path, monkeypatch):
+        """Test that an IVF-PQ store trains once it reaches FAISS_IVF_TRAIN_SIZE"""
+        monkeypatch.setattr(ARISConfig, "FAISS_INDEX_TYPE", "ivfpq")
+        monkeypatch.setattr(ARISConfig, "FAISS_IVF_TRAIN_SIZE", 300)
+        monkeypatch.setattr(ARISConfig, "FAISS_PQ_M", 8)
+        path = str(tmp_path / "vs")
+        store = FAISSVectorStore(LocalHashEmbeddings(dim=32)).from_documents(_docs(0, 100))
+        assert type(store.vectorstore.index).__name__ == "IndexFlatL2"
+        store.add_documents(_docs(100, 300))
+        assert "IVF" in type(store.vectorstore.index).__name__
+        store.save_local(path)
+
+        loaded = FAISSVectorStore(LocalHashEmbeddings(dim=32))
+        loaded.load_local(path)
+        assert FaissIndexFiles(path).read_meta()["index_type"] == "ivfpq"
+        assert loaded.vectorstore.index.ntotal == 400
+        assert len(loaded.vectorstore.index.reconstruct(0)) == 32
+
+    def test_legacy_directory_is_migrated(self, tmp_path):
+        """Test that a pickle-format directory loads and is rewritten in the new layout"""
+        from langchain_community.vectorstores import FAISS
+
+        path = str(tmp_path / "legacy")
+        FAISS.from_documents(_docs(0, 5), LocalHashEmbeddings(dim=32)).save_local(path)
+        store = FAISSVectorStore(LocalHashEmbeddings(dim=32))
+        store.load_local(path)
+        store.save_local(path)
+
+        assert FaissIndexFiles(path).exists()
+        reloaded = FAISSVectorStore(LocalHashEmbeddings(dim=32))
+        reloaded.load_local(path)
+        assert reloaded.vectorstore.similarity_search("inspect valve 3", k=5)
+
+    def test_unsaved_add_is_dropped_on_reload(self, tmp_path, monkeypatch):
+        """Test that docstore rows of an add that was never saved do not shift later positions"""
+        monkeypatch.setattr(ARISConfig, "FAISS_INDEX_TYPE", "flat")
+        path = str(tmp_path / "vs")
+        store = FAISSVectorStore(LocalHashEmbeddings(dim=32)).from_documents(_docs(0, 5))
+        store.save_local(path)
+        # Crash before save: the docstore row is on disk, the vector is not
+        store.add_documents([Document(page_content="zzz gamma unsaved chunk", metadata={"page": 99})])
+
+        reloaded = FAISSVectorStore(LocalHashEmbeddings(dim=32))
+        reloaded.load_local(path)
+        assert reloaded.vectorstore.index.ntotal == 5
+        assert len(reloaded.vectorstore.index_to_docstore_id) == 5
+
+        reloaded.add_documents(_docs(5, 1))
+        reloaded.save_local(path)
+        hit = reloaded.vectorstore.similarity_search("zzz gamma", k=1)[0]
+        assert hit.page_content != "zzz gamma unsaved chunk"
+        exact = reloaded.vectorstore.similarity_search(_docs(5, 1)[0].page_content, k=1)[0]
+        assert exact.metadata["page"] == 5
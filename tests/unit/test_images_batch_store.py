@@ -0,0 +1,108 @@
+"""
+Unit tests for batched image OCR indexing in OpenSearchImagesStore
+"""
+import pytest
+
+from shared.config.settings import ARISConfig
+from tests.fixtures.mock_services import CountingEmbeddings, make_fake_opensearch_store
+
+
+def _make_store():
+    from vectorstores.opensearch_images_store import OpenSearchImagesStore
+
+    ensured = []
+    return make_fake_opensearch_store(
+        OpenSearchImagesStore,
+        embeddings=CountingEmbeddings(dim=16),
+        index_name="aris-rag-images-index",
+        ensured=ensured,
+        vectorstore=make_fake_opensearch_store(_ensure_index=ensured.append),
+    )
+
+
+@pytest.mark.unit
+class TestImagesBatchStore:
+    """Test OCR dedupe, batched embedding and bulk writes with deterministic ids"""
+
+    def test_duplicate_ocr_embedded_once(self, monkeypatch):
+        """Test that identical OCR texts share one embedding and ids come from _create_image_id"""
+        from opensearchpy import helpers
+
+        written = []
+
+        def fake_bulk(client, actions, chunk_size, max_chunk_bytes, raise_on_error):
+            written.extend(actions)
+            return len(written), []
+
+        monkeypatch.setattr(helpers, "bulk", fake_bulk)
+        monkeypatch.setattr(ARISConfig, "IMAGE_EMBEDDING_BATCH_SIZE", 2)
+        store = _make_store()
+        images = [
+            {"source": "manual.pdf", "image_number": i + 1, "ocr_text": text, "page": i + 1}
+            for i, text in enumerate(["DRAWER 1 wrench", "", "DRAWER 1 wrench", "DRAWER 2 socket", "DRAWER 3 mallet"])
+        ]
+
+        ids = store.store_images_batch(images)
+
+        assert ids == [store._create_image_id("manual.pdf", i, i) for i in range(1, 6)]
+        assert ids[0].startswith("manual_pdf_") and ids[0].endswith("_p1_0_image_1")
+        assert [a["_id"] for a in written] == ids
+        embedded = [text for batch in store.embeddings.batches for text in batch]
+        # "" becomes the "Image 2 from ..." placeholder; the repeated drawer text is embedded once
+        assert len(embedded) == 4
+        assert all(len(batch) <= 2 for batch in store.embeddings.batches)
+        assert written[0]["vector_field"] == written[2]["vector_field"]
+        assert written[0]["metadata"]["content_type"] == "image_ocr"
+        assert written[0]["metadata"]["drawer_references"] == ["1"]
+        assert store.ensured == [16]
+        assert store.vectorstore.vectorstore.client.indices.calls == [("refresh",)]
+
+    def test_ids_unique_across_pages_and_similar_names(self, monkeypatch):
+        """Test that repeated image numbers and names that sanitize alike still get distinct, stable ids"""
+        from opensearchpy import helpers
+
+        monkeypatch.setattr(helpers, "bulk", lambda client, actions, **kwargs: (len(list(actions)), []))
+        images = [
+            {"source": source, "image_number": 1, "ocr_text": f"figure {n}", "page": page}
+            for n, (source, page) in enumerate([
+                ("Manual A.pdf", 1), ("Manual A.pdf", 1), ("Manual A.pdf", 2), ("Manual_A.pdf", 1)
+            ])
+        ]
+        ids = _make_store().store_images_batch(images)
+        assert len(set(ids)) == 4
+        assert _make_store().store_images_batch(images) == ids
+
+    def test_bulk_errors_raise(self, monkeypatch):
+        """Test that per-item bulk failures surface as an error"""
+        from opensearchpy import helpers
+
+        monkeypatch.setattr(helpers, "bulk", lambda client, actions, **kwargs: (0, [{"index": {"error": "boom"}}]))
+        store = _make_store()
+        with pytest.raises(ValueError):
+            store.store_images_batch([{"source": "a.pdf", "image_number": 1, "ocr_text": "x"}])
+
+
+@pytest.mark.unit
+class TestImagesStoreCache:
+    """Test that get_images_store reuses one instance per configuration"""
+
+    def test_store_reused(self, monkeypatch):
+        """Test that the same model/domain/region returns the cached store"""
+        from vectorstores import opensearch_images_store
+
+        created = []
+
+        class StubStore:
+            def __init__(self, embeddings, domain, index_name=None, region=None):
+                created.append(domain)
+
+        monkeypatch.setattr(opensearch_images_store, "OpenSearchImagesStore", StubStore)
+        monkeypatch.setattr(opensearch_images_store, "_store_cache", {})
+        monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+        first = opensearch_images_store.get_images_store("text-embedding-3-small", "dom-a", "us-east-2")
+        second = opensearch_images_store.get_images_store("text-embedding-3-small", "dom-a", "us-east-2")
+        other = opensearch_images_store.get_images_store("text-embedding-3-small", "dom-b", "us-east-2")
+
+        assert first is second
+        assert other is not first
+        assert created == ["dom-a", "dom-b"]
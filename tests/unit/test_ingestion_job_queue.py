@@ -0,0 +1,232 @@
+"""
+Unit tests for the durable ingestion job queue
+"""
+import threading
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from services.ingestion.embedding_cache import PersistentEmbeddings
+from services.ingestion.job_queue import IngestionJobQueue, JobCheckpoint
+from tests.fixtures.mock_services import CountingEmbeddings
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return IngestionJobQueue(str(tmp_path / "jobs.sqlite"), workers=1, max_inflight_bytes=100, max_attempts=2)
+
+
+@pytest.mark.unit
+class TestIngestionJobQueue:
+    """Test claiming, admission, recovery and retry"""
+
+    def test_claims_by_priority(self, queue):
+        """Test that higher-priority jobs are claimed first, then oldest first"""
+        queue.enqueue("low", {}, priority=0)
+        queue.enqueue("high", {}, priority=5)
+        queue.enqueue("low-2", {}, priority=0)
+        claimed = [queue._claim()['job_id'] for _ in range(3)]
+        assert claimed == ["high", "low", "low-2"]
+
+    def test_size_admission(self, queue):
+        """Test that jobs are only admitted within the in-flight byte budget, and an oversized job runs alone"""
+        queue.enqueue("big", {}, size_bytes=80)
+        queue.enqueue("too-big", {}, size_bytes=50)
+        queue.enqueue("small", {}, size_bytes=20)
+        assert queue._claim()['job_id'] == "big"
+        assert queue._claim()['job_id'] == "small"
+        assert queue._claim() is None
+        queue._inflight.clear()
+        assert queue._claim()['job_id'] == "too-big"
+
+    def test_recover_requeues_running_jobs_with_checkpoint(self, queue):
+        """Test that a restart re-queues running jobs and keeps their parse checkpoint"""
+        queue.enqueue("doc", {"file_path": "x"})
+        job = queue._claim()
+        JobCheckpoint(queue, job['job_id']).save_parsed({"text": "parsed"}, images_stored=2)
+
+        restarted = IngestionJobQueue(queue.path, workers=1)
+        assert restarted.recover() == 1
+        job = restarted._claim()
+        checkpoint = JobCheckpoint(restarted, job['job_id'], job['checkpoint'])
+        assert checkpoint.stage == "parsed" and checkpoint.data['images_stored'] == 2
+        assert checkpoint.load_parsed() == {"text": "parsed"}
+
+    def test_workers_retry_then_fail(self, queue, monkeypatch):
+        """Test that a failing job is retried up to max_attempts and then marked failed"""
+        monkeypatch.setattr("services.ingestion.job_queue._RETRY_BACKOFF_SECONDS", 0)
+        calls = []
+        done = threading.Event()
+
+        def handler(payload, checkpoint):
+            calls.append(payload)
+            if len(calls) >= 2:
+                done.set()
+            raise RuntimeError("parser crashed")
+
+        queue.enqueue("doc", {"n": 1})
+        queue.start(handler)
+        try:
+            assert done.wait(timeout=10)
+            deadline = time.time() + 5
+            while queue.get("doc")['status'] != "failed" and time.time() < deadline:
+                time.sleep(0.05)
+        finally:
+            queue.stop()
+        job = queue.get("doc")
+        assert job['status'] == "failed" and job['attempts'] == 2 and "parser crashed" in job['error']
+
+
+@pytest.mark.unit
+class TestEmbeddingCheckpoint:
+    """Test the persistent embedding checkpoint"""
+
+    def test_resumed_job_reuses_embedded_chunks(self, queue):
+        """Test that chunks embedded before a crash are read back instead of re-embedded"""
+        base = CountingEmbeddings(dim=8, model_name="text-embedding-3-small")
+        first = PersistentEmbeddings(base, queue).embed_documents(["alpha", "beta"])
+
+        resumed = PersistentEmbeddings(base, queue).embed_documents(["alpha", "beta", "gamma"])
+        assert base.embedded == ["alpha", "beta", "gamma"]
+        assert np.allclose(resumed[:2], first)
+        assert len(resumed[2]) == 8
+
+    def test_finished_job_drops_its_vectors(self, queue):
+        """Test that a completed job's checkpointed vectors are deleted, except those a running job still uses"""
+        engine = SimpleNamespace(embeddings=CountingEmbeddings(dim=8, model_name="text-embedding-3-small"))
+        queue.attach(engine)
+        embeddings = engine.embeddings
+        queue._current.job_id = "running"
+        embeddings.embed_documents(["shared"])
+        queue._current.job_id = "done"
+        embeddings.embed_documents(["shared", "own"])
+        queue._current.job_id = None
+
+        queue._complete("done")
+        assert list(queue.get_vectors([embeddings._key("shared"), embeddings._key("own")])) == [embeddings._key("shared")]
+        queue._complete("running")
+        assert queue.get_vectors([embeddings._key("shared")]) == {}
+
+
+@pytest.mark.unit
+class TestQueueWorkerEngine:
+    """Test that concurrent jobs for different stores each run on their own engine"""
+
+    def test_concurrent_jobs_keep_their_store(self, monkeypatch):
+        """Test that a job is processed by the engine of its store even when another job swaps the global one"""
+        from services.ingestion import main
+
+        class FakeEngine:
+            def __init__(self, vector_store_type, **kwargs):
+                self.vector_store_type = vector_store_type
+                self.__dict__.update(kwargs)
+
+        class FakeProcessor:
+            def __init__(self, engine):
+                self.engine = engine
+
+            def process_document(self, file_name, **kwargs):
+                time.sleep(0.01)
+                seen[file_name] = self.engine.vector_store_type
+                return type("Result", (), {"status": "success"})()
+
+        seen = {}
+        monkeypatch.setattr(main, "IngestionEngine", FakeEngine)
+        monkeypatch.setattr(main, "DocumentProcessor", FakeProcessor)
+        monkeypatch.setattr(main, "engine", None)
+        monkeypatch.setattr(main, "processor", None)
+        monkeypatch.setattr(main, "job_queue", None)
+        get_processor = main.get_processor
+
+        def slow_get_processor():
+            # Widen the window in which another job can swap the global processor
+            time.sleep(0.005)
+            return get_processor()
+
+        monkeypatch.setattr(main, "get_processor", slow_get_processor)
+
+        def run(i):
+            store = "qdrant" if i % 2 else "opensearch"
+            payload = {"file_path": "x", "file_name": f"doc-{i}", "document_id": str(i), "store": {"vector_store_type": store}}
+            main._run_ingest_job(payload, checkpoint=None)
+
+        threads = [threading.Thread(target=run, args=(i,)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert seen == {f"doc-{i}": "qdrant" if i % 2 else "opensearch" for i in range(8)}
+
+    def test_new_jobs_parse_in_the_parse_pool(self, monkeypatch, queue):
+        """Test that a new job is parsed in the parse pool and a resumed job keeps its parse checkpoint"""
+        from concurrent.futures import ThreadPoolExecutor
+        from services.ingestion import main
+
+        handed = {}
+
+        class FakeProcessor:
+            def process_document(self, file_name, parsed_document=None, **kwargs):
+                handed[file_name] = parsed_document
+                return SimpleNamespace(status="success")
+
+        monkeypatch.setattr(main, "_reconfigure_engine_if_needed", lambda **kwargs: FakeProcessor())
+        monkeypatch.setattr(main, "_parse_file", lambda path, content, parser, language: f"parsed:{path}:{language}")
+        resumed = JobCheckpoint(queue, "resumed", {"stage": "parsed"})
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            monkeypatch.setattr(main, "parse_pool", pool)
+            main._run_ingest_job({"file_path": "/tmp/a.pdf", "file_name": "a.pdf", "document_id": "a"}, JobCheckpoint(queue, "a"))
+            main._run_ingest_job({"file_path": "/tmp/b.pdf", "file_name": "b.pdf", "document_id": "b"}, resumed)
+
+        assert handed == {"a.pdf": "parsed:/tmp/a.pdf:eng", "b.pdf": None}
+
+
+@pytest.mark.unit
+class TestBulkBatches:
+    """Test that bulk imports are queued as durable batches"""
+
+    def test_batch_progress_survives_restart_and_cleans_up(self, queue, tmp_path):
+        """Test that batch progress is read from the queue database and the download dir goes with the last job"""
+        download_dir = tmp_path / "batch-1"
+        download_dir.mkdir()
+        jobs = [{'job_id': f"doc-{i}", 'payload': {'file_name': f"{i}.pdf"}, 'size_bytes': 10} for i in range(2)]
+        queue.enqueue_batch("batch-1", jobs, source="s3://bucket/docs", cleanup_dir=str(download_dir))
+
+        queue._complete(queue._claim()['job_id'])
+        restarted = IngestionJobQueue(queue.path, workers=1, max_attempts=1)
+        batch = restarted.get_batch("batch-1")
+        assert batch['status'] == "processing" and batch['completed'] == 1 and batch['queued'] == 1
+        assert download_dir.exists()
+
+        restarted._fail(restarted._claim(), RuntimeError("parser crashed"))
+        batch = restarted.get_batch("batch-1")
+        assert batch['status'] == "success" and batch['progress'] == 1.0
+        assert batch['documents'] == {"0.pdf": "success", "1.pdf": "failed"}
+        assert not download_dir.exists()
+        assert restarted.get_batch("batch-0") is None
+
+    def test_bulk_endpoint_enqueues_one_job_per_file(self, queue, tmp_path, monkeypatch):
+        """Test that /ingest/bulk queues every file of the batch and reports it by /status/{batch_id}"""
+        import asyncio
+        from services.ingestion import main
+        from shared.config.settings import ARISConfig
+
+        docs = tmp_path / "imports" / "docs"
+        docs.mkdir(parents=True)
+        for name in ("a.pdf", "b.txt", "skip.png"):
+            (docs / name).write_text("content")
+        monkeypatch.setattr(ARISConfig, "BULK_IMPORT_ROOT", str(tmp_path / "imports"))
+        monkeypatch.setattr(main, "job_queue", queue)
+
+        response = asyncio.run(main.ingest_bulk(
+            source="docs", parser_preference=None, language="eng", recursive=False,
+            skip_existing=False, priority=3, background_tasks=None, processor=None
+        ))
+        assert response['total'] == 2
+        assert {job['job_id'] for job in queue.list_jobs(status="queued")} == set(response['documents'].values())
+        assert queue._claim()['payload']['file_name'] == "a.pdf"
+
+        processor = SimpleNamespace(get_processing_state=lambda key: None)
+        status = asyncio.run(main.get_processing_status(response['batch_id'], processor=processor))
+        assert status['total'] == 2 and status['running'] == 1 and status['status'] == "processing"
@@ -0,0 +1,82 @@
+"""
+Unit tests for the pipelined LlamaScanParser against a local mock Ollama server
+"""
+import base64
+
+import pytest
+
+from tests.fixtures.mock_services import MockOllamaServer
+
+fitz = pytest.importorskip("fitz")
+
+from services.ingestion.parsers.llama_scan_parser import LlamaScanParser  # noqa: E402
+
+PAGES = 8
+
+
+@pytest.fixture
+def scan_pdf(tmp_path):
+    path = tmp_path / "scan.pdf"
+    doc = fitz.open()
+    for page_num in range(1, PAGES + 1):
+        page = doc.new_page(width=200, height=200)
+        page.insert_text((20, 100), f"Inspection sheet page {page_num}")
+    doc.save(str(path))
+    doc.close()
+    return str(path)
+
+
+@pytest.fixture
+def make_parser(tmp_path, monkeypatch):
+    def make(server, concurrency=4):
+        monkeypatch.setenv("LLAMA_SCAN_CONCURRENCY", str(concurrency))
+        monkeypatch.setenv("LLAMA_SCAN_CACHE_DIR", str(tmp_path / "cache"))
+        return LlamaScanParser(server_url=server.url, width=120)
+    return make
+
+
+def expected_texts(parser, path):
+    doc = fitz.open(path)
+    try:
+        return [
+            MockOllamaServer.image_text(base64.b64encode(parser._render_page(doc, n)).decode())
+            for n in range(1, PAGES + 1)
+        ]
+    finally:
+        doc.close()
+
+
+@pytest.mark.unit
+class TestLlamaScanPipeline:
+    """Test concurrent requests, page-order reassembly and the page-image cache"""
+
+    def test_concurrent_requests_reassembled_in_page_order(self, scan_pdf, make_parser):
+        """Test that pages are sent concurrently, finish out of order and come back in page order"""
+        # Earlier requests take longer, so responses complete in reverse
+        with MockOllamaServer(delay=lambda call: max(0.0, 0.2 - 0.02 * call)) as server:
+            parser = make_parser(server)
+            parsed = parser.parse(scan_pdf)
+
+        assert server.max_in_flight > 1
+        blocks = parsed.metadata["page_blocks"]
+        assert [block["page"] for block in blocks] == list(range(1, PAGES + 1))
+        assert [block["text"] for block in blocks] == expected_texts(parser, scan_pdf)
+        assert parsed.extraction_percentage == 1.0
+
+    def test_repeated_pages_served_from_cache(self, scan_pdf, make_parser):
+        """Test that a second parse of the same scan sends no page to Ollama"""
+        with MockOllamaServer() as server:
+            make_parser(server).parse(scan_pdf)
+            assert server.generate_calls == PAGES
+            again = make_parser(server).parse(scan_pdf)
+            assert server.generate_calls == PAGES
+        assert len(again.metadata["page_blocks"]) == PAGES
+
+    def test_page_failure_fails_the_parse(self, scan_pdf, make_parser, monkeypatch):
+        """Test that a failed page request raises instead of dropping the page"""
+        monkeypatch.setenv("LLAMA_SCAN_OLLAMA_RETRIES", "0")
+        with MockOllamaServer() as server:
+            parser = make_parser(server, concurrency=2)
+            server.fail_images = {expected_texts(parser, scan_pdf)[3]}
+            with pytest.raises(ValueError, match="500"):
+                parser.parse(scan_pdf)
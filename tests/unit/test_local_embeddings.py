@@ -0,0 +1,48 @@
+"""
+Unit tests for the batched LocalHashEmbeddings modes
+"""
+import hashlib
+
+import numpy as np
+import pytest
+
+from shared.utils.local_embeddings import LocalHashEmbeddings
+
+
+@pytest.mark.unit
+class TestLocalHashEmbeddings:
+    """Test batch generation, feature hashing and the legacy vectors"""
+
+    def test_batch_matches_single_queries(self):
+        """Test that a batch yields the same unit vectors as embedding each text alone"""
+        embeddings = LocalHashEmbeddings(dim=96)
+        texts = ["pump", "valve", "", "pump"]
+        batch = np.array(embeddings.embed_documents(texts))
+        single = np.array([embeddings.embed_query(t) for t in texts])
+        assert batch.shape == (4, 96)
+        assert np.allclose(batch, single)
+        assert np.allclose(np.linalg.norm(batch, axis=1), 1.0)
+        assert np.allclose(batch[0], batch[3]) and not np.allclose(batch[0], batch[1])
+
+    def test_features_carry_lexical_similarity(self):
+        """Test that feature-hashed texts sharing n-grams score higher than unrelated ones"""
+        embeddings = LocalHashEmbeddings(dim=512, mode="features", ngrams=2)
+        query, related, unrelated = np.array(embeddings.embed_documents([
+            "inspect the hydraulic valve",
+            "hydraulic valve inspection schedule",
+            "quarterly revenue report",
+        ]))
+        assert query @ related > 0.3
+        assert abs(query @ unrelated) < 0.2
+
+    def test_legacy_mode_keeps_previous_vectors(self):
+        """Test that legacy mode reproduces the per-text RNG vectors of existing indexes"""
+        seed = int.from_bytes(hashlib.sha256(b"valve").digest()[:8], "big", signed=False)
+        expected = np.random.default_rng(seed).standard_normal(16, dtype=np.float32)
+        expected /= np.linalg.norm(expected)
+        assert LocalHashEmbeddings(dim=16, mode="legacy").embed_query("valve") == expected.tolist()
+
+    def test_legacy_is_the_default_mode(self):
+        """Test that the default and a typo in LOCAL_EMBEDDINGS_MODE both yield the legacy vectors"""
+        assert LocalHashEmbeddings(dim=8).mode == "legacy"
+        assert LocalHashEmbeddings(dim=8, mode="sparse").mode == "legacy"
@@ -0,0 +1,105 @@
+"""
+Unit tests for search_after based occurrence search
+"""
+import pytest
+
+from services.retrieval.search.retriever import (
+    SearchMixin,
+    _HL_POST,
+    _HL_PRE,
+    _spans_from_highlight,
+)
+
+
+def _hl(text):
+    return f"{_HL_PRE}{text}{_HL_POST}"
+
+
+class FakeClient:
+    """Serves pre-built pages of hits and records the search bodies it receives."""
+
+    def __init__(self, pages, pit=True):
+        self.pages = list(pages)
+        self.pit = pit
+        self.bodies = []
+        self.deleted_pits = []
+
+    def create_pit(self, index, params=None):
+        if not self.pit:
+            raise RuntimeError("PIT not supported")
+        return {"pit_id": "pit-1"}
+
+    def delete_pit(self, body=None):
+        self.deleted_pits.append(body)
+
+    def search(self, body, index=None):
+        self.bodies.append(body)
+        hits = self.pages.pop(0) if self.pages else []
+        return {"hits": {"hits": hits}}
+
+
+class FakeSearcher(SearchMixin):
+    def __init__(self, client):
+        store = type("Store", (), {})()
+        store.vectorstore = type("LC", (), {"client": client})()
+        manager = type("Manager", (), {"get_or_create_index_store": lambda _self, name: store})()
+        self.multi_index_manager = manager
+        self.active_sources = ["manual.pdf"]
+        self.document_index_map = {"manual.pdf": "aris-doc-1"}
+        self.vector_store_type = "opensearch"
+
+
+def _hit(n, highlighted, page):
+    return {
+        "_id": str(n),
+        "sort": [n],
+        "_source": {"metadata": {"source": "manual.pdf", "page": page}},
+        "highlight": {"text": [highlighted]},
+    }
+
+
+@pytest.mark.unit
+class TestOccurrenceSearch:
+    """Test highlight offsets and search_after paging"""
+
+    def test_spans_merge_phrase_terms(self):
+        """Test that adjacent highlighted phrase terms become one span"""
+        text, spans = _spans_from_highlight(f"The {_hl('leave')} {_hl('policy')} and {_hl('leave')}.")
+        assert text == "The leave policy and leave."
+        assert [text[s:e] for s, e in spans] == ["leave policy", "leave"]
+
+    def test_pages_with_search_after_and_pit(self, monkeypatch):
+        """Test that pages are fetched with search_after inside a PIT and the PIT is released"""
+        monkeypatch.setenv("OCCURRENCE_SEARCH_PAGE_SIZE", "2")
+        client = FakeClient([
+            [_hit(1, f"a {_hl('pump')}", 1), _hit(2, f"{_hl('pump')} b {_hl('pump')}", 2)],
+            [_hit(3, f"c {_hl('pump')}", 3)],
+        ])
+        searcher = FakeSearcher(client)
+        occurrences = list(searcher.iter_occurrences("pump"))
+
+        assert [o["page"] for o in occurrences] == [1, 2, 2, 3]
+        assert "from" not in client.bodies[0]
+        assert client.bodies[1]["search_after"] == [2]
+        assert client.bodies[0]["pit"]["id"] == "pit-1"
+        assert client.deleted_pits == [{"pit_id": ["pit-1"]}]
+        assert searcher._occurrence_scan_truncated is False
+
+    def test_time_budget_truncates(self):
+        """Test that an exhausted time budget stops the scan and flags truncation"""
+        client = FakeClient([[_hit(1, _hl("pump"), 1)]], pit=False)
+        searcher = FakeSearcher(client)
+        assert list(searcher.iter_occurrences("pump", time_budget=0)) == []
+        assert searcher._occurrence_scan_truncated is True
+        assert client.bodies == []
+
+    def test_without_pit_pages_by_id_and_keeps_unhighlighted_hits(self, monkeypatch):
+        """Test that plain search_after sorts by _id and a hit without highlight falls back to its text"""
+        monkeypatch.setenv("OCCURRENCE_SEARCH_PAGE_SIZE", "2")
+        plain = {"_id": "2", "sort": ["2"], "_source": {"metadata": {"source": "manual.pdf", "page": 2}, "text": "check the pump"}}
+        client = FakeClient([[_hit(1, f"a {_hl('pump')}", 1), plain]], pit=False)
+        occurrences = list(FakeSearcher(client).iter_occurrences("pump"))
+
+        assert [o["page"] for o in occurrences] == [1, 2]
+        assert client.bodies[0]["sort"] == [{"_id": "asc"}]
+        assert "text" in client.bodies[0]["_source"] and "pit" not in client.bodies[0]
@@ -0,0 +1,112 @@
+"""
+Unit tests for OpenSearch bulk-ingest mode
+"""
+import pytest
+
+try:
+    from langchain_core.documents import Document
+except ImportError:
+    from langchain.docstore.document import Document
+
+from shared.config.settings import ARISConfig
+from shared.utils.local_embeddings import LocalHashEmbeddings
+from tests.fixtures.mock_services import FakeOpenSearchClient, make_fake_opensearch_store
+
+
+def _make_store():
+    return make_fake_opensearch_store(
+        client=FakeOpenSearchClient(index_exists=False),
+        embeddings=LocalHashEmbeddings(dim=16),
+        index_name="aris-doc-manual",
+        _bulk_state=None,
+    )
+
+
+@pytest.mark.unit
+class TestOpenSearchBulkIngest:
+    """Test the bulk-ingest context and parallel_bulk streaming"""
+
+    def test_settings_toggled_and_restored(self, monkeypatch):
+        """Test that refresh/replicas are disabled during ingest, restored after, with one refresh"""
+        from opensearchpy import helpers
+
+        indexed = []
+
+        def fake_parallel_bulk(client, actions, thread_count, chunk_size, max_chunk_bytes, raise_on_error):
+            for action in actions:
+                indexed.append(action)
+                yield True, {"index": {"_id": action["_id"]}}
+
+        monkeypatch.setattr(helpers, "parallel_bulk", fake_parallel_bulk)
+        monkeypatch.setattr(ARISConfig, "EMBEDDING_BATCH_SIZE", 2)
+        store = _make_store()
+        docs = [Document(page_content=f"chunk {i}", metadata={"source": "m.pdf"}, id=f"id-{i}") for i in range(5)]
+
+        with store.bulk_ingest(force_merge=True):
+            assert store._parallel_bulk_add(docs) == 5
+
+        calls = store.vectorstore.client.indices.calls
+        assert calls[0][0] == "create"
+        assert calls[0][1]["mappings"]["properties"]["vector_field"]["dimension"] == 16
+        assert calls[1] == ("put_settings", {"refresh_interval": "-1", "number_of_replicas": 0})
+        assert calls[2:] == [
+            ("put_settings", {"refresh_interval": "1s", "number_of_replicas": "1"}),
+            ("forcemerge", ARISConfig.OPENSEARCH_FORCE_MERGE_SEGMENTS),
+            ("refresh",),
+        ]
+        assert [a["_id"] for a in indexed] == [f"id-{i}" for i in range(5)]
+        assert indexed[0]["text"] == "chunk 0"
+        assert indexed[0]["metadata"] == {"source": "m.pdf"}
+        assert len(indexed[0]["vector_field"]) == 16
+
+    def test_settings_restored_on_failure(self, monkeypatch):
+        """Test that bulk errors raise but the original settings still come back"""
+        from opensearchpy import helpers
+
+        def failing_parallel_bulk(client, actions, **kwargs):
+            for action in actions:
+                yield False, {"index": {"error": "mapper_parsing_exception"}}
+
+        monkeypatch.setattr(helpers, "parallel_bulk", failing_parallel_bulk)
+        store = _make_store()
+        docs = [Document(page_content="chunk", metadata={})]
+
+        with pytest.raises(ValueError):
+            with store.bulk_ingest():
+                store._parallel_bulk_add(docs)
+
+        calls = store.vectorstore.client.indices.calls
+        assert ("put_settings", {"refresh_interval": "1s", "number_of_replicas": "1"}) in calls
+        assert calls[-1] == ("refresh",)
+        assert store._bulk_state is None
+
+    def test_concurrent_ingests_restore_original_settings(self, monkeypatch):
+        """Test that overlapping bulk ingests into one index apply the settings once and the last one restores them"""
+        from opensearchpy import helpers
+
+        monkeypatch.setattr(
+            helpers, "parallel_bulk",
+            lambda client, actions, **kwargs: ((True, {"index": {"_id": a["_id"]}}) for a in actions)
+        )
+        client = FakeOpenSearchClient(index_exists=False)
+        first, second = (
+            make_fake_opensearch_store(client=client, embeddings=LocalHashEmbeddings(dim=16),
+                                       index_name="aris-chunks", _bulk_state=None)
+            for _ in range(2)
+        )
+        docs = [Document(page_content="chunk", metadata={})]
+
+        with first.bulk_ingest():
+            first._parallel_bulk_add(docs)
+            with second.bulk_ingest():
+                second._parallel_bulk_add(docs)
+            first._parallel_bulk_add(docs)
+            # The second ingest finished while the first still runs: settings stay in bulk mode
+            assert [c for c in client.indices.calls if c[0] == "put_settings"] == [
+                ("put_settings", {"refresh_interval": "-1", "number_of_replicas": 0})
+            ]
+
+        assert [c for c in client.indices.calls if c[0] == "put_settings"][-1] == (
+            "put_settings", {"refresh_interval": "1s", "number_of_replicas": "1"}
+        )
+        assert client.indices.calls.count(("refresh",)) == 2
@@ -0,0 +1,117 @@
+"""
+Unit tests for the content-addressed page store (SQLite in tmp_path, local embeddings)
+"""
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+
+from services.ingestion.embedding_cache import PersistentEmbeddings
+from services.ingestion.engine import IngestionEngine
+from services.ingestion.job_queue import IngestionJobQueue
+from services.ingestion.page_store import PageStore, page_key
+from shared.utils.local_embeddings import LocalHashEmbeddings
+from tests.fixtures.mock_services import CountingEmbeddings
+
+RecursiveCharacterTextSplitter = pytest.importorskip("langchain_text_splitters").RecursiveCharacterTextSplitter
+
+
+def manual(revision: int, changed_pages=()):
+    pages = []
+    for page in range(1, 11):
+        text = " ".join(
+            f"Section {page}.{line}: the operator checks valve {line} and records the pressure reading."
+            for line in range(12)
+        )
+        if page in changed_pages:
+            text += f" Revised in revision {revision}."
+        pages.append(Document(page_content=text, metadata={"source": f"manual-r{revision}.pdf", "page": page}))
+    return pages
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = IngestionEngine.__new__(IngestionEngine)
+    engine.embeddings = CountingEmbeddings(dim=64, model_name="text-embedding-3-small")
+    engine.page_store = None
+    PageStore(str(tmp_path / "pages.sqlite")).attach(engine)
+    return engine
+
+
+@pytest.mark.unit
+class TestPageStore:
+    """Test page reuse across documents and embedding reuse"""
+
+    def test_unchanged_pages_reuse_chunks_and_vectors(self, engine):
+        """Test that a revision with one changed page out of ten embeds only that page's chunks"""
+        splitter = RecursiveCharacterTextSplitter(chunk_size=300, chunk_overlap=30, add_start_index=True)
+        base = engine.embeddings.base
+
+        first = engine._split_with_page_store(splitter, manual(1))
+        engine.embeddings.embed_documents([chunk.page_content for chunk in first])
+        first_calls = len(base.embedded)
+        assert first_calls == len(first)
+
+        revision = engine._split_with_page_store(splitter, manual(2, changed_pages={7}))
+        engine.embeddings.embed_documents([chunk.page_content for chunk in revision])
+        revision_calls = len(base.embedded) - first_calls
+        assert 0 < revision_calls <= len(revision) * 0.2
+
+        # Reused chunks are identical to a fresh split but carry the new document's metadata
+        fresh = splitter.split_documents(manual(2, changed_pages={7}))
+        assert [c.page_content for c in revision] == [c.page_content for c in fresh]
+        assert [c.metadata["start_index"] for c in revision] == [c.metadata["start_index"] for c in fresh]
+        assert {c.metadata["source"] for c in revision} == {"manual-r2.pdf"}
+
+    def test_page_key_depends_on_chunking(self):
+        """Test that whitespace layout does not change a page key but the chunking fingerprint does"""
+        assert page_key("Torque  the bolts\nto 40 Nm", "a") == page_key("Torque the bolts to 40 Nm ", "a")
+        assert page_key("Torque the bolts to 40 Nm", "a") != page_key("Torque the bolts to 40 Nm", "b")
+
+    def test_vectors_round_trip_and_attach_once(self, engine):
+        """Test that stored vectors are served unchanged and the engine is wrapped only once"""
+        wrapped = engine.embeddings
+        vectors = wrapped.embed_documents(["alpha", "beta"])
+        assert np.allclose(wrapped.embed_documents(["beta", "alpha"]), [vectors[1], vectors[0]], atol=1e-6)
+        assert len(wrapped.base.embedded) == 2
+
+        engine.page_store.attach(engine)
+        assert engine.embeddings is wrapped and isinstance(wrapped, PersistentEmbeddings)
+        assert engine.page_store.stats()["vectors"] == 2
+
+    def test_job_queue_shares_the_page_store_cache(self, engine, tmp_path):
+        """Test that with the job queue attached vectors are stored once, in the page store"""
+        queue = IngestionJobQueue(str(tmp_path / "jobs.sqlite"), workers=1)
+        queue.attach(engine)
+        wrapped = engine.embeddings
+        assert wrapped.store is engine.page_store and wrapped.listeners == [queue.record_job_keys]
+
+        queue._current.job_id = "job-1"
+        wrapped.embed_documents(["alpha", "beta"])
+        queue._current.job_id = None
+        assert engine.page_store.stats()["vectors"] == 2
+        assert queue.get_vectors([wrapped._key("alpha"), wrapped._key("beta")]) == {}
+        assert queue._conn.execute("SELECT COUNT(*) FROM job_embeddings WHERE job_id = 'job-1'").fetchone()[0] == 2
+
+    def test_reconfigured_engine_keeps_page_store(self, tmp_path, monkeypatch):
+        """Test that an engine rebuilt for another vector store gets the page store attached again"""
+        from services.ingestion import main
+
+        class FakeEngine:
+            def __init__(self, vector_store_type, **kwargs):
+                self.vector_store_type = vector_store_type
+                self.__dict__.update(kwargs)
+                self.embeddings = LocalHashEmbeddings(dim=8)
+                self.page_store = None
+
+        store = PageStore(str(tmp_path / "shared.sqlite"))
+        monkeypatch.setattr(main, "IngestionEngine", FakeEngine)
+        monkeypatch.setattr(main, "DocumentProcessor", lambda engine: engine)
+        monkeypatch.setattr(main, "engine", None)
+        monkeypatch.setattr(main, "processor", None)
+        monkeypatch.setattr(main, "job_queue", None)
+        monkeypatch.setattr(main, "page_store", store)
+
+        for store_type in ("opensearch", "qdrant"):
+            rebuilt = main._reconfigure_engine_if_needed(vector_store_type=store_type)
+            assert rebuilt.vector_store_type == store_type
+            assert rebuilt.page_store is store and isinstance(rebuilt.embeddings, PersistentEmbeddings)
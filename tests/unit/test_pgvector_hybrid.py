@@ -0,0 +1,145 @@
+"""
+Unit tests for PGVector native hybrid search SQL, schema migration and the pooled engine
+"""
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+import pytest
+
+from vectorstores import pgvector_store
+from vectorstores.pgvector_store import build_hybrid_search_sql, build_metadata_filter_sql
+
+
+@pytest.mark.unit
+class TestPgVectorHybridSql:
+    """Test SQL generation for in-database RRF hybrid search"""
+
+    def test_metadata_filter_translation(self):
+        """Test equality, $eq and $in filters become bound cmetadata predicates"""
+        clause, params = build_metadata_filter_sql({
+            "source": {"$in": ["a.pdf", "b.pdf"]},
+            "language": "spa",
+            "page": {"$eq": 3},
+        })
+        assert clause == (
+            " AND e.cmetadata->>'source' = ANY(:filter_0)"
+            " AND e.cmetadata->>'language' = :filter_1"
+            " AND e.cmetadata->>'page' = :filter_2"
+        )
+        assert params == {"filter_0": ["a.pdf", "b.pdf"], "filter_1": "spa", "filter_2": "3"}
+        assert build_metadata_filter_sql(None) == ("", {})
+
+    def test_metadata_filter_rejects_unsafe_keys(self):
+        """Test that filter keys cannot inject SQL"""
+        with pytest.raises(ValueError):
+            build_metadata_filter_sql({"source'; DROP TABLE x; --": "a"})
+        with pytest.raises(ValueError):
+            build_metadata_filter_sql({"source": {"$regex": "a"}})
+
+    def test_hybrid_sql_uses_both_indexes_and_rrf(self):
+        """Test that the statement orders by the HNSW expression and fuses with a full outer join"""
+        sql, params = build_hybrid_search_sql(384, "english", {"source": "a.pdf"})
+        assert "CAST(e.embedding AS vector(384)) <=> CAST(:query_vector AS vector(384))" in sql
+        assert "@@ query.q" in sql
+        assert "plainto_tsquery('english', :query_text)" in sql
+        assert "FULL OUTER JOIN keyword" in sql
+        assert sql.count("e.cmetadata->>'source' = :filter_0") == 2
+        assert params == {"filter_0": "a.pdf"}
+
+    def test_hybrid_sql_rejects_bad_text_search_config(self):
+        """Test that the text search config is validated as an identifier"""
+        with pytest.raises(ValueError):
+            build_hybrid_search_sql(384, "simple') OR 1=1 --")
+
+
+@pytest.mark.unit
+class TestPgVectorEnginePool:
+    """Test that stores share one pooled engine per connection string"""
+
+    def test_engine_created_once(self, monkeypatch):
+        """Test that repeated lookups reuse the engine and new URLs get their own"""
+        calls = []
+
+        def fake_create_engine(url, **kwargs):
+            calls.append((url, kwargs))
+            return object()
+
+        monkeypatch.setattr(pgvector_store, "create_engine", fake_create_engine)
+        monkeypatch.setattr(pgvector_store, "_engines", {})
+        first = pgvector_store.get_pgvector_engine("postgresql://db/a")
+        second = pgvector_store.get_pgvector_engine("postgresql://db/a")
+        other = pgvector_store.get_pgvector_engine("postgresql://db/b")
+
+        assert first is second
+        assert other is not first
+        assert len(calls) == 2
+        assert calls[0][1]["pool_pre_ping"] is True
+        assert "pool_size" in calls[0][1]
+
+
+class FakePgEngine:
+    """Records executed SQL; the tsvector column exists once a statement added it"""
+
+    def __init__(self, has_column=False):
+        self.has_column = has_column
+        self.statements = []
+
+    @contextmanager
+    def connect(self):
+        yield self
+
+    begin = connect
+
+    def execute(self, statement, params=None):
+        sql = str(statement)
+        self.statements.append(sql)
+        if "ADD COLUMN" in sql:
+            self.has_column = True
+        scalar = 1 if "information_schema" in sql and self.has_column else None
+        return SimpleNamespace(scalar=lambda: scalar)
+
+    def ddl(self):
+        return [sql for sql in self.statements if "information_schema" not in sql]
+
+
+@pytest.fixture
+def fake_pg(monkeypatch):
+    engine = FakePgEngine()
+    monkeypatch.setattr(pgvector_store, "get_pgvector_engine", lambda connection_string: engine)
+    monkeypatch.setattr(pgvector_store, "_tsvector_ready", set())
+    monkeypatch.setattr(pgvector_store, "_hnsw_ready", set())
+    monkeypatch.setattr(pgvector_store.PgVectorStore, "_initialize_vectorstore", lambda self: None)
+    return engine
+
+
+@pytest.mark.unit
+class TestPgVectorHybridSchema:
+    """Test that the tsvector column is a migration and HNSW indexes are created once per dimension"""
+
+    def test_store_creation_runs_no_ddl(self, fake_pg):
+        """Test that building a store neither alters the table nor creates indexes"""
+        pgvector_store.PgVectorStore(embeddings=None, connection_string="postgresql://db/a")
+        assert fake_pg.statements == []
+
+    def test_hybrid_unavailable_until_migrated(self, fake_pg):
+        """Test that a missing tsvector column disables hybrid search without altering the table"""
+        store = pgvector_store.PgVectorStore(embeddings=None, connection_string="postgresql://db/a")
+        assert store.ensure_hybrid_schema(8) is False
+        assert fake_pg.ddl() == []
+
+        assert pgvector_store.migrate_hybrid_schema("postgresql://db/a") is True
+        assert sum("ADD COLUMN" in sql for sql in fake_pg.ddl()) == 1
+        assert pgvector_store.migrate_hybrid_schema("postgresql://db/a") is True
+        assert sum("ADD COLUMN" in sql for sql in fake_pg.ddl()) == 1
+
+    def test_hnsw_index_once_per_dimension(self, fake_pg):
+        """Test that the column check is cached per database and HNSW indexes per dimension"""
+        fake_pg.has_column = True
+        store = pgvector_store.PgVectorStore(embeddings=None, connection_string="postgresql://db/a")
+        assert store.ensure_hybrid_schema() is True
+        assert store.ensure_hybrid_schema(8) and store.ensure_hybrid_schema(8) and store.ensure_hybrid_schema(16)
+
+        checks = [sql for sql in fake_pg.statements if "information_schema" in sql]
+        hnsw = [sql for sql in fake_pg.ddl() if "hnsw" in sql]
+        assert len(checks) == 1
+        assert len(hnsw) == 2 and "vector(8)" in hnsw[0] and "vector(16)" in hnsw[1]
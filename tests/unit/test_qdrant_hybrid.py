@@ -0,0 +1,67 @@
+"""
+Unit tests for Qdrant dense + sparse hybrid search (local in-memory Qdrant)
+"""
+import pytest
+
+try:
+    from langchain_core.documents import Document
+except ImportError:
+    from langchain.docstore.document import Document
+
+pytest.importorskip("qdrant_client")
+
+from tests.fixtures.mock_services import CountingEmbeddings
+from vectorstores.qdrant_store import QdrantStore, hashed_sparse_vector
+
+
+@pytest.fixture
+def store():
+    qdrant = QdrantStore(embeddings=CountingEmbeddings(), url=":memory:", collection_name="test_hybrid")
+    docs = [
+        Document(page_content=f"General maintenance note {i} for the press line.", metadata={"source": "a.pdf", "page": i})
+        for i in range(20)
+    ]
+    docs.append(Document(page_content="Replace gasket XK4471 every 500 hours.", metadata={"source": "b.pdf", "page": 7}))
+    qdrant.add_documents(docs)
+    return qdrant
+
+
+@pytest.mark.unit
+class TestQdrantHybrid:
+    """Test sparse vectors, fusion and query-vector reuse"""
+
+    def test_sparse_vector_weights(self):
+        """Test that repeated terms saturate and queries use unit weights"""
+        indices, values = hashed_sparse_vector("pump pump valve")
+        assert len(indices) == 2 and indices == sorted(indices)
+        assert max(values) > min(values)
+        _, query_values = hashed_sparse_vector("pump pump valve", is_query=True)
+        assert query_values == [1.0, 1.0]
+
+    def test_no_dimension_probe(self, store):
+        """Test that creating the collection and writing never embeds a probe query"""
+        assert store.embeddings.query_calls == 0
+        assert store.count_documents() == 21
+
+    def test_keyword_match_found_by_sparse_side(self, store):
+        """Test that an exact term is surfaced by the sparse prefetch"""
+        results = store.hybrid_search("gasket XK4471", k=3, semantic_weight=0.5, keyword_weight=0.5)
+        assert results[0].page_content.startswith("Replace gasket XK4471")
+        assert "_qdrant_semantic_only" not in results[0].metadata
+
+    def test_precomputed_vector_and_filter(self, store):
+        """Test that a supplied query vector is reused and LangChain-style filters apply"""
+        vector = store.embeddings.embed_documents(["maintenance"])[0]
+        results = store.hybrid_search(
+            "maintenance", query_vector=vector, k=5, semantic_weight=0.5, keyword_weight=0.5,
+            filter={"source": {"$in": ["b.pdf"]}}
+        )
+        assert store.embeddings.query_calls == 0
+        assert {d.metadata["source"] for d in results} == {"b.pdf"}
+
+    def test_stable_point_ids_upsert(self, store):
+        """Test that documents with ids are upserted in place"""
+        doc = Document(page_content="Torque to 40 Nm.", metadata={"source": "c.pdf"}, id="chunk-1")
+        store.add_documents([doc])
+        store.add_documents([doc])
+        assert store.count_documents() == 22
@@ -0,0 +1,130 @@
+"""
+Unit tests for the registry change feed (fake change-log index, doorbell over localhost UDP)
+"""
+import json
+import socket
+import time
+
+import pytest
+
+from shared.config.settings import ARISConfig
+from shared.utils import sync_manager as sync_module
+from shared.utils.sync_manager import SyncManager
+from storage import registry_changes
+from storage.registry_changes import RegistryChangeLog
+from tests.fixtures.mock_services import FakeOpenSearchClient
+
+
+class StubRegistry:
+    def __init__(self, client):
+        self.client = client
+
+    def list_documents(self, fresh=False):
+        return []
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(registry_changes, "_CHANGE_LOGS", {})
+    monkeypatch.setattr(ARISConfig, "DOCUMENT_REGISTRY_PAGE_SIZE", 2)
+    return FakeOpenSearchClient()
+
+
+@pytest.fixture
+def manager(client, tmp_path, monkeypatch):
+    monkeypatch.setattr(SyncManager, "_instances", {})
+    monkeypatch.setattr(sync_module, "DocumentRegistry", lambda: StubRegistry(client))
+    monkeypatch.setattr(ARISConfig, "ENABLE_REGISTRY_CHANGE_FEED", True)
+    manager = SyncManager("feed-test")
+    manager.index_map_path = str(tmp_path / "document_index_map.json")
+    yield manager
+    manager.stop_background_sync()
+
+
+def free_udp_port() -> int:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+@pytest.mark.unit
+class TestRegistryChangeFeed:
+    """Test publishing, delta application and the doorbell"""
+
+    def test_publish_and_read_back(self, client, monkeypatch):
+        """Test that queued events are bulk-written with wait_for and read back in _seq_no order past a version"""
+        monkeypatch.setattr(registry_changes, "peer_addresses", lambda: [])
+        log = RegistryChangeLog(client, "changes")
+        for i in range(5):
+            log.publish('upsert', f"doc-{i}", {"document_name": f"{i}.pdf", "text_index": f"idx-{i}", "status": "success"})
+        assert log.flush()
+        assert set(client.refreshes) == {"wait_for"}
+        assert log.latest_version() == 4
+
+        events, version = log.changes_since(1)
+        assert [event['document_id'] for event in events] == ["doc-2", "doc-3", "doc-4"]
+        assert version == 4
+        assert log.changes_since(4) == ([], 4)
+
+    def test_late_searchable_event_delivered_once(self, client, monkeypatch):
+        """Test that an event searchable only after a higher _seq_no is delivered by the overlap, exactly once"""
+        monkeypatch.setattr(ARISConfig, "REGISTRY_SEQ_NO_OVERLAP", 10)
+        log = RegistryChangeLog(client, "changes")
+        log._write([{"op": "upsert", "document_id": f"doc-{i}"} for i in range(3)])
+        late = client.docs.pop("auto-1")
+        delivered = set()
+
+        events, version = log.changes_since(-1, delivered)
+        assert [event['document_id'] for event in events] == ["doc-0", "doc-2"] and version == 2
+
+        client.docs["auto-1"] = late
+        events, version = log.changes_since(version, delivered)
+        assert [event['document_id'] for event in events] == ["doc-1"] and version == 2
+        assert log.changes_since(version, delivered) == ([], 2)
+
+    def test_apply_changes_swaps_index_map(self, manager, client):
+        """Test that deltas update a copy of the map, skip unfinished documents and keep re-uploaded names"""
+        manager._change_log = RegistryChangeLog(client, "changes")
+        previous = {"old.pdf": "idx-old", "reuploaded.pdf": "idx-new"}
+        manager._cached_index_map = previous
+        manager._index_map_mtime = time.time()
+        notified = []
+        manager.register_sync_callback(notified.append)
+
+        manager._change_log._write([
+            {"op": "upsert", "document_name": "a.pdf", "text_index": "idx-a", "status": "success"},
+            {"op": "upsert", "document_name": "b.pdf", "text_index": "idx-b", "status": "processing"},
+            {"op": "remove", "document_name": "old.pdf", "text_index": "idx-old"},
+            {"op": "remove", "document_name": "reuploaded.pdf", "text_index": "idx-first"},
+        ])
+        result = manager.apply_registry_changes()
+
+        expected = {"a.pdf": "idx-a", "reuploaded.pdf": "idx-new"}
+        assert manager.get_cached_index_map() == expected
+        assert previous == {"old.pdf": "idx-old", "reuploaded.pdf": "idx-new"}
+        with open(manager.index_map_path) as f:
+            assert json.load(f) == expected
+        assert result["registry"] and result["index_map"] and result["version"] == 3
+        assert notified == [result]
+        assert manager.apply_registry_changes() is None
+
+    def test_doorbell_wakes_subscriber(self, manager, client, monkeypatch):
+        """Test that a publish rings the subscriber over UDP well before the safety poll"""
+        port = free_udp_port()
+        monkeypatch.setattr(ARISConfig, "CHANGE_FEED_UDP_PORT", port - len(registry_changes.SERVICE_PORT_OFFSETS))
+        monkeypatch.setattr(ARISConfig, "CHANGE_FEED_SAFETY_POLL_SECONDS", 60)
+        monkeypatch.setattr(registry_changes, "peer_addresses", lambda: [("127.0.0.1", port)])
+
+        manager.start_background_sync()
+        assert manager.change_feed_active and manager._feed_socket is not None
+        assert manager.get_sync_status()["change_feed"]["version"] == -1
+
+        registry_changes.get_change_log(client).publish(
+            'upsert', "doc-1", {"document_name": "manual.pdf", "text_index": "idx-manual", "status": "success"}
+        )
+        deadline = time.time() + 5
+        while "manual.pdf" not in manager.get_cached_index_map() and time.time() < deadline:
+            time.sleep(0.02)
+        assert manager.get_cached_index_map()["manual.pdf"] == "idx-manual"
@@ -0,0 +1,104 @@
+"""
+Unit tests for the document registry snapshot cache and upsert writes (fake OpenSearch client)
+"""
+import pytest
+
+from shared.config.settings import ARISConfig
+from storage import document_registry
+from storage.document_registry import DocumentRegistry
+from tests.fixtures.mock_services import FakeOpenSearchClient
+
+
+@pytest.fixture
+def client(monkeypatch):
+    fake = FakeOpenSearchClient()
+    monkeypatch.setattr(document_registry, "_CLIENTS", {})
+    monkeypatch.setattr(document_registry, "_SNAPSHOTS", {})
+    monkeypatch.setattr(document_registry, "_READY_INDEXES", set())
+    monkeypatch.setattr(DocumentRegistry, "_initialize_client", lambda self: fake)
+    monkeypatch.setattr(ARISConfig, "DOCUMENT_REGISTRY_PAGE_SIZE", 100)
+    monkeypatch.setattr(ARISConfig, "DOCUMENT_REGISTRY_CACHE_TTL_SECONDS", 0)
+    monkeypatch.setattr(ARISConfig, "ENABLE_REGISTRY_CHANGE_FEED", False)
+    monkeypatch.setattr(ARISConfig, "REGISTRY_SEQ_NO_OVERLAP", 2)
+    return fake
+
+
+@pytest.mark.unit
+class TestRegistrySnapshot:
+    """Test complete listings, delta refreshes and the shared client"""
+
+    def test_lists_past_one_page(self, client):
+        """Test that listings page with search_after instead of truncating"""
+        for i in range(250):
+            client.index("registry", f"doc-{i:04d}", {"document_id": f"doc-{i:04d}"})
+        docs = DocumentRegistry().list_documents()
+        assert len(docs) == 250
+        assert len(client.searches) == 3
+
+    def test_refresh_fetches_only_changes(self, client):
+        """Test that a refresh asks for entries above the last _seq_no (less the overlap) and notices remote deletes"""
+        for i in range(5):
+            client.index("registry", f"doc-{i}", {"document_id": f"doc-{i}"})
+        registry = DocumentRegistry()
+        assert len(registry.list_documents()) == 5
+
+        client.index("registry", "doc-9", {"document_id": "doc-9", "status": "completed"})
+        client.searches.clear()
+        docs = {doc['document_id']: doc for doc in registry.list_documents()}
+        assert docs["doc-9"]["status"] == "completed"
+        assert client.searches[0]['query'] == {"range": {"_seq_no": {"gt": 2}}}
+        assert registry.version == 5
+
+        client.delete("registry", "doc-0")
+        assert "doc-0" not in {doc['document_id'] for doc in registry.list_documents()}
+
+    def test_late_searchable_lower_seq_no_is_not_skipped(self, client):
+        """Test that an update searchable only after a higher _seq_no is still picked up by the next delta"""
+        for i in range(3):
+            client.index("registry", f"doc-{i}", {"document_id": f"doc-{i}"})
+        registry = DocumentRegistry()
+        assert len(registry.list_documents()) == 3
+
+        before = client.docs["doc-1"]
+        client.index("registry", "doc-1", {"document_id": "doc-1", "status": "completed"})
+        client.index("registry", "doc-4", {"document_id": "doc-4"})
+        # The doc-1 update (_seq_no 3) is not refreshed yet when doc-4 (_seq_no 4) is read
+        updated, client.docs["doc-1"] = client.docs["doc-1"], before
+        registry.list_documents()
+        assert registry.version == 4
+
+        client.docs["doc-1"] = updated
+        docs = {doc['document_id']: doc for doc in registry.list_documents()}
+        assert docs["doc-1"].get("status") == "completed"
+
+    def test_client_and_snapshot_are_shared(self, client):
+        """Test that registries built per request reuse one client and one snapshot"""
+        first, second = DocumentRegistry(), DocumentRegistry()
+        assert first.client is second.client
+        first.add_document("doc-1", {"document_name": "a.pdf"})
+        assert [doc['document_id'] for doc in second.list_documents()] == ["doc-1"]
+
+
+@pytest.mark.unit
+class TestRegistryWrites:
+    """Test scripted upserts and bulk writes"""
+
+    def test_update_preserves_created_at_without_read(self, client):
+        """Test that re-writing an entry keeps created_at server-side and does not refresh by default"""
+        registry = DocumentRegistry()
+        registry.add_document("doc-1", {"document_name": "a.pdf", "status": "processing"})
+        created = client.docs["doc-1"][1]["created_at"]
+        registry.add_document("doc-1", {"document_name": "a.pdf", "status": "success"}, refresh="wait_for")
+        stored = client.docs["doc-1"][1]
+        assert stored["status"] == "success" and stored["created_at"] == created
+        assert client.refreshes == [False, "wait_for"]
+
+    def test_bulk_upsert(self, client, monkeypatch):
+        """Test that many entries are written in bulk requests and appear in the listing"""
+        monkeypatch.setattr(ARISConfig, "DOCUMENT_REGISTRY_PAGE_SIZE", 10)
+        registry = DocumentRegistry()
+        registry.list_documents()
+        written = registry.add_documents({f"doc-{i:02d}": {"document_name": f"{i}.pdf"} for i in range(25)})
+        assert written == 25
+        assert len(registry.list_documents()) == 25
+        assert all("created_at" in source for _, source in client.docs.values())
@@ -0,0 +1,73 @@
+"""
+Unit tests for S3 uploads and batched prefix deletes (in-memory S3 stand-in)
+"""
+import threading
+
+import pytest
+
+from shared.config.settings import ARISConfig
+from shared.utils import s3_service
+from shared.utils.s3_service import S3Service, delete_prefix_objects
+
+
+class InMemoryS3:
+    """Just enough of the boto3 S3 client for listing and batch deletes."""
+
+    def __init__(self, keys=()):
+        self.objects = {key: b"" for key in keys}
+        self.delete_calls = []
+        self._lock = threading.Lock()
+
+    def get_paginator(self, name):
+        client = self
+
+        class Paginator:
+            def paginate(self, Bucket, Prefix, PaginationConfig=None):
+                keys = sorted(key for key in client.objects if key.startswith(Prefix))
+                size = (PaginationConfig or {}).get('PageSize', 1000)
+                for start in range(0, len(keys), size):
+                    yield {'Contents': [{'Key': key} for key in keys[start:start + size]]}
+
+        return Paginator()
+
+    def delete_objects(self, Bucket, Delete):
+        assert len(Delete['Objects']) <= 1000
+        with self._lock:
+            self.delete_calls.append(len(Delete['Objects']))
+            for obj in Delete['Objects']:
+                self.objects.pop(obj['Key'], None)
+        return {'Deleted': Delete['Objects']}
+
+
+@pytest.mark.unit
+class TestS3Transfers:
+    """Test prefix deletes and upload failures"""
+
+    def test_delete_prefix_batches_of_1000(self):
+        """Test that 2,500 page images are deleted in three DeleteObjects calls and other prefixes are kept"""
+        keys = [f"documents/doc-1/pages/{i:05d}.png" for i in range(2500)]
+        client = InMemoryS3(keys + ["documents/doc-2/report.pdf"])
+        deleted = delete_prefix_objects(client, "bucket", "documents/doc-1/", max_workers=4)
+        assert deleted == 2500
+        assert sorted(client.delete_calls) == [500, 1000, 1000]
+        assert list(client.objects) == ["documents/doc-2/report.pdf"]
+
+    def test_failed_uploads_return_false(self, monkeypatch):
+        """Test that transfer-manager failures are reported, not raised"""
+        from boto3.exceptions import S3UploadFailedError
+
+        class FailingS3(InMemoryS3):
+            def upload_fileobj(self, *args, **kwargs):
+                raise S3UploadFailedError("Failed to upload: AccessDenied")
+
+        monkeypatch.setattr(ARISConfig, "ENABLE_S3_STORAGE", False)
+        service = S3Service(bucket_name="bucket")
+        service.enabled, service.client = True, FailingS3()
+        assert service.upload_bytes(b"pdf", "documents/doc-1/report.pdf") is False
+
+    def test_transfer_config(self, monkeypatch):
+        """Test that the transfer manager uses the configured multipart threshold and concurrency"""
+        monkeypatch.setattr(ARISConfig, "S3_MULTIPART_THRESHOLD_MB", 16)
+        monkeypatch.setattr(ARISConfig, "S3_MAX_CONCURRENCY", 20)
+        config = s3_service.transfer_config()
+        assert config.multipart_threshold == 16 * 1024 * 1024 and config.max_concurrency == 20
@@ -0,0 +1,160 @@
+"""
+Unit tests for the shared (consolidated) OpenSearch chunk index layout
+"""
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+try:
+    from langchain_core.documents import Document
+except ImportError:
+    from langchain.docstore.document import Document
+
+from shared.config.settings import ARISConfig
+from vectorstores import shared_index
+
+
+@pytest.fixture
+def shared_config(monkeypatch):
+    monkeypatch.setattr(ARISConfig, "OPENSEARCH_INDEX_LAYOUT", "shared")
+    monkeypatch.setattr(ARISConfig, "OPENSEARCH_SHARED_INDEX", "aris-chunks")
+    monkeypatch.setattr(ARISConfig, "OPENSEARCH_SHARED_INDEX_PARTITION", "none")
+    monkeypatch.setattr(ARISConfig, "OPENSEARCH_SHARED_INDEX_SHARDS", 6)
+
+
+@pytest.mark.unit
+class TestSharedIndexHelpers:
+    """Test index naming, routing and filter helpers"""
+
+    def test_index_names(self, shared_config, monkeypatch):
+        """Test the shared index name with and without monthly partitions"""
+        assert shared_index.use_shared_layout()
+        assert shared_index.shared_index_name() == "aris-chunks"
+        assert shared_index.shared_search_target() == "aris-chunks"
+
+        monkeypatch.setattr(ARISConfig, "OPENSEARCH_SHARED_INDEX_PARTITION", "month")
+        assert shared_index.shared_index_name(datetime(2026, 3, 9)) == "aris-chunks-2026.03"
+        assert shared_index.shared_search_target() == "aris-chunks-*"
+        assert shared_index.is_shared_index("aris-chunks-2026.03")
+        assert not shared_index.is_shared_index("aris-doc-123")
+        assert not shared_index.is_shared_index(None)
+
+    def test_document_routing_uses_source_key(self, shared_config):
+        """Test that routing is the sorted, de-duplicated source_key of each document"""
+        assert shared_index.document_routing(["/tmp/Manual.PDF"]) == "manual.pdf"
+        assert shared_index.document_routing(["b.pdf", "A.pdf", "dir/b.pdf", None]) == "a.pdf,b.pdf"
+        assert shared_index.document_routing([]) is None
+
+    def test_with_document_filter(self, shared_config):
+        """Test that the source_key clause is ANDed onto an existing filter"""
+        doc_filter = {"term": {"metadata.source_key.keyword": "a.pdf"}}
+        assert shared_index.with_document_filter(None, ["A.pdf"]) == doc_filter
+        assert shared_index.with_document_filter({"term": {"metadata.language": "eng"}}, ["A.pdf"]) == {
+            "bool": {"must": [{"term": {"metadata.language": "eng"}}, doc_filter]}
+        }
+        assert shared_index.with_document_filter({"x": 1}, None) == {"x": 1}
+
+    def test_index_body_requires_routing(self, shared_config):
+        """Test that the shared index mapping requires routing and sets the shard count"""
+        body = shared_index.shared_index_body(384)
+        assert body["mappings"]["_routing"] == {"required": True}
+        assert body["mappings"]["properties"]["vector_field"]["dimension"] == 384
+        assert body["settings"]["index"]["number_of_shards"] == 6
+
+
+class FakeStore:
+    def __init__(self, calls, routing=None):
+        self.calls = calls
+        self.routing = routing
+        self.vectorstore = SimpleNamespace(similarity_search_with_score=self._search)
+
+    def with_routing(self, routing):
+        return FakeStore(self.calls, routing)
+
+    def _search(self, query, k, filter=None):
+        self.calls.append((self.routing, filter))
+        return [(Document(page_content=f"chunk routed to {self.routing}", metadata={}), 1.0)]
+
+
+@pytest.mark.unit
+class TestSharedIndexSearch:
+    """Test that searches over the shared index are routed and filtered"""
+
+    def test_search_across_indexes_dedupes_and_routes(self, shared_config):
+        """Test that documents mapped to the shared index cause one routed, filtered search"""
+        from vectorstores.opensearch_store import OpenSearchMultiIndexManager
+
+        calls = []
+        manager = OpenSearchMultiIndexManager.__new__(OpenSearchMultiIndexManager)
+        manager.get_or_create_index_store = lambda name: FakeStore(calls)
+
+        results = manager.search_across_indexes(
+            "torque", ["aris-chunks", "aris-chunks"], k=5, sources=["A.pdf", "b.pdf"]
+        )
+        assert len(results) == 1
+        assert calls == [("a.pdf,b.pdf", {"terms": {"metadata.source_key.keyword": ["a.pdf", "b.pdf"]}})]
+
+    def test_per_document_indexes_are_not_routed(self, shared_config):
+        """Test that per-document indexes are searched without routing or an extra filter"""
+        from vectorstores.opensearch_store import OpenSearchMultiIndexManager
+
+        calls = []
+        manager = OpenSearchMultiIndexManager.__new__(OpenSearchMultiIndexManager)
+        manager.get_or_create_index_store = lambda name: FakeStore(calls)
+
+        manager.search_across_indexes("torque", ["aris-doc-1"], k=5, sources=["a.pdf"])
+        assert calls == [(None, None)]
+
+    def test_with_routing_copies_langchain_store(self):
+        """Test that with_routing does not mutate the cached store"""
+        from vectorstores.opensearch_store import OpenSearchVectorStore
+
+        store = OpenSearchVectorStore.__new__(OpenSearchVectorStore)
+        store.routing = None
+        store.vectorstore = SimpleNamespace(routing=None)
+
+        scoped = store.with_routing("a.pdf")
+        assert scoped is not store
+        assert scoped.vectorstore.routing == "a.pdf"
+        assert store.routing is None and store.vectorstore.routing is None
+        assert store.with_routing(None) is store
+
+
+class FakeCrudClient:
+    def __init__(self):
+        self.calls = []
+
+    def search(self, index, body):
+        return {"hits": {"hits": [{"_id": body["query"]["ids"]["values"][0], "_routing": "a.pdf"}]}}
+
+    def delete(self, index, id, **kwargs):
+        self.calls.append(("delete", index, kwargs))
+
+
+@pytest.mark.unit
+class TestSharedIndexCrud:
+    """Test by-id CRUD on a routing-required index"""
+
+    def _manager(self):
+        from vectorstores.opensearch_store import OpenSearchCRUDManager
+
+        manager = OpenSearchCRUDManager.__new__(OpenSearchCRUDManager)
+        manager._client = FakeCrudClient()
+        return manager
+
+    def test_delete_chunk_looks_up_routing(self, shared_config):
+        """Test that deleting a chunk in the shared index passes its routing"""
+        manager = self._manager()
+        assert manager.delete_chunk("aris-chunks", "c1")["success"]
+        assert manager.delete_chunk("aris-doc-1", "c2")["success"]
+        assert manager._client.calls == [
+            ("delete", "aris-chunks", {"routing": "a.pdf"}),
+            ("delete", "aris-doc-1", {}),
+        ]
+
+    def test_shared_index_cannot_be_dropped(self, shared_config):
+        """Test that delete_index refuses the shared index"""
+        result = self._manager().delete_index("aris-chunks")
+        assert result["success"] is False
+        assert result["chunks_deleted"] == 0
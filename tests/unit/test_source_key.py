@@ -0,0 +1,55 @@
+"""
+Unit tests for the canonical source_key field and single-term source filters
+"""
+import pytest
+
+try:
+    from langchain_core.documents import Document
+except ImportError:
+    from langchain.docstore.document import Document
+
+from shared.config.settings import ARISConfig
+from shared.utils.source_key import source_key, source_key_filter
+
+
+@pytest.mark.unit
+class TestSourceKey:
+    """Test source normalization and filter construction"""
+
+    def test_normalizes_paths_and_case(self):
+        """Test that paths, backslashes, whitespace and case collapse to one key"""
+        assert source_key("/data/uploads/Manual EM11.PDF") == "manual em11.pdf"
+        assert source_key("C:\\docs\\Manual EM11.pdf ") == "manual em11.pdf"
+        assert source_key("manual em11.pdf") == "manual em11.pdf"
+        assert source_key(None) == ""
+
+    def test_filter_is_single_clause(self):
+        """Test that sources become one term (or terms) clause on the keyword field"""
+        assert source_key_filter(["/x/A.pdf"]) == {"term": {"metadata.source_key.keyword": "a.pdf"}}
+        assert source_key_filter(["A.pdf", "a.pdf", "dir/B.pdf", ""]) == {
+            "terms": {"metadata.source_key.keyword": ["a.pdf", "b.pdf"]}
+        }
+        assert source_key_filter([None, ""]) is None
+
+    def test_chunk_metadata_carries_source_key(self):
+        """Test that OpenSearch metadata cleaning writes source_key next to source"""
+        from vectorstores.opensearch_store import OpenSearchVectorStore
+
+        store = OpenSearchVectorStore.__new__(OpenSearchVectorStore)
+        cleaned = store._clean_metadata_for_opensearch([
+            Document(page_content="text", metadata={"source": "/tmp/Report.PDF", "page": 2})
+        ])
+        assert cleaned[0].metadata["source"] == "/tmp/Report.PDF"
+        assert cleaned[0].metadata["source_key"] == "report.pdf"
+
+    def test_image_filter_uses_source_key(self, monkeypatch):
+        """Test that image source filters collapse to one clause, with the legacy variants behind the flag"""
+        from vectorstores.opensearch_images_store import OpenSearchImagesStore
+
+        store = OpenSearchImagesStore.__new__(OpenSearchImagesStore)
+        monkeypatch.setattr(ARISConfig, "USE_SOURCE_KEY_FILTER", True)
+        assert store._source_clauses(["/a/Doc.pdf", "other.pdf"]) == [
+            {"terms": {"metadata.source_key.keyword": ["doc.pdf", "other.pdf"]}}
+        ]
+        monkeypatch.setattr(ARISConfig, "USE_SOURCE_KEY_FILTER", False)
+        assert len(store._source_clauses(["/a/Doc.pdf"])) == 12
@@ -0,0 +1,60 @@
+"""
+Unit tests for token counting and context budget packing
+"""
+import pytest
+from langchain_core.documents import Document
+
+from shared.utils.tokenizer import count_tokens, get_context_token_budget, get_context_window, pack_documents_by_tokens
+
+
+@pytest.mark.unit
+class TestTokenBudget:
+    """Test the shared token helpers used for context packing"""
+
+    def test_count_tokens(self):
+        """Test that counting handles empty text and special-token strings"""
+        assert count_tokens("") == 0
+        assert count_tokens(None) == 0
+        assert count_tokens("hello world") == 2
+        assert count_tokens("<|endoftext|>") > 0
+
+    def test_budget_respects_window_and_cap(self):
+        """Test that the budget is the window minus output/reserve, capped by the setting"""
+        assert get_context_token_budget("gpt-4o", 2500, 24000) == 24000
+        assert get_context_token_budget("gpt-4", 2500, 24000) == 8192 - 2500 - 1500
+        assert get_context_token_budget("unknown-model", 100000, 24000) == 512
+
+    def test_dated_model_ids_use_their_family_window(self):
+        """Test that snapshot ids match the longest listed prefix and unlisted models assume the cap"""
+        assert get_context_window("gpt-4o-2024-08-06") == 128000
+        assert get_context_window("gpt-4o-mini-2024-07-18") == 128000
+        assert get_context_window("gpt-4-0613") == 8192
+        assert get_context_window("gpt-4.1-nano-2025-04-14") == 1000000
+        assert get_context_window("unknown-model") is None
+        assert get_context_token_budget("gpt-4o-2024-08-06", 2500, 24000) == 24000
+        assert get_context_token_budget("unknown-model", 2500, 24000) == 24000 - 2500 - 1500
+
+    def test_pack_uses_stored_token_count(self):
+        """Test that stored token_count is used and oversized chunks are skipped, not truncated"""
+        docs = [
+            Document(page_content="a", metadata={"token_count": 50}),
+            Document(page_content="b", metadata={"token_count": 500}),
+            Document(page_content="c", metadata={"token_count": 30}),
+        ]
+        kept, used = pack_documents_by_tokens(docs, budget=120, overhead_per_document=0)
+        assert [d.page_content for d in kept] == ["a", "c"]
+        assert used == 80
+
+    def test_pack_always_keeps_top_document(self):
+        """Test that the top-ranked chunk is kept even when it alone exceeds the budget"""
+        docs = [Document(page_content="x", metadata={"token_count": 1000})]
+        kept, _ = pack_documents_by_tokens(docs, budget=10)
+        assert kept == docs
+
+    def test_pack_fills_missing_token_count(self):
+        """Test that chunks without token_count are counted and annotated"""
+        doc = Document(page_content="hello world", metadata={})
+        kept, used = pack_documents_by_tokens([doc], budget=100, overhead_per_document=0)
+        assert kept == [doc]
+        assert used == 2
+        assert doc.metadata["token_count"] == 2
@@ -0,0 +1,64 @@
+"""
+Unit tests for streaming upload spooling
+"""
+import asyncio
+import hashlib
+import io
+import os
+
+import pytest
+
+from services.ingestion import uploads
+from services.ingestion.uploads import UploadTooLarge, spool_upload
+
+
+class FakeUpload:
+    """Minimal async UploadFile stand-in that records read sizes."""
+
+    def __init__(self, data: bytes, filename: str = "manual.pdf", size=None):
+        self._stream = io.BytesIO(data)
+        self.filename = filename
+        self.size = size
+        self.reads = []
+
+    async def read(self, size: int = -1) -> bytes:
+        self.reads.append(size)
+        return self._stream.read(size)
+
+
+@pytest.fixture(autouse=True)
+def spool_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(uploads, "SPOOL_DIR", str(tmp_path / ".spool"))
+    return tmp_path / ".spool"
+
+
+@pytest.mark.unit
+class TestSpoolUpload:
+    """Test chunked spooling, hashing and the size limit"""
+
+    def test_streams_in_chunks_and_hashes(self, tmp_path):
+        """Test that the upload is read in fixed-size chunks and the MD5 matches the content"""
+        data = os.urandom(10_000)
+        upload = FakeUpload(data)
+        spooled = asyncio.run(spool_upload(upload, chunk_size=4096, max_bytes=0))
+        assert spooled.size == len(data) and spooled.md5 == hashlib.md5(data).hexdigest()
+        assert set(upload.reads) == {4096}
+
+        final = spooled.move_to(str(tmp_path / "uploads" / "doc_manual.pdf"))
+        spooled.discard()
+        with open(final, "rb") as f:
+            assert f.read() == data
+
+    def test_rejects_oversized_uploads(self, spool_dir):
+        """Test that the limit applies to the declared size and to streamed bytes, leaving no spool file"""
+        with pytest.raises(UploadTooLarge):
+            asyncio.run(spool_upload(FakeUpload(b"x", size=2048), max_bytes=1024))
+        with pytest.raises(UploadTooLarge):
+            asyncio.run(spool_upload(FakeUpload(b"x" * 3000), chunk_size=1000, max_bytes=2048))
+        assert not any(spool_dir.iterdir())
+
+    def test_discard_removes_unmoved_spool(self):
+        """Test that a duplicate upload's spool file is removed"""
+        spooled = asyncio.run(spool_upload(FakeUpload(b"same content"), max_bytes=0))
+        spooled.discard()
+        assert not os.path.exists(spooled.path)
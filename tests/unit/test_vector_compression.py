@@ -0,0 +1,180 @@
+"""
+Unit tests for reduced-precision vector storage and full-precision rescoring
+"""
+import os
+
+import numpy as np
+import pytest
+
+try:
+    from langchain_core.documents import Document
+except ImportError:
+    from langchain.docstore.document import Document
+
+from shared.config.settings import ARISConfig
+from shared.utils.local_embeddings import LocalHashEmbeddings
+from vectorstores import vector_compression
+from vectorstores.faiss_index import VECTORS_FILE, FullPrecisionVectors, build_faiss_index
+
+
+def _docs(count):
+    return [
+        Document(page_content=f"Maintenance step {i}: inspect valve {i} and record pressure {i * 7}.", metadata={"page": i})
+        for i in range(count)
+    ]
+
+
+@pytest.mark.unit
+class TestOpenSearchCompression:
+    """Test k-NN mappings and rescore clauses per compression mode"""
+
+    @pytest.mark.parametrize("mode", ["none", "fp16", "int8", "on_disk"])
+    def test_mapping_round_trip(self, mode):
+        """Test that the mode of a generated mapping is recognised when read back"""
+        field = vector_compression.opensearch_vector_field(1536, mode)
+        assert field["dimension"] == 1536
+        assert vector_compression.opensearch_mapping_compression(field) == mode
+
+    def test_fp16_uses_faiss_engine(self):
+        """Test that fp16 maps to the faiss engine with an SQ fp16 encoder"""
+        method = vector_compression.opensearch_vector_field(8, "fp16")["method"]
+        assert method["engine"] == "faiss"
+        assert method["parameters"]["encoder"] == {"name": "sq", "parameters": {"type": "fp16"}}
+
+    def test_unknown_mode_falls_back_to_none(self):
+        """Test that a typo in VECTOR_COMPRESSION stores full-precision vectors"""
+        assert vector_compression.compression_mode("fp8") == "none"
+
+    def test_sq_rescore_oversamples_and_rescores(self, monkeypatch):
+        """Test that SQ indexes fetch an oversampled window re-ranked by an exact knn_score script"""
+        monkeypatch.setattr(ARISConfig, "VECTOR_RESCORE", True)
+        monkeypatch.setattr(ARISConfig, "VECTOR_RESCORE_OVERSAMPLE", 3.0)
+        query = {"size": 10, "query": {"knn": {"vector_field": {"vector": [0.1, 0.2], "k": 10}}}}
+        keep = vector_compression.apply_opensearch_rescore(query, [0.1, 0.2], 10, "int8")
+
+        assert keep == 10
+        assert query["size"] == 30 and query["query"]["knn"]["vector_field"]["k"] == 30
+        assert query["rescore"]["window_size"] == 30
+        script = query["rescore"]["query"]["rescore_query"]["script_score"]["script"]
+        assert script["source"] == "knn_score" and script["params"]["query_value"] == [0.1, 0.2]
+
+    def test_on_disk_uses_native_rescore(self, monkeypatch):
+        """Test that on_disk indexes use the k-NN plugin's rescore and uncompressed ones are untouched"""
+        monkeypatch.setattr(ARISConfig, "VECTOR_RESCORE", True)
+        monkeypatch.setattr(ARISConfig, "VECTOR_RESCORE_OVERSAMPLE", 2.0)
+        query = {"size": 10, "query": {"knn": {"vector_field": {"vector": [0.1], "k": 10}}}}
+        vector_compression.apply_opensearch_rescore(query, [0.1], 10, "on_disk")
+        assert query["query"]["knn"]["vector_field"]["rescore"] == {"oversample_factor": 2.0}
+        assert "rescore" not in query
+
+        plain = {"size": 10, "query": {"knn": {"vector_field": {"vector": [0.1], "k": 10}}}}
+        vector_compression.apply_opensearch_rescore(plain, [0.1], 10, "none")
+        assert plain == {"size": 10, "query": {"knn": {"vector_field": {"vector": [0.1], "k": 10}}}}
+
+
+@pytest.mark.unit
+class TestFaissCompression:
+    """Test scalar-quantized FAISS indexes with the float32 side file"""
+
+    def test_index_types(self, monkeypatch):
+        """Test that flat and HNSW indexes use scalar quantizers when compressed"""
+        monkeypatch.setattr(ARISConfig, "VECTOR_COMPRESSION", "int8")
+        assert type(build_faiss_index(16, "flat", ARISConfig)).__name__ == "IndexScalarQuantizer"
+        assert type(build_faiss_index(16, "hnsw", ARISConfig)).__name__ == "IndexHNSWSQ"
+        monkeypatch.setattr(ARISConfig, "VECTOR_COMPRESSION", "none")
+        assert type(build_faiss_index(16, "flat", ARISConfig)).__name__ == "IndexFlatL2"
+
+    def test_full_precision_vectors_attach(self, tmp_path):
+        """Test that vectors added before and after attaching are read back by position"""
+        vectors = FullPrecisionVectors(4)
+        vectors.add(np.eye(4, dtype=np.float32)[:2])
+        vectors.attach(str(tmp_path / VECTORS_FILE))
+        vectors.add(np.eye(4, dtype=np.float32)[2:])
+
+        reopened = FullPrecisionVectors(4, str(tmp_path / VECTORS_FILE))
+        assert len(reopened) == 4
+        assert np.array_equal(reopened.get([3, 0]), np.eye(4, dtype=np.float32)[[3, 0]])
+
+    def test_rescored_search_matches_exact_search(self, monkeypatch, tmp_path):
+        """Test that an int8 index with rescoring returns exact top-k distances, also after save/load"""
+        from vectorstores.vector_store_factory import FAISSVectorStore
+
+        embeddings = LocalHashEmbeddings(dim=32)
+        monkeypatch.setattr(ARISConfig, "FAISS_INDEX_TYPE", "flat")
+        monkeypatch.setattr(ARISConfig, "VECTOR_RESCORE", True)
+        monkeypatch.setattr(ARISConfig, "VECTOR_RESCORE_OVERSAMPLE", 4.0)
+        monkeypatch.setattr(ARISConfig, "VECTOR_COMPRESSION", "none")
+        exact = FAISSVectorStore(embeddings).from_documents(_docs(60))
+        monkeypatch.setattr(ARISConfig, "VECTOR_COMPRESSION", "int8")
+        compressed = FAISSVectorStore(embeddings).from_documents(_docs(60))
+
+        query = "inspect valve 17 pressure"
+        expected = exact.vectorstore.similarity_search_with_score(query, k=5)
+        results = compressed.vectorstore.similarity_search_with_score(query, k=5)
+        assert [d.page_content for d, _ in results] == [d.page_content for d, _ in expected]
+        assert [s for _, s in results] == pytest.approx([s for _, s in expected], rel=1e-5)
+
+        compressed.save_local(str(tmp_path))
+        assert os.path.exists(tmp_path / VECTORS_FILE)
+        loaded = FAISSVectorStore(embeddings)
+        loaded.load_local(str(tmp_path))
+        reloaded = loaded.vectorstore.similarity_search_with_score(query, k=5)
+        assert [d.page_content for d, _ in reloaded] == [d.page_content for d, _ in expected]
+
+    def test_unsaved_vectors_truncated_on_reload(self, monkeypatch, tmp_path):
+        """Test that full-precision vectors of an unsaved add are dropped when the store is reloaded"""
+        from vectorstores.vector_store_factory import FAISSVectorStore
+
+        embeddings = LocalHashEmbeddings(dim=32)
+        monkeypatch.setattr(ARISConfig, "FAISS_INDEX_TYPE", "flat")
+        monkeypatch.setattr(ARISConfig, "VECTOR_RESCORE", True)
+        monkeypatch.setattr(ARISConfig, "VECTOR_COMPRESSION", "int8")
+        store = FAISSVectorStore(embeddings).from_documents(_docs(20))
+        store.save_local(str(tmp_path))
+        store.add_documents(_docs(5))
+        assert len(store.vectorstore.full_vectors) == 25
+
+        loaded = FAISSVectorStore(embeddings)
+        loaded.load_local(str(tmp_path))
+        assert loaded.vectorstore.index.ntotal == 20
+        assert len(loaded.vectorstore.full_vectors) == 20
+        assert os.path.getsize(tmp_path / VECTORS_FILE) == 20 * 32 * 4
+
+    def test_side_file_holds_normalized_vectors(self, monkeypatch):
+        """Test that with L2 normalization the side file stores the normalized vectors the index holds"""
+        from vectorstores.vector_store_factory import FAISSVectorStore
+
+        monkeypatch.setattr(ARISConfig, "FAISS_INDEX_TYPE", "flat")
+        monkeypatch.setattr(ARISConfig, "VECTOR_RESCORE", True)
+        monkeypatch.setattr(ARISConfig, "VECTOR_COMPRESSION", "int8")
+        store = FAISSVectorStore(LocalHashEmbeddings(dim=32)).from_documents(_docs(2))
+        store.vectorstore._normalize_L2 = True
+        store.add_documents(_docs(3))
+        stored = store.vectorstore.full_vectors.get([2, 3, 4])
+        assert np.allclose(np.linalg.norm(stored, axis=1), 1.0, atol=1e-5)
+
+
+@pytest.mark.unit
+class TestQdrantCompression:
+    """Test Qdrant collection and search params per compression mode"""
+
+    def test_vectors_config(self):
+        """Test that int8/on_disk add scalar quantization and fp16 sets the datatype"""
+        pytest.importorskip("qdrant_client")
+        params, quantization = vector_compression.qdrant_vectors_config(64, "on_disk")
+        assert params.on_disk is True and quantization.scalar.always_ram is True
+        params, quantization = vector_compression.qdrant_vectors_config(64, "fp16")
+        assert params.datatype.value == "float16" and quantization is None
+
+    def test_quantized_search_rescores(self, monkeypatch):
+        """Test that quantized collections are searched with rescoring and oversampling"""
+        pytest.importorskip("qdrant_client")
+        from vectorstores.qdrant_store import QdrantStore
+
+        monkeypatch.setattr(ARISConfig, "VECTOR_COMPRESSION", "int8")
+        monkeypatch.setattr(ARISConfig, "VECTOR_RESCORE_OVERSAMPLE", 3.0)
+        store = QdrantStore(embeddings=LocalHashEmbeddings(dim=32), url=":memory:", collection_name="test_int8")
+        store.add_documents(_docs(10))
+        assert store._quantized is True
+        assert vector_compression.qdrant_search_params(True).quantization.oversampling == 3.0
+        assert store.similarity_search("inspect valve 3", k=3)
@@ -0,0 +1,402 @@
+"""
+Building blocks for the scalable FAISS backend.
+
+- SqliteDocstore: append-only LangChain docstore in SQLite (WAL) instead of a
+  pickled in-memory dict; rows are keyed by FAISS position so the
+  position -> docstore id mapping is persisted with the documents.
+- build_faiss_index / upgrade_to_ivfpq: flat, HNSW or IVF-PQ indexes, optionally
+  scalar-quantized (fp16 / int8) per VECTOR_COMPRESSION.
+- FullPrecisionVectors / RescoringFAISS: float32 side file for lossy indexes and a
+  LangChain FAISS subclass that re-ranks oversampled candidates with it.
+- FaissIndexFiles: on-disk layout with a base index file plus append-only delta
+  segments, so saves only write what was added since the last save.
+"""
+import os
+import json
+import sqlite3
+import logging
+import threading
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+
+try:
+    from langchain_core.documents import Document
+except ImportError:
+    from langchain.docstore.document import Document
+
+from langchain_community.docstore.base import AddableMixin, Docstore
+from langchain_community.vectorstores import FAISS
+
+from vectorstores.vector_compression import compression_mode
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = "aris_index.faiss"
+DOCSTORE_FILE = "docstore.sqlite"
+META_FILE = "aris_faiss_meta.json"
+VECTORS_FILE = "vectors.f32"
+FORMAT_VERSION = 1
+
+
+class SqliteDocstore(Docstore, AddableMixin):
+    """
+    Append-only docstore backed by SQLite.
+
+    Starts in memory (the store exists before its directory is known) and is
+    attached to a file on the first save; from then on every add is written
+    straight to disk, so saving the docstore never rewrites existing rows.
+    Rows written after the last index save (a crash before save_local) are
+    dropped on load with truncate().
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self._lock = threading.RLock()
+        self.path = path
+        self._conn = self._connect(path or ":memory:")
+        self._next_position = self._conn.execute("SELECT COALESCE(MAX(position) + 1, 0) FROM chunks").fetchone()[0]
+
+    @staticmethod
+    def _connect(target: str) -> sqlite3.Connection:
+        conn = sqlite3.connect(target, check_same_thread=False)
+        if target != ":memory:":
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS chunks ("
+            "position INTEGER PRIMARY KEY, doc_id TEXT UNIQUE NOT NULL, "
+            "page_content TEXT NOT NULL, metadata TEXT NOT NULL)"
+        )
+        conn.commit()
+        return conn
+
+    def add(self, texts: Dict[str, Document]) -> None:
+        """Append documents; positions follow insertion order (= FAISS add order)."""
+        with self._lock:
+            rows = []
+            for doc_id, doc in texts.items():
+                rows.append((self._next_position + len(rows), doc_id, doc.page_content, json.dumps(doc.metadata or {}, default=str)))
+            try:
+                self._conn.executemany("INSERT INTO chunks VALUES (?, ?, ?, ?)", rows)
+            except sqlite3.IntegrityError as e:
+                self._conn.rollback()
+                raise ValueError(f"Tried to add ids that already exist: {e}") from e
+            self._conn.commit()
+            self._next_position += len(rows)
+
+    def search(self, search: str) -> Union[str, Document]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT page_content, metadata FROM chunks WHERE doc_id = ?", (search,)
+            ).fetchone()
+        if row is None:
+            return f"ID {search} not found."
+        return Document(id=search, page_content=row[0], metadata=json.loads(row[1]))
+
+    def delete(self, ids: List) -> None:
+        with self._lock:
+            self._conn.executemany("DELETE FROM chunks WHERE doc_id = ?", [(i,) for i in ids])
+            self._conn.commit()
+
+    def truncate(self, count: int) -> int:
+        """Drop rows at FAISS positions >= count (added after the index was last saved). Returns rows dropped."""
+        with self._lock:
+            dropped = self._conn.execute("DELETE FROM chunks WHERE position >= ?", (count,)).rowcount
+            self._conn.commit()
+            # The next add goes to FAISS position `count`
+            self._next_position = count
+        return dropped
+
+    def positions(self) -> Dict[int, str]:
+        """FAISS position -> docstore id, as LangChain's index_to_docstore_id expects."""
+        with self._lock:
+            return {pos: doc_id for pos, doc_id in self._conn.execute("SELECT position, doc_id FROM chunks ORDER BY position")}
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+
+    def attach(self, path: str):
+        """Bind the docstore to a file: copy current rows there and write through from now on."""
+        with self._lock:
+            if self.path and os.path.abspath(self.path) == os.path.abspath(path):
+                self._conn.commit()
+                return
+            target = self._connect(path)
+            self._conn.backup(target)
+            target.execute("PRAGMA journal_mode=WAL")
+            self._conn.close()
+            self._conn = target
+            self.path = path
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def _pq_subquantizers(dimension: int, requested: int) -> int:
+    """Largest divisor of the dimension not above the requested PQ m."""
+    for m in range(min(requested, dimension), 0, -1):
+        if dimension % m == 0:
+            return m
+    return 1
+
+
+# on_disk keeps int8 codes in memory; the float32 originals are the side file
+_SQ_TYPES = {"fp16": "QT_fp16", "int8": "QT_8bit", "on_disk": "QT_8bit"}
+
+
+def build_faiss_index(dimension: int, index_type: str, config):
+    """
+    Create an empty index. IVF-PQ needs training data, so it starts as a flat index
+    and is upgraded by upgrade_to_ivfpq once enough vectors exist. Flat and HNSW
+    indexes store scalar-quantized codes when VECTOR_COMPRESSION asks for it
+    (int8 codes are trained on the first batch added, see train_if_needed).
+    """
+    import faiss
+
+    compression = compression_mode(config.VECTOR_COMPRESSION)
+    qtype = getattr(faiss.ScalarQuantizer, _SQ_TYPES[compression]) if compression in _SQ_TYPES else None
+    if index_type == "hnsw":
+        if qtype is not None:
+            index = faiss.IndexHNSWSQ(dimension, qtype, config.FAISS_HNSW_M)
+        else:
+            index = faiss.IndexHNSWFlat(dimension, config.FAISS_HNSW_M)
+        index.hnsw.efConstruction = config.FAISS_HNSW_EF_CONSTRUCTION
+    elif index_type == "flat" and qtype is not None:
+        index = faiss.IndexScalarQuantizer(dimension, qtype, faiss.METRIC_L2)
+    else:
+        index = faiss.IndexFlatL2(dimension)
+    apply_search_params(index, config)
+    return index
+
+
+def train_if_needed(index, vectors: np.ndarray):
+    """Scalar quantizers need value ranges before the first add."""
+    if not index.is_trained:
+        index.train(vectors)
+
+
+def is_lossy(index_type: str, config) -> bool:
+    """Whether indexes built for this config return approximate distances worth rescoring."""
+    return index_type == "ivfpq" or compression_mode(config.VECTOR_COMPRESSION) != "none"
+
+
+def upgrade_to_ivfpq(index, config):
+    """Train an IVF-PQ index on the vectors of a flat index and move them over (same positions)."""
+    import faiss
+
+    dimension = index.d
+    vectors = index.reconstruct_n(0, index.ntotal)
+    nlist = max(1, min(config.FAISS_IVF_NLIST, index.ntotal // 39))
+    quantizer = faiss.IndexFlatL2(dimension)
+    ivfpq = faiss.IndexIVFPQ(quantizer, dimension, nlist, _pq_subquantizers(dimension, config.FAISS_PQ_M), 8)
+    ivfpq.train(vectors)
+    ivfpq.add(vectors)
+    ivfpq.make_direct_map()
+    apply_search_params(ivfpq, config)
+    logger.info(f"✅ FAISS index upgraded to IVF-PQ (nlist={nlist}, vectors={ivfpq.ntotal})")
+    return ivfpq
+
+
+class FullPrecisionVectors:
+    """
+    float32 copy of every vector, by FAISS position, for rescoring a lossy index.
+
+    Kept in memory until attached to a directory (like SqliteDocstore); from then on
+    adds are appended to ``vectors.f32`` and reads are memory-mapped, so the
+    originals cost disk, not RAM.
+    """
+
+    def __init__(self, dimension: int, path: Optional[str] = None):
+        self.dimension = dimension
+        self.path = path
+        self._lock = threading.RLock()
+        self._memory: List[np.ndarray] = []
+        self._mmap = None
+
+    def __len__(self) -> int:
+        with self._lock:
+            if self.path:
+                return os.path.getsize(self.path) // (4 * self.dimension) if os.path.exists(self.path) else 0
+            return sum(len(block) for block in self._memory)
+
+    def add(self, vectors: np.ndarray):
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32).reshape(-1, self.dimension)
+        with self._lock:
+            if self.path:
+                with open(self.path, "ab") as f:
+                    f.write(vectors.tobytes())
+                self._mmap = None
+            else:
+                self._memory.append(vectors)
+
+    def _array(self) -> np.ndarray:
+        if not self.path:
+            if len(self._memory) > 1:
+                self._memory = [np.concatenate(self._memory)]
+            return self._memory[0] if self._memory else np.empty((0, self.dimension), dtype=np.float32)
+        if self._mmap is None:
+            if not os.path.getsize(self.path):
+                return np.empty((0, self.dimension), dtype=np.float32)
+            self._mmap = np.memmap(self.path, dtype=np.float32, mode="r").reshape(-1, self.dimension)
+        return self._mmap
+
+    def get(self, positions) -> np.ndarray:
+        with self._lock:
+            return np.asarray(self._array()[np.asarray(positions, dtype=np.int64)])
+
+    def attach(self, path: str):
+        """Bind to a file: write the current vectors there and append through from now on."""
+        with self._lock:
+            if self.path and os.path.abspath(self.path) == os.path.abspath(path):
+                return
+            data = np.array(self._array())
+            tmp = path + ".tmp"
+            data.tofile(tmp)
+            os.replace(tmp, path)
+            self.path = path
+            self._memory = []
+            self._mmap = None
+
+    def truncate(self, count: int) -> int:
+        """Drop vectors at positions >= count (added after the index was last saved). Returns vectors dropped."""
+        with self._lock:
+            dropped = len(self) - count
+            if dropped <= 0:
+                return 0
+            if self.path:
+                self._mmap = None
+                os.truncate(self.path, count * 4 * self.dimension)
+            else:
+                self._memory = [self._array()[:count].copy()]
+            return dropped
+
+
+class RescoringFAISS(FAISS):
+    """
+    LangChain FAISS store that re-ranks an oversampled candidate set with exact
+    L2 distances from FullPrecisionVectors. Without a (complete) side file it
+    behaves exactly like FAISS; vectors past the index's ntotal (appended by an
+    add that was never saved) are dropped from the side file.
+    """
+
+    full_vectors: Optional[FullPrecisionVectors] = None
+    oversample: float = 1.0
+
+    def _docstore_positions(self) -> Dict[str, int]:
+        cache = getattr(self, "_position_cache", None)
+        if cache is None or len(cache) != len(self.index_to_docstore_id):
+            cache = {doc_id: pos for pos, doc_id in self.index_to_docstore_id.items()}
+            self._position_cache = cache
+        return cache
+
+    def similarity_search_with_score_by_vector(self, embedding, k: int = 4, filter=None, fetch_k: int = 20, **kwargs):
+        full = self.full_vectors
+        if full is not None and len(full) > self.index.ntotal:
+            dropped = full.truncate(self.index.ntotal)
+            logger.warning(f"⚠️ FAISS: dropped {dropped} full-precision vectors past the index")
+        if full is None or self.oversample <= 1.0 or len(full) < self.index.ntotal:
+            return super().similarity_search_with_score_by_vector(embedding, k=k, filter=filter, fetch_k=fetch_k, **kwargs)
+
+        candidates_k = max(k, int(k * self.oversample))
+        candidates = super().similarity_search_with_score_by_vector(
+            embedding, k=candidates_k, filter=filter, fetch_k=max(fetch_k, candidates_k), **kwargs
+        )
+        positions = self._docstore_positions()
+        if not candidates or any(getattr(doc, "id", None) not in positions for doc, _ in candidates):
+            return candidates[:k]
+
+        query = np.asarray(embedding, dtype=np.float32).reshape(1, -1)
+        if self._normalize_L2:
+            query = query / max(float(np.linalg.norm(query)), 1e-12)
+        originals = full.get([positions[doc.id] for doc, _ in candidates])
+        distances = np.sum((originals - query) ** 2, axis=1)
+        order = np.argsort(distances, kind="stable")[:k]
+        return [(candidates[i][0], float(distances[i])) for i in order]
+
+
+def index_kind(index) -> str:
+    name = type(index).__name__
+    if "HNSW" in name:
+        return "hnsw"
+    if "IVF" in name:
+        return "ivfpq"
+    return "flat"
+
+
+def apply_search_params(index, config):
+    if hasattr(index, "hnsw"):
+        index.hnsw.efSearch = config.FAISS_HNSW_EF_SEARCH
+    if hasattr(index, "nprobe"):
+        index.nprobe = config.FAISS_IVF_NPROBE
+
+
+class FaissIndexFiles:
+    """Base index + append-only delta segments in one directory."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    @property
+    def meta_path(self) -> str:
+        return os.path.join(self.path, META_FILE)
+
+    def exists(self) -> bool:
+        return os.path.exists(self.meta_path)
+
+    def read_meta(self) -> Dict:
+        with open(self.meta_path) as f:
+            return json.load(f)
+
+    def _write_meta(self, meta: Dict):
+        tmp = self.meta_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp, self.meta_path)
+
+    def write_full(self, index, dimension: int):
+        """Rewrite the base index and drop delta segments."""
+        import faiss
+
+        os.makedirs(self.path, exist_ok=True)
+        tmp = os.path.join(self.path, INDEX_FILE + ".tmp")
+        faiss.write_index(index, tmp)
+        os.replace(tmp, os.path.join(self.path, INDEX_FILE))
+        old_deltas = self.read_meta().get("deltas", []) if self.exists() else []
+        self._write_meta({
+            "format": FORMAT_VERSION,
+            "dimension": dimension,
+            "index_type": index_kind(index),
+            "base_ntotal": int(index.ntotal),
+            "deltas": [],
+        })
+        for name in old_deltas:
+            try:
+                os.remove(os.path.join(self.path, name))
+            except OSError:
+                pass
+
+    def append_delta(self, vectors: np.ndarray):
+        """Persist vectors added since the last save as a new segment."""
+        meta = self.read_meta()
+        name = f"delta-{len(meta['deltas']) + 1:05d}.npy"
+        np.save(os.path.join(self.path, name), vectors.astype(np.float32))
+        meta["deltas"].append(name)
+        self._write_meta(meta)
+
+    def load(self, mmap: bool):
+        """Return (index, meta, delta_vectors); the base index is memory-mapped when requested."""
+        import faiss
+
+        meta = self.read_meta()
+        deltas = [np.load(os.path.join(self.path, name)) for name in meta.get("deltas", [])]
+        # Delta segments are replayed into the index, which needs it in RAM
+        flags = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY if mmap and not deltas else 0
+        index = faiss.read_index(os.path.join(self.path, INDEX_FILE), flags)
+        return index, meta, (np.concatenate(deltas) if deltas else None)
+
+    def read_index_into_memory(self):
+        import faiss
+
+        return faiss.read_index(os.path.join(self.path, INDEX_FILE))
@@ -17,7 +17,9 @@ except ImportError:
 from langchain_openai import OpenAIEmbeddings
 from vectorstores.opensearch_store import OpenSearchVectorStore
 from shared.config.settings import ARISConfig
+from shared.utils.source_key import source_key, source_key_filter
 import hashlib
+import threading
 import time
 
 load_dotenv()
@@ -28,6 +30,10 @@ logger = logging.getLogger(__name__)
 _query_cache = {}
 _cache_timestamps = {}
 
+# One images store per (embedding model, domain, region, index) per process
+_store_cache: Dict[tuple, 'OpenSearchImagesStore'] = {}
+_store_cache_lock = threading.Lock()
+
 
 def clear_image_search_cache(source: Optional[str] = None):
     """
@@ -51,6 +57,42 @@ def clear_image_search_cache(source: Optional[str] = None):
         logger.info(f"🗑️ Cleared {len(keys_to_remove)} cache entries for source: {source}")
 
 
+def get_images_store(
+    embedding_model: str,
+    domain: str,
+    region: Optional[str] = None,
+    index_name: Optional[str] = None
+) -> 'OpenSearchImagesStore':
+    """
+    Return the process-wide OpenSearchImagesStore for this model/domain/index.
+    
+    Creating a store resolves the domain endpoint and tests the connection, so
+    ingestion reuses one instance instead of building a new store per document.
+    Embeddings go through CachedEmbeddings so repeated OCR texts across documents
+    are not re-embedded.
+    """
+    key = (embedding_model, domain, region, index_name)
+    store = _store_cache.get(key)
+    if store is not None:
+        return store
+    with _store_cache_lock:
+        store = _store_cache.get(key)
+        if store is None:
+            from shared.utils.cached_embeddings import CachedEmbeddings
+            embeddings = CachedEmbeddings(
+                OpenAIEmbeddings(openai_api_key=os.getenv('OPENAI_API_KEY'), model=embedding_model),
+                max_cache_size=5000
+            )
+            store = OpenSearchImagesStore(
+                embeddings=embeddings,
+                domain=domain,
+                index_name=index_name,
+                region=region
+            )
+            _store_cache[key] = store
+    return store
+
+
 class OpenSearchImagesStore:
     """
     OpenSearch store specifically for image OCR content.
@@ -86,25 +128,63 @@ class OpenSearchImagesStore:
             domain=domain,
             index_name=self.index_name,
             region=region,
-            endpoint=endpoint
+            endpoint=endpoint,
+            two_stage_knn=False
         )
         
         logger.info(f"OpenSearchImagesStore initialized with index: {self.index_name}")
     
-    def _create_image_id(self, source: str, image_number: int) -> str:
+    def _create_image_id(self, source: str, image_number: int, page: int = 0, ordinal: int = 0) -> str:
         """
-        Create unique image ID from source and image number.
+        Create unique image ID from source, page and image number.
+        
+        Parsers often report the same image_number for every image and different
+        file names can sanitize to the same string, so the id also carries a hash
+        of the source key and the image's page and position on that page.
         
         Args:
             source: Document source name
             image_number: Image number within document
+            page: Page number where the image appears
+            ordinal: Position of the image among the images of its page
             
         Returns:
             Unique image ID string
         """
         # Sanitize source name for ID
         sanitized_source = re.sub(r'[^a-zA-Z0-9_-]', '_', os.path.basename(source))
-        return f"{sanitized_source}_image_{image_number}"
+        scope = hashlib.sha256(source_key(source).encode('utf-8')).hexdigest()[:12]
+        return f"{sanitized_source}_{scope}_p{page}_{ordinal}_image_{image_number}"
+    
+    def _source_clauses(self, sources: List[Optional[str]]) -> List[Dict[str, Any]]:
+        """
+        Source filter clauses for the given document names (any may match).
+        
+        With USE_SOURCE_KEY_FILTER this is one term/terms clause on the canonical
+        source_key; otherwise the legacy per-spelling should clauses.
+        """
+        if ARISConfig.USE_SOURCE_KEY_FILTER:
+            clause = source_key_filter(sources)
+            return [clause] if clause else []
+        should_clauses = []
+        for src in sources:
+            if not src:
+                continue
+            source_variants = [
+                src,
+                os.path.basename(src),
+                src.lower(),
+                os.path.basename(src).lower()
+            ]
+            for variant in source_variants:
+                if not variant:
+                    continue
+                should_clauses.extend([
+                    {"term": {"metadata.source.keyword": variant}},
+                    {"term": {"metadata.source": variant}},
+                    {"match_phrase": {"metadata.source": variant}}
+                ])
+        return should_clauses
     
     def _extract_image_metadata(self, ocr_text: str) -> Dict[str, Any]:
         """
@@ -189,7 +269,7 @@ class OpenSearchImagesStore:
         if image_number <= 0:
             image_number = 1
 
-        image_id = self._create_image_id(source, image_number)
+        image_id = self._create_image_id(source, image_number, page)
         
         # Extract metadata from OCR text
         metadata = self._extract_image_metadata(ocr_text)
@@ -201,6 +281,7 @@ class OpenSearchImagesStore:
         # Create document with image-specific structure
         doc_metadata = {
             'source': source,
+            'source_key': source_key(source),
             'image_number': image_number,
             'page': page,
             'ocr_text_length': len(ocr_text) if ocr_text else 0,
@@ -268,6 +349,8 @@ class OpenSearchImagesStore:
         # Convert to Document objects
         documents = []
         image_ids = []
+        # Images seen so far per (source, page), for the per-page ordinal in the id
+        page_ordinals: Dict[tuple, int] = {}
         
         for img_data in images:
             source = img_data.get('source', 'unknown')
@@ -283,7 +366,10 @@ class OpenSearchImagesStore:
             if not image_number or image_number <= 0:
                 image_number = len(image_ids) + 1
             
-            image_id = self._create_image_id(source, image_number)
+            page = img_data.get('page', 0)
+            ordinal = page_ordinals.get((source, page), 0)
+            page_ordinals[(source, page)] = ordinal + 1
+            image_id = self._create_image_id(source, image_number, page, ordinal)
             image_ids.append(image_id)
             
             # Extract metadata
@@ -295,8 +381,9 @@ class OpenSearchImagesStore:
             extraction_method = img_data.get('extraction_method', 'unknown')
             doc_metadata = {
                 'source': source,
+                'source_key': source_key(source),
                 'image_number': image_number,
-                'page': img_data.get('page', 0),
+                'page': page,
                 'ocr_text_length': len(ocr_text) if ocr_text else 0,
                 'marker_detected': img_data.get('marker_detected', True),
                 'extraction_method': extraction_method,
@@ -328,14 +415,62 @@ class OpenSearchImagesStore:
             documents.append(doc)
         
         try:
-            # Store all in batch
-            self.vectorstore.add_documents(documents)
+            # Store all in batch (deterministic ids: re-ingesting a document overwrites its images)
+            self._bulk_index(documents, image_ids)
             logger.info(f"✅ Stored {len(images)} images in batch")
             return image_ids
         except Exception as e:
             logger.error(f"❌ Failed to store images batch: {str(e)}")
             raise
     
+    def _embed_unique(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts once per distinct content (blank pages, repeated headers) in configured batches."""
+        unique_texts: Dict[str, str] = {}
+        for text in texts:
+            unique_texts.setdefault(hashlib.sha256(text.encode('utf-8')).hexdigest(), text)
+        
+        keys = list(unique_texts)
+        batch_size = max(1, ARISConfig.IMAGE_EMBEDDING_BATCH_SIZE)
+        vectors: Dict[str, List[float]] = {}
+        for start in range(0, len(keys), batch_size):
+            batch_keys = keys[start:start + batch_size]
+            embedded = self.embeddings.embed_documents([unique_texts[k] for k in batch_keys])
+            vectors.update(zip(batch_keys, embedded))
+        
+        if len(keys) < len(texts):
+            logger.info(f"Embedding {len(keys)} unique OCR texts for {len(texts)} images ({len(texts) - len(keys)} duplicates reused)")
+        return [vectors[hashlib.sha256(text.encode('utf-8')).hexdigest()] for text in texts]
+    
+    def _bulk_index(self, documents: List[Document], image_ids: List[str]):
+        """Write image documents with the bulk API in LangChain's layout, then refresh once."""
+        from opensearchpy import helpers
+        
+        vectors = self._embed_unique([doc.page_content for doc in documents])
+        self.vectorstore._ensure_index(len(vectors[0]))
+        client = self.vectorstore.vectorstore.client
+        actions = (
+            {
+                '_op_type': 'index',
+                '_index': self.index_name,
+                '_id': image_id,
+                'vector_field': vector,
+                'text': doc.page_content,
+                'metadata': doc.metadata,
+            }
+            for doc, image_id, vector in zip(documents, image_ids, vectors)
+        )
+        success, errors = helpers.bulk(
+            client,
+            actions,
+            chunk_size=ARISConfig.OPENSEARCH_BULK_SIZE,
+            max_chunk_bytes=ARISConfig.OPENSEARCH_BULK_CHUNK_BYTES,
+            raise_on_error=False
+        )
+        if errors:
+            raise ValueError(f"Bulk indexing failed for {len(errors)} images: {str(errors[0])[:500]}")
+        client.indices.refresh(index=self.index_name)
+        clear_image_search_cache()
+    
     def get_images_by_source(self, source: str, limit: int = 100) -> List[Dict[str, Any]]:
         """
         Retrieve all images for a specific document source.
@@ -354,22 +489,8 @@ class OpenSearchImagesStore:
         try:
             client = self.vectorstore.vectorstore.client
             
-            # Build flexible source match (handles basename, lowercase, keyword fields)
-            source_variants = {
-                source,
-                os.path.basename(source or ""),
-                (source or "").lower(),
-                os.path.basename(source or "").lower()
-            }
-            should_clauses = []
-            for variant in source_variants:
-                if not variant:
-                    continue
-                should_clauses.extend([
-                    {"term": {"metadata.source.keyword": variant}},
-                    {"term": {"metadata.source": variant}},
-                    {"match_phrase": {"metadata.source": variant}}
-                ])
+            # Source match: canonical source_key term (or legacy spelling variants)
+            should_clauses = self._source_clauses([source])
             
             query = {
                 "size": limit,
@@ -488,22 +609,7 @@ class OpenSearchImagesStore:
         try:
             client = self.vectorstore.vectorstore.client
 
-            source_variants = {
-                source,
-                os.path.basename(source or ""),
-                (source or "").lower(),
-                os.path.basename(source or "").lower(),
-            }
-
-            should_clauses = []
-            for variant in source_variants:
-                if not variant:
-                    continue
-                should_clauses.extend([
-                    {"term": {"metadata.source.keyword": variant}},
-                    {"term": {"metadata.source": variant}},
-                    {"match_phrase": {"metadata.source": variant}},
-                ])
+            should_clauses = self._source_clauses([source])
 
             query = {
                 "bool": {
@@ -681,24 +787,7 @@ class OpenSearchImagesStore:
                 # Build source filter if specified
                 source_filter = None
                 if effective_sources and len(effective_sources) > 0:
-                    should_clauses = []
-                    for src in effective_sources:
-                        if not src:
-                            continue
-                        source_variants = [
-                            src,
-                            os.path.basename(src),
-                            src.lower(),
-                            os.path.basename(src).lower()
-                        ]
-                        for variant in source_variants:
-                            if not variant:
-                                continue
-                            should_clauses.extend([
-                                {"term": {"metadata.source.keyword": variant}},
-                                {"term": {"metadata.source": variant}},
-                                {"match_phrase": {"metadata.source": variant}}
-                            ])
+                    should_clauses = self._source_clauses(effective_sources)
                     
                     source_filter = {
                         "bool": {
@@ -765,21 +854,7 @@ class OpenSearchImagesStore:
                 
                 # Add source filter if specified
                 if source:
-                    source_variants = [
-                        source,
-                        os.path.basename(source or ""),
-                        (source or "").lower(),
-                        os.path.basename(source or "").lower()
-                    ]
-                    should_clauses = []
-                    for variant in source_variants:
-                        if not variant:
-                            continue
-                        should_clauses.extend([
-                            {"term": {"metadata.source.keyword": variant}},
-                            {"term": {"metadata.source": variant}},
-                            {"match_phrase": {"metadata.source": variant}}
-                        ])
+                    should_clauses = self._source_clauses([source])
                     if should_clauses:
                         text_query["query"] = {
                             "bool": {
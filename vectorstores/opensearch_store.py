@@ -5,8 +5,12 @@ Uses AWS OpenSearch Service with LangChain integration.
 import os
 import re
 import logging
+import copy
+import threading
 import time
+import uuid
 import hashlib
+from contextlib import contextmanager
 from typing import List, Optional, Dict, Any
 from dotenv import load_dotenv
 import boto3
@@ -19,6 +23,24 @@ except ImportError:
 
 from langchain_openai import OpenAIEmbeddings
 
+from shared.utils.embedding_dimensions import TruncatedEmbeddings, embedding_model_name, supports_truncation, truncate_embedding
+from shared.utils.source_key import source_key, source_key_filter
+from vectorstores.shared_index import (
+    document_routing,
+    is_shared_index,
+    shared_index_body,
+    with_document_filter,
+)
+from vectorstores.vector_compression import (
+    FULL_VECTOR_FIELD,
+    apply_opensearch_rescore,
+    opensearch_index_body,
+    opensearch_index_layout,
+    opensearch_vector_values,
+    rescore_full_vectors,
+    rescore_oversample,
+)
+
 load_dotenv()
 
 logger = logging.getLogger(__name__)
@@ -27,6 +49,11 @@ logger = logging.getLogger(__name__)
 _hybrid_cache = {}
 _hybrid_cache_timestamps = {}
 
+# Bulk-ingest settings are per index, but stores are per document (several ingest into the
+# shared index at once): index name -> {'count': active bulk ingests, 'original': settings}
+_bulk_indexes: Dict[str, Dict[str, Any]] = {}
+_bulk_indexes_lock = threading.Lock()
+
 
 def clear_hybrid_search_cache(index_name: Optional[str] = None):
     """
@@ -53,13 +80,22 @@ def clear_hybrid_search_cache(index_name: Optional[str] = None):
 class OpenSearchVectorStore:
     """OpenSearch vector store wrapper for LangChain compatibility."""
     
+    # Shard routing (document key in the shared index layout); None for per-document indexes
+    routing: Optional[str] = None
+    # Vector layout of the index: dimensions, two-stage, compression (read from its mapping on first use)
+    _layout: Optional[Dict[str, Any]] = None
+    # Build new indexes two-stage (coarse k-NN prefix + full vectors for rescoring)
+    two_stage_knn: bool = False
+    
     def __init__(
         self,
         embeddings: OpenAIEmbeddings,
         domain: str = "intelycx-os-dev",
         index_name: str = "aris-rag-index",
         region: Optional[str] = None,
-        endpoint: Optional[str] = None
+        endpoint: Optional[str] = None,
+        routing: Optional[str] = None,
+        two_stage_knn: Optional[bool] = None
     ):
         """
         Initialize OpenSearch vector store.
@@ -69,8 +105,12 @@ class OpenSearchVectorStore:
             domain: OpenSearch domain name
             index_name: Name of the OpenSearch index
             region: AWS region (defaults to AWS_OPENSEARCH_REGION from .env)
+            routing: Shard routing for all writes and searches (document key in the shared index layout)
+            two_stage_knn: Build a new index two-stage (defaults to ENABLE_TWO_STAGE_KNN)
         """
+        from shared.config.settings import ARISConfig
         self.embeddings = embeddings
+        self.two_stage_knn = ARISConfig.ENABLE_TWO_STAGE_KNN if two_stage_knn is None else two_stage_knn
         # Validate domain - must be at least 3 characters (AWS requirement)
         if not domain or len(str(domain).strip()) < 3:
             raise ValueError(
@@ -80,7 +120,10 @@ class OpenSearchVectorStore:
             )
         self.domain = str(domain).strip()
         self.index_name = index_name
+        self.routing = routing
         self.region = region or os.getenv('AWS_OPENSEARCH_REGION', 'us-east-2')
+        # Original index settings while inside bulk_ingest(); None outside the context
+        self._bulk_state: Optional[Dict[str, Any]] = None
         
         # Get AWS credentials
         self.access_key = os.getenv('AWS_OPENSEARCH_ACCESS_KEY_ID')
@@ -197,6 +240,8 @@ class OpenSearchVectorStore:
                     
                     if conn_class:
                         kwargs['connection_class'] = conn_class
+                    if self.routing:
+                        kwargs['routing'] = self.routing
                     
                     self.vectorstore = OpenSearchVectorSearch(**kwargs)
                     
@@ -292,14 +337,21 @@ class OpenSearchVectorStore:
                             break
             
             if vector_dimension:
-                # Get current embedding model dimension
-                # Try to get dimension from embeddings model
+                # Embedding dimension and model the index was built for (_meta); the k-NN field
+                # may hold only a Matryoshka prefix of it
+                meta = index_mapping.get('_meta') or {}
+                full_dimension = meta.get('embedding_dimensions') or vector_dimension
+                index_model = meta.get('embedding_model')
                 try:
                     # Test embedding to get dimension
                     test_embedding = self.embeddings.embed_query("test")
                     current_dimension = len(test_embedding)
+                    current_model = embedding_model_name(self.embeddings) or 'unknown'
                     
-                    if current_dimension != vector_dimension:
+                    truncatable = current_dimension == full_dimension or (
+                        current_dimension > full_dimension and supports_truncation(current_model)
+                    )
+                    if not truncatable or (index_model and current_model != 'unknown' and index_model != current_model):
                         # Map dimensions to models
                         dimension_to_model = {
                             1536: 'text-embedding-3-small',
@@ -307,12 +359,11 @@ class OpenSearchVectorStore:
                             1536: 'text-embedding-ada-002'  # Also 1536
                         }
                         
-                        expected_model = dimension_to_model.get(vector_dimension, f"model with {vector_dimension} dimensions")
-                        current_model = getattr(self.embeddings, 'model', 'unknown')
+                        expected_model = index_model or dimension_to_model.get(full_dimension, f"model with {full_dimension} dimensions")
                         
                         error_msg = (
                             f"Embedding dimension mismatch! "
-                            f"Index '{self.index_name}' was created with {vector_dimension} dimensions "
+                            f"Index '{self.index_name}' was created with {full_dimension} dimensions "
                             f"(likely {expected_model}), but current embedding model '{current_model}' "
                             f"produces {current_dimension} dimensions. "
                             f"Please use the same embedding model that was used to create the index, "
@@ -321,6 +372,13 @@ class OpenSearchVectorStore:
                         
                         logger.error(error_msg)
                         raise ValueError(error_msg)
+                    elif current_dimension > vector_dimension:
+                        # Shortened index: query and write with the prefix it was built at
+                        self.vectorstore.embedding_function = TruncatedEmbeddings(self.embeddings, vector_dimension)
+                        logger.info(
+                            f"✅ Embedding dimension validated: {current_dimension}-d embeddings truncated to "
+                            f"{vector_dimension} for index (built for {full_dimension})"
+                        )
                     else:
                         logger.info(f"✅ Embedding dimension validated: {current_dimension} dimensions match index")
                 except Exception as e:
@@ -355,7 +413,7 @@ class OpenSearchVectorStore:
                 'language', 'language_detected', 'primary_language', 'secondary_language',
                 'text_original', 'text_english', 'script_type',
                 # Document tracking
-                'document_id'
+                'document_id', 'chunk_hash', 'simhash'
             ]
             
             if doc.metadata:
@@ -373,6 +431,10 @@ class OpenSearchVectorStore:
                 # Add source if not already present (required for filtering)
                 if 'source' not in cleaned_metadata and 'source' in doc.metadata:
                     cleaned_metadata['source'] = doc.metadata['source']
+
+            # Canonical keyword for single-term document filters
+            if cleaned_metadata.get('source'):
+                cleaned_metadata['source_key'] = source_key(cleaned_metadata['source'])
             
             # Add content_type to indicate this is text content (not image OCR)
             cleaned_metadata['content_type'] = 'text'
@@ -380,12 +442,223 @@ class OpenSearchVectorStore:
             # Create cleaned document
             cleaned_doc = Document(
                 page_content=doc.page_content,
-                metadata=cleaned_metadata
+                metadata=cleaned_metadata,
+                id=getattr(doc, 'id', None)
             )
             cleaned_documents.append(cleaned_doc)
         
         return cleaned_documents
     
+    def _add_batch(self, documents: List[Document]):
+        """Add a batch to the LangChain store, using content-hash ids when every chunk has one."""
+        if self._index_layout()['two_stage']:
+            # LangChain only writes vector_field; two-stage chunks also carry the full vector
+            return self._bulk_add(documents)
+        ids = [getattr(doc, 'id', None) for doc in documents]
+        if ids and all(ids):
+            return self.vectorstore.add_documents(documents, ids=ids)
+        return self.vectorstore.add_documents(documents)
+    
+    def _use_bulk_ingest(self, count: int) -> bool:
+        from shared.config.settings import ARISConfig
+        return ARISConfig.ENABLE_OPENSEARCH_BULK_INGEST and count >= ARISConfig.OPENSEARCH_BULK_INGEST_MIN_DOCS
+    
+    def _ensure_index(self, dimension: int):
+        """
+        Create the index with LangChain's default k-NN mapping if it does not exist yet.
+        
+        ``dimension`` is the embedding dimension, recorded in the index ``_meta``; two-stage
+        indexes build the k-NN graph over the first EMBEDDING_COARSE_DIMENSIONS only.
+        """
+        from shared.config.settings import ARISConfig
+        client = self.vectorstore.client
+        if client.indices.exists(index=self.index_name):
+            return
+        layout = {
+            'embedding_model': embedding_model_name(self.embeddings),
+            'coarse_dimensions': ARISConfig.EMBEDDING_COARSE_DIMENSIONS if self.two_stage_knn else None,
+        }
+        if is_shared_index(self.index_name):
+            mapping = shared_index_body(dimension, **layout)
+        else:
+            mapping = opensearch_index_body(dimension, **layout)
+        client.indices.create(index=self.index_name, body=mapping)
+        self._layout = opensearch_index_layout(mapping['mappings'])
+        if self._layout['dimension'] < dimension:
+            self.vectorstore.embedding_function = TruncatedEmbeddings(self.embeddings, self._layout['dimension'])
+        logger.info(
+            f"Created index '{self.index_name}' ({dimension} dimensions"
+            f"{', two-stage k-NN on ' + str(self._layout['dimension']) if self._layout['two_stage'] else ''}, "
+            f"compression: {self._layout['compression']})"
+        )
+    
+    def _ensure_index_mapping(self):
+        """
+        Create the index with our own mapping before LangChain would create a default one
+        (embedding metadata, shared chunk index settings, compressed or two-stage vector fields).
+        """
+        if not self.vectorstore.client.indices.exists(index=self.index_name):
+            self._ensure_index(len(self.embeddings.embed_query("dimension")))
+    
+    def _index_layout(self) -> Dict[str, Any]:
+        """Vector layout of this index (k-NN and embedding dimensions, two-stage, compression), cached."""
+        if self._layout is None:
+            try:
+                mapping = self.vectorstore.client.indices.get_mapping(index=self.index_name)
+                self._layout = opensearch_index_layout(next(iter(mapping.values())).get('mappings', {}))
+            except Exception as e:
+                logger.debug(f"_index_layout: {type(e).__name__}: {e}")
+                return opensearch_index_layout({})
+        return self._layout
+    
+    def with_routing(self, routing: Optional[str]) -> 'OpenSearchVectorStore':
+        """Shallow copy sharing the client, with searches routed to the given document shard(s)."""
+        if routing == self.routing:
+            return self
+        scoped = copy.copy(self)
+        scoped.routing = routing
+        if self.vectorstore is not None:
+            scoped.vectorstore = copy.copy(self.vectorstore)
+            scoped.vectorstore.routing = routing
+        return scoped
+    
+    def _apply_bulk_settings(self):
+        """
+        Disable refresh and replicas for the duration of a bulk ingest (once per context).
+        
+        Only the first of concurrent bulk ingests into an index records the original
+        settings; the others join it and the last one to finish restores them.
+        """
+        state = self._bulk_state
+        if state is None or state.get('applied'):
+            return
+        client = self.vectorstore.client
+        with _bulk_indexes_lock:
+            entry = _bulk_indexes.get(self.index_name)
+            if entry is None:
+                current = client.indices.get_settings(index=self.index_name)
+                index_settings = current.get(self.index_name, {}).get('settings', {}).get('index', {})
+                refresh_interval = index_settings.get('refresh_interval')
+                original = {
+                    # Refresh left off by an interrupted ingest (e.g. another process): reset to the default
+                    'refresh_interval': None if refresh_interval == '-1' else refresh_interval,
+                    'number_of_replicas': index_settings.get('number_of_replicas'),
+                }
+                client.indices.put_settings(
+                    index=self.index_name,
+                    body={'index': {'refresh_interval': '-1', 'number_of_replicas': 0}}
+                )
+                _bulk_indexes[self.index_name] = {'count': 1, 'original': original}
+                logger.info(f"⚡ Bulk-ingest settings applied to '{self.index_name}' (refresh off, 0 replicas)")
+            else:
+                entry['count'] += 1
+        state['applied'] = True
+    
+    @contextmanager
+    def bulk_ingest(self, force_merge: Optional[bool] = None):
+        """
+        Context for large ingests into this store's index.
+        
+        Inside the context refresh is disabled and replicas are dropped to 0 (applied
+        once the index exists). When the last concurrent bulk ingest into the index
+        exits, the original settings are restored and an optional force-merge runs;
+        every context refreshes the index once on exit.
+        """
+        from shared.config.settings import ARISConfig
+        if self._bulk_state is not None:
+            # Nested use: the outer context restores the settings
+            yield self
+            return
+        
+        self._bulk_state = {'applied': False}
+        try:
+            yield self
+        finally:
+            state, self._bulk_state = self._bulk_state, None
+            if state.get('applied'):
+                original = None
+                with _bulk_indexes_lock:
+                    entry = _bulk_indexes[self.index_name]
+                    entry['count'] -= 1
+                    if entry['count'] == 0:
+                        original = _bulk_indexes.pop(self.index_name)['original']
+                client = self.vectorstore.client
+                try:
+                    if original is not None:
+                        client.indices.put_settings(index=self.index_name, body={'index': original})
+                        if force_merge if force_merge is not None else ARISConfig.OPENSEARCH_BULK_FORCE_MERGE:
+                            client.indices.forcemerge(
+                                index=self.index_name,
+                                max_num_segments=ARISConfig.OPENSEARCH_FORCE_MERGE_SEGMENTS,
+                                request_timeout=1800
+                            )
+                        logger.info(f"✅ Bulk-ingest settings restored on '{self.index_name}'")
+                    # Other bulk ingests may still hold refresh off: make this one's documents visible
+                    client.indices.refresh(index=self.index_name)
+                except Exception as e:
+                    logger.warning(f"⚠️ Could not restore index settings on '{self.index_name}': {e}")
+    
+    def _bulk_actions(self, documents: List[Document]):
+        """Embed documents batch by batch and yield bulk index actions in LangChain's document layout."""
+        from shared.config.settings import ARISConfig
+        batch_size = max(1, ARISConfig.EMBEDDING_BATCH_SIZE)
+        ids = [getattr(doc, 'id', None) for doc in documents]
+        if not all(ids):
+            ids = [str(uuid.uuid4()) for _ in documents]
+        for start in range(0, len(documents), batch_size):
+            batch = documents[start:start + batch_size]
+            vectors = self.embeddings.embed_documents([doc.page_content for doc in batch])
+            if start == 0:
+                self._ensure_index(len(vectors[0]))
+                self._apply_bulk_settings()
+                layout = self._index_layout()
+            for doc, doc_id, vector in zip(batch, ids[start:start + batch_size], vectors):
+                action = {
+                    '_op_type': 'index',
+                    '_index': self.index_name,
+                    '_id': doc_id,
+                    **opensearch_vector_values(vector, layout),
+                    'text': doc.page_content,
+                    'metadata': doc.metadata,
+                }
+                if self.routing:
+                    action['_routing'] = self.routing
+                yield action
+    
+    def _parallel_bulk_add(self, documents: List[Document]) -> int:
+        """Stream documents into the index with helpers.parallel_bulk. Returns the number indexed."""
+        from opensearchpy import helpers
+        from shared.config.settings import ARISConfig
+        
+        indexed, errors = 0, []
+        for ok, info in helpers.parallel_bulk(
+            self.vectorstore.client,
+            self._bulk_actions(documents),
+            thread_count=ARISConfig.OPENSEARCH_BULK_THREADS,
+            chunk_size=ARISConfig.OPENSEARCH_BULK_SIZE,
+            max_chunk_bytes=ARISConfig.OPENSEARCH_BULK_CHUNK_BYTES,
+            raise_on_error=False,
+        ):
+            if ok:
+                indexed += 1
+            else:
+                errors.append(info)
+        if errors:
+            raise ValueError(f"Bulk ingest failed for {len(errors)} documents: {str(errors[0])[:500]}")
+        logger.info(f"Bulk-ingested {indexed} documents into '{self.index_name}' ({ARISConfig.OPENSEARCH_BULK_THREADS} threads)")
+        return indexed
+    
+    def _bulk_add(self, documents: List[Document]) -> int:
+        """Index a batch with helpers.bulk and refresh once (the write path for two-stage indexes)."""
+        from opensearchpy import helpers
+        
+        indexed, errors = helpers.bulk(self.vectorstore.client, self._bulk_actions(documents), raise_on_error=False)
+        if errors:
+            raise ValueError(f"Bulk indexing failed for {len(errors)} documents: {str(errors[0])[:500]}")
+        if self._bulk_state is None:
+            self.vectorstore.client.indices.refresh(index=self.index_name)
+        return indexed
+    
     def from_documents(self, documents: List[Document], auto_recreate_on_mismatch: bool = True) -> 'OpenSearchVectorStore':
         """
         Create vector store from documents.
@@ -404,6 +677,8 @@ class OpenSearchVectorStore:
             cleaned_documents = self._clean_metadata_for_opensearch(documents)
             logger.info(f"Cleaned metadata for {len(cleaned_documents)} documents (removed large nested structures)")
             
+            self._ensure_index_mapping()
+            
             # Check if index exists and validate dimensions before adding
             try:
                 client = self.vectorstore.client
@@ -430,6 +705,7 @@ class OpenSearchVectorStore:
                     current_dimension = len(test_embedding)
                     logger.info(f"Recreating index '{self.index_name}' with {current_dimension} dimensions...")
                     self._initialize_langchain_store()
+                    self._ensure_index(current_dimension)
                 else:
                     # Re-raise the validation error if auto-recreate is disabled
                     raise
@@ -440,8 +716,13 @@ class OpenSearchVectorStore:
             from shared.config.settings import ARISConfig
             bulk_size = ARISConfig.OPENSEARCH_BULK_SIZE
             
+            # Large ingests stream through parallel_bulk with refresh and replicas disabled
+            if self._use_bulk_ingest(len(cleaned_documents)):
+                with self.bulk_ingest():
+                    total_added = self._parallel_bulk_add(cleaned_documents)
+                logger.info(f"OpenSearch vectorstore created successfully with {total_added} documents (bulk-ingest mode)")
             # Split into batches if documents exceed bulk_size
-            if len(cleaned_documents) > bulk_size:
+            elif len(cleaned_documents) > bulk_size:
                 logger.info(f"Splitting {len(cleaned_documents)} documents into batches of {bulk_size}...")
                 total_added = 0
                 for i in range(0, len(cleaned_documents), bulk_size):
@@ -449,11 +730,11 @@ class OpenSearchVectorStore:
                     batch_num = (i // bulk_size) + 1
                     total_batches = (len(cleaned_documents) + bulk_size - 1) // bulk_size
                     logger.info(f"Adding batch {batch_num}/{total_batches} ({len(batch)} documents)...")
-                    self.vectorstore.add_documents(batch)
+                    self._add_batch(batch)
                     total_added += len(batch)
                 logger.info(f"OpenSearch vectorstore created successfully with {total_added} documents in {total_batches} batches")
             else:
-                self.vectorstore.add_documents(cleaned_documents)
+                self._add_batch(cleaned_documents)
                 logger.info(f"OpenSearch vectorstore created successfully with {len(cleaned_documents)} documents")
         except Exception as e:
             error_str = str(e)
@@ -477,7 +758,7 @@ class OpenSearchVectorStore:
                     batch_num = (i // safe_batch_size) + 1
                     total_batches = (len(cleaned_documents) + safe_batch_size - 1) // safe_batch_size
                     logger.info(f"Adding batch {batch_num}/{total_batches} ({len(batch)} documents)...")
-                    self.vectorstore.add_documents(batch)
+                    self._add_batch(batch)
                     total_added += len(batch)
                 logger.info(f"OpenSearch vectorstore created successfully with {total_added} documents in {total_batches} batches")
                 return  # Successfully handled, exit early
@@ -516,10 +797,11 @@ class OpenSearchVectorStore:
                     # Recreate the vectorstore (which will create a new index with correct dimensions)
                     logger.info(f"Recreating index '{self.index_name}' with {current_dimension} dimensions...")
                     self._initialize_langchain_store()
+                    self._ensure_index(current_dimension)
                     
                     # Retry adding documents
                     logger.info(f"Retrying to add {len(cleaned_documents)} documents to recreated index...")
-                    self.vectorstore.add_documents(cleaned_documents)
+                    self._add_batch(cleaned_documents)
                     logger.info(f"✅ OpenSearch vectorstore created successfully with {len(cleaned_documents)} documents")
                     return self
                     
@@ -562,12 +844,19 @@ class OpenSearchVectorStore:
             cleaned_documents = self._clean_metadata_for_opensearch(documents)
             logger.info(f"Cleaned metadata for {len(cleaned_documents)} documents (removed large nested structures)")
             
+            self._ensure_index_mapping()
+            
             # Get bulk_size from config to ensure we don't exceed it
             from shared.config.settings import ARISConfig
             bulk_size = ARISConfig.OPENSEARCH_BULK_SIZE
             
+            # Large ingests stream through parallel_bulk with refresh and replicas disabled
+            if self._use_bulk_ingest(len(cleaned_documents)):
+                with self.bulk_ingest():
+                    total_added = self._parallel_bulk_add(cleaned_documents)
+                logger.info(f"Successfully added {total_added} documents to OpenSearch vectorstore (bulk-ingest mode)")
             # Split into batches if documents exceed bulk_size
-            if len(cleaned_documents) > bulk_size:
+            elif len(cleaned_documents) > bulk_size:
                 logger.info(f"Splitting {len(cleaned_documents)} documents into batches of {bulk_size}...")
                 total_added = 0
                 for i in range(0, len(cleaned_documents), bulk_size):
@@ -575,11 +864,11 @@ class OpenSearchVectorStore:
                     batch_num = (i // bulk_size) + 1
                     total_batches = (len(cleaned_documents) + bulk_size - 1) // bulk_size
                     logger.info(f"Adding batch {batch_num}/{total_batches} ({len(batch)} documents)...")
-                    self.vectorstore.add_documents(batch)
+                    self._add_batch(batch)
                     total_added += len(batch)
                 logger.info(f"Successfully added {total_added} documents to OpenSearch vectorstore in {total_batches} batches")
             else:
-                self.vectorstore.add_documents(cleaned_documents)
+                self._add_batch(cleaned_documents)
                 logger.info(f"Successfully added {len(cleaned_documents)} documents to OpenSearch vectorstore")
         except Exception as e:
             error_str = str(e)
@@ -605,7 +894,7 @@ class OpenSearchVectorStore:
                     batch_num = (i // safe_batch_size) + 1
                     total_batches = (len(cleaned_documents) + safe_batch_size - 1) // safe_batch_size
                     logger.info(f"Adding batch {batch_num}/{total_batches} ({len(batch)} documents)...")
-                    self.vectorstore.add_documents(batch)
+                    self._add_batch(batch)
                     total_added += len(batch)
                 logger.info(f"Successfully added {total_added} documents to OpenSearch vectorstore in {total_batches} batches")
                 return  # Successfully handled, exit early
@@ -640,10 +929,11 @@ class OpenSearchVectorStore:
                     # Recreate the vectorstore (which will create a new index with correct dimensions)
                     logger.info(f"Recreating index '{self.index_name}' with {current_dimension} dimensions...")
                     self._initialize_langchain_store()
+                    self._ensure_index(current_dimension)
                     
                     # Retry adding documents
                     logger.info(f"Retrying to add {len(cleaned_documents)} documents to recreated index...")
-                    self.vectorstore.add_documents(cleaned_documents)
+                    self._add_batch(cleaned_documents)
                     logger.info(f"✅ Successfully added {len(cleaned_documents)} documents to recreated index")
                     return
                     
@@ -784,7 +1074,7 @@ class OpenSearchVectorStore:
         # Build cache key (use first 100 chars of query + filter hash)
         filter_hash = hashlib.md5(str(filter).encode()).hexdigest()[:8] if filter else "none"
         cache_key = hashlib.md5(
-            f"{query[:100]}:{k}:{semantic_weight}:{filter_hash}:{self.index_name}".encode()
+            f"{query[:100]}:{k}:{semantic_weight}:{filter_hash}:{self.index_name}:{self.routing}".encode()
         ).hexdigest()
         
         # Check cache
@@ -813,6 +1103,15 @@ class OpenSearchVectorStore:
             semantic_results = []
             keyword_results = []
             msearch_body = []
+            search_header = {"index": self.index_name}
+            search_params = {}
+            if self.routing:
+                search_header["routing"] = self.routing
+                search_params["routing"] = self.routing
+            
+            # Shortened indexes are searched with the matching Matryoshka prefix of the query
+            layout = self._index_layout()
+            knn_vector = truncate_embedding(query_vector, layout['dimension'] or len(query_vector))
             
             # 1. Prepare Semantic Search (if weight > 0) with ef_search optimization
             if semantic_weight > 0:
@@ -823,7 +1122,7 @@ class OpenSearchVectorStore:
                     "query": {
                         "knn": {
                             "vector_field": {
-                                "vector": query_vector,
+                                "vector": knn_vector,
                                 "k": knn_size,
                                 "method_parameters": {
                                     "ef_search": ef_search
@@ -835,11 +1134,21 @@ class OpenSearchVectorStore:
                 if filter:
                     knn_query["query"]["knn"]["vector_field"]["filter"] = filter
                 
+                if layout['two_stage']:
+                    # Two-stage: oversampled coarse k-NN, re-ranked below with the full vectors
+                    window = int(knn_size * rescore_oversample())
+                    knn_query["size"] = window
+                    knn_query["query"]["knn"]["vector_field"]["k"] = window
+                    knn_query["_source"].append(FULL_VECTOR_FIELD)
+                else:
+                    # Compressed vectors: oversample and re-rank with the full-precision vectors
+                    knn_size = apply_opensearch_rescore(knn_query, knn_vector, knn_size, layout['compression'])
+                
                 # Add min_score if specified
                 if min_score and min_score > 0:
                     knn_query["min_score"] = min_score
                 
-                msearch_body.extend([{"index": self.index_name}, knn_query])
+                msearch_body.extend([search_header, knn_query])
             
             # 2. Prepare Keyword Search (if weight > 0)
             # ENHANCED: Add phrase matching with very high boost to prioritize exact phrase matches
@@ -909,7 +1218,7 @@ class OpenSearchVectorStore:
                 if filter:
                     text_query["query"]["bool"]["filter"] = filter
                 
-                msearch_body.extend([{"index": self.index_name}, text_query])
+                msearch_body.extend([search_header, text_query])
             
             # 3. Execute Multi-Search
             if msearch_body:
@@ -929,17 +1238,23 @@ class OpenSearchVectorStore:
                     # Fallback to sequential if msearch fails (unlikely)
                     if not semantic_results and semantic_weight > 0:
                         try:
-                            semantic_response = client.search(index=self.index_name, body=knn_query)
+                            semantic_response = client.search(index=self.index_name, body=knn_query, **search_params)
                             semantic_results = semantic_response.get("hits", {}).get("hits", [])
                         except Exception as e:
                             logger.debug(f"hybrid_search: semantic fallback failed: {type(e).__name__}: {e}")
                     if not keyword_results and keyword_weight > 0:
                         try:
-                            keyword_response = client.search(index=self.index_name, body=text_query)
+                            keyword_response = client.search(index=self.index_name, body=text_query, **search_params)
                             keyword_results = keyword_response.get("hits", {}).get("hits", [])
                         except Exception as e:
                             logger.debug(f"hybrid_search: keyword fallback failed: {type(e).__name__}: {e}")
             
+            if semantic_weight > 0 and layout['two_stage']:
+                full_query = truncate_embedding(query_vector, layout['full_dimensions'])
+                semantic_results = rescore_full_vectors(semantic_results, full_query, knn_size)
+            elif semantic_weight > 0:
+                semantic_results = semantic_results[:knn_size]
+            
             # Combine results using RRF
             all_hits = semantic_results + keyword_results
             
@@ -1145,7 +1460,100 @@ class OpenSearchVectorStore:
         except Exception as e:
             logger.warning(f"Could not count documents in index '{target_index}': {str(e)}")
             return 0
-    
+
+    def get_chunk_identities(self, source: Optional[str] = None, index_name: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Fetch the content-hash identity and stored metadata of every chunk in an index.
+
+        Vectors are excluded from the scan so this stays cheap for large documents.
+
+        Args:
+            source: Optional document name to restrict the scan to (for shared indexes)
+            index_name: Index to scan (defaults to self.index_name)
+
+        Returns:
+            Dict mapping chunk _id -> stored metadata (only chunks that carry a chunk_hash)
+        """
+        if self.vectorstore is None:
+            return {}
+
+        target_index = index_name or self.index_name
+        identities: Dict[str, Dict[str, Any]] = {}
+        try:
+            from opensearchpy import helpers
+            client = self.vectorstore.client
+            if not client.indices.exists(index=target_index):
+                return {}
+            filters = [{"exists": {"field": "metadata.chunk_hash"}}]
+            if source:
+                filters.append({"term": {"metadata.source.keyword": source}})
+            scan_params = {"routing": self.routing} if self.routing else {}
+            for hit in helpers.scan(
+                client,
+                index=target_index,
+                query={"query": {"bool": {"filter": filters}}},
+                _source=["metadata"],
+                size=1000,
+                **scan_params
+            ):
+                identities[hit["_id"]] = hit.get("_source", {}).get("metadata", {}) or {}
+        except Exception as e:
+            logger.warning(f"Could not read chunk identities from index '{target_index}': {str(e)}")
+            return {}
+        return identities
+
+    def delete_chunks_by_ids(self, chunk_ids: List[str], index_name: Optional[str] = None) -> int:
+        """Delete chunks by _id with bulk requests. Returns the number of chunks deleted."""
+        if self.vectorstore is None or not chunk_ids:
+            return 0
+
+        target_index = index_name or self.index_name
+        from opensearchpy import helpers
+        routing = {"_routing": self.routing} if self.routing else {}
+        actions = (
+            {"_op_type": "delete", "_index": target_index, "_id": chunk_id, **routing}
+            for chunk_id in chunk_ids
+        )
+        success, errors = helpers.bulk(
+            self.vectorstore.client, actions, raise_on_error=False, chunk_size=1000
+        )
+        if errors:
+            logger.warning(f"⚠️ {len(errors)} chunk deletions failed in index '{target_index}'")
+        return success
+
+    def update_chunks_metadata(self, updates: Dict[str, Dict[str, Any]], index_name: Optional[str] = None) -> int:
+        """
+        Partially update the stored metadata of existing chunks without re-embedding them.
+
+        Args:
+            updates: Dict mapping chunk _id -> metadata fields to overwrite
+
+        Returns:
+            Number of chunks updated
+        """
+        if self.vectorstore is None or not updates:
+            return 0
+
+        target_index = index_name or self.index_name
+        from opensearchpy import helpers
+        routing = {"_routing": self.routing} if self.routing else {}
+        actions = (
+            {
+                "_op_type": "update",
+                "_index": target_index,
+                "_id": chunk_id,
+                "doc": {"metadata": metadata},
+                **routing
+            }
+            for chunk_id, metadata in updates.items()
+        )
+        success, errors = helpers.bulk(
+            self.vectorstore.client, actions, raise_on_error=False, chunk_size=500
+        )
+        if errors:
+            logger.warning(f"⚠️ {len(errors)} chunk metadata updates failed in index '{target_index}'")
+        return success
+
     def find_next_available_index_name(self, base_index_name: str) -> str:
         """
         Find the next available index name by auto-incrementing.
@@ -1194,7 +1602,12 @@ class OpenSearchVectorStore:
 
 
 class OpenSearchMultiIndexManager:
-    """Manages multiple OpenSearch indexes for per-document storage."""
+    """
+    Manages multiple OpenSearch indexes for per-document storage.
+    
+    Also serves the shared layout: several documents then map to the same shared
+    index, which is searched once with document routing and a source_key filter.
+    """
     
     def __init__(self, embeddings, domain, region=None, endpoint=None):
         self.embeddings = embeddings
@@ -1228,11 +1641,15 @@ class OpenSearchMultiIndexManager:
         keyword_weight: float = 0.3,
         filter: Optional[Dict] = None,
         alternate_query: Optional[str] = None,
+        sources: Optional[List[str]] = None,
         **kwargs
     ) -> List[Document]:
         """
         Search across multiple indexes and combine results with GLOBAL RE-RANKING.
         
+        ``sources`` restricts shared (consolidated) indexes to the selected documents;
+        per-document indexes are already scoped by their name.
+        
         FIX: Previous implementation divided results per index (k/n per index) and 
         concatenated without re-ranking. This caused irrelevant results when searching
         all documents because early indexes got priority regardless of relevance.
@@ -1240,6 +1657,8 @@ class OpenSearchMultiIndexManager:
         NEW: Get k results from EACH index, then globally re-rank by relevance score.
         """
         all_results = []
+        # Documents in the shared layout map to the same index - search it once
+        index_names = list(dict.fromkeys(index_names))
         
         # FIX: Get k results from EACH index (not k/n), then re-rank globally
         # This ensures we get the best results from each document
@@ -1259,6 +1678,10 @@ class OpenSearchMultiIndexManager:
         def search_single_index(index_name):
             try:
                 store = self.get_or_create_index_store(index_name)
+                index_filter = filter
+                if sources and is_shared_index(index_name):
+                    store = store.with_routing(document_routing(sources))
+                    index_filter = with_document_filter(filter, sources)
                 
                 if use_hybrid_search:
                     # Use pre-computed embedding for efficiency
@@ -1268,7 +1691,7 @@ class OpenSearchMultiIndexManager:
                         k=results_per_index,
                         semantic_weight=semantic_weight,
                         keyword_weight=keyword_weight,
-                        filter=filter,
+                        filter=index_filter,
                         alternate_query=alternate_query
                     )
                 elif use_mmr:
@@ -1279,7 +1702,7 @@ class OpenSearchMultiIndexManager:
                             "k": results_per_index,
                             "fetch_k": fetch_k,
                             "lambda_mult": lambda_mult,
-                            "filter": filter
+                            "filter": index_filter
                         }
                     )
                     mmr_results = retriever.invoke(query)
@@ -1292,8 +1715,8 @@ class OpenSearchMultiIndexManager:
                     # Basic similarity search: Use similarity_search_with_score for scores
                     try:
                         search_kwargs_inner = {"k": results_per_index}
-                        if filter:
-                            search_kwargs_inner["filter"] = filter
+                        if index_filter:
+                            search_kwargs_inner["filter"] = index_filter
                         
                         results_with_scores = store.vectorstore.similarity_search_with_score(
                             query, **search_kwargs_inner
@@ -1308,8 +1731,8 @@ class OpenSearchMultiIndexManager:
                         # Fallback to retriever
                         logger.debug(f"similarity_search_with_score failed, using retriever: {score_err}")
                         search_kwargs={"k": results_per_index}
-                        if filter:
-                            search_kwargs["filter"] = filter
+                        if index_filter:
+                            search_kwargs["filter"] = index_filter
                         retriever = store.vectorstore.as_retriever(
                             search_kwargs=search_kwargs
                         )
@@ -1618,6 +2041,14 @@ class OpenSearchCRUDManager:
             Result dict with success status
         """
         try:
+            if is_shared_index(index_name):
+                return {
+                    'success': False,
+                    'index_name': index_name,
+                    'message': f"Index '{index_name}' is the shared chunk index; delete documents by source instead",
+                    'chunks_deleted': 0
+                }
+            
             if not self._client.indices.exists(index=index_name):
                 return {
                     'success': False,
@@ -1778,6 +2209,31 @@ class OpenSearchCRUDManager:
                 'error': str(e)
             }
     
+    def _index_layout(self, index_name: str) -> Dict[str, Any]:
+        """Vector layout of an index (k-NN and embedding dimensions, two-stage, compression)."""
+        try:
+            mapping = self._client.indices.get_mapping(index=index_name)
+            return opensearch_index_layout(next(iter(mapping.values())).get('mappings', {}))
+        except Exception as e:
+            logger.debug(f"_index_layout: {type(e).__name__}: {e}")
+            return opensearch_index_layout({})
+    
+    def _chunk_routing(self, index_name: str, chunk_id: str) -> Dict[str, Any]:
+        """
+        Routing kwargs for a by-id request. The shared index requires routing, so
+        look up the chunk's ``_routing`` with an ids query (searches fan out).
+        """
+        if not is_shared_index(index_name):
+            return {}
+        response = self._client.search(
+            index=index_name,
+            body={"query": {"ids": {"values": [chunk_id]}}, "_source": False, "size": 1}
+        )
+        hits = response.get('hits', {}).get('hits', [])
+        if hits and hits[0].get('_routing'):
+            return {'routing': hits[0]['_routing']}
+        return {}
+    
     def get_chunk(self, index_name: str, chunk_id: str) -> Optional[Dict[str, Any]]:
         """
         Get a specific chunk by ID.
@@ -1790,7 +2246,7 @@ class OpenSearchCRUDManager:
             Chunk data or None
         """
         try:
-            response = self._client.get(index=index_name, id=chunk_id)
+            response = self._client.get(index=index_name, id=chunk_id, **self._chunk_routing(index_name, chunk_id))
             source = response.get('_source', {})
             
             return {
@@ -1837,7 +2293,7 @@ class OpenSearchCRUDManager:
             # Prepare document
             doc = {
                 'text': text,
-                'vector_field': embedding,
+                **opensearch_vector_values(embedding, self._index_layout(index_name)),
                 'page': page,
                 'source': source,
                 'language': language,
@@ -1846,7 +2302,11 @@ class OpenSearchCRUDManager:
             }
             
             # Index document
-            response = self._client.index(index=index_name, body=doc)
+            index_kwargs = {}
+            if is_shared_index(index_name):
+                doc['metadata']['source_key'] = source_key(source)
+                index_kwargs['routing'] = document_routing([source])
+            response = self._client.index(index=index_name, body=doc, **index_kwargs)
             
             chunk_id = response.get('_id')
             logger.info(f"Created chunk '{chunk_id}' in index '{index_name}'")
@@ -1891,19 +2351,20 @@ class OpenSearchCRUDManager:
         try:
             # Build update doc
             update_doc = {}
+            routing = self._chunk_routing(index_name, chunk_id)
             
             if text is not None:
                 update_doc['text'] = text
                 # Regenerate embedding
                 embedding = self.embeddings.embed_query(text)
-                update_doc['vector_field'] = embedding
+                update_doc.update(opensearch_vector_values(embedding, self._index_layout(index_name)))
             
             if page is not None:
                 update_doc['page'] = page
             
             if metadata:
                 # Get existing doc to merge metadata
-                existing = self._client.get(index=index_name, id=chunk_id)
+                existing = self._client.get(index=index_name, id=chunk_id, **routing)
                 existing_metadata = existing.get('_source', {}).get('metadata', {})
                 existing_metadata.update(metadata)
                 update_doc['metadata'] = existing_metadata
@@ -1919,7 +2380,8 @@ class OpenSearchCRUDManager:
             self._client.update(
                 index=index_name,
                 id=chunk_id,
-                body={'doc': update_doc}
+                body={'doc': update_doc},
+                **routing
             )
             
             logger.info(f"Updated chunk '{chunk_id}' in index '{index_name}'")
@@ -1952,7 +2414,7 @@ class OpenSearchCRUDManager:
             Result dict
         """
         try:
-            self._client.delete(index=index_name, id=chunk_id)
+            self._client.delete(index=index_name, id=chunk_id, **self._chunk_routing(index_name, chunk_id))
             
             logger.info(f"Deleted chunk '{chunk_id}' from index '{index_name}'")
             
@@ -1985,18 +2447,23 @@ class OpenSearchCRUDManager:
         """
         try:
             # Delete by query
+            query = {
+                "bool": {
+                    "should": [
+                        {"match": {"source": source}},
+                        {"match": {"metadata.source": source}}
+                    ]
+                }
+            }
+            delete_kwargs = {}
+            if is_shared_index(index_name):
+                # Other documents share this index: exact source_key match on the document's shard
+                query = {"bool": {"filter": [source_key_filter([source])]}}
+                delete_kwargs['routing'] = document_routing([source])
             response = self._client.delete_by_query(
                 index=index_name,
-                body={
-                    "query": {
-                        "bool": {
-                            "should": [
-                                {"match": {"source": source}},
-                                {"match": {"metadata.source": source}}
-                            ]
-                        }
-                    }
-                }
+                body={"query": query},
+                **delete_kwargs
             )
             
             deleted = response.get('deleted', 0)
@@ -2068,6 +2535,8 @@ class OpenSearchCRUDManager:
             
             for index_name in index_names:
                 try:
+                    # k-NN on the prefix the index was built at (shortened or two-stage indexes)
+                    knn_vector = truncate_embedding(query_vector, self._index_layout(index_name)['dimension'] or len(query_vector))
                     if use_hybrid:
                         # Hybrid search with semantic and keyword
                         # OpenSearch KNN query format - vector_field is the field name, not "field" parameter
@@ -2078,7 +2547,7 @@ class OpenSearchCRUDManager:
                                 "query": {
                                     "knn": {
                                         "vector_field": {
-                                            "vector": query_vector,
+                                            "vector": knn_vector,
                                             "k": k
                                         }
                                     }
@@ -2143,7 +2612,7 @@ class OpenSearchCRUDManager:
                                 "query": {
                                     "knn": {
                                         "vector_field": {
-                                            "vector": query_vector,
+                                            "vector": knn_vector,
                                             "k": k
                                         }
                                     }
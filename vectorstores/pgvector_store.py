@@ -1,10 +1,20 @@
 """
 PGVector vector store implementation for ARIS RAG.
 Uses LangChain's PostgreSQL pgvector backend.
+
+Hybrid search runs natively in Postgres: a generated ``tsvector`` column with a
+GIN index serves the keyword list, an HNSW index serves the vector list, and a
+single statement fuses both candidate lists with Reciprocal Rank Fusion (RRF).
+Adding the generated column rewrites the table under an ACCESS EXCLUSIVE lock, so
+it is a migration (``migrate_hybrid_schema``, run at ingestion startup or by
+scripts/migrate_pgvector_hybrid.py), never part of building a store.
+All stores in a process share one pooled SQLAlchemy engine per connection string.
 """
 import os
+import re
 import logging
-from typing import List, Optional, Dict, Any
+import threading
+from typing import List, Optional, Dict, Any, Tuple
 
 try:
     from langchain.docstore.document import Document
@@ -13,8 +23,193 @@ except ImportError:
 
 from sqlalchemy import create_engine, text
 
+from shared.config.settings import ARISConfig
+
 logger = logging.getLogger(__name__)
 
+EMBEDDING_TABLE = "langchain_pg_embedding"
+COLLECTION_TABLE = "langchain_pg_collection"
+TSV_COLUMN = "document_tsv"
+RRF_K = 60  # same constant as OpenSearchVectorStore._combine_results_rrf
+
+_IDENTIFIER_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+_FILTER_KEY_RE = re.compile(r"^[A-Za-z0-9_.\-]+$")
+
+# Process-wide pooled engines (connection string -> Engine) and schema bookkeeping:
+# databases whose tsvector column exists, and (database, dimension) HNSW indexes created
+_engines: Dict[str, Any] = {}
+_engines_lock = threading.Lock()
+_tsvector_ready: set = set()
+_hnsw_ready: set = set()
+
+
+def get_pgvector_engine(connection_string: str):
+    """Return the long-lived pooled engine for a connection string (created once per process)."""
+    with _engines_lock:
+        engine = _engines.get(connection_string)
+        if engine is None:
+            engine = create_engine(
+                connection_string,
+                pool_size=ARISConfig.PGVECTOR_POOL_SIZE,
+                max_overflow=ARISConfig.PGVECTOR_MAX_OVERFLOW,
+                pool_pre_ping=True,
+                pool_recycle=1800,
+            )
+            _engines[connection_string] = engine
+            logger.info(
+                f"PGVector pooled engine created (pool_size={ARISConfig.PGVECTOR_POOL_SIZE}, "
+                f"max_overflow={ARISConfig.PGVECTOR_MAX_OVERFLOW})"
+            )
+        return engine
+
+
+def _vector_literal(vector: List[float]) -> str:
+    return "[" + ",".join(repr(float(v)) for v in vector) + "]"
+
+
+def build_metadata_filter_sql(filter: Optional[Dict[str, Any]], alias: str = "e") -> Tuple[str, Dict[str, Any]]:
+    """
+    Translate a LangChain-style metadata filter into a SQL predicate on ``cmetadata``.
+
+    Supports ``{"key": value}``, ``{"key": {"$eq": value}}`` and
+    ``{"key": {"$in": [values]}}``; clauses are AND-ed.
+
+    Returns:
+        (" AND ..." clause or "", bind parameters)
+    """
+    if not filter:
+        return "", {}
+    clauses = []
+    params: Dict[str, Any] = {}
+    for i, (key, condition) in enumerate(filter.items()):
+        if not _FILTER_KEY_RE.match(str(key)):
+            raise ValueError(f"Unsupported metadata filter key: {key!r}")
+        param = f"filter_{i}"
+        column = f"{alias}.cmetadata->>'{key}'"
+        if isinstance(condition, dict):
+            if "$in" in condition:
+                clauses.append(f"{column} = ANY(:{param})")
+                params[param] = [str(v) for v in condition["$in"]]
+                continue
+            if "$eq" in condition:
+                condition = condition["$eq"]
+            else:
+                raise ValueError(f"Unsupported metadata filter operator for {key!r}: {list(condition)}")
+        clauses.append(f"{column} = :{param}")
+        params[param] = str(condition)
+    return "".join(f" AND {clause}" for clause in clauses), params
+
+
+def build_hybrid_search_sql(
+    dimension: int,
+    text_search_config: str = "simple",
+    filter: Optional[Dict[str, Any]] = None
+) -> Tuple[str, Dict[str, Any]]:
+    """
+    Build the single-statement hybrid query.
+
+    Each branch takes its top ``:candidates`` rows through its own index (HNSW on
+    the dimension-cast embedding, GIN on the tsvector column); the two ranked lists
+    are then fused with weighted RRF and the top ``:k`` rows are returned. Keyword
+    terms are OR-ed, matching the OpenSearch ``match`` semantics.
+    """
+    if not _IDENTIFIER_RE.match(text_search_config):
+        raise ValueError(f"Invalid text search config: {text_search_config!r}")
+    dim = int(dimension)
+    filter_sql, params = build_metadata_filter_sql(filter)
+    distance = f"CAST(e.embedding AS vector({dim})) <=> CAST(:query_vector AS vector({dim}))"
+    sql = f"""
+WITH coll AS (
+    SELECT uuid FROM {COLLECTION_TABLE} WHERE name = :collection_name
+),
+query AS (
+    SELECT CAST(replace(CAST(plainto_tsquery('{text_search_config}', :query_text) AS text), '&', '|') AS tsquery) AS q
+),
+semantic AS (
+    SELECT id, ROW_NUMBER() OVER (ORDER BY distance) AS rank
+    FROM (
+        SELECT e.uuid AS id, {distance} AS distance
+        FROM {EMBEDDING_TABLE} e
+        WHERE e.collection_id = (SELECT uuid FROM coll){filter_sql}
+        ORDER BY distance
+        LIMIT :candidates
+    ) s
+),
+keyword AS (
+    SELECT id, ROW_NUMBER() OVER (ORDER BY score DESC) AS rank
+    FROM (
+        SELECT e.uuid AS id, ts_rank_cd(e.{TSV_COLUMN}, query.q) AS score
+        FROM {EMBEDDING_TABLE} e, query
+        WHERE e.collection_id = (SELECT uuid FROM coll)
+          AND e.{TSV_COLUMN} @@ query.q{filter_sql}
+        ORDER BY score DESC
+        LIMIT :candidates
+    ) kw
+),
+fused AS (
+    SELECT COALESCE(s.id, kw.id) AS id,
+           COALESCE(CAST(:semantic_weight AS float8) / (:rrf_k + s.rank), 0.0)
+           + COALESCE(CAST(:keyword_weight AS float8) / (:rrf_k + kw.rank), 0.0) AS score,
+           s.rank AS semantic_rank,
+           kw.rank AS keyword_rank
+    FROM semantic s
+    FULL OUTER JOIN keyword kw ON s.id = kw.id
+)
+SELECT e.document, e.cmetadata, f.score, f.semantic_rank, f.keyword_rank
+FROM fused f
+JOIN {EMBEDDING_TABLE} e ON e.uuid = f.id
+ORDER BY f.score DESC
+LIMIT :k
+"""
+    return sql, params
+
+
+def _tsvector_column_exists(conn) -> bool:
+    """Catalog lookup for the generated tsvector column (takes no table lock)."""
+    return conn.execute(
+        text(
+            "SELECT 1 FROM information_schema.columns "
+            "WHERE table_name = :table AND column_name = :column"
+        ),
+        {"table": EMBEDDING_TABLE, "column": TSV_COLUMN},
+    ).scalar() is not None
+
+
+def migrate_hybrid_schema(connection_string: str, text_search_config: Optional[str] = None) -> bool:
+    """
+    Add the generated tsvector column and the GIN/collection indexes if missing.
+
+    The ALTER TABLE rewrites the embeddings table under an ACCESS EXCLUSIVE lock, so
+    it only runs when the catalog shows the column is missing. Returns True when the
+    schema is ready.
+    """
+    config = text_search_config or ARISConfig.PGVECTOR_TEXT_SEARCH_CONFIG
+    if not _IDENTIFIER_RE.match(config):
+        logger.warning(f"Invalid PGVECTOR_TEXT_SEARCH_CONFIG {config!r}; native hybrid search disabled")
+        return False
+    try:
+        with get_pgvector_engine(connection_string).begin() as conn:
+            if not _tsvector_column_exists(conn):
+                logger.info(f"PGVector migration: adding generated {TSV_COLUMN} column (rewrites {EMBEDDING_TABLE})...")
+                conn.execute(text(
+                    f"ALTER TABLE {EMBEDDING_TABLE} ADD COLUMN IF NOT EXISTS {TSV_COLUMN} tsvector "
+                    f"GENERATED ALWAYS AS (to_tsvector('{config}', coalesce(document, ''))) STORED"
+                ))
+            conn.execute(text(
+                f"CREATE INDEX IF NOT EXISTS ix_{EMBEDDING_TABLE}_{TSV_COLUMN} "
+                f"ON {EMBEDDING_TABLE} USING gin ({TSV_COLUMN})"
+            ))
+            conn.execute(text(
+                f"CREATE INDEX IF NOT EXISTS ix_{EMBEDDING_TABLE}_collection_id "
+                f"ON {EMBEDDING_TABLE} (collection_id)"
+            ))
+        _tsvector_ready.add(connection_string)
+        logger.info(f"✅ PGVector hybrid schema migrated (tsvector/GIN, config={config})")
+        return True
+    except Exception as e:
+        logger.warning(f"Could not migrate PGVector hybrid schema: {type(e).__name__}: {e}")
+        return False
+
 
 class PgVectorStore:
     """PGVector wrapper with an interface similar to other vector stores in this repo."""
@@ -29,7 +224,10 @@ class PgVectorStore:
         self.connection_string = connection_string or self._build_connection_string_from_env()
         self.collection_name = collection_name
         self.index_name = collection_name  # compatibility with OpenSearch code paths
+        self.text_search_config = ARISConfig.PGVECTOR_TEXT_SEARCH_CONFIG
+        self.engine = get_pgvector_engine(self.connection_string)
         self.vectorstore = None
+        self._dimension: Optional[int] = None
         self._initialize_vectorstore()
 
     @staticmethod
@@ -68,8 +266,60 @@ class PgVectorStore:
             embedding_function=self.embeddings,
             collection_name=self.collection_name,
             use_jsonb=True,
+            connection=self.engine,
         )
 
+    def _stored_dimension(self) -> Optional[int]:
+        """Dimension of vectors already stored (None for an empty table)."""
+        if self._dimension:
+            return self._dimension
+        try:
+            with self.engine.connect() as conn:
+                dim = conn.execute(
+                    text(f"SELECT vector_dims(embedding) FROM {EMBEDDING_TABLE} LIMIT 1")
+                ).scalar()
+            if dim:
+                self._dimension = int(dim)
+        except Exception as e:
+            logger.debug(f"Could not read PGVector dimension: {type(e).__name__}: {e}")
+        return self._dimension
+
+    def ensure_hybrid_schema(self, dimension: Optional[int] = None) -> bool:
+        """
+        Check the tsvector column and create the HNSW index for the dimension if missing.
+
+        The tsvector column is only looked up (``migrate_hybrid_schema`` adds it) and is
+        cached per database once present. The HNSW index is an expression index on
+        ``embedding::vector(dim)`` because the LangChain table declares an untyped
+        ``vector`` column; it is created once per (database, dimension) per process as
+        soon as the dimension is known (first stored vector or first query).
+        """
+        dimension = dimension or self._stored_dimension()
+        try:
+            if self.connection_string not in _tsvector_ready:
+                with self.engine.connect() as conn:
+                    if not _tsvector_column_exists(conn):
+                        logger.warning(
+                            f"PGVector {TSV_COLUMN} column missing; run scripts/migrate_pgvector_hybrid.py "
+                            f"(or enable PGVECTOR_MIGRATE_ON_STARTUP) for native hybrid search"
+                        )
+                        return False
+                _tsvector_ready.add(self.connection_string)
+            key = (self.connection_string, dimension)
+            if dimension and key not in _hnsw_ready:
+                with self.engine.begin() as conn:
+                    conn.execute(text(
+                        f"CREATE INDEX IF NOT EXISTS ix_{EMBEDDING_TABLE}_hnsw_{int(dimension)} "
+                        f"ON {EMBEDDING_TABLE} USING hnsw ((CAST(embedding AS vector({int(dimension)}))) vector_cosine_ops) "
+                        f"WITH (m = {ARISConfig.PGVECTOR_HNSW_M}, ef_construction = {ARISConfig.PGVECTOR_HNSW_EF_CONSTRUCTION})"
+                    ))
+                _hnsw_ready.add(key)
+                logger.info(f"✅ PGVector HNSW index ready (dimension={dimension})")
+            return True
+        except Exception as e:
+            logger.warning(f"Could not prepare PGVector hybrid schema: {type(e).__name__}: {e}")
+            return False
+
     def from_documents(self, documents: List[Document], auto_recreate_on_mismatch: bool = True) -> "PgVectorStore":
         """Create/store vectors from documents in PGVector collection."""
         if not documents:
@@ -83,7 +333,9 @@ class PgVectorStore:
                 collection_name=self.collection_name,
                 pre_delete_collection=False,
                 use_jsonb=True,
+                connection=self.engine,
             )
+            self.ensure_hybrid_schema()
             return self
         except Exception as e:
             logger.error(f"Failed to build PGVector collection from documents: {e}")
@@ -97,6 +349,7 @@ class PgVectorStore:
             self.from_documents(documents, auto_recreate_on_mismatch=auto_recreate_on_mismatch)
             return
         self.vectorstore.add_documents(documents)
+        self.ensure_hybrid_schema()
 
     def as_retriever(self, search_type: str = "similarity", search_kwargs: Optional[Dict] = None):
         """Return retriever interface."""
@@ -121,11 +374,52 @@ class PgVectorStore:
         semantic_weight: float = 1.0,
         keyword_weight: float = 0.0,
         filter: Optional[Dict[str, Any]] = None,
+        alternate_query: Optional[str] = None,
     ):
         """
-        PGVector fallback for hybrid_search API compatibility.
-        Uses semantic similarity search only.
+        Native hybrid search: HNSW vector list + tsvector keyword list fused with RRF in one query.
+
+        Falls back to semantic-only search (flagged with ``_pgvector_semantic_only``)
+        if the hybrid schema is unavailable or the statement fails.
         """
+        try:
+            if query_vector is None:
+                query_vector = self.embeddings.embed_query(query)
+            dimension = len(query_vector)
+            if not self.ensure_hybrid_schema(dimension):
+                raise RuntimeError("hybrid schema unavailable")
+
+            sql, params = build_hybrid_search_sql(dimension, self.text_search_config, filter)
+            keyword_text = f"{query} {alternate_query}" if alternate_query and alternate_query != query else query
+            params.update({
+                "collection_name": self.collection_name,
+                "query_vector": _vector_literal(query_vector),
+                "query_text": keyword_text,
+                "candidates": max(int(k), ARISConfig.PGVECTOR_HYBRID_CANDIDATES),
+                "semantic_weight": float(semantic_weight),
+                "keyword_weight": float(keyword_weight),
+                "rrf_k": RRF_K,
+                "k": int(k),
+            })
+            with self.engine.begin() as conn:
+                conn.execute(text(f"SET LOCAL hnsw.ef_search = {max(int(ARISConfig.PGVECTOR_HNSW_EF_SEARCH), int(k))}"))
+                rows = conn.execute(text(sql), params).fetchall()
+
+            results = []
+            for document, cmetadata, score, semantic_rank, keyword_rank in rows:
+                metadata = dict(cmetadata or {})
+                metadata["_pgvector_score"] = float(score)
+                metadata["_pgvector_semantic_rank"] = semantic_rank
+                metadata["_pgvector_keyword_rank"] = keyword_rank
+                results.append(Document(page_content=document or "", metadata=metadata))
+            logger.info(
+                f"✅ PGVector hybrid search returned {len(results)} results "
+                f"(semantic={semantic_weight:.2f}, keyword={keyword_weight:.2f})"
+            )
+            return results
+        except Exception as e:
+            logger.warning(f"PGVector native hybrid search failed, using semantic-only search: {type(e).__name__}: {e}")
+
         results = self.similarity_search(query=query, k=k, filter=filter)
         for d in results:
             if hasattr(d, "metadata") and isinstance(d.metadata, dict):
@@ -135,14 +429,13 @@ class PgVectorStore:
     def count_documents(self) -> int:
         """Count stored embeddings in this collection."""
         try:
-            engine = create_engine(self.connection_string)
-            with engine.begin() as conn:
+            with self.engine.connect() as conn:
                 result = conn.execute(
                     text(
-                        """
+                        f"""
                         SELECT COUNT(*)
-                        FROM langchain_pg_embedding e
-                        JOIN langchain_pg_collection c ON e.collection_id = c.uuid
+                        FROM {EMBEDDING_TABLE} e
+                        JOIN {COLLECTION_TABLE} c ON e.collection_id = c.uuid
                         WHERE c.name = :collection_name
                         """
                     ),
@@ -1,9 +1,19 @@
 """
 Qdrant vector store implementation for ARIS RAG.
-Uses LangChain's Qdrant backend.
+
+Points use the LangChain payload layout (``page_content`` + ``metadata``) with the
+unnamed dense vector, plus a hashed-term sparse vector (BM25-style term weights,
+IDF applied by Qdrant) so hybrid search can fuse dense and keyword candidates
+server-side in a single ``query_points`` call. New collections store dense vectors
+per VECTOR_COMPRESSION; quantized ones are searched with oversampling and rescoring
+against the original vectors.
 """
 import os
+import re
+import uuid
+import hashlib
 import logging
+from collections import Counter
 from typing import List, Optional, Dict, Any, Tuple
 
 try:
@@ -11,8 +21,46 @@ try:
 except ImportError:
     from langchain_core.documents import Document
 
+from shared.config.settings import ARISConfig
+from vectorstores.vector_compression import qdrant_search_params, qdrant_vectors_config
+
 logger = logging.getLogger(__name__)
 
+_TERM_RE = re.compile(r"\w+", re.UNICODE)
+_FILTER_CLAUSE_KEYS = {"must", "should", "must_not", "min_should"}
+
+# BM25 term-frequency saturation; IDF is applied by Qdrant (Modifier.IDF)
+_BM25_K1 = 1.2
+_BM25_B = 0.75
+_BM25_AVG_DOC_LEN = 256.0
+
+
+def _term_index(term: str) -> int:
+    return int.from_bytes(hashlib.blake2b(term.encode("utf-8"), digest_size=4).digest(), "little") & 0x7FFFFFFF
+
+
+def hashed_sparse_vector(text: str, is_query: bool = False) -> Tuple[List[int], List[float]]:
+    """
+    Hash lowercase word terms into a sparse vector.
+
+    Documents get BM25-saturated term frequencies; queries get weight 1.0 per
+    distinct term, so the dot product with an IDF-modified index is a BM25 score.
+
+    Returns:
+        (indices, values) sorted by index
+    """
+    terms = _TERM_RE.findall((text or "").lower())
+    if not terms:
+        return [], []
+    counts = Counter(_term_index(term) for term in terms)
+    if is_query:
+        weights = {idx: 1.0 for idx in counts}
+    else:
+        norm = _BM25_K1 * (1 - _BM25_B + _BM25_B * len(terms) / _BM25_AVG_DOC_LEN)
+        weights = {idx: tf * (_BM25_K1 + 1) / (tf + norm) for idx, tf in counts.items()}
+    indices = sorted(weights)
+    return indices, [float(weights[idx]) for idx in indices]
+
 
 class QdrantStore:
     """Qdrant wrapper with an interface similar to other vector stores in this repo."""
@@ -24,6 +72,7 @@ class QdrantStore:
         collection_name: str = "aris_rag_index",
         api_key: Optional[str] = None,
         prefer_grpc: bool = False,
+        vector_size: Optional[int] = None,
     ):
         self.embeddings = embeddings
         self.url = url or os.getenv("QDRANT_URL")
@@ -31,8 +80,12 @@ class QdrantStore:
         self.index_name = collection_name  # compatibility with existing engine logic
         self.api_key = api_key or os.getenv("QDRANT_API_KEY")
         self.prefer_grpc = prefer_grpc
+        self.vector_size = vector_size or ARISConfig.QDRANT_VECTOR_SIZE or None
+        self.sparse_vector_name = ARISConfig.QDRANT_SPARSE_VECTOR_NAME
         self.client = None
-        self.vectorstore = None
+        self._collection_ready = False
+        self._has_sparse = False
+        self._quantized = False
         self._init_client()
 
     def _init_client(self):
@@ -41,6 +94,10 @@ class QdrantStore:
         try:
             from qdrant_client import QdrantClient
 
+            if self.url == ":memory:":
+                # Local in-process mode (tests / development stand-in)
+                self.client = QdrantClient(location=":memory:")
+                return
             self.client = QdrantClient(
                 url=self.url,
                 api_key=self.api_key,
@@ -51,54 +108,119 @@ class QdrantStore:
             logger.error(f"Failed to initialize Qdrant client: {e}")
             raise
 
-    def _init_vectorstore(self):
-        try:
-            from langchain_community.vectorstores import Qdrant
-
-            if self.client is None:
-                self._init_client()
-            self.vectorstore = Qdrant(
-                client=self.client,
-                collection_name=self.collection_name,
-                embeddings=self.embeddings,
-            )
-        except Exception as e:
-            logger.error(f"Failed to initialize Qdrant vectorstore wrapper: {e}")
-            raise
+    def _resolve_dimension(self, dimension: Optional[int] = None) -> Optional[int]:
+        """Dimension for a new collection: caller's vectors, then config, then the embeddings object."""
+        if dimension:
+            return int(dimension)
+        if self.vector_size:
+            return int(self.vector_size)
+        for attr in ("dim", "dimensions", "embedding_dimension"):
+            value = getattr(self.embeddings, attr, None)
+            if isinstance(value, int) and value > 0:
+                return value
+        return None
 
-    def _ensure_collection_exists(self):
+    def _ensure_collection_exists(self, dimension: Optional[int] = None) -> bool:
         """
-        Ensure collection exists before writes.
-        Avoids incompatible code path in Qdrant.from_documents with newer qdrant-client.
+        Ensure the collection (dense + sparse vectors) and payload indexes exist.
+
+        Reads the existing collection info once; when creating, the dimension comes
+        from the vectors being written/queried or config - never from a probe
+        embedding. Returns False if the collection is missing and no dimension is known.
         """
-        from qdrant_client.models import Distance, VectorParams
+        if self._collection_ready:
+            return True
+        from qdrant_client.models import Modifier, SparseVectorParams
 
         if self.client is None:
             self._init_client()
 
         try:
-            self.client.get_collection(collection_name=self.collection_name)
-            return
+            info = self.client.get_collection(collection_name=self.collection_name)
+            sparse = getattr(info.config.params, "sparse_vectors", None) or {}
+            self._has_sparse = self.sparse_vector_name in sparse
+            dense = getattr(info.config.params, "vectors", None)
+            self._quantized = bool(
+                getattr(info.config, "quantization_config", None) or getattr(dense, "quantization_config", None)
+            )
+            if not self._has_sparse:
+                logger.info(
+                    f"Qdrant collection '{self.collection_name}' has no sparse vector "
+                    f"'{self.sparse_vector_name}'; hybrid search will be dense-only until it is recreated"
+                )
         except Exception:
-            pass
+            dim = self._resolve_dimension(dimension)
+            if not dim:
+                return False
+            vectors_config, quantization_config = qdrant_vectors_config(dim)
+            self.client.create_collection(
+                collection_name=self.collection_name,
+                vectors_config=vectors_config,
+                sparse_vectors_config={self.sparse_vector_name: SparseVectorParams(modifier=Modifier.IDF)},
+                quantization_config=quantization_config,
+            )
+            self._has_sparse = True
+            self._quantized = quantization_config is not None
+            logger.info(
+                f"✅ Created Qdrant collection '{self.collection_name}' (dimension={dim}, "
+                f"sparse='{self.sparse_vector_name}', compression={ARISConfig.VECTOR_COMPRESSION})"
+            )
 
-        # Create collection with embedding dimension discovered from model.
-        dim = len(self.embeddings.embed_query("dimension_probe"))
-        self.client.create_collection(
-            collection_name=self.collection_name,
-            vectors_config=VectorParams(size=dim, distance=Distance.COSINE),
-        )
+        self._ensure_payload_indexes()
+        self._collection_ready = True
+        return True
+
+    def _ensure_payload_indexes(self):
+        """Index the payload fields used for filtering (idempotent)."""
+        from qdrant_client.models import PayloadSchemaType
+
+        for field_name, schema in (
+            ("metadata.source", PayloadSchemaType.KEYWORD),
+            ("metadata.page", PayloadSchemaType.INTEGER),
+            ("metadata.language", PayloadSchemaType.KEYWORD),
+        ):
+            try:
+                self.client.create_payload_index(
+                    collection_name=self.collection_name,
+                    field_name=field_name,
+                    field_schema=schema,
+                )
+            except Exception as e:
+                logger.debug(f"Qdrant payload index {field_name}: {type(e).__name__}: {e}")
+
+    def _point_id(self, document: Document) -> str:
+        doc_id = getattr(document, "id", None)
+        if doc_id:
+            return str(uuid.uuid5(uuid.NAMESPACE_URL, f"{self.collection_name}/{doc_id}"))
+        return uuid.uuid4().hex
+
+    def _upsert_documents(self, documents: List[Document]):
+        from qdrant_client.models import PointStruct, SparseVector
+
+        batch_size = max(1, ARISConfig.QDRANT_UPSERT_BATCH_SIZE)
+        for start in range(0, len(documents), batch_size):
+            batch = documents[start:start + batch_size]
+            vectors = self.embeddings.embed_documents([doc.page_content for doc in batch])
+            self._ensure_collection_exists(dimension=len(vectors[0]) if vectors else None)
+            points = []
+            for doc, vector in zip(batch, vectors):
+                point_vector: Any = list(vector)
+                if self._has_sparse:
+                    indices, values = hashed_sparse_vector(doc.page_content)
+                    point_vector = {"": point_vector, self.sparse_vector_name: SparseVector(indices=indices, values=values)}
+                points.append(PointStruct(
+                    id=self._point_id(doc),
+                    vector=point_vector,
+                    payload={"page_content": doc.page_content, "metadata": dict(doc.metadata or {})},
+                ))
+            self.client.upsert(collection_name=self.collection_name, points=points)
 
     def from_documents(self, documents: List[Document], auto_recreate_on_mismatch: bool = True) -> "QdrantStore":
         """Create/store vectors from documents in Qdrant collection."""
         if not documents:
             return self
         try:
-            self._ensure_collection_exists()
-            if self.vectorstore is None:
-                self._init_vectorstore()
-            # Use add_documents path to avoid qdrant-client/langchain incompatible args.
-            self.vectorstore.add_documents(documents)
+            self._upsert_documents(documents)
             return self
         except Exception as e:
             logger.error(f"Failed to build Qdrant collection from documents: {e}")
@@ -108,10 +230,7 @@ class QdrantStore:
         """Add documents to Qdrant collection."""
         if not documents:
             return
-        self._ensure_collection_exists()
-        if self.vectorstore is None:
-            self._init_vectorstore()
-        self.vectorstore.add_documents(documents)
+        self._upsert_documents(documents)
 
     def as_retriever(self, search_type: str = "similarity", search_kwargs: Optional[Dict] = None):
         """Return retriever interface."""
@@ -153,68 +272,100 @@ class QdrantStore:
             metadata.setdefault(k, v)
         return Document(page_content=page_content, metadata=metadata)
 
+    @staticmethod
+    def _build_filter(filter: Optional[Any]):
+        """
+        Accept a native Qdrant Filter, a Filter-shaped dict (must/should/...), or a
+        LangChain-style metadata filter ({"source": {"$in": [...]}, "language": "spa"}).
+        """
+        if filter is None:
+            return None
+        from qdrant_client.models import FieldCondition, Filter as QdrantFilter, MatchAny, MatchValue
+
+        if isinstance(filter, QdrantFilter):
+            return filter
+        if not isinstance(filter, dict) or not filter:
+            logger.debug("Ignoring non-Qdrant filter for Qdrant search: %s", type(filter).__name__)
+            return None
+        if set(filter) & _FILTER_CLAUSE_KEYS:
+            return QdrantFilter(**filter)
+
+        conditions = []
+        for key, condition in filter.items():
+            field = key if key.startswith("metadata.") else f"metadata.{key}"
+            if isinstance(condition, dict) and "$in" in condition:
+                conditions.append(FieldCondition(key=field, match=MatchAny(any=list(condition["$in"]))))
+            else:
+                value = condition.get("$eq") if isinstance(condition, dict) else condition
+                conditions.append(FieldCondition(key=field, match=MatchValue(value=value)))
+        return QdrantFilter(must=conditions)
+
+    def _points_to_results(self, points) -> List[Tuple[Document, float]]:
+        results: List[Tuple[Document, float]] = []
+        for p in points or []:
+            payload = getattr(p, "payload", None) or {}
+            point_id = getattr(p, "id", None)
+            score = float(getattr(p, "score", 0.0) or 0.0)
+            results.append((self._to_document(payload=payload, point_id=point_id, score=score), score))
+        return results
+
     def _query_points_with_score(
         self,
         query: str,
         k: int = 4,
         filter: Optional[Dict] = None,
+        query_vector: Optional[List[float]] = None,
     ) -> List[Tuple[Document, float]]:
-        self._ensure_collection_exists()
-        if self.client is None:
-            self._init_client()
-
-        query_vector = self.embeddings.embed_query(query)
+        if query_vector is None:
+            query_vector = self.embeddings.embed_query(query)
+        if not self._ensure_collection_exists(dimension=len(query_vector)):
+            return []
         k = max(1, int(k or 4))
+        query_filter = self._build_filter(filter)
 
-        query_filter = None
-        if filter is not None:
-            # Support native qdrant filter object; ignore unknown dict filter shapes.
-            try:
-                from qdrant_client.models import Filter as QdrantFilter
-                if isinstance(filter, QdrantFilter):
-                    query_filter = filter
-                elif isinstance(filter, dict):
-                    query_filter = QdrantFilter(**filter)
-            except Exception:
-                logger.debug("Ignoring non-Qdrant filter for Qdrant search: %s", type(filter).__name__)
-
-        points = None
-        if hasattr(self.client, "search"):
-            points = self.client.search(
+        if hasattr(self.client, "query_points"):
+            response = self.client.query_points(
                 collection_name=self.collection_name,
-                query_vector=query_vector,
+                query=list(query_vector),
                 query_filter=query_filter,
+                search_params=qdrant_search_params(self._quantized),
                 limit=k,
                 with_payload=True,
                 with_vectors=False,
             )
-        elif hasattr(self.client, "query_points"):
-            response = self.client.query_points(
+            points = getattr(response, "points", response)
+        elif hasattr(self.client, "search"):
+            points = self.client.search(
                 collection_name=self.collection_name,
-                query=query_vector,
+                query_vector=list(query_vector),
                 query_filter=query_filter,
+                search_params=qdrant_search_params(self._quantized),
                 limit=k,
                 with_payload=True,
                 with_vectors=False,
             )
-            points = getattr(response, "points", response)
         else:
             raise AttributeError("Qdrant client has neither 'search' nor 'query_points' method.")
+        return self._points_to_results(points)
 
-        results: List[Tuple[Document, float]] = []
-        for p in points or []:
-            payload = getattr(p, "payload", None) or {}
-            point_id = getattr(p, "id", None)
-            score = float(getattr(p, "score", 0.0) or 0.0)
-            results.append((self._to_document(payload=payload, point_id=point_id, score=score), score))
-        return results
-
-    def similarity_search_with_score(self, query: str, k: int = 4, filter: Optional[Dict] = None):
-        return self._query_points_with_score(query=query, k=k, filter=filter)
+    def similarity_search_with_score(
+        self,
+        query: str,
+        k: int = 4,
+        filter: Optional[Dict] = None,
+        query_vector: Optional[List[float]] = None,
+    ):
+        return self._query_points_with_score(query=query, k=k, filter=filter, query_vector=query_vector)
 
-    def similarity_search(self, query: str, k: int = 4, filter: Optional[Dict] = None):
+    def similarity_search(
+        self,
+        query: str,
+        k: int = 4,
+        filter: Optional[Dict] = None,
+        query_vector: Optional[List[float]] = None,
+    ):
         """Run semantic similarity search."""
-        return [doc for doc, _ in self._query_points_with_score(query=query, k=k, filter=filter)]
+        return [doc for doc, _ in self._query_points_with_score(query=query, k=k, filter=filter, query_vector=query_vector)]
 
     def hybrid_search(
         self,
@@ -224,15 +375,74 @@ class QdrantStore:
         semantic_weight: float = 1.0,
         keyword_weight: float = 0.0,
         filter: Optional[Dict[str, Any]] = None,
+        alternate_query: Optional[str] = None,
     ):
         """
-        Qdrant fallback for hybrid_search API compatibility.
-        Uses semantic similarity search only.
+        Dense + sparse hybrid search fused with weighted RRF in one ``query_points`` call.
+
+        The query is embedded at most once (or not at all when ``query_vector`` is
+        given). Collections without the sparse vector fall back to dense-only search,
+        flagged with ``_qdrant_semantic_only``.
         """
-        results = self.similarity_search(query=query, k=k, filter=filter)
-        for d in results:
-            if hasattr(d, "metadata") and isinstance(d.metadata, dict):
-                d.metadata.setdefault("_qdrant_semantic_only", True)
+        if query_vector is None:
+            query_vector = self.embeddings.embed_query(query)
+        if keyword_weight <= 0 or not self._ensure_collection_exists(dimension=len(query_vector)) or not self._has_sparse:
+            results = self.similarity_search(query=query, k=k, filter=filter, query_vector=query_vector)
+            if keyword_weight > 0:
+                for d in results:
+                    if hasattr(d, "metadata") and isinstance(d.metadata, dict):
+                        d.metadata.setdefault("_qdrant_semantic_only", True)
+            return results
+
+        from qdrant_client.models import Fusion, FusionQuery, Prefetch, Rrf, RrfQuery, SparseVector
+
+        k = max(1, int(k or 10))
+        candidates = max(k, ARISConfig.QDRANT_HYBRID_CANDIDATES)
+        query_filter = self._build_filter(filter)
+        keyword_text = f"{query} {alternate_query}" if alternate_query and alternate_query != query else query
+        indices, values = hashed_sparse_vector(keyword_text, is_query=True)
+
+        prefetch, weights = [], []
+        if semantic_weight > 0:
+            prefetch.append(Prefetch(
+                query=list(query_vector),
+                filter=query_filter,
+                params=qdrant_search_params(self._quantized),
+                limit=candidates,
+            ))
+            weights.append(float(semantic_weight))
+        if indices:
+            prefetch.append(Prefetch(
+                query=SparseVector(indices=indices, values=values),
+                using=self.sparse_vector_name,
+                filter=query_filter,
+                limit=candidates,
+            ))
+            weights.append(float(keyword_weight))
+
+        def _run(fusion_query):
+            response = self.client.query_points(
+                collection_name=self.collection_name,
+                prefetch=prefetch,
+                query=fusion_query,
+                limit=k,
+                with_payload=True,
+                with_vectors=False,
+            )
+            return getattr(response, "points", response)
+
+        try:
+            points = _run(RrfQuery(rrf=Rrf(weights=weights)))
+        except Exception as e:
+            # Servers without weighted RRF: plain RRF fusion, still one call
+            logger.debug(f"Weighted RRF not available, using plain RRF: {type(e).__name__}: {e}")
+            points = _run(FusionQuery(fusion=Fusion.RRF))
+
+        results = [doc for doc, _ in self._points_to_results(points)]
+        logger.info(
+            f"✅ Qdrant hybrid search returned {len(results)} results "
+            f"(semantic={semantic_weight:.2f}, keyword={keyword_weight:.2f})"
+        )
         return results
 
     def count_documents(self) -> int:
@@ -0,0 +1,71 @@
+"""
+Consolidated chunk index layout for OpenSearch.
+
+Instead of one ``aris-doc-*`` index per document, every document's chunks go
+into one shared index (``OPENSEARCH_SHARED_INDEX``, optionally partitioned by
+month). Writes are routed by the document's canonical ``source_key`` so a
+document's chunks live on one shard, and queries for selected documents add the
+same routing plus a ``source_key`` term filter inside the k-NN clause. Queries
+over all documents hit a single index (or the partition pattern) instead of
+fanning out across thousands of small ones.
+
+``document_index_map`` keeps mapping document name -> index name; in this layout
+many documents map to the same shared index.
+"""
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from shared.config.settings import ARISConfig
+from shared.utils.source_key import source_key, source_key_filter
+
+SHARED_LAYOUT = "shared"
+
+
+def use_shared_layout() -> bool:
+    return ARISConfig.OPENSEARCH_INDEX_LAYOUT == SHARED_LAYOUT
+
+
+def shared_index_name(when: Optional[datetime] = None) -> str:
+    """Index new chunks are written to (the current partition when partitioned by month)."""
+    base = ARISConfig.OPENSEARCH_SHARED_INDEX
+    if ARISConfig.OPENSEARCH_SHARED_INDEX_PARTITION == "month":
+        return f"{base}-{(when or datetime.utcnow()).strftime('%Y.%m')}"
+    return base
+
+
+def shared_search_target() -> str:
+    """Index expression covering all shared partitions (for cross-corpus queries)."""
+    base = ARISConfig.OPENSEARCH_SHARED_INDEX
+    if ARISConfig.OPENSEARCH_SHARED_INDEX_PARTITION == "month":
+        return f"{base}-*"
+    return base
+
+
+def is_shared_index(index_name: Optional[str]) -> bool:
+    base = ARISConfig.OPENSEARCH_SHARED_INDEX
+    return bool(index_name) and (index_name == base or index_name.startswith(f"{base}-"))
+
+
+def document_routing(sources: Iterable[Optional[str]]) -> Optional[str]:
+    """Routing value for one or more documents (comma-separated, as the search API accepts)."""
+    keys = sorted({source_key(s) for s in sources if s and source_key(s)})
+    return ",".join(keys) if keys else None
+
+
+def with_document_filter(filter: Optional[Dict], sources: Optional[List[str]]) -> Optional[Dict]:
+    """AND a source_key filter for the given documents onto an existing filter."""
+    doc_filter = source_key_filter(sources or [])
+    if doc_filter is None:
+        return filter
+    if not filter:
+        return doc_filter
+    return {"bool": {"must": [filter, doc_filter]}}
+
+
+def shared_index_body(dimension: int, **layout) -> Dict:
+    """Settings and mapping for a shared chunk index: the chunk k-NN mapping, routing required."""
+    from vectorstores.vector_compression import opensearch_index_body
+
+    body = opensearch_index_body(dimension, routing_required=True, **layout)
+    body["settings"]["index"]["number_of_shards"] = ARISConfig.OPENSEARCH_SHARED_INDEX_SHARDS
+    return body
@@ -0,0 +1,261 @@
+"""
+Reduced-precision vector storage shared by the vector store backends.
+
+VECTOR_COMPRESSION selects how new indexes/collections store vectors:
+
+- ``none``:    float32 (previous behaviour)
+- ``fp16``:    half precision (OpenSearch faiss engine SQ fp16, FAISS SQfp16,
+               Qdrant float16 datatype)
+- ``int8``:    8-bit scalar quantization (OpenSearch lucene SQ, FAISS SQ8,
+               Qdrant int8 quantization)
+- ``on_disk``: quantized vectors in memory, full-precision vectors on disk
+               (OpenSearch on_disk mode, FAISS SQ8 + float32 side file,
+               Qdrant int8 quantization in RAM with originals on disk)
+
+Lossy modes are rescored when VECTOR_RESCORE is on: an oversampled candidate
+set (VECTOR_RESCORE_OVERSAMPLE x k) is re-ranked with the full-precision
+vectors, which every backend keeps (OpenSearch doc values, the FAISS side
+file, Qdrant original vectors).
+
+OpenSearch indexes can also be built two-stage (ENABLE_TWO_STAGE_KNN): the HNSW
+graph covers only a coarse Matryoshka prefix of each embedding and the full
+vector is stored alongside (``vector_full``) to rescore the candidates.
+"""
+import base64
+import logging
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from shared.config.settings import ARISConfig
+from shared.utils.embedding_dimensions import truncate_embedding
+
+logger = logging.getLogger(__name__)
+
+COMPRESSION_MODES = ("none", "fp16", "int8", "on_disk")
+
+_HNSW_EF_CONSTRUCTION = 512
+_HNSW_M = 16
+
+# Full-dimension vectors of two-stage indexes (base64 float32, _source only)
+FULL_VECTOR_FIELD = "vector_full"
+
+
+def compression_mode(mode: Optional[str] = None) -> str:
+    """Validated compression mode (configured one by default); unknown values fall back to 'none'."""
+    mode = (mode or ARISConfig.VECTOR_COMPRESSION or "none").lower()
+    if mode not in COMPRESSION_MODES:
+        logger.warning(f"Unknown VECTOR_COMPRESSION '{mode}', storing full-precision vectors")
+        return "none"
+    return mode
+
+
+def rescore_oversample() -> float:
+    return max(1.0, ARISConfig.VECTOR_RESCORE_OVERSAMPLE)
+
+
+# ============================================================================
+# OpenSearch
+# ============================================================================
+
+def opensearch_vector_field(dimension: int, mode: Optional[str] = None) -> Dict[str, Any]:
+    """knn_vector mapping for the ``vector_field`` of a new chunk index."""
+    mode = compression_mode(mode)
+    if mode == "on_disk":
+        return {
+            "type": "knn_vector",
+            "dimension": dimension,
+            "space_type": "l2",
+            "mode": "on_disk",
+            "compression_level": ARISConfig.OPENSEARCH_ON_DISK_COMPRESSION,
+        }
+    parameters: Dict[str, Any] = {"ef_construction": _HNSW_EF_CONSTRUCTION, "m": _HNSW_M}
+    engine = "lucene"
+    if mode == "fp16":
+        engine = "faiss"
+        parameters["encoder"] = {"name": "sq", "parameters": {"type": "fp16"}}
+    elif mode == "int8":
+        parameters["encoder"] = {"name": "sq"}
+    return {
+        "type": "knn_vector",
+        "dimension": dimension,
+        "method": {"name": "hnsw", "space_type": "l2", "engine": engine, "parameters": parameters},
+    }
+
+
+def opensearch_index_body(
+    dimension: int,
+    mode: Optional[str] = None,
+    routing_required: bool = False,
+    coarse_dimensions: Optional[int] = None,
+    embedding_model: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    LangChain's default k-NN index body with the vector field for the given compression.
+
+    ``dimension`` is the embedding dimension, recorded in ``_meta`` with the
+    embedding model. With ``coarse_dimensions`` the k-NN field only indexes that
+    prefix and the full vectors go to FULL_VECTOR_FIELD for rescoring.
+    """
+    from langchain_community.vectorstores.opensearch_vector_search import _default_text_mapping
+
+    if coarse_dimensions and coarse_dimensions >= dimension:
+        coarse_dimensions = None
+    knn_dimension = coarse_dimensions or dimension
+    body = _default_text_mapping(
+        knn_dimension, "lucene", "l2", 512, _HNSW_EF_CONSTRUCTION, _HNSW_M, "vector_field", routing_required=routing_required
+    )
+    properties = body["mappings"]["properties"]
+    properties["vector_field"] = opensearch_vector_field(knn_dimension, mode)
+    meta: Dict[str, Any] = {"embedding_dimensions": dimension}
+    if embedding_model:
+        meta["embedding_model"] = embedding_model
+    if coarse_dimensions:
+        properties[FULL_VECTOR_FIELD] = {"type": "binary"}
+        meta["coarse_dimensions"] = coarse_dimensions
+    body["mappings"]["_meta"] = meta
+    return body
+
+
+def opensearch_mapping_compression(field_mapping: Optional[Dict[str, Any]]) -> str:
+    """Compression mode of an existing knn_vector field mapping."""
+    if not field_mapping:
+        return "none"
+    if field_mapping.get("mode") == "on_disk" or field_mapping.get("compression_level") not in (None, "1x"):
+        return "on_disk"
+    encoder = (field_mapping.get("method", {}).get("parameters") or {}).get("encoder") or {}
+    if encoder.get("name") == "sq":
+        return "fp16" if (encoder.get("parameters") or {}).get("type") == "fp16" else "int8"
+    return "none"
+
+
+def opensearch_index_layout(mappings: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Vector layout of an existing chunk index from its ``mappings``.
+
+    ``dimension`` is the k-NN field size, ``full_dimensions`` the embedding
+    dimension the index was built for (``_meta``, or the k-NN size for indexes
+    created before it was recorded).
+    """
+    properties = mappings.get("properties", {})
+    meta = mappings.get("_meta") or {}
+    vector_field = properties.get("vector_field") or {}
+    dimension = vector_field.get("dimension")
+    return {
+        "dimension": dimension,
+        "full_dimensions": meta.get("embedding_dimensions") or dimension,
+        "embedding_model": meta.get("embedding_model"),
+        "two_stage": FULL_VECTOR_FIELD in properties,
+        "compression": opensearch_mapping_compression(vector_field),
+    }
+
+
+def encode_full_vector(vector: List[float]) -> str:
+    return base64.b64encode(np.asarray(vector, dtype=np.float32).tobytes()).decode("ascii")
+
+
+def decode_full_vector(encoded: str) -> np.ndarray:
+    return np.frombuffer(base64.b64decode(encoded), dtype=np.float32)
+
+
+def opensearch_vector_values(vector: List[float], layout: Dict[str, Any]) -> Dict[str, Any]:
+    """Vector fields of one chunk for an index layout: the k-NN prefix, plus the full vector when two-stage."""
+    values: Dict[str, Any] = {"vector_field": truncate_embedding(vector, layout.get("dimension") or len(vector))}
+    if layout.get("two_stage"):
+        values[FULL_VECTOR_FIELD] = encode_full_vector(truncate_embedding(vector, layout["full_dimensions"]))
+    return values
+
+
+def rescore_full_vectors(hits: List[Dict[str, Any]], query_vector: List[float], size: int) -> List[Dict[str, Any]]:
+    """
+    Re-rank coarse k-NN hits of a two-stage index by exact L2 on the full vectors.
+
+    Scores use the lucene l2 scale (1 / (1 + squared distance)); FULL_VECTOR_FIELD
+    is dropped from each ``_source``. Hits without a full vector keep their order
+    after the rescored ones.
+    """
+    query = np.asarray(query_vector, dtype=np.float32)
+    rescored, unscored = [], []
+    for hit in hits:
+        encoded = hit.get("_source", {}).pop(FULL_VECTOR_FIELD, None)
+        if encoded is None:
+            unscored.append(hit)
+            continue
+        full = decode_full_vector(encoded)
+        if len(full) != len(query):
+            unscored.append(hit)
+            continue
+        hit["_score"] = 1.0 / (1.0 + float(np.sum((full - query) ** 2)))
+        rescored.append(hit)
+    rescored.sort(key=lambda hit: hit["_score"], reverse=True)
+    return (rescored + unscored)[:size]
+
+
+def apply_opensearch_rescore(knn_query: Dict[str, Any], query_vector: List[float], size: int, mode: str) -> int:
+    """
+    Add rescoring to a ``knn`` search body for a compressed index.
+
+    on_disk uses the k-NN plugin's built-in rescore (oversample + exact
+    distances from the full-precision vectors on disk). The SQ modes fetch an
+    oversampled window and re-rank it with an exact ``knn_score`` script over
+    the full-precision doc values. Returns the number of hits to keep.
+    """
+    if mode == "none" or not ARISConfig.VECTOR_RESCORE:
+        return size
+    oversample = rescore_oversample()
+    knn_clause = knn_query["query"]["knn"]["vector_field"]
+    if mode == "on_disk":
+        knn_clause["rescore"] = {"oversample_factor": oversample}
+        return size
+    window = int(size * oversample)
+    knn_query["size"] = window
+    knn_clause["k"] = window
+    knn_query["rescore"] = {
+        "window_size": window,
+        "query": {
+            "query_weight": 0.0,
+            "rescore_query_weight": 1.0,
+            "rescore_query": {
+                "script_score": {
+                    "query": {"match_all": {}},
+                    "script": {
+                        "source": "knn_score",
+                        "lang": "knn",
+                        "params": {"field": "vector_field", "query_value": list(query_vector), "space_type": "l2"},
+                    },
+                }
+            },
+        },
+    }
+    return size
+
+
+# ============================================================================
+# Qdrant
+# ============================================================================
+
+def qdrant_vectors_config(dimension: int, mode: Optional[str] = None):
+    """(VectorParams, quantization_config) for a new dense collection."""
+    from qdrant_client.models import Datatype, Distance, ScalarQuantization, ScalarQuantizationConfig, ScalarType, VectorParams
+
+    mode = compression_mode(mode)
+    if mode == "fp16":
+        return VectorParams(size=dimension, distance=Distance.COSINE, datatype=Datatype.FLOAT16), None
+    if mode in ("int8", "on_disk"):
+        quantization = ScalarQuantization(
+            scalar=ScalarQuantizationConfig(type=ScalarType.INT8, quantile=0.99, always_ram=True)
+        )
+        return VectorParams(size=dimension, distance=Distance.COSINE, on_disk=mode == "on_disk"), quantization
+    return VectorParams(size=dimension, distance=Distance.COSINE), None
+
+
+def qdrant_search_params(quantized: bool):
+    """Search params that rescore quantized candidates with the original vectors."""
+    if not quantized:
+        return None
+    from qdrant_client.models import QuantizationSearchParams, SearchParams
+
+    return SearchParams(quantization=QuantizationSearchParams(
+        rescore=ARISConfig.VECTOR_RESCORE,
+        oversampling=rescore_oversample() if ARISConfig.VECTOR_RESCORE else None,
+    ))
@@ -12,9 +12,27 @@ try:
 except ImportError:
     from langchain_core.documents import Document
 
+import numpy as np
 from langchain_openai import OpenAIEmbeddings
 from langchain_community.vectorstores import FAISS
 
+from shared.config.settings import ARISConfig
+from .faiss_index import (
+    DOCSTORE_FILE,
+    VECTORS_FILE,
+    FaissIndexFiles,
+    FullPrecisionVectors,
+    RescoringFAISS,
+    SqliteDocstore,
+    apply_search_params,
+    build_faiss_index,
+    index_kind,
+    is_lossy,
+    train_if_needed,
+    upgrade_to_ivfpq,
+)
+from .vector_compression import rescore_oversample
+
 load_dotenv()
 
 logger = logging.getLogger(__name__)
@@ -34,7 +52,8 @@ class VectorStoreFactory:
         pgvector_collection: Optional[str] = None,
         qdrant_url: Optional[str] = None,
         qdrant_collection: Optional[str] = None,
-        qdrant_api_key: Optional[str] = None
+        qdrant_api_key: Optional[str] = None,
+        opensearch_routing: Optional[str] = None
     ):
         """
         Create a vector store instance.
@@ -44,6 +63,7 @@ class VectorStoreFactory:
             embeddings: Embeddings model to use
             opensearch_domain: OpenSearch domain name (required for OpenSearch)
             opensearch_index: OpenSearch index name (optional, defaults to "aris-rag-index")
+            opensearch_routing: Document routing key when writing into a shared chunk index
         
         Returns:
             Vector store instance (FAISS or OpenSearch wrapper)
@@ -61,7 +81,8 @@ class VectorStoreFactory:
                 embeddings=embeddings,
                 domain=opensearch_domain or os.getenv('AWS_OPENSEARCH_DOMAIN', 'intelycx-waseem-os'),
                 index_name=opensearch_index or "aris-rag-index",
-                endpoint=opensearch_endpoint
+                endpoint=opensearch_endpoint,
+                routing=opensearch_routing
             )
         elif store_type.lower() == "pgvector":
             from .pgvector_store import PgVectorStore
@@ -144,20 +165,48 @@ class VectorStoreFactory:
 
 
 class FAISSVectorStore:
-    """Wrapper for FAISS vector store to provide consistent interface."""
+    """
+    Wrapper for FAISS vector store to provide consistent interface.
+    
+    The index type is configurable (flat / HNSW / IVF-PQ), documents live in an
+    append-only SQLite docstore, the saved index is memory-mapped on load, and
+    saves after the first one only append the vectors added since (delta
+    segments), compacting into a full rewrite once deltas grow past
+    FAISS_COMPACT_RATIO. Directories written by the previous pickle-based format
+    are still loaded and migrated on the next save.
+    
+    With VECTOR_COMPRESSION (or IVF-PQ) the index holds lossy codes; float32
+    originals go to a ``vectors.f32`` side file and searches re-rank an
+    oversampled candidate set with them (VECTOR_RESCORE).
+    """
     
     def __init__(self, embeddings: OpenAIEmbeddings):
         self.embeddings = embeddings
         self.vectorstore: Optional[FAISS] = None
         self._embedding_dimension: Optional[int] = None
+        self._index_type = ARISConfig.FAISS_INDEX_TYPE
+        self._saved_path: Optional[str] = None
+        self._saved_ntotal = 0
+        self._pending_vectors: List[np.ndarray] = []
+        self._needs_full_save = True
+        self._mmap_loaded = False
     
     def _get_embedding_dimension(self) -> int:
-        """Get the dimension of embeddings dynamically."""
+        """Get the dimension of embeddings (cached; taken from the index or model before probing)."""
         if self._embedding_dimension is None:
-            # Use a small test text to get embedding dimension
-            test_text = "test"
-            test_embedding = self.embeddings.embed_query(test_text)
-            self._embedding_dimension = len(test_embedding)
+            existing_dim = self._get_existing_dimension()
+            if existing_dim:
+                self._embedding_dimension = existing_dim
+            else:
+                for attr in ("dim", "dimension", "dimensions"):
+                    value = getattr(self.embeddings, attr, None)
+                    if isinstance(value, int) and value > 0:
+                        self._embedding_dimension = value
+                        break
+            if self._embedding_dimension is None:
+                # Last resort: embed a small test text
+                test_embedding = self.embeddings.embed_query("test")
+                self._embedding_dimension = len(test_embedding)
             logger.info(f"Detected embedding dimension: {self._embedding_dimension} (model: {getattr(self.embeddings, 'model', 'unknown')})")
         return self._embedding_dimension
     
@@ -171,10 +220,13 @@ class FAISSVectorStore:
             logger.warning(f"_get_existing_dimension: {type(e).__name__}: {e}")
             return None
     
-    def _check_dimension_compatibility(self) -> Tuple[bool, Optional[int], Optional[int]]:
+    def _check_dimension_compatibility(self, new_dim: Optional[int] = None) -> Tuple[bool, Optional[int], Optional[int]]:
         """
         Check if embedding dimensions are compatible.
         
+        Args:
+            new_dim: Dimension of vectors about to be added (avoids a probe call)
+        
         Returns:
             (is_compatible, existing_dim, new_dim)
         """
@@ -182,15 +234,76 @@ class FAISSVectorStore:
         if existing_dim is None:
             return True, None, None  # No existing index, compatible
         
-        new_dim = self._get_embedding_dimension()
+        new_dim = new_dim or self._get_embedding_dimension()
         is_compatible = existing_dim == new_dim
         
         return is_compatible, existing_dim, new_dim
     
+    def _wrap_index(self, index, docstore, index_to_docstore_id: Dict, full_vectors: Optional[FullPrecisionVectors] = None) -> RescoringFAISS:
+        """LangChain FAISS store over the index, rescoring with full-precision vectors when available."""
+        store = RescoringFAISS(
+            embedding_function=self.embeddings,
+            index=index,
+            docstore=docstore,
+            index_to_docstore_id=index_to_docstore_id,
+        )
+        if full_vectors is not None and ARISConfig.VECTOR_RESCORE:
+            store.full_vectors = full_vectors
+            store.oversample = rescore_oversample()
+        return store
+    
+    def _create_index(self, dimension: int):
+        """Create an empty LangChain FAISS store with the configured index type and a SQLite docstore."""
+        index = build_faiss_index(dimension, self._index_type, ARISConfig)
+        full_vectors = FullPrecisionVectors(dimension) if ARISConfig.VECTOR_RESCORE and is_lossy(self._index_type, ARISConfig) else None
+        self.vectorstore = self._wrap_index(index, SqliteDocstore(), {}, full_vectors)
+        self._embedding_dimension = dimension
+        self._saved_path = None
+        self._saved_ntotal = 0
+        self._pending_vectors = []
+        self._needs_full_save = True
+        self._mmap_loaded = False
+    
+    def _ensure_writable(self):
+        """A memory-mapped index is read-only; read it into RAM before the first add."""
+        if self._mmap_loaded and self._saved_path:
+            self.vectorstore.index = FaissIndexFiles(self._saved_path).read_index_into_memory()
+            apply_search_params(self.vectorstore.index, ARISConfig)
+            if hasattr(self.vectorstore.index, "make_direct_map"):
+                self.vectorstore.index.make_direct_map()
+            self._mmap_loaded = False
+    
+    def _add_embedded(self, documents: List[Document], vectors: List[List[float]]):
+        """Add pre-embedded documents and remember the vectors for the next incremental save."""
+        array = np.asarray(vectors, dtype=np.float32)
+        if self.vectorstore._normalize_L2:
+            # Normalize up front so the delta segment and the rescoring side file hold what the index holds
+            array = array / np.maximum(np.linalg.norm(array, axis=1, keepdims=True), 1e-12)
+        train_if_needed(self.vectorstore.index, array)
+        self.vectorstore.add_embeddings(
+            list(zip([doc.page_content for doc in documents], array.tolist())),
+            metadatas=[doc.metadata for doc in documents],
+        )
+        self._pending_vectors.append(array)
+        full_vectors = getattr(self.vectorstore, 'full_vectors', None)
+        if full_vectors is not None:
+            full_vectors.add(array)
+        
+        index = self.vectorstore.index
+        if (
+            self._index_type == "ivfpq"
+            and index_kind(index) == "flat"
+            and index.ntotal >= ARISConfig.FAISS_IVF_TRAIN_SIZE
+        ):
+            self.vectorstore.index = upgrade_to_ivfpq(index, ARISConfig)
+            self._needs_full_save = True
+    
     def from_documents(self, documents: List[Document]) -> 'FAISSVectorStore':
         """Create vector store from documents."""
-        logger.info(f"Creating FAISS vectorstore from {len(documents)} documents...")
-        self.vectorstore = FAISS.from_documents(documents, self.embeddings)
+        logger.info(f"Creating FAISS vectorstore from {len(documents)} documents (index type: {self._index_type})...")
+        vectors = self.embeddings.embed_documents([doc.page_content for doc in documents])
+        self._create_index(len(vectors[0]))
+        self._add_embedded(documents, vectors)
         logger.info("FAISS vectorstore created successfully")
         return self
     
@@ -222,8 +335,9 @@ class FAISSVectorStore:
         if not valid_docs:
             raise ValueError("No valid documents to add to vectorstore. All documents are empty or None.")
         
-        # Check dimension compatibility before adding
-        is_compatible, existing_dim, new_dim = self._check_dimension_compatibility()
+        # Embed once; the dimension check uses these vectors instead of a probe call
+        vectors = self.embeddings.embed_documents([doc.page_content for doc in valid_docs])
+        is_compatible, existing_dim, new_dim = self._check_dimension_compatibility(len(vectors[0]))
         
         if not is_compatible:
             error_msg = (
@@ -236,11 +350,9 @@ class FAISSVectorStore:
             if auto_recreate_on_mismatch:
                 logger.warning(f"{error_msg}")
                 logger.warning("⚠️ Automatically recreating vectorstore with correct dimension...")
-                # Clear the existing vectorstore
-                self.vectorstore = None
-                # Recreate with new documents
                 logger.info(f"Recreating FAISS vectorstore with {len(valid_docs)} documents (dimension: {new_dim})...")
-                self.vectorstore = FAISS.from_documents(valid_docs, self.embeddings)
+                self._create_index(new_dim)
+                self._add_embedded(valid_docs, vectors)
                 logger.info("✅ Vectorstore recreated successfully with correct dimension")
                 return
             else:
@@ -250,50 +362,11 @@ class FAISSVectorStore:
                     f"Set auto_recreate_on_mismatch=True to automatically fix this."
                 )
         
-        logger.info(f"Adding {len(valid_docs)} documents to FAISS vectorstore (dimension: {new_dim or self._get_embedding_dimension()})...")
+        logger.info(f"Adding {len(valid_docs)} documents to FAISS vectorstore (dimension: {len(vectors[0])})...")
         try:
-            self.vectorstore.add_documents(valid_docs)
+            self._ensure_writable()
+            self._add_embedded(valid_docs, vectors)
             logger.info("Documents added to FAISS vectorstore successfully")
-        except AssertionError as e:
-            # Catch FAISS dimension assertion error
-            error_str = str(e) if str(e) else "AssertionError"
-            if "d == self.d" in error_str or "dimension" in error_str.lower():
-                # This is a dimension mismatch error
-                existing_dim = self._get_existing_dimension()
-                new_dim = self._get_embedding_dimension()
-                
-                if auto_recreate_on_mismatch:
-                    logger.warning(
-                        f"⚠️ Dimension mismatch detected during add_documents: "
-                        f"existing={existing_dim}, new={new_dim}. Auto-recreating..."
-                    )
-                    # Get all existing documents from the vectorstore
-                    try:
-                        # Try to retrieve existing documents (if possible)
-                        existing_docs = []
-                        # Note: FAISS doesn't easily allow retrieving all documents, so we'll just recreate with new ones
-                        logger.warning("⚠️ Existing documents in vectorstore will be lost. Recreating with new documents only.")
-                    except Exception:
-                        pass
-                    
-                    # Clear and recreate
-                    self.vectorstore = None
-                    self.vectorstore = FAISS.from_documents(valid_docs, self.embeddings)
-                    logger.info(f"✅ Vectorstore recreated with {len(valid_docs)} documents (dimension: {new_dim})")
-                    return
-                else:
-                    detailed_error = (
-                        f"❌ FAISS Dimension Mismatch!\n"
-                        f"   Existing index dimension: {existing_dim}\n"
-                        f"   New embedding dimension: {new_dim}\n"
-                        f"   Embedding model: {getattr(self.embeddings, 'model', 'unknown')}\n\n"
-                        f"   Solution: Delete the existing vectorstore or set auto_recreate_on_mismatch=True"
-                    )
-                    logger.error(detailed_error)
-                    raise ValueError(detailed_error) from e
-            else:
-                # Other AssertionError, re-raise as-is
-                raise
         except Exception as e:
             import traceback
             error_details = traceback.format_exc()
@@ -312,11 +385,64 @@ class FAISSVectorStore:
         )
     
     def save_local(self, path: str):
-        """Save vector store to local disk."""
+        """
+        Save vector store to local disk.
+        
+        The docstore is attached to ``docstore.sqlite`` in the directory (later adds
+        are written through). The index is written in full on the first save, after
+        an index-type change or once deltas pass FAISS_COMPACT_RATIO; otherwise only
+        the vectors added since the last save are appended as a delta segment.
+        """
         if self.vectorstore is None:
             raise ValueError("No vector store to save")
-        self.vectorstore.save_local(path)
-        logger.info(f"FAISS vectorstore saved to {path}")
+        os.makedirs(path, exist_ok=True)
+        files = FaissIndexFiles(path)
+        index = self.vectorstore.index
+        
+        same_target = self._saved_path is not None and os.path.abspath(self._saved_path) == os.path.abspath(path)
+        docstore = self.vectorstore.docstore
+        if isinstance(docstore, SqliteDocstore):
+            docstore.attach(os.path.join(path, DOCSTORE_FILE))
+        full_vectors = getattr(self.vectorstore, 'full_vectors', None)
+        if full_vectors is not None:
+            full_vectors.attach(os.path.join(path, VECTORS_FILE))
+        
+        unsaved = index.ntotal - self._saved_ntotal
+        full = (
+            self._needs_full_save
+            or not same_target
+            or not files.exists()
+            or unsaved > ARISConfig.FAISS_COMPACT_RATIO * max(files.read_meta().get("base_ntotal", 0), 1)
+        )
+        if full:
+            self._ensure_writable()
+            files.write_full(self.vectorstore.index, self._get_embedding_dimension())
+            logger.info(f"FAISS vectorstore saved to {path} (full: {index.ntotal} vectors, {index_kind(index)})")
+        elif unsaved > 0 and self._pending_vectors:
+            files.append_delta(np.concatenate(self._pending_vectors))
+            logger.info(f"FAISS vectorstore saved to {path} (delta: {unsaved} vectors)")
+        
+        self._saved_path = path
+        self._saved_ntotal = index.ntotal
+        self._pending_vectors = []
+        self._needs_full_save = False
+    
+    def _load_legacy(self, path: str):
+        """Load the pickle-based LangChain format and move its documents into a SQLite docstore."""
+        legacy = FAISS.load_local(path, self.embeddings, allow_dangerous_deserialization=True)
+        docstore = SqliteDocstore()
+        mapping = legacy.index_to_docstore_id
+        docs = {}
+        for position in sorted(mapping):
+            doc_id = mapping[position]
+            doc = legacy.docstore.search(doc_id)
+            if isinstance(doc, str):
+                doc = Document(page_content=doc, metadata={})
+            docs[doc_id] = doc
+        docstore.add(docs)
+        self.vectorstore = self._wrap_index(legacy.index, docstore, docstore.positions())
+        self._needs_full_save = True
+        logger.info(f"Loaded legacy FAISS vectorstore from {path}; it will be migrated on the next save")
     
     def load_local(self, path: str):
         """Load vector store from local disk with dimension validation."""
@@ -324,7 +450,33 @@ class FAISSVectorStore:
             raise FileNotFoundError(f"Vector store path not found: {path}")
         
         try:
-            self.vectorstore = FAISS.load_local(path, self.embeddings, allow_dangerous_deserialization=True)
+            files = FaissIndexFiles(path)
+            if files.exists():
+                index, meta, delta_vectors = files.load(mmap=ARISConfig.FAISS_MMAP)
+                docstore = SqliteDocstore(os.path.join(path, DOCSTORE_FILE))
+                self._mmap_loaded = ARISConfig.FAISS_MMAP and delta_vectors is None
+                if delta_vectors is not None:
+                    index.add(delta_vectors)
+                if hasattr(index, "make_direct_map"):
+                    index.make_direct_map()
+                apply_search_params(index, ARISConfig)
+                # Docstore rows are written through on add, the index only on save:
+                # rows past the saved index belong to adds that were never saved
+                dropped = docstore.truncate(index.ntotal)
+                if dropped:
+                    logger.warning(f"⚠️ FAISS: dropped {dropped} docstore rows added after the last save of {path}")
+                vectors_path = os.path.join(path, VECTORS_FILE)
+                full_vectors = FullPrecisionVectors(index.d, vectors_path) if os.path.exists(vectors_path) else None
+                if full_vectors is not None and full_vectors.truncate(index.ntotal):
+                    logger.warning(f"⚠️ FAISS: dropped full-precision vectors added after the last save of {path}")
+                self.vectorstore = self._wrap_index(index, docstore, docstore.positions(), full_vectors)
+                self._embedding_dimension = meta.get("dimension") or index.d
+                self._saved_path = path
+                self._saved_ntotal = index.ntotal
+                self._pending_vectors = []
+                self._needs_full_save = False
+            else:
+                self._load_legacy(path)
             
             # Validate dimension after loading
             is_compatible, existing_dim, new_dim = self._check_dimension_compatibility()
@@ -338,7 +490,7 @@ class FAISSVectorStore:
                 )
                 # Don't fail here, let add_documents handle the recreation
             else:
-                logger.info(f"FAISS vectorstore loaded from {path} (dimension: {existing_dim})")
+                logger.info(f"FAISS vectorstore loaded from {path} (dimension: {existing_dim}, mmap: {self._mmap_loaded})")
         except Exception as e:
             # If loading fails due to dimension mismatch, log and re-raise
             error_msg = str(e)